@@ -1,31 +1,201 @@
+import os
 import sys
+import argparse
 from antlr4 import *
 from CompiscriptLexer import CompiscriptLexer
 from CompiscriptParser import CompiscriptParser
-from semantic_analizer import semantic_analyzer 
+from semantic_analizer import semantic_analyzer
+from tac_generator import tac_generator
+from pass_manager import optimize, OPT_LEVELS
+from tac_passes import PASSES
+from tac_runtime import compiscript_error
+from tac_vm import run_tac
+from tac_bytecode import run_bytecode
+from tac_closure import run_closures
+from tac_python import run_python
+from tac_c import build_native, native_build_error
+from frame_layout import format_layout
+from object_layout import format_objects
+from tac_analysis import build_call_graph, format_call_graph
+from tac_mips import run_mips, mips_source, mips_build_error
+from tac_x86 import build_x86
 
-def main(argv):
-    input_stream = FileStream(argv[1])
+# Motores de ejecución para 'run'
+ENGINES = {
+    "tac": run_tac,
+    "bytecode": run_bytecode,
+    "closure": run_closures,
+    "python": run_python,
+    "mips": run_mips,
+}
+
+# Subcomandos: compile (por defecto) escribe el TAC, run lo ejecuta en la VM, build genera un ejecutable o ensamblador
+COMMANDS = ("compile", "run", "build")
+DEFAULT_OUTPUT = "intermediate_code.txt"
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="Driver.py", description="Compilador de Compiscript")
+    parser.add_argument("source", help="archivo fuente .cps")
+    parser.add_argument("-O", dest="opt_level", type=int, choices=sorted(OPT_LEVELS), default=0,
+                        help="nivel de optimización (-O0, -O1, -O2)")
+    parser.add_argument("--passes", default=None,
+                        help=f"lista de pasadas separadas por coma, reemplaza el preset de -O ({', '.join(PASSES)})")
+    parser.add_argument("-o", dest="output", default=DEFAULT_OUTPUT,
+                        help="archivo de salida del TAC (o del ejecutable con 'build')")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="tac", help="motor de ejecución para 'run'")
+    parser.add_argument("--native", action="store_true", help="'build': generar C y compilarlo con cc")
+    parser.add_argument("--mips", action="store_true", help="'build': generar ensamblador de MIPS32 (.s)")
+    parser.add_argument("--x86", action="store_true",
+                        help="'build': generar ensamblador x86-64, ensamblarlo con as y enlazarlo con el runtime")
+    parser.add_argument("--profile", action="store_true",
+                        help="'run' con --engine mips: instrucciones y ciclos por función (a stderr)")
+    parser.add_argument("--memoize", type=int, default=0, metavar="N",
+                        help="'run' con --engine tac: memorizar los últimos N resultados de cada función pura")
+    parser.add_argument("--registers", type=int, default=8,
+                        help="MIPS: registros $s para el asignador de registros (0-8, 0 = todo en memoria)")
+    parser.add_argument("--allocator", choices=["linear", "coloring"], default=None,
+                        help="MIPS: asignador de registros (por omisión coloring con -O2 y linear si no)")
+    parser.add_argument("--regalloc", action="store_true",
+                        help="MIPS: imprimir la asignación de registros por función (a stderr)")
+    return parser.parse_args(argv)
+
+def compile_source(args, verbose=True, contiguous_arrays=True):
+    """Análisis semántico + TAC (+ optimización). Devuelve la tabla de cuádruplos o None si hubo errores."""
+    input_stream = FileStream(args.source, encoding="utf-8")
     lexer = CompiscriptLexer(input_stream)
     stream = CommonTokenStream(lexer)
     parser = CompiscriptParser(stream)
-    tree = parser.program() 
+    tree = parser.program()
     analyzer = semantic_analyzer()
     analyzer.visit(tree)
+    # Al ejecutar, los mensajes del compilador van a stderr para no mezclarse con la salida del programa
+    log = sys.stdout if verbose else sys.stderr
 
     # Mostrar errores o tabla de símbolos
     if analyzer.errors:
-        print("Se encontraron errores semánticos:")
+        print("Se encontraron errores semánticos:", file=log)
         for err in analyzer.errors:
-            print("  ", err)
-    else:
+            print("  ", err, file=log)
+    elif verbose:
         print(" Análisis semántico completado sin errores.")
 
-    print("\n--- TABLA DE SÍMBOLOS ---")
-    analyzer.global_table.print_table()
+    if verbose:
+        print("\n--- TABLA DE SÍMBOLOS ---")
+        analyzer.global_table.print_table()
+
+    if analyzer.errors:
+        return None
+
+    generator = tac_generator(analyzer.global_table, contiguous_arrays)
+    if verbose:
+        print("\n--- REGISTROS DE ACTIVACIÓN ---")
+        print(format_layout(generator.frames))
+    generator.visit(tree)
+    if verbose and generator.object_layouts:
+        print("\n--- DISPOSICIÓN DE OBJETOS ---")
+        print(format_objects(generator.object_layouts))
+    if verbose:
+        print("\n--- GRAFO DE LLAMADAS ---")
+        print(format_call_graph(build_call_graph(generator.quadruple_table.quadruples)))
+
+    passes = args.passes.split(",") if args.passes else None
+    if passes or args.opt_level:
+        print(f"\n--- OPTIMIZACIÓN (-O{args.opt_level}) ---", file=log)
+        generator.quadruple_table.quadruples = optimize(
+            generator.quadruple_table.quadruples, opt_level=args.opt_level, passes=passes, output=log)
+    return generator.quadruple_table
+
+def register_allocator(args):
+    """El coloreo de grafos tarda más en compilar; se usa por omisión solo con -O2."""
+    if args.allocator:
+        return args.allocator
+    return "coloring" if args.opt_level >= 2 else "linear"
+
+def contiguous_arrays(args):
+    """
+    Las matrices contiguas ahorran una carga de fila por dimensión en MIPS, C y
+    x86-64. En los motores de Python cada fila ya es una lista y solo sumarían
+    la aritmética del índice, así que 'run' las deja anidadas.
+    """
+    return args.engine == "mips"
+
+def main(argv):
+    argv = list(argv[1:])
+    command = argv.pop(0) if argv and argv[0] in COMMANDS else "compile"
+    args = parse_args(argv)
+
+    if command == "run":
+        table = compile_source(args, verbose=False, contiguous_arrays=contiguous_arrays(args))
+        if table is None:
+            return 1
+        if args.profile and args.engine != "mips":
+            print("--profile solo está disponible con --engine mips", file=sys.stderr)
+            return 1
+        if args.memoize and args.engine != "tac":
+            print("--memoize solo está disponible con --engine tac", file=sys.stderr)
+            return 1
+        try:
+            if args.engine == "mips":
+                run_mips(table.quadruples, profile=sys.stderr if args.profile else None,
+                         registers=args.registers, report=sys.stderr if args.regalloc else None,
+                         allocator=register_allocator(args))
+            elif args.engine == "tac":
+                run_tac(table.quadruples, memoize=args.memoize)
+            else:
+                ENGINES[args.engine](table.quadruples)
+        except mips_build_error as error:
+            print(f"Error al generar el ensamblador: {error}", file=sys.stderr)
+            return 1
+        except compiscript_error as error:
+            print(f"Error en tiempo de ejecución: {error}", file=sys.stderr)
+            return 1
+        return 0
+
+    if command == "build":
+        if args.native + args.mips + args.x86 != 1:
+            print("build requiere un backend: --native, --x86 o --mips", file=sys.stderr)
+            return 1
+        table = compile_source(args, verbose=False)
+        if table is None:
+            return 1
+        if args.mips:
+            assembly = args.output
+            if assembly == DEFAULT_OUTPUT:
+                assembly = os.path.splitext(os.path.basename(args.source))[0] + ".s"
+            try:
+                source = mips_source(table.quadruples, args.registers, sys.stderr if args.regalloc else None,
+                                     register_allocator(args))
+            except mips_build_error as error:
+                print(f"Error al generar el ensamblador: {error}", file=sys.stderr)
+                return 1
+            with open(assembly, "w", encoding="utf-8") as f:
+                f.write(source)
+            print(f"Ensamblador MIPS generado: {assembly}", file=sys.stderr)
+            return 0
+        executable = args.output
+        if executable == DEFAULT_OUTPUT:
+            executable = os.path.splitext(os.path.basename(args.source))[0]
+        try:
+            if args.x86:
+                build_x86(table.quadruples, executable)
+            else:
+                build_native(table.quadruples, executable)
+        except native_build_error as error:
+            print(f"Error al generar el ejecutable: {error}", file=sys.stderr)
+            return 1
+        source = f"ensamblador: {executable}.s" if args.x86 else f"fuente C: {executable}.c"
+        print(f"Ejecutable generado: {executable} ({source})", file=sys.stderr)
+        return 0
+
+    table = compile_source(args)
+    if table is None:
+        return 1
+    table.write_tac(args.output)
+    return 0
 
 if __name__ == '__main__':
     if len(sys.argv) < 2:
-        print("Uso: python3 main.py <archivo_fuente.compiscript>")
+        print("Uso: python3 Driver.py [run|build] <archivo_fuente.cps> [-O0|-O1|-O2] [--passes a,b,c] "
+              "[--engine tac|bytecode|closure|python|mips] [--memoize N] [--profile] [--registers N] [--allocator linear|coloring] [--regalloc] [--native|--x86|--mips] [-o salida]")
         sys.exit(1)
-    main(sys.argv)
+    sys.exit(main(sys.argv))
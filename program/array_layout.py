@@ -0,0 +1,186 @@
+"""
+Descriptores de arreglos y almacenamiento contiguo de arreglos multidimensionales.
+
+Un descriptor guarda el tipo y tamaño del elemento y el largo de cada
+dimensión (None si no se conoce en compilación). Con todas las dimensiones
+conocidas, el elemento [i1]...[in] está en la posición
+
+    i1 * s1 + ... + in * sn,    sk = largo(k+1) * ... * largo(n)
+
+de un solo bloque en orden por filas.
+
+Un arreglo de 2 o más dimensiones se guarda así cuando se declara con un
+literal rectangular (todas las filas del mismo largo) y todos sus usos lo
+indexan con al menos tantos índices como dimensiones tiene el literal: en
+ese caso nadie ve una fila suelta y m[i][j] es un solo acceso a m[i*s1 + j].
+Cualquier otro uso (pasarlo a una función, reasignarlo, recorrerlo con
+foreach, imprimirlo, m[i] sin el segundo índice) lo deja anidado.
+
+La decisión es por nombre sobre todo el árbol: el nombre tiene que
+declararse una sola vez con let/var fuera de una clase y no aparecer como
+parámetro, función, constante ni destino de una asignación.
+"""
+from CompiscriptParser import CompiscriptParser
+from frame_layout import storage
+from constant_eval import constant_expression
+
+
+class array_descriptor():
+    """Forma de un arreglo: tipo del elemento y largo de cada dimensión."""
+    def __init__(self, lengths, element_type=None):
+        self.lengths = lengths
+        self.element_type = element_type
+        self.flat = False       # True si se guarda contiguo en orden por filas
+
+    def rank(self):
+        return len(self.lengths)
+
+    def known(self):
+        return all(n is not None for n in self.lengths)
+
+    def count(self):
+        """Cantidad de elementos (None si alguna dimensión no se conoce)."""
+        if not self.known():
+            return None
+        total = 1
+        for n in self.lengths:
+            total *= n
+        return total
+
+    def element_size(self):
+        return storage(self.element_type)[0]
+
+    def size(self):
+        """Bytes del bloque contiguo (None si alguna dimensión no se conoce)."""
+        count = self.count()
+        return None if count is None else count * self.element_size()
+
+    def strides(self):
+        """Paso de cada dimensión, en elementos, para el orden por filas."""
+        strides = []
+        step = 1
+        for n in reversed(self.lengths):
+            strides.append(step)
+            step *= n if n is not None else 0
+        return list(reversed(strides))
+
+    def __str__(self):
+        dims = "".join(f"[{'?' if n is None else n}]" for n in self.lengths)
+        text = f"{self.element_type}{dims}"
+        if self.known():
+            text += f" = {self.size()} bytes"
+        return text + (" contiguo" if self.flat else "")
+
+
+def array_literal(expr):
+    """El ArrayLiteralContext de una expresión que es solo un literal de arreglo, o None."""
+    node = expr
+    while node is not None and not isinstance(node, CompiscriptParser.ArrayLiteralContext):
+        children = list(node.getChildren()) if node.getChildCount() else []
+        if len(children) != 1 or not hasattr(children[0], "getChildren"):
+            return None
+        node = children[0]
+    return node
+
+
+def literal_shape(literal):
+    """Largo de cada nivel de un literal anidado; None en el nivel donde deja de ser rectangular."""
+    elements = literal.expression()
+    inner = [array_literal(e) for e in elements]
+    if not elements or any(x is None for x in inner):
+        return [len(elements)]
+    shapes = [literal_shape(x) for x in inner]
+    if any(s != shapes[0] or None in s for s in shapes):
+        return [len(elements), None]
+    return [len(elements)] + shapes[0]
+
+
+def literal_leaves(literal, rank):
+    """Expresiones de los elementos del literal a profundidad rank, en orden por filas."""
+    if rank == 1:
+        return list(literal.expression())
+    leaves = []
+    for e in literal.expression():
+        leaves += literal_leaves(array_literal(e), rank - 1)
+    return leaves
+
+
+def literal_data(literal):
+    """
+    (largos, valores) de un literal rectangular cuyos elementos son todos
+    constantes, con los valores como literales del TAC en orden por filas; None
+    si algún elemento se calcula al correr o alguna dimensión está vacía.
+    """
+    lengths = literal_shape(literal)
+    if None in lengths or 0 in lengths:
+        return None
+    values = [constant_expression(e) for e in literal_leaves(literal, len(lengths))]
+    if None in values:
+        return None
+    return tuple(lengths), tuple(values)
+
+
+def describe_literal(element_type, literal):
+    return array_descriptor(literal_shape(literal), element_type)
+
+
+def leading_indices(lhs):
+    """Cuántos sufijos seguidos de índice [..] tiene un leftHandSide desde el inicio."""
+    count = 0
+    for suffix in lhs.suffixOp() or []:
+        if not isinstance(suffix, CompiscriptParser.IndexExprContext):
+            break
+        count += 1
+    return count
+
+
+def identifier_nodes(tree):
+    pending = [tree]
+    while pending:
+        node = pending.pop()
+        if hasattr(node, "getChildren"):
+            pending.extend(node.getChildren())
+        elif getattr(node, "symbol", None) is not None and node.symbol.type == CompiscriptParser.Identifier:
+            yield node
+
+
+def is_member_name(node):
+    """El identificador es el nombre de una propiedad (obj.x), no una variable."""
+    parent = node.parentCtx
+    if isinstance(parent, (CompiscriptParser.PropertyAccessExprContext, CompiscriptParser.PropertyAssignExprContext)):
+        return True
+    return isinstance(parent, CompiscriptParser.AssignmentContext) and len(parent.expression()) == 2
+
+
+def flat_arrays(tree):
+    """{nombre: array_descriptor} de los arreglos que pueden guardarse contiguos."""
+    declarations = {}
+    uses = {}
+    excluded = set()
+    for node in identifier_nodes(tree):
+        name = node.getText()
+        parent = node.parentCtx
+        if isinstance(parent, CompiscriptParser.VariableDeclarationContext):
+            declarations.setdefault(name, []).append(parent)
+        elif isinstance(parent, CompiscriptParser.IdentifierExprContext):
+            uses.setdefault(name, []).append(leading_indices(parent.parentCtx))
+        elif not is_member_name(node):
+            excluded.add(name)
+
+    result = {}
+    for name, decls in declarations.items():
+        if name in excluded or len(decls) != 1:
+            continue
+        decl = decls[0]
+        if isinstance(decl.parentCtx, CompiscriptParser.ClassMemberContext) or not decl.initializer():
+            continue
+        literal = array_literal(decl.initializer().expression())
+        if literal is None:
+            continue
+        descriptor = array_descriptor(literal_shape(literal))
+        if descriptor.rank() < 2 or not descriptor.known():
+            continue
+        if all(n >= descriptor.rank() for n in uses.get(name, [])):
+            descriptor.flat = True
+            result[name] = descriptor
+    return result
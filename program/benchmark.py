@@ -0,0 +1,131 @@
+"""
+Compara los motores de ejecución sobre los programas de benchmarks/.
+
+Uso: python3 benchmark.py [-O0|-O1|-O2] [--repeat N] [--allocators] [programa.cps ...]
+
+Cada programa se compila una vez; para cada motor se toma el mejor tiempo de N
+corridas (incluye cargar/compilar el TAC al formato del motor) y se verifica
+que todos impriman exactamente lo mismo.
+
+Con --allocators se comparan en cambio los asignadores de registros: ciclos
+del simulador de MIPS sin registros, con barrido lineal y con coloreo, y el
+tiempo que tarda cada asignación.
+"""
+import sys
+import io
+import os
+import glob
+import time
+import argparse
+from antlr4 import *
+from CompiscriptLexer import CompiscriptLexer
+from CompiscriptParser import CompiscriptParser
+from semantic_analizer import semantic_analyzer
+from tac_generator import tac_generator
+from pass_manager import optimize, OPT_LEVELS
+from tac_vm import run_tac
+from tac_bytecode import run_bytecode
+from tac_closure import run_closures
+from tac_python import run_python
+from tac_mips import run_mips
+from tac_regalloc import allocate_registers
+
+ENGINES = [
+    ("tac", run_tac),
+    ("bytecode", run_bytecode),
+    ("closure", run_closures),
+    ("python", run_python),
+]
+BENCHMARK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+
+
+def compile_program(path, opt_level, contiguous_arrays=True):
+    tree = CompiscriptParser(CommonTokenStream(CompiscriptLexer(FileStream(path, encoding="utf-8")))).program()
+    analyzer = semantic_analyzer()
+    analyzer.visit(tree)
+    if analyzer.errors:
+        raise SystemExit(f"{path}: errores semánticos:\n  " + "\n  ".join(analyzer.errors))
+    generator = tac_generator(analyzer.global_table, contiguous_arrays)
+    generator.visit(tree)
+    return optimize(generator.quadruple_table.quadruples, opt_level=opt_level, verbose=False)
+
+
+def time_engine(engine, quads, repeat):
+    best = None
+    output = None
+    for _ in range(repeat):
+        out = io.StringIO()
+        start = time.perf_counter()
+        engine(quads, output=out)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        output = out.getvalue()
+    return best, output
+
+
+def compare_allocators(programs, opt_level):
+    """Ciclos en el simulador de MIPS con cada asignador; la salida debe ser la misma."""
+    setups = [("memoria", 0, "linear"), ("lineal", 8, "linear"), ("coloreo", 8, "coloring")]
+    print(f"{'programa':<12s}" + "".join(f"{name:>12s}" for name, _, _ in setups)
+          + f"{'acel. lin':>10s}{'acel. col':>10s}{'t. lineal':>11s}{'t. coloreo':>11s}")
+    status = 0
+    for path in programs:
+        quads = compile_program(path, opt_level)
+        cycles = []
+        outputs = []
+        for _, registers, allocator in setups:
+            out = io.StringIO()
+            cycles.append(run_mips(quads, output=out, registers=registers, allocator=allocator).totals()[1])
+            outputs.append(out.getvalue())
+        compile_times = []
+        for method in ("linear", "coloring"):
+            start = time.perf_counter()
+            allocate_registers(quads, 8, method=method)
+            compile_times.append(time.perf_counter() - start)
+        name = os.path.splitext(os.path.basename(path))[0]
+        # Ciclos sin registros / ciclos con cada asignador
+        print(f"{name:<12s}" + "".join(f"{c:12d}" for c in cycles)
+              + "".join(f"{cycles[0] / c:9.2f}x" for c in cycles[1:])
+              + "".join(f"{t * 1000:9.1f}ms" for t in compile_times))
+        if any(out != outputs[0] for out in outputs):
+            print(f"[❌] {name}: los asignadores no imprimen lo mismo")
+            status = 1
+    return status
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="benchmark.py", description="Benchmark de motores de ejecución")
+    parser.add_argument("programs", nargs="*", help="programas .cps (por defecto benchmarks/*.cps)")
+    parser.add_argument("-O", dest="opt_level", type=int, choices=sorted(OPT_LEVELS), default=2)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--allocators", action="store_true",
+                        help="comparar los asignadores de registros en el simulador de MIPS")
+    args = parser.parse_args(argv[1:])
+    programs = args.programs or sorted(glob.glob(os.path.join(BENCHMARK_DIR, "*.cps")))
+    if args.allocators:
+        return compare_allocators(programs, args.opt_level)
+
+    header = f"{'programa':<12s}" + "".join(f"{name:>12s}" for name, _ in ENGINES) + f"{'speedup':>10s}"
+    print(header)
+    status = 0
+    for path in programs:
+        # Mismo TAC que 'Driver.py run' con los motores de Python (matrices anidadas)
+        quads = compile_program(path, args.opt_level, contiguous_arrays=False)
+        times = []
+        outputs = []
+        for _, engine in ENGINES:
+            elapsed, output = time_engine(engine, quads, args.repeat)
+            times.append(elapsed)
+            outputs.append(output)
+        name = os.path.splitext(os.path.basename(path))[0]
+        # speedup: interpretación de cuádruplos contra el backend de Python
+        row = f"{name:<12s}" + "".join(f"{t * 1000:10.1f}ms" for t in times) + f"{times[0] / times[-1]:9.2f}x"
+        print(row)
+        if any(out != outputs[0] for out in outputs):
+            print(f"[❌] {name}: los motores no imprimen lo mismo")
+            status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
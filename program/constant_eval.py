@@ -0,0 +1,75 @@
+"""
+Evaluación al compilar de expresiones constantes del árbol sintáctico.
+
+Una expresión es constante si solo usa literales escalares, constantes ya
+evaluadas y operadores (unarios, binarios, paréntesis y el ternario). El
+análisis semántico evalúa el inicializador de cada const y, si es constante,
+guarda su valor como literal del TAC en el símbolo (Register.value) y en cada
+identificador que lo usa (_constant_value). El generador emite ese literal en
+lugar del nombre, así que la constante no ocupa memoria ni necesita un '='.
+
+Los operadores se evalúan con tac_runtime, igual que el plegado de constantes:
+una operación que fallaría al correr (división entre cero, tipos inválidos) no
+es constante y se deja para el runtime.
+"""
+from antlr4 import ParserRuleContext
+from antlr4.tree.Tree import TerminalNode
+from CompiscriptParser import CompiscriptParser
+from tac_runtime import compiscript_error, constant_value, format_constant, binary_op, unary_op
+
+
+def constant_expression(ctx):
+    """Literal del TAC ('5', '"hola"', 'true', 'null') con el valor de la expresión, o None si no es constante."""
+    found, value = evaluate(ctx)
+    return format_constant(value) if found else None
+
+
+def evaluate(ctx):
+    """(True, valor) si la expresión es constante; (False, None) si no."""
+    if isinstance(ctx, CompiscriptParser.IdentifierExprContext):
+        text = getattr(ctx, "_constant_value", None)
+        return (True, constant_value(text)) if text is not None else (False, None)
+    if isinstance(ctx, CompiscriptParser.LiteralExprContext):
+        if ctx.arrayLiteral():
+            return False, None
+        return True, constant_value(ctx.getText())
+    if isinstance(ctx, (CompiscriptParser.AssignExprContext, CompiscriptParser.PropertyAssignExprContext)):
+        return False, None
+    if isinstance(ctx, CompiscriptParser.LeftHandSideContext) and ctx.suffixOp():
+        return False, None
+    if isinstance(ctx, CompiscriptParser.TernaryExprContext) and ctx.expression():
+        found, condition = evaluate(ctx.logicalOrExpr())
+        if not found or not isinstance(condition, bool):
+            return False, None
+        return evaluate(ctx.expression(0) if condition else ctx.expression(1))
+    if not isinstance(ctx, ParserRuleContext):
+        return False, None
+
+    children = list(ctx.getChildren())
+    operands = [c for c in children if isinstance(c, ParserRuleContext)]
+    if len(children) == 3 and children[0].getText() == "(":
+        return evaluate(operands[0])    # paréntesis
+    if len(children) == 2 and isinstance(children[0], TerminalNode):
+        found, value = evaluate(children[1])
+        return try_operation(unary_op, children[0].getText(), value) if found else (False, None)
+    if len(operands) == 1 and len(children) == 1:
+        return evaluate(operands[0])
+
+    # Cadena de operadores binarios del mismo nivel: a op b op c, de izquierda a derecha
+    if not operands or len(children) != 2 * len(operands) - 1:
+        return False, None
+    found, value = evaluate(children[0])
+    for k in range(1, len(children), 2):
+        if not found:
+            return False, None
+        found, right = evaluate(children[k + 1])
+        if found:
+            found, value = try_operation(binary_op, children[k].getText(), value, right)
+    return found, value
+
+
+def try_operation(operation, op, *values):
+    try:
+        return True, operation(op, *values)
+    except compiscript_error:
+        return False, None
@@ -0,0 +1,215 @@
+"""
+Registros de activación a partir de la tabla de símbolos.
+
+Cada función tiene un registro con offsets crecientes desde su base:
+
+    0                 valor de retorno (si la función devuelve algo)
+    ...               parámetros, con 'this' primero en los métodos
+    ...               enlace de control y dirección de retorno (8 bytes cada uno)
+    ...               variables del cuerpo de la función
+    ...               variables de los ámbitos anidados (if, else, lazos, try, catch)
+
+Las variables de un ámbito solo existen mientras se ejecuta, así que los
+ámbitos hermanos (if/else, dos lazos seguidos, try/catch) nunca están vivos a
+la vez: todos empiezan en el mismo offset, después de las variables de su
+padre, y el registro mide lo que mide la rama más profunda. Cada valor se
+alinea a su tamaño y el registro completo a 8 bytes.
+
+El programa principal usa el mismo esquema: las globales van desde 0 y los
+ámbitos de nivel superior se superponen a continuación. Los campos de una
+clase se ubican aparte (su offset es dentro del objeto): primero los
+heredados, con los offsets que tienen en el padre, y después los propios en el
+orden en que se declaran, como en object_layout.py. Las funciones anidadas
+tienen su propio registro.
+
+El registro queda en el Register de la función (frame y frame_size) y el
+offset de cada variable en el Register de la variable (offset y address).
+Los temporales del TAC no están en la tabla de símbolos y no se cuentan.
+"""
+
+POINTER_SIZE = 8
+LINK_SIZE = 8
+FRAME_ALIGNMENT = 8
+SCALAR_SIZES = {"integer": 4, "int": 4, "boolean": 1, "bool": 1, "float": 8, "double": 8}
+
+
+def storage(typ, dim=0):
+    """(tamaño, alineación) de un valor: escalares por tipo; cadenas, arreglos y objetos son punteros."""
+    if isinstance(dim, int) and dim > 0:
+        return POINTER_SIZE, POINTER_SIZE
+    size = SCALAR_SIZES.get(typ.lower() if isinstance(typ, str) else None, POINTER_SIZE)
+    return size, size
+
+
+def align(offset, alignment):
+    return (offset + alignment - 1) // alignment * alignment
+
+
+class activation_record():
+    """Distribución de un registro de activación (o del área estática del programa)."""
+    def __init__(self, name):
+        self.name = name
+        self.size = 0
+        self.return_offset = None
+        self.return_size = 0
+        self.params = {}            # nombre -> offset
+        self.control_link = None
+        self.return_address = None
+        self.slots = []             # (ámbito, nombre, offset, tamaño)
+        self.scope_bases = {}       # ámbito anidado -> offset donde empieza
+
+    def place(self, scope, name, elem, offset):
+        """Ubica elem en el primer offset alineado desde offset; devuelve el fin."""
+        size, alignment = storage(getattr(elem, "type", None), getattr(elem, "dim", 0))
+        offset = align(offset, alignment)
+        elem.offset = offset
+        elem.update_memory_address(offset)
+        self.slots.append((scope.scope, name, offset, size))
+        return offset + size
+
+    def offset_of(self, name, scope=None):
+        """Offset de name (el primero que aparezca si no se da el ámbito)."""
+        for scope_name, slot_name, offset, _ in self.slots:
+            if slot_name == name and scope in (None, scope_name):
+                return offset
+        return None
+
+
+def is_frame_scope(table):
+    return table.scope.startswith(("function_", "class_"))
+
+
+def layout_scope(record, table, start, skip=()):
+    """Variables de table desde start y sus ámbitos hijos superpuestos; devuelve el fin."""
+    offset = start
+    for name, elem in table.elements.items():
+        if getattr(elem, "kind", None) != "variable" or name in skip:
+            continue
+        offset = record.place(table, name, elem, offset)
+    end = offset
+    for child in table.children:
+        if is_frame_scope(child):
+            continue
+        record.scope_bases[child.scope] = offset
+        end = max(end, layout_scope(record, child, offset))
+    return end
+
+
+def layout_function(function, table, params):
+    """Registro de activación de una función; lo guarda en su Register."""
+    record = activation_record(function.identifier)
+    offset = 0
+    if function.return_type:
+        record.return_offset = 0
+        record.return_size = storage(function.return_type, getattr(function, "dim", 0))[0]
+        offset = record.return_size
+    placed = []
+    for name in ["this"] + [p["name"] for p in params]:
+        elem = table.elements.get(name)
+        if elem is None or name in placed:
+            continue
+        offset = record.place(table, name, elem, offset)
+        record.params[name] = elem.offset
+        placed.append(name)
+    record.control_link = align(offset, LINK_SIZE)
+    record.return_address = record.control_link + LINK_SIZE
+    end = layout_scope(record, table, record.return_address + LINK_SIZE, skip=placed)
+    record.size = align(end, FRAME_ALIGNMENT)
+    function.frame = record
+    function.frame_size = record.size
+    return record
+
+
+def layout_class(table, base=None):
+    """Campos de una clase (offsets dentro del objeto): los de base y luego los propios en orden de declaración."""
+    record = activation_record(table.scope)
+    offset = 0
+    if base is not None:
+        record.slots = list(base.slots)
+        offset = base.size
+    for name, elem in table.elements.items():
+        if getattr(elem, "kind", None) != "variable":
+            continue
+        inherited = base.offset_of(name) if base is not None else None
+        if inherited is not None:
+            # Un campo redeclarado conserva el offset del padre
+            elem.offset = inherited
+            elem.update_memory_address(inherited)
+            continue
+        offset = record.place(table, name, elem, offset)
+    record.size = align(offset, FRAME_ALIGNMENT)
+    return record
+
+
+def layout_program(global_table):
+    """
+    Distribuye el programa completo. Devuelve {nombre: activation_record}
+    con "Global" para el área estática, el nombre de cada función (o
+    Clase.método) y el de cada clase.
+    """
+    records = {}
+    main = activation_record(global_table.scope)
+    main.size = align(layout_scope(main, global_table, 0), FRAME_ALIGNMENT)
+    global_table.frame = main
+    records[global_table.scope] = main
+
+    classes = {child.scope[len("class_"):]: child for child in global_table.children
+               if child.scope.startswith("class_")}
+
+    def class_record(name, visiting=()):
+        """El padre se distribuye antes que la subclase."""
+        scope = "class_" + name
+        if scope not in records:
+            parent = getattr(global_table.lookup_global(name), "parent_class", None)
+            base = class_record(parent, visiting + (name,)) if parent in classes and parent not in visiting else None
+            records[scope] = layout_class(classes[name], base)
+        return records[scope]
+
+    pending = [(global_table, None)]
+    while pending:
+        table, owner = pending.pop(0)
+        for child in table.children:
+            if child.scope.startswith("class_"):
+                class_name = child.scope[len("class_"):]
+                if class_name in classes:
+                    class_record(class_name)
+                else:
+                    records[child.scope] = layout_class(child)
+                pending.append((child, class_name))
+            elif child.scope.startswith("function_"):
+                name = child.scope[len("function_"):]
+                function = table.elements.get(name)
+                if function is None or function.kind != "function":
+                    continue
+                record = layout_function(function, child, function.params or [])
+                if owner:
+                    record.name = f"{owner}.{name}"
+                    # El Register del miembro en la clase también lleva el registro
+                    cls = table.lookup_global(owner)
+                    member = (cls.members or {}).get(name) if cls is not None else None
+                    if member is not None:
+                        member.frame, member.frame_size = record, record.size
+                records[record.name] = record
+                pending.append((child, None))
+            else:
+                pending.append((child, owner if table.scope.startswith("class_") else None))
+    return records
+
+
+def format_layout(records):
+    """Texto legible de los registros: tamaño y offset de cada ranura."""
+    lines = []
+    for name, record in records.items():
+        lines.append(f"{name}: {record.size} bytes")
+        if record.return_offset is not None:
+            lines.append(f"  {record.return_offset:4d}  retorno ({record.return_size} bytes)")
+        for scope, slot, offset, size in record.slots:
+            if slot in record.params:
+                lines.append(f"  {offset:4d}  parámetro {slot} ({size} bytes)")
+        if record.control_link is not None:
+            lines.append(f"  {record.control_link:4d}  enlace de control")
+            lines.append(f"  {record.return_address:4d}  dirección de retorno")
+        for scope, slot, offset, size in record.slots:
+            if slot not in record.params:
+                lines.append(f"  {offset:4d}  {slot} ({size} bytes, {scope})")
+    return "\n".join(lines)
@@ -1,3 +1,16 @@
+from tac_analysis import TYPED_OPS, TYPED_UNARY_OPS, string_pool
+
+
+
+def format_data(data):
+    """Datos de un alloc como literal anidado: [[1, 2], [3, 4]]."""
+    lengths, values = data
+    rows = list(values)
+    for n in reversed(lengths[1:]):
+        rows = [f"[{', '.join(rows[k:k + n])}]" for k in range(0, len(rows), n)]
+    return f"[{', '.join(rows)}]"
+
+
 class Quadruple():
     def __init__(self):
         self.quadruples = []
@@ -20,24 +33,47 @@ class Quadruple():
                 f.write(f"{i:03d}: ({op}, {arg1}, {arg2}, {res})\n")
         print(f"[✅] Código intermedio guardado en '{filename}'")
 
+    def string_pool(self):
+        """Constantes de cadena del programa: literal -> índice, cada texto una sola vez."""
+        return string_pool(self.quadruples)
+
     def write_tac(self, filename="intermediate_code.txt"):
         with open(filename, "w", encoding="utf-8") as f:
             f.write("=== CÓDIGO INTERMEDIO (TAC / Cuádruplos) ===\n\n")
+            pool = self.string_pool()
+            if pool:
+                # Sección de constantes: C, x86-64 y MIPS emiten cada una una sola vez como str_<índice>
+                f.write("constantes de cadena:\n")
+                for literal, index in pool.items():
+                    f.write(f"  str_{index} = {literal}\n")
+                f.write("\n")
             for i, (op, arg1, arg2, res) in enumerate(self.quadruples):
                 line = ""
                 if op == "label":
-                    line = f"{res}"
+                    line = f"{res}:"
                 elif op == "=":
                     if arg2 is None:
                         line = f"{res} = {arg1}"
                     else:
                         line = f"{res} = {arg1} {op} {arg2}"
-                elif op in ["+", "-", "*", "/", ">", "<", ">=", "<=", "==", "!=", "&&", "||"]:
+                elif op in ["-", "!"] and arg2 is None:
+                    line = f"{res} = {op}{arg1}"
+                elif op in ["+", "-", "*", "/", "%", ">", "<", ">=", "<=", "==", "!=", "&&", "||"]:
                     line = f"{res} = {arg1} {op} {arg2}"
+                elif op in TYPED_UNARY_OPS:
+                    line = f"{res} = {op} {arg1}"
+                elif op in TYPED_OPS:
+                    line = f"{res} = {op} {arg1}, {arg2}"
+                elif op == "CONCAT":
+                    line = f"{res} = concat {', '.join(arg1)}"
                 elif op == "[]":
                     line = f"{res} = {arg1}[{arg2}]"
                 elif op == "[]=":
                     line = f"{res}[{arg2}] = {arg1}"
+                elif op == "[]u":
+                    line = f"{res} = {arg1}[{arg2}] (sin verificar)"
+                elif op == "[]=u":
+                    line = f"{res}[{arg2}] = {arg1} (sin verificar)"
                 elif op == "if":
                     line = f"if {arg1} goto {res}"
                 elif op == "goto":
@@ -62,14 +98,40 @@ class Quadruple():
                         line = f"{res} = call {arg1}, {arg2}"
                     else:
                         line = f"call {arg1}, {arg2}"
+                elif op in ("CALL_FUNC", "CALL_METHOD"):
+                    line = f"{res} = call {arg1}, {arg2}"
+                elif op == "LOAD_FIELD":
+                    line = f"{res} = {arg1}.{arg2[1]}@{arg2[0]}"
+                elif op == "STORE_FIELD":
+                    line = f"{arg1}.{arg2[1]}@{arg2[0]} = {res}"
+                elif op == "CALL_VIRTUAL":
+                    slot, method, nargs = arg2
+                    line = f"{res} = vcall {arg1}.{method}@{slot}, {nargs}"
+                elif op == "CALL_DIRECT":
+                    owner, method, nargs, guard = arg2
+                    line = f"{res} = dcall {owner}.{method}({arg1}){'' if guard is None else f'@{guard}'}, {nargs}"
+                elif op == "alloc" and arg2 is not None:
+                    line = f"{res} = alloc {arg1}, {format_data(arg2)}"
                 elif op == "length":
                     line = f"{res} = length {arg1}"
+                elif op == "bounds":
+                    line = f"bounds {arg1}, {arg2}"
                 elif op == "class":
                     line = f"class {arg1}"
                 elif op == "endclass":
                     line = "endclass"
                 elif op == "field":
                     line = f"field {arg1}"
+                elif op == "local":
+                    line = f"local {arg1}"
+                elif op == "END_TRY":
+                    line = f"endtry {res}"
+                elif op == "JUMP_TABLE":
+                    low, labels = arg2
+                    line = f"jumptable {arg1} - {low}, [{', '.join(labels)}], else {res}"
+                elif op == "HASH_SWITCH":
+                    entries = ", ".join(f"{value}: {lbl}" for value, lbl in arg2)
+                    line = f"hashswitch {arg1}, {{{entries}}}, else {res}"
                 else:
                     line = f"# {op} {arg1 or ''} {arg2 or ''} {res or ''}".strip()
                 f.write(f"{line}\n")
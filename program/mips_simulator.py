@@ -0,0 +1,566 @@
+"""
+Simulador de MIPS32 en Python puro para ejecutar el ensamblador que genera
+tac_mips.py sin instalar SPIM ni MARS.
+
+Ensambla el subconjunto que usan el generador y runtime/cs_runtime.s
+(aritmética entera, cargas y almacenamientos de palabra y byte, saltos,
+mul/div y las pseudoinstrucciones comunes de SPIM) y lo ejecuta sin slots
+de retardo. Las llamadas al sistema son las de SPIM/MARS: 1 print_int,
+4 print_string, 9 sbrk, 10 exit, 11 print_char, 15 write y 17 exit2.
+
+Además de ejecutar, cuenta instrucciones y ciclos por función (los rangos
+.ent/.end del código). Una pseudoinstrucción cuenta como las instrucciones
+reales en que la expande el ensamblador, y los ciclos siguen un modelo
+simple de un procesador segmentado: 1 ciclo por instrucción, +1 en las
+cargas (dependencia con la siguiente), +1 en los saltos tomados, 4 en mul y
+35 en div.
+"""
+import re
+import sys
+
+TEXT_BASE = 0x00400000
+DATA_BASE = 0x10010000
+STACK_TOP = 0x7FFFEFFC
+
+REGISTER_NAMES = [
+    "zero", "at", "v0", "v1", "a0", "a1", "a2", "a3",
+    "t0", "t1", "t2", "t3", "t4", "t5", "t6", "t7",
+    "s0", "s1", "s2", "s3", "s4", "s5", "s6", "s7",
+    "t8", "t9", "k0", "k1", "gp", "sp", "fp", "ra",
+]
+REGISTERS = {name: n for n, name in enumerate(REGISTER_NAMES)}
+REGISTERS["s8"] = 30
+
+LOAD_CYCLES = 2
+TAKEN_BRANCH_CYCLES = 1
+MUL_CYCLES = 4
+DIV_CYCLES = 35
+
+class mips_error(Exception):
+    """Error al ensamblar o al ejecutar el programa MIPS."""
+    pass
+
+
+class _halt(Exception):
+    def __init__(self, code):
+        self.code = code
+
+
+def s32(x):
+    return ((x + 0x80000000) & 0xFFFFFFFF) - 0x80000000
+
+
+def strip_comment(line):
+    in_string = False
+    escaped = False
+    for k, ch in enumerate(line):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "#":
+            return line[:k]
+    return line
+
+
+def split_operands(text):
+    return [x.strip() for x in text.split(",")] if text.strip() else []
+
+
+def parse_string(text):
+    m = re.fullmatch(r'\s*"((?:[^"\\]|\\.)*)"\s*', text)
+    if not m:
+        raise mips_error(f"Cadena inválida: {text}")
+    escapes = {"n": "\n", "t": "\t", "0": "\0", "\\": "\\", '"': '"'}
+    return re.sub(r"\\(.)", lambda e: escapes.get(e.group(1), e.group(1)), m.group(1)).encode("utf-8")
+
+
+class instruction():
+    """Instrucción de código fuente (una pseudoinstrucción cuenta como varias reales)."""
+    def __init__(self, op, operands, line, function):
+        self.op = op
+        self.operands = operands
+        self.line = line
+        self.function = function
+        self.size = 1           # instrucciones reales
+        self.cycles = 1
+
+
+class mips_program():
+    """Programa ensamblado: instrucciones, segmento de datos y símbolos."""
+    def __init__(self, source):
+        self.instructions = []
+        self.data = bytearray()
+        self.symbols = {}
+        self.functions = []     # (nombre, primera instrucción, última + 1)
+        self.data_words = []    # (desplazamiento, símbolo) para .word con etiquetas
+        self.assemble(source)
+
+    def assemble(self, source):
+        section = "text"
+        function = None
+        starts = {}
+        for number, raw in enumerate(source.splitlines(), 1):
+            line = strip_comment(raw).strip()
+            while True:
+                m = re.match(r"([A-Za-z_.$][\w.$]*)\s*:\s*(.*)$", line)
+                if not m:
+                    break
+                name, line = m.group(1), m.group(2)
+                if name in self.symbols:
+                    raise mips_error(f"Línea {number}: etiqueta repetida {name}")
+                if section == "text":
+                    self.symbols[name] = TEXT_BASE + 4 * len(self.instructions)
+                else:
+                    self.symbols[name] = DATA_BASE + len(self.data)
+            if not line:
+                continue
+            parts = line.split(None, 1)
+            op = parts[0]
+            rest = parts[1] if len(parts) > 1 else ""
+            if op == ".data":
+                section = "data"
+            elif op == ".text":
+                section = "text"
+            elif op in (".globl", ".extern"):
+                pass
+            elif op == ".ent":
+                function = rest.strip()
+                starts[function] = len(self.instructions)
+            elif op == ".end":
+                name = rest.strip() or function
+                self.functions.append((name, starts.get(name, len(self.instructions)), len(self.instructions)))
+                function = None
+            elif op.startswith("."):
+                if section != "data":
+                    raise mips_error(f"Línea {number}: directiva {op} fuera de .data")
+                self.directive(op, rest, number)
+            else:
+                if section != "text":
+                    raise mips_error(f"Línea {number}: instrucción en .data")
+                self.instructions.append(instruction(op, split_operands(rest), number, function))
+        for offset, symbol in self.data_words:
+            self.data[offset:offset + 4] = (self.resolve(symbol) & 0xFFFFFFFF).to_bytes(4, "little")
+
+    def align(self, n):
+        while len(self.data) % n:
+            self.data.append(0)
+
+    def directive(self, op, rest, number):
+        if op == ".align":
+            self.align(1 << int(rest))
+        elif op == ".word":
+            self.align(4)
+            for item in split_operands(rest):
+                if re.fullmatch(r"-?(0x[0-9a-fA-F]+|\d+)", item):
+                    self.data += (int(item, 0) & 0xFFFFFFFF).to_bytes(4, "little")
+                else:
+                    self.data_words.append((len(self.data), item))
+                    self.data += bytes(4)
+        elif op == ".byte":
+            for item in split_operands(rest):
+                self.data.append(int(item, 0) & 0xFF)
+        elif op == ".space":
+            self.data += bytes(int(rest, 0))
+        elif op in (".ascii", ".asciiz"):
+            self.data += parse_string(rest)
+            if op == ".asciiz":
+                self.data.append(0)
+        else:
+            raise mips_error(f"Línea {number}: directiva no soportada {op}")
+
+    def resolve(self, symbol):
+        if symbol not in self.symbols:
+            raise mips_error(f"Etiqueta no definida: {symbol}")
+        return self.symbols[symbol]
+
+
+class mips_simulator():
+    """Ejecuta un mips_program y lleva la cuenta de instrucciones y ciclos."""
+    def __init__(self, source, output=None, errors=None):
+        self.program = source if isinstance(source, mips_program) else mips_program(source)
+        self.output = output if output is not None else sys.stdout
+        self.errors = errors if errors is not None else sys.stderr
+        self.regs = [0] * 32
+        self.hi = 0
+        self.lo = 0
+        self.memory = {}        # dirección alineada -> palabra con signo
+        self.stdout = bytearray()
+        self.stderr = bytearray()
+        data = self.program.data + bytes(-len(self.program.data) % 4)
+        for k in range(0, len(data), 4):
+            self.memory[DATA_BASE + k] = s32(int.from_bytes(data[k:k + 4], "little"))
+        self.brk = DATA_BASE + len(data)
+        self.regs[REGISTERS["sp"]] = STACK_TOP
+        self.regs[REGISTERS["gp"]] = 0x10008000
+        n = len(self.program.instructions)
+        self.counts = [0] * n
+        self.taken = [0] * n
+        self.code = [self.decode(k, ins) for k, ins in enumerate(self.program.instructions)]
+        self.exit_code = 0
+
+    # ---------------- Memoria ----------------
+
+    def load_word(self, address):
+        if address & 3:
+            raise mips_error(f"Lectura de palabra no alineada en 0x{address & 0xFFFFFFFF:08x}")
+        return self.memory.get(address, 0)
+
+    def store_word(self, address, value):
+        if address & 3:
+            raise mips_error(f"Escritura de palabra no alineada en 0x{address & 0xFFFFFFFF:08x}")
+        self.memory[address] = value
+
+    def load_byte(self, address):
+        return (self.memory.get(address & -4, 0) >> ((address & 3) << 3)) & 0xFF
+
+    def store_byte(self, address, value):
+        base = address & -4
+        shift = (address & 3) << 3
+        word = self.memory.get(base, 0)
+        self.memory[base] = s32((word & ~(0xFF << shift)) | ((value & 0xFF) << shift))
+
+    def read_bytes(self, address, count):
+        return bytes(self.load_byte(address + k) for k in range(count))
+
+    def read_cstring(self, address):
+        out = bytearray()
+        while True:
+            b = self.load_byte(address)
+            if b == 0:
+                return bytes(out)
+            out.append(b)
+            address += 1
+
+    # ---------------- Decodificación ----------------
+
+    def reg(self, text, ins):
+        name = text.strip().lstrip("$")
+        if name.isdigit() and int(name) < 32:
+            return int(name)
+        if name not in REGISTERS:
+            raise mips_error(f"Línea {ins.line}: registro inválido {text}")
+        return REGISTERS[name]
+
+    def imm(self, text, ins):
+        text = text.strip()
+        if re.fullmatch(r"-?(0x[0-9a-fA-F]+|\d+)", text):
+            return int(text, 0)
+        if text in self.program.symbols:
+            return self.program.symbols[text]
+        raise mips_error(f"Línea {ins.line}: inmediato inválido {text}")
+
+    def target(self, text, ins):
+        address = self.imm(text, ins)
+        return (address - TEXT_BASE) >> 2
+
+    def memory_operand(self, text, ins):
+        """off($reg) o una etiqueta de datos (pseudoinstrucción de dos instrucciones)."""
+        m = re.fullmatch(r"(-?\w*)\((\$\w+)\)", text.strip())
+        if m:
+            return (int(m.group(1), 0) if m.group(1) else 0), self.reg(m.group(2), ins), False
+        return self.imm(text, ins), 0, True
+
+    def decode(self, index, ins):
+        """Convierte la instrucción en una función sin argumentos que devuelve el siguiente índice."""
+        op, args = ins.op, ins.operands
+        r = self.regs
+        nxt = index + 1
+        taken = self.taken
+
+        def three():
+            return self.reg(args[0], ins), self.reg(args[1], ins), args[2]
+
+        def alu(fn):
+            d, s, t = three()
+            if t.strip().startswith("$"):
+                t = self.reg(t, ins)
+                if d == 0:
+                    return lambda: nxt
+                def run():
+                    r[d] = fn(r[s], r[t])
+                    return nxt
+            else:
+                k = self.imm(t, ins)
+                if not -0x8000 <= k <= 0xFFFF:
+                    ins.size = 3
+                if d == 0:
+                    return lambda: nxt
+                def run():
+                    r[d] = fn(r[s], k)
+                    return nxt
+            return run
+
+        def branch(cond, operands):
+            target = self.target(args[-1], ins)
+            regs_ = [self.reg(a, ins) for a in args[:operands]]
+            if operands == 2:
+                a, b = regs_
+                def run():
+                    if cond(r[a], r[b]):
+                        taken[index] += 1
+                        return target
+                    return nxt
+            elif operands == 1:
+                a = regs_[0]
+                def run():
+                    if cond(r[a], 0):
+                        taken[index] += 1
+                        return target
+                    return nxt
+            else:
+                def run():
+                    taken[index] += 1
+                    return target
+            return run
+
+        if op in ("addu", "add", "addiu", "addi"):
+            return alu(lambda a, b: s32(a + b))
+        if op in ("subu", "sub"):
+            return alu(lambda a, b: s32(a - b))
+        if op in ("and", "andi"):
+            return alu(lambda a, b: s32(a & b))
+        if op in ("or", "ori"):
+            return alu(lambda a, b: s32(a | b))
+        if op in ("xor", "xori"):
+            return alu(lambda a, b: s32(a ^ b))
+        if op == "nor":
+            return alu(lambda a, b: s32(~(a | b)))
+        if op in ("slt", "slti"):
+            return alu(lambda a, b: int(a < b))
+        if op in ("sltu", "sltiu"):
+            return alu(lambda a, b: int((a & 0xFFFFFFFF) < (b & 0xFFFFFFFF)))
+        if op in ("sll", "sllv"):
+            return alu(lambda a, b: s32(a << (b & 31)))
+        if op in ("srl", "srlv"):
+            return alu(lambda a, b: s32((a & 0xFFFFFFFF) >> (b & 31)))
+        if op in ("sra", "srav"):
+            return alu(lambda a, b: a >> (b & 31))
+        if op == "mul":
+            ins.cycles = MUL_CYCLES
+            return alu(lambda a, b: s32(a * b))
+        if op in ("div", "divu") and len(args) == 2:
+            ins.cycles = DIV_CYCLES
+            s, t = self.reg(args[0], ins), self.reg(args[1], ins)
+            unsigned = op == "divu"
+            def run():
+                a, b = r[s], r[t]
+                if unsigned:
+                    a, b = a & 0xFFFFFFFF, b & 0xFFFFFFFF
+                if b != 0:
+                    q = abs(a) // abs(b)
+                    if (a < 0) != (b < 0):
+                        q = -q
+                    self.lo = s32(q)
+                    self.hi = s32(a - q * b)
+                return nxt
+            return run
+        if op in ("mfhi", "mflo"):
+            d = self.reg(args[0], ins)
+            attr = op[2:]
+            def run():
+                if d:
+                    r[d] = getattr(self, attr)
+                return nxt
+            return run
+        if op == "lui":
+            d, k = self.reg(args[0], ins), self.imm(args[1], ins)
+            def run():
+                r[d] = s32(k << 16)
+                return nxt
+            return run
+        if op == "li":
+            d, k = self.reg(args[0], ins), s32(self.imm(args[1], ins))
+            if not -0x8000 <= k <= 0xFFFF:
+                ins.size = 2
+            def run():
+                r[d] = k
+                return nxt
+            return run
+        if op == "la":
+            d, k = self.reg(args[0], ins), self.imm(args[1], ins)
+            ins.size = 2
+            def run():
+                r[d] = k
+                return nxt
+            return run
+        if op == "move":
+            d, s = self.reg(args[0], ins), self.reg(args[1], ins)
+            def run():
+                r[d] = r[s]
+                return nxt
+            return run
+        if op in ("neg", "negu"):
+            d, s = self.reg(args[0], ins), self.reg(args[1], ins)
+            def run():
+                r[d] = s32(-r[s])
+                return nxt
+            return run
+        if op == "not":
+            d, s = self.reg(args[0], ins), self.reg(args[1], ins)
+            def run():
+                r[d] = s32(~r[s])
+                return nxt
+            return run
+        if op in ("lw", "lbu", "lb"):
+            d = self.reg(args[0], ins)
+            offset, base, absolute = self.memory_operand(args[1], ins)
+            ins.cycles = LOAD_CYCLES
+            if absolute:
+                ins.size = 2
+            if op == "lw":
+                load = self.load_word
+            elif op == "lbu":
+                load = self.load_byte
+            else:
+                load = lambda a: self.load_byte(a) - ((self.load_byte(a) & 0x80) << 1)
+            def run():
+                value = load(r[base] + offset)
+                if d:
+                    r[d] = value
+                return nxt
+            return run
+        if op in ("sw", "sb"):
+            s = self.reg(args[0], ins)
+            offset, base, absolute = self.memory_operand(args[1], ins)
+            if absolute:
+                ins.size = 2
+            store = self.store_word if op == "sw" else self.store_byte
+            def run():
+                store(r[base] + offset, r[s])
+                return nxt
+            return run
+        if op == "beq":
+            return branch(lambda a, b: a == b, 2)
+        if op == "bne":
+            return branch(lambda a, b: a != b, 2)
+        if op in ("blt", "bgt", "ble", "bge"):
+            ins.size = 2
+            cond = {"blt": lambda a, b: a < b, "bgt": lambda a, b: a > b,
+                    "ble": lambda a, b: a <= b, "bge": lambda a, b: a >= b}[op]
+            return branch(cond, 2)
+        if op in ("beqz", "bnez", "blez", "bgtz", "bltz", "bgez"):
+            cond = {"beqz": lambda a, b: a == 0, "bnez": lambda a, b: a != 0,
+                    "blez": lambda a, b: a <= 0, "bgtz": lambda a, b: a > 0,
+                    "bltz": lambda a, b: a < 0, "bgez": lambda a, b: a >= 0}[op]
+            return branch(cond, 1)
+        if op in ("b", "j"):
+            return branch(None, 0)
+        if op == "jal":
+            target = self.target(args[0], ins)
+            ret = TEXT_BASE + 4 * nxt
+            def run():
+                taken[index] += 1
+                r[31] = ret
+                return target
+            return run
+        if op in ("jr", "jalr"):
+            s = self.reg(args[0], ins)
+            ret = TEXT_BASE + 4 * nxt
+            link = op == "jalr"
+            def run():
+                taken[index] += 1
+                address = r[s]
+                if link:
+                    r[31] = ret
+                return (address - TEXT_BASE) >> 2
+            return run
+        if op == "nop":
+            return lambda: nxt
+        if op == "syscall":
+            def run():
+                self.syscall()
+                return nxt
+            return run
+        raise mips_error(f"Línea {ins.line}: instrucción no soportada {op}")
+
+    # ---------------- Llamadas al sistema ----------------
+
+    def syscall(self):
+        r = self.regs
+        service = r[2]
+        a0 = r[4]
+        if service == 1:
+            self.stdout += str(a0).encode()
+        elif service == 4:
+            self.stdout += self.read_cstring(a0)
+        elif service == 9:
+            r[2] = self.brk
+            self.brk += (a0 + 3) & -4
+        elif service == 10:
+            raise _halt(0)
+        elif service == 11:
+            self.stdout.append(a0 & 0xFF)
+        elif service == 15:
+            data = self.read_bytes(r[5], r[6])
+            if a0 == 2:
+                self.stderr += data
+            else:
+                self.stdout += data
+            r[2] = r[6]
+        elif service == 17:
+            raise _halt(a0)
+        else:
+            raise mips_error(f"Llamada al sistema no soportada: {service}")
+
+    # ---------------- Ejecución ----------------
+
+    def run(self, entry="main"):
+        """Ejecuta desde entry hasta exit; devuelve el código de salida."""
+        code = self.code
+        counts = self.counts
+        pc = (self.program.resolve(entry) - TEXT_BASE) >> 2
+        try:
+            while True:
+                counts[pc] += 1
+                pc = code[pc]()
+        except _halt as h:
+            self.exit_code = h.code
+        except IndexError:
+            if 0 <= pc < len(code):
+                raise
+            raise mips_error(f"Salto fuera del código: 0x{TEXT_BASE + 4 * pc:08x}")
+        finally:
+            self.output.write(self.stdout.decode("utf-8", errors="replace"))
+            self.errors.write(self.stderr.decode("utf-8", errors="replace"))
+        return self.exit_code
+
+    # ---------------- Perfil ----------------
+
+    def profile(self):
+        """[(función, llamadas, instrucciones, ciclos)] ordenado por ciclos."""
+        rows = []
+        instructions = self.program.instructions
+        for name, start, end in self.program.functions:
+            executed = cycles = 0
+            for k in range(start, end):
+                n = self.counts[k]
+                if n:
+                    ins = instructions[k]
+                    executed += n * ins.size
+                    cycles += n * (ins.cycles + ins.size - 1) + self.taken[k] * TAKEN_BRANCH_CYCLES
+            if executed:
+                rows.append((name, self.counts[start], executed, cycles))
+        rows.sort(key=lambda row: -row[3])
+        return rows
+
+    def totals(self):
+        rows = self.profile()
+        return sum(row[2] for row in rows), sum(row[3] for row in rows)
+
+    def format_profile(self):
+        rows = self.profile()
+        total_instructions, total_cycles = self.totals()
+        lines = [f"{'función':<28} {'llamadas':>9} {'instrucciones':>14} {'ciclos':>12} {'%':>6}"]
+        for name, calls, executed, cycles in rows:
+            share = 100.0 * cycles / total_cycles if total_cycles else 0.0
+            lines.append(f"{name:<28} {calls:>9} {executed:>14} {cycles:>12} {share:>5.1f}%")
+        lines.append(f"{'total':<28} {'':>9} {total_instructions:>14} {total_cycles:>12}")
+        if total_instructions:
+            lines.append(f"CPI: {total_cycles / total_instructions:.2f}")
+        return "\n".join(lines)
@@ -0,0 +1,195 @@
+"""
+Disposición de los objetos: posición fija de cada campo y tabla virtual de
+métodos (vtable) de cada clase.
+
+Una clase extiende la disposición de su padre: los campos heredados ocupan las
+primeras posiciones, en el mismo orden, y los propios van a continuación (un
+campo que la subclase vuelve a declarar conserva la posición del padre y solo
+cambia su valor inicial). La vtable sigue la misma regla: primero las ranuras
+del padre, un método redefinido reemplaza la entrada del padre en su misma
+ranura y los métodos nuevos se agregan al final.
+
+Así la posición de C.x y la ranura de C.m valen para cualquier subclase de C.
+Cuando el análisis semántico conoce la clase estática del objeto, el
+generador emite
+
+    LOAD_FIELD obj, (posición, x), t        en lugar de  GET_FIELD obj, x, t
+    STORE_FIELD obj, (posición, x), v       en lugar de  SET_FIELD obj, x, v
+    CALL_VIRTUAL obj, (ranura, m, n), t     en lugar de  CALL_METHOD obj.m, n, t
+
+y cada motor resuelve el acceso con un índice, sin buscar el nombre; el
+nombre solo viaja para los mensajes de error. Las formas por nombre quedan
+para los accesos cuya clase no se conoce al compilar.
+
+La disposición se calcula con las mismas reglas desde el árbol (para el
+generador, antes de emitir los métodos) y desde los marcadores CLASS/FIELD
+del TAC (para los motores).
+"""
+from CompiscriptParser import CompiscriptParser
+from tac_analysis import split_units
+from tac_runtime import constant_value
+
+
+class class_shape():
+    """Lo que declara una clase: su padre, sus campos con el valor inicial y sus métodos."""
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.parent = parent
+        self.fields = {}        # campo -> valor inicial (None si no es un literal)
+        self.methods = []       # métodos propios en orden de declaración
+
+
+class object_layout():
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.parent = parent
+        self.fields = []        # nombre del campo en cada posición
+        self.offsets = {}       # campo -> posición
+        self.initial = []       # valor inicial de cada posición
+        self.methods = []       # nombre del método en cada ranura de la vtable
+        self.owners = []        # clase que implementa cada ranura
+        self.slots = {}         # método -> ranura
+
+    def field_ref(self, name):
+        """(posición, nombre) del campo, o None si la clase no lo tiene."""
+        return (self.offsets[name], name) if name in self.offsets else None
+
+    def method_ref(self, name):
+        """(ranura, nombre) del método, o None si la clase no lo tiene."""
+        return (self.slots[name], name) if name in self.slots else None
+
+    def extend(self, base):
+        self.fields = list(base.fields)
+        self.offsets = dict(base.offsets)
+        self.initial = list(base.initial)
+        self.methods = list(base.methods)
+        self.owners = list(base.owners)
+        self.slots = dict(base.slots)
+
+
+def compute_layouts(shapes):
+    """{clase: object_layout}; cada clase se dispone después de su padre."""
+    layouts = {}
+
+    def build(name, visiting):
+        if name in layouts:
+            return layouts[name]
+        shape = shapes[name]
+        layout = object_layout(name, shape.parent)
+        if shape.parent in shapes and shape.parent not in visiting:
+            layout.extend(build(shape.parent, visiting | {name}))
+        for field, value in shape.fields.items():
+            if field in layout.offsets:
+                layout.initial[layout.offsets[field]] = value
+            else:
+                layout.offsets[field] = len(layout.fields)
+                layout.fields.append(field)
+                layout.initial.append(value)
+        for method in shape.methods:
+            if method in layout.slots:
+                layout.owners[layout.slots[method]] = name
+            else:
+                layout.slots[method] = len(layout.methods)
+                layout.methods.append(method)
+                layout.owners.append(name)
+        layouts[name] = layout
+        return layout
+
+    for name in shapes:
+        build(name, frozenset())
+    return layouts
+
+
+def subclasses(layouts, name):
+    """name y todas sus subclases, directas e indirectas."""
+    family = [name]
+    for cls in family:
+        family.extend(n for n, layout in layouts.items() if layout.parent == cls and n not in family)
+    return family
+
+
+def implementation(layouts, name, method):
+    """
+    Clase que implementa method para todo objeto de name o de una subclase;
+    None si alguna subclase lo redefine o name no lo tiene.
+    """
+    if name not in layouts or method not in layouts[name].slots:
+        return None
+    owners = {layouts[c].owners[layouts[c].slots[method]] for c in subclasses(layouts, name)}
+    return owners.pop() if len(owners) == 1 else None
+
+
+def slot_implementation(layouts, slot, method):
+    """Clase que implementa method en todas las clases que lo tienen en la ranura slot, o None."""
+    owners = {layout.owners[slot] for layout in layouts.values()
+              if slot < len(layout.methods) and layout.methods[slot] == method}
+    return owners.pop() if len(owners) == 1 else None
+
+
+def method_slot(layouts, method):
+    """Ranura de method si es la misma en todas las clases que lo tienen, o None."""
+    slots = {layout.slots[method] for layout in layouts.values() if method in layout.slots}
+    return slots.pop() if len(slots) == 1 else None
+
+
+def shapes_from_quads(quads):
+    """Clases del TAC: CLASS/INHERIT/FIELD/ENDCLASS y las unidades de sus métodos."""
+    shapes = {}
+    current = None
+    for op, arg1, arg2, res in quads:
+        if op == "CLASS":
+            current = class_shape(arg1, res if arg2 == "inherits" else None)
+            shapes[arg1] = current
+        elif op == "INHERIT" and current is not None:
+            current.parent = arg1
+        elif op in ("FIELD", "FIELD_CONST") and current is not None:
+            current.fields[res] = constant_value(arg1) if arg1 is not None else None
+        elif op == "ENDCLASS":
+            current = None
+    for unit in split_units(quads):
+        shape = shapes.get(unit.owner_class)
+        if shape is not None and unit.name not in shape.methods:
+            shape.methods.append(unit.name)
+    return shapes
+
+
+def class_declarations(tree):
+    pending = [tree]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, CompiscriptParser.ClassDeclarationContext):
+            yield node
+        if hasattr(node, "getChildren"):
+            pending.extend(reversed(list(node.getChildren())))
+
+
+def shapes_from_tree(tree):
+    """Clases del árbol sintáctico, con los miembros en el mismo orden en que el generador los emite."""
+    shapes = {}
+    for ctx in class_declarations(tree):
+        parent = ctx.Identifier(1).getText() if len(ctx.Identifier()) > 1 else None
+        shape = class_shape(ctx.Identifier(0).getText(), parent)
+        for member in ctx.classMember():
+            child = member.getChild(0)
+            if isinstance(child, (CompiscriptParser.VariableDeclarationContext,
+                                  CompiscriptParser.ConstantDeclarationContext)):
+                shape.fields.setdefault(child.Identifier().getText(), None)
+            elif isinstance(child, CompiscriptParser.FunctionDeclarationContext):
+                name = child.Identifier().getText()
+                if name not in shape.methods:
+                    shape.methods.append(name)
+        shapes[shape.name] = shape
+    return shapes
+
+
+def format_objects(layouts):
+    """Texto legible de cada clase: posición de sus campos y ranuras de su vtable."""
+    lines = []
+    for name, layout in layouts.items():
+        header = f"{name}: {len(layout.fields)} campos, {len(layout.methods)} métodos"
+        lines.append(header + (f" (extiende {layout.parent})" if layout.parent else ""))
+        for offset, field in enumerate(layout.fields):
+            lines.append(f"  {offset:4d}  {field}")
+        for slot, (method, owner) in enumerate(zip(layout.methods, layout.owners)):
+            lines.append(f"  [{slot:2d}]  {owner}.{method}")
+    return "\n".join(lines)
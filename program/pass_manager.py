@@ -0,0 +1,87 @@
+import sys
+import time
+from tac_analysis import program_cfg, compute_dominators, compute_liveness, build_call_graph
+from tac_passes import PASSES
+
+# Pasadas que corre cada nivel de optimización, en orden
+OPT_LEVELS = {
+    0: [],
+    1: ["dead_functions", "devirtualize", "scalar_replace", "const_fold", "branch_fold", "jump_thread", "unreachable",
+        "copy_coalesce", "bce", "dce"],
+    2: ["dead_functions", "devirtualize", "scalar_replace", "const_fold", "branch_fold", "jump_thread", "unreachable", "local_cse", "const_fold",
+        "licm", "copy_coalesce", "bce", "dce", "jump_thread"],
+}
+
+# Análisis disponibles: nombre -> (función, análisis de los que depende)
+ANALYSES = {
+    "cfg": (lambda pm: program_cfg(pm.quads), ()),
+    "dominators": (lambda pm: compute_dominators(pm.get_analysis("cfg")), ("cfg",)),
+    "liveness": (lambda pm: compute_liveness(pm.quads, pm.get_analysis("cfg")), ("cfg",)),
+    "callgraph": (lambda pm: build_call_graph(pm.quads), ()),
+}
+
+
+class pass_manager():
+    """
+    Corre una secuencia de pasadas sobre los cuádruplos. Los análisis (CFG,
+    dominadores, vida de variables) se calculan bajo demanda, se guardan y solo
+    se invalidan cuando una pasada cambia el código sin declararlos preservados.
+    """
+    def __init__(self, quads, passes=None, opt_level=0, verbose=True, output=sys.stdout):
+        self.quads = list(quads)
+        self.pass_names = list(passes) if passes is not None else list(OPT_LEVELS[opt_level])
+        for name in self.pass_names:
+            if name not in PASSES:
+                raise ValueError(f"Pasada desconocida: {name} (disponibles: {', '.join(PASSES)})")
+        self.verbose = verbose
+        self.output = output
+        self.cache = {}
+        self.computed = []
+        self.stats = []
+
+    def get_analysis(self, name):
+        if name not in self.cache:
+            function, _ = ANALYSES[name]
+            self.cache[name] = function(self)
+            self.computed.append(name)
+        return self.cache[name]
+
+    def invalidate(self, preserved=()):
+        preserved = set(preserved)
+        # Un análisis solo sobrevive si todo aquello de lo que depende también sobrevive
+        for name in list(self.cache):
+            _, depends = ANALYSES[name]
+            if name not in preserved or any(dep not in preserved for dep in depends):
+                del self.cache[name]
+
+    def run(self):
+        if self.verbose and self.pass_names:
+            print(f"{'pasada':<16s} {'tiempo':>10s} {'instr':>7s} {'delta':>7s}  análisis", file=self.output)
+        for name in self.pass_names:
+            tac_pass = PASSES[name]
+            before = len(self.quads)
+            self.computed = []
+            start = time.perf_counter()
+            new_quads = tac_pass.run(self.quads, self)
+            elapsed = time.perf_counter() - start
+            if new_quads != self.quads:
+                self.quads = new_quads
+                self.invalidate(tac_pass.preserves)
+            stat = {
+                "pass": name,
+                "time_ms": elapsed * 1000,
+                "instructions": len(self.quads),
+                "delta": len(self.quads) - before,
+                "analyses": list(self.computed),
+            }
+            self.stats.append(stat)
+            if self.verbose:
+                analyses = ", ".join(self.computed) or "-"
+                print(f"{name:<16s} {stat['time_ms']:8.3f}ms {stat['instructions']:7d} {stat['delta']:+7d}  {analyses}",
+                      file=self.output)
+        return self.quads
+
+
+def optimize(quads, opt_level=0, passes=None, verbose=True, output=sys.stdout):
+    """Atajo: corre el preset del nivel (o la lista explícita) y devuelve los cuádruplos."""
+    return pass_manager(quads, passes=passes, opt_level=opt_level, verbose=verbose, output=output).run()
@@ -0,0 +1,367 @@
+/*
+ * Caminos lentos del runtime de Compiscript: cadenas, conversión a texto,
+ * errores en tiempo de ejecución, objetos e impresión. Los mensajes de error
+ * son los mismos que los de tac_runtime.py y la VM de TAC.
+ *
+ * La memoria nunca se libera: los programas son trabajos por lotes y el
+ * proceso termina al final.
+ */
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include "cs_runtime.h"
+
+cs_handler cs_handlers[CS_MAX_HANDLERS];
+int cs_handler_depth = 0;
+cs_value cs_error = {CS_NULL, {0}};
+
+static const char *OP_SYMBOLS[] = {"+", "-", "*", "/", "%", "<", "<=", ">", ">=", "&&", "||", "-", "!"};
+
+/* ---------------- Memoria y cadenas ---------------- */
+
+static void *cs_malloc(size_t size) {
+    void *p = malloc(size ? size : 1);
+    if (!p) {
+        fflush(stdout);
+        fprintf(stderr, "Error en tiempo de ejecución: memoria agotada\n");
+        exit(1);
+    }
+    return p;
+}
+
+typedef struct text_buffer {
+    char *data;
+    size_t len, cap;
+} text_buffer;
+
+static void buffer_append(text_buffer *b, const char *s, size_t n) {
+    if (b->len + n + 1 > b->cap) {
+        size_t cap = b->cap ? b->cap * 2 : 32;
+        while (cap < b->len + n + 1) cap *= 2;
+        char *data = cs_malloc(cap);
+        if (b->len) memcpy(data, b->data, b->len);
+        free(b->data);
+        b->data = data;
+        b->cap = cap;
+    }
+    memcpy(b->data + b->len, s, n);
+    b->len += n;
+    b->data[b->len] = '\0';
+}
+
+static void buffer_text(text_buffer *b, const char *s) { buffer_append(b, s, strlen(s)); }
+
+static void append_value(text_buffer *b, cs_value v) {
+    char number[32];
+    switch (v.tag) {
+    case CS_INT:
+        snprintf(number, sizeof number, "%lld", v.u.i);
+        buffer_text(b, number);
+        break;
+    case CS_BOOL:
+        buffer_text(b, v.u.i ? "true" : "false");
+        break;
+    case CS_STR:
+        buffer_append(b, v.u.s->chars, (size_t)v.u.s->len);
+        break;
+    case CS_ARR:
+        buffer_text(b, "[");
+        for (long long k = 0; k < v.u.a->len; k++) {
+            if (k) buffer_text(b, ", ");
+            append_value(b, v.u.a->items[k]);
+        }
+        buffer_text(b, "]");
+        break;
+    case CS_OBJ:
+        buffer_text(b, "<");
+        buffer_text(b, v.u.o->cls->name);
+        buffer_text(b, ">");
+        break;
+    default:
+        buffer_text(b, "null");
+    }
+}
+
+static cs_value buffer_value(text_buffer *b) {
+    cs_string *s = cs_malloc(sizeof *s);
+    s->len = (long long)b->len;
+    s->chars = b->data ? b->data : "";
+    return cs_str(s);
+}
+
+/* Texto de un valor (lo que imprime print); el resultado vive hasta el fin del programa */
+static const char *text_of(cs_value v) {
+    text_buffer b = {0, 0, 0};
+    append_value(&b, v);
+    return b.data ? b.data : "";
+}
+
+cs_value cs_concat(cs_value a, cs_value b) {
+    text_buffer buffer = {0, 0, 0};
+    append_value(&buffer, a);
+    append_value(&buffer, b);
+    return buffer_value(&buffer);
+}
+
+/* a + b + c ... de cadenas en un solo búfer; como en sconcat, el primer par sin cadenas es un error */
+cs_value cs_concat_n(const cs_value *parts, long long n) {
+    text_buffer buffer = {0, 0, 0};
+    long long k = 0;
+    if (parts[0].tag != CS_STR && parts[1].tag != CS_STR) {
+        append_value(&buffer, cs_binary_slow(CS_OP_ADD, parts[0], parts[1]));
+        k = 2;
+    }
+    for (; k < n; k++) append_value(&buffer, parts[k]);
+    return buffer_value(&buffer);
+}
+
+int cs_values_equal(cs_value a, cs_value b) {
+    if (a.tag != b.tag) return 0;
+    switch (a.tag) {
+    case CS_NULL: return 1;
+    case CS_INT:
+    case CS_BOOL: return a.u.i == b.u.i;
+    case CS_STR:
+        /* Los literales son constantes únicas: dos apariciones del mismo texto son el mismo cs_string */
+        return a.u.s == b.u.s
+            || (a.u.s->len == b.u.s->len && memcmp(a.u.s->chars, b.u.s->chars, (size_t)a.u.s->len) == 0);
+    case CS_ARR: return a.u.a == b.u.a;
+    default: return a.u.o == b.u.o;
+    }
+}
+
+unsigned cs_hash(cs_value v) {
+    /* FNV-1a de 32 bits: debe coincidir con fnv1a() de tac_c.py */
+    unsigned h = 2166136261u;
+    if (v.tag != CS_STR) return 0;
+    for (long long k = 0; k < v.u.s->len; k++) {
+        h ^= (unsigned char)v.u.s->chars[k];
+        h *= 16777619u;
+    }
+    return h;
+}
+
+int cs_str_equals(cs_value v, const cs_string *s) {
+    return v.tag == CS_STR
+        && (v.u.s == s || (v.u.s->len == s->len && memcmp(v.u.s->chars, s->chars, (size_t)s->len) == 0));
+}
+
+/* ---------------- Errores ---------------- */
+
+void cs_throw_value(cs_value message) {
+    if (cs_handler_depth == 0) {
+        fflush(stdout);
+        fprintf(stderr, "Error en tiempo de ejecución: %s\n", text_of(message));
+        exit(1);
+    }
+    cs_error = message;
+    cs_handler_depth--;
+    longjmp(cs_handlers[cs_handler_depth].env, 1);
+}
+
+void cs_throw(const char *message) {
+    text_buffer b = {0, 0, 0};
+    buffer_text(&b, message);
+    cs_throw_value(buffer_value(&b));
+}
+
+int cs_push_handler(void) {
+    if (cs_handler_depth >= CS_MAX_HANDLERS) cs_throw("Demasiados try anidados");
+    return cs_handler_depth++;
+}
+
+/* Para el ensamblador de tac_x86.py: registra un manejador y devuelve el jmp_buf para _setjmp */
+void *cs_try_buffer(void) {
+    return cs_handlers[cs_push_handler()].env;
+}
+
+cs_value cs_binary_slow(int op, cs_value a, cs_value b) {
+    if (a.tag == CS_INT && b.tag == CS_INT && (op == CS_OP_DIV || op == CS_OP_MOD) && b.u.i == 0)
+        cs_throw("División entre cero");
+    text_buffer m = {0, 0, 0};
+    buffer_text(&m, "Operación '");
+    buffer_text(&m, OP_SYMBOLS[op]);
+    buffer_text(&m, "' inválida entre ");
+    append_value(&m, a);
+    buffer_text(&m, " y ");
+    append_value(&m, b);
+    cs_throw_value(buffer_value(&m));
+    return CS_NULL_VALUE;
+}
+
+cs_value cs_unary_slow(int op, cs_value a) {
+    text_buffer m = {0, 0, 0};
+    buffer_text(&m, "Operación '");
+    buffer_text(&m, OP_SYMBOLS[op]);
+    buffer_text(&m, "' inválida sobre ");
+    append_value(&m, a);
+    cs_throw_value(buffer_value(&m));
+    return CS_NULL_VALUE;
+}
+
+void cs_arity_error(const char *name, int expected, int got) {
+    char message[256];
+    snprintf(message, sizeof message, "'%s' esperaba %d argumentos, recibió %d", name, expected, got);
+    cs_throw(message);
+}
+
+void cs_undefined_function(const char *name) {
+    text_buffer m = {0, 0, 0};
+    buffer_text(&m, "Función no definida: ");
+    buffer_text(&m, name);
+    cs_throw_value(buffer_value(&m));
+}
+
+/* ---------------- Arreglos ---------------- */
+
+cs_value cs_alloc(cs_value size) {
+    cs_value v;
+    long long n = size.tag == CS_INT && size.u.i > 0 ? size.u.i : 0;
+    cs_array *a = cs_malloc(sizeof *a);
+    a->len = n;
+    a->items = cs_malloc(sizeof(cs_value) * (size_t)n);
+    for (long long k = 0; k < n; k++) a->items[k] = CS_NULL_VALUE;
+    v.tag = CS_ARR;
+    v.u.a = a;
+    return v;
+}
+
+/* Arreglo nuevo con los datos estáticos de un literal constante (valores en orden por filas) */
+cs_value cs_alloc_data(const cs_value *values, const long long *lengths, long long rank) {
+    cs_value v;
+    long long n = lengths[0], stride = 1;
+    cs_array *a = cs_malloc(sizeof *a);
+    a->len = n;
+    a->items = cs_malloc(sizeof(cs_value) * (size_t)n);
+    if (rank == 1) {
+        memcpy(a->items, values, sizeof(cs_value) * (size_t)n);
+    } else {
+        for (long long k = 1; k < rank; k++) stride *= lengths[k];
+        for (long long k = 0; k < n; k++) a->items[k] = cs_alloc_data(values + k * stride, lengths + 1, rank - 1);
+    }
+    v.tag = CS_ARR;
+    v.u.a = a;
+    return v;
+}
+
+cs_value cs_index_fail(cs_value array, cs_value index) {
+    text_buffer m = {0, 0, 0};
+    if (array.tag != CS_ARR) {
+        buffer_text(&m, "No se puede indexar ");
+        append_value(&m, array);
+    } else {
+        char size[48];
+        buffer_text(&m, "Índice fuera de rango: ");
+        append_value(&m, index);
+        snprintf(size, sizeof size, " (tamaño %lld)", array.u.a->len);
+        buffer_text(&m, size);
+    }
+    cs_throw_value(buffer_value(&m));
+    return CS_NULL_VALUE;
+}
+
+void cs_bounds_fail(cs_value index, cs_value length) {
+    text_buffer m = {0, 0, 0};
+    buffer_text(&m, "Índice fuera de rango: ");
+    append_value(&m, index);
+    buffer_text(&m, " (tamaño ");
+    append_value(&m, length);
+    buffer_text(&m, ")");
+    cs_throw_value(buffer_value(&m));
+}
+
+cs_value cs_length(cs_value v) {
+    if (v.tag == CS_ARR) return cs_int(v.u.a->len);
+    if (v.tag == CS_STR) {
+        /* Caracteres, no bytes: se saltan los bytes de continuación de UTF-8 */
+        long long n = 0;
+        for (long long k = 0; k < v.u.s->len; k++)
+            if (((unsigned char)v.u.s->chars[k] & 0xC0) != 0x80) n++;
+        return cs_int(n);
+    }
+    text_buffer m = {0, 0, 0};
+    append_value(&m, v);
+    buffer_text(&m, " no tiene longitud");
+    cs_throw_value(buffer_value(&m));
+    return CS_NULL_VALUE;
+}
+
+/* ---------------- Objetos ---------------- */
+
+cs_value cs_new_object(const cs_class *cls) {
+    cs_value v;
+    cs_object *o = cs_malloc(sizeof *o + sizeof(cs_value) * (size_t)cls->nfields);
+    o->cls = cls;
+    for (int k = 0; k < cls->nfields; k++) o->fields[k] = cls->field_init[k];
+    v.tag = CS_OBJ;
+    v.u.o = o;
+    return v;
+}
+
+static void member_error(const char *prefix, const char *name, const char *middle, cs_value obj) {
+    text_buffer m = {0, 0, 0};
+    buffer_text(&m, prefix);
+    buffer_text(&m, name);
+    buffer_text(&m, middle);
+    append_value(&m, obj);
+    cs_throw_value(buffer_value(&m));
+}
+
+static void missing_member(const char *before, const cs_class *cls, const char *after, const char *name) {
+    text_buffer m = {0, 0, 0};
+    buffer_text(&m, before);
+    buffer_text(&m, cls->name);
+    buffer_text(&m, after);
+    buffer_text(&m, name);
+    buffer_text(&m, "'");
+    cs_throw_value(buffer_value(&m));
+}
+
+cs_value cs_get_field(cs_value obj, int id, const char *name, int is_size) {
+    if (is_size && obj.tag == CS_ARR) return cs_int(obj.u.a->len);
+    if (obj.tag != CS_OBJ) member_error("Acceso a '", name, "' sobre ", obj);
+    int slot = obj.u.o->cls->field_slots[id];
+    if (slot < 0) missing_member("El objeto ", obj.u.o->cls, " no tiene el campo '", name);
+    return obj.u.o->fields[slot];
+}
+
+void cs_set_field(cs_value obj, int id, const char *name, cs_value value) {
+    if (obj.tag != CS_OBJ) member_error("Asignación a '", name, "' sobre ", obj);
+    int slot = obj.u.o->cls->field_slots[id];
+    if (slot < 0) missing_member("El objeto ", obj.u.o->cls, " no tiene el campo '", name);
+    obj.u.o->fields[slot] = value;
+}
+
+const cs_method *cs_lookup(cs_value obj, int id, const char *name, int nargs) {
+    if (obj.tag != CS_OBJ) member_error("Llamada al método '", name, "' sobre ", obj);
+    const cs_method *m = &obj.u.o->cls->vtable[id];
+    if (!m->fn) missing_member("La clase '", obj.u.o->cls, "' no tiene el método '", name);
+    if (m->arity != nargs) cs_arity_error(name, m->arity, nargs);
+    return m;
+}
+
+/* ---------------- Salida ---------------- */
+
+void cs_print(cs_value v) {
+    if (v.tag == CS_INT) {
+        printf("%lld\n", v.u.i);
+    } else if (v.tag == CS_STR) {
+        fwrite(v.u.s->chars, 1, (size_t)v.u.s->len, stdout);
+        putchar('\n');
+    } else {
+        text_buffer b = {0, 0, 0};
+        append_value(&b, v);
+        buffer_text(&b, "\n");
+        fwrite(b.data, 1, b.len, stdout);
+        free(b.data);
+    }
+}
+
+void cs_runtime_init(void) {
+    static char buffer[1 << 16];
+    setvbuf(stdout, buffer, _IOFBF, sizeof buffer);
+}
+
+void cs_runtime_exit(void) {
+    fflush(stdout);
+}
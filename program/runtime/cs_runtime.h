@@ -0,0 +1,231 @@
+/*
+ * Runtime de Compiscript para el código C generado por tac_c.py.
+ *
+ * Cada valor es un cs_value con etiqueta (null, entero, booleano, cadena,
+ * arreglo u objeto). Los caminos rápidos de enteros están aquí como funciones
+ * inline; el resto (cadenas, errores, impresión) vive en cs_runtime.c.
+ * Los objetos apuntan a su clase, que guarda la tabla de campos y la vtable
+ * indexadas por identificadores que asigna el compilador a cada nombre, y
+ * las tablas por posición y por ranura que fija object_layout.py.
+ * Las excepciones usan setjmp/longjmp sobre una pila global de manejadores.
+ */
+#ifndef CS_RUNTIME_H
+#define CS_RUNTIME_H
+
+#include <setjmp.h>
+
+enum { CS_NULL = 0, CS_INT, CS_BOOL, CS_STR, CS_ARR, CS_OBJ };
+
+typedef struct cs_string {
+    long long len;              /* bytes */
+    const char *chars;
+} cs_string;
+
+struct cs_array;
+struct cs_object;
+
+typedef struct cs_value {
+    int tag;
+    union {
+        long long i;
+        const cs_string *s;
+        struct cs_array *a;
+        struct cs_object *o;
+    } u;
+} cs_value;
+
+typedef struct cs_array {
+    long long len;
+    cs_value *items;
+} cs_array;
+
+typedef cs_value (*cs_fn)(void);
+
+typedef struct cs_method {
+    cs_fn fn;                   /* se convierte al tipo con la aridad correcta al llamar */
+    int arity;
+    int selector;               /* en methods: id del método de la ranura, -1 si está vacía */
+} cs_method;
+
+typedef struct cs_class {
+    const char *name;
+    int nfields;
+    const int *field_slots;     /* id de campo -> posición en el objeto, -1 si no existe */
+    const cs_value *field_init; /* valores iniciales por posición */
+    const cs_method *vtable;    /* id de método -> implementación ({0, 0} si no existe) */
+    const int *field_at;        /* posición -> id del campo, rellena con -1 hasta la clase más grande */
+    const cs_method *methods;   /* ranura -> implementación, rellena igual */
+} cs_class;
+
+typedef struct cs_object {
+    const cs_class *cls;
+    cs_value fields[];
+} cs_object;
+
+/* Operadores para los caminos lentos */
+enum { CS_OP_ADD, CS_OP_SUB, CS_OP_MUL, CS_OP_DIV, CS_OP_MOD, CS_OP_LT, CS_OP_LE, CS_OP_GT, CS_OP_GE,
+       CS_OP_AND, CS_OP_OR, CS_OP_NEG, CS_OP_NOT };
+
+#define CS_MAX_HANDLERS 4096
+
+typedef struct cs_handler {
+    jmp_buf env;
+} cs_handler;
+
+extern cs_handler cs_handlers[CS_MAX_HANDLERS];
+extern int cs_handler_depth;
+extern cs_value cs_error;
+
+/* ---------------- Construcción de valores ---------------- */
+
+static const cs_value CS_NULL_VALUE = {CS_NULL, {0}};
+
+static inline cs_value cs_int(long long i) { cs_value v; v.tag = CS_INT; v.u.i = i; return v; }
+static inline cs_value cs_bool(int b) { cs_value v; v.tag = CS_BOOL; v.u.i = b != 0; return v; }
+static inline cs_value cs_str(const cs_string *s) { cs_value v; v.tag = CS_STR; v.u.s = s; return v; }
+static inline int cs_truth(cs_value v) { return v.tag == CS_BOOL && v.u.i; }
+
+/* ---------------- Funciones del runtime (cs_runtime.c) ---------------- */
+
+void cs_throw(const char *message);
+void cs_throw_value(cs_value message);
+int cs_push_handler(void);
+cs_value cs_binary_slow(int op, cs_value a, cs_value b);
+cs_value cs_unary_slow(int op, cs_value a);
+cs_value cs_concat(cs_value a, cs_value b);
+cs_value cs_concat_n(const cs_value *parts, long long n);
+int cs_values_equal(cs_value a, cs_value b);
+cs_value cs_alloc(cs_value size);
+cs_value cs_alloc_data(const cs_value *values, const long long *lengths, long long rank);
+cs_value cs_index_fail(cs_value array, cs_value index);
+void cs_bounds_fail(cs_value index, cs_value length);
+cs_value cs_length(cs_value v);
+cs_value cs_new_object(const cs_class *cls);
+cs_value cs_get_field(cs_value obj, int id, const char *name, int is_size);
+void cs_set_field(cs_value obj, int id, const char *name, cs_value value);
+const cs_method *cs_lookup(cs_value obj, int id, const char *name, int nargs);
+void cs_print(cs_value v);
+unsigned cs_hash(cs_value v);
+int cs_str_equals(cs_value v, const cs_string *s);
+void cs_arity_error(const char *name, int expected, int got);
+void cs_undefined_function(const char *name);
+void cs_runtime_init(void);
+void cs_runtime_exit(void);
+void *cs_try_buffer(void);
+
+/* ---------------- Caminos rápidos ---------------- */
+
+#define CS_BOTH_INT(a, b) ((a).tag == CS_INT && (b).tag == CS_INT)
+
+static inline cs_value cs_add(cs_value a, cs_value b) {
+    if (CS_BOTH_INT(a, b)) return cs_int(a.u.i + b.u.i);
+    if (a.tag == CS_STR || b.tag == CS_STR) return cs_concat(a, b);
+    return cs_binary_slow(CS_OP_ADD, a, b);
+}
+static inline cs_value cs_sub(cs_value a, cs_value b) {
+    return CS_BOTH_INT(a, b) ? cs_int(a.u.i - b.u.i) : cs_binary_slow(CS_OP_SUB, a, b);
+}
+static inline cs_value cs_mul(cs_value a, cs_value b) {
+    return CS_BOTH_INT(a, b) ? cs_int(a.u.i * b.u.i) : cs_binary_slow(CS_OP_MUL, a, b);
+}
+/* C99 trunca la división hacia cero, igual que Compiscript */
+static inline cs_value cs_div(cs_value a, cs_value b) {
+    return CS_BOTH_INT(a, b) && b.u.i != 0 ? cs_int(a.u.i / b.u.i) : cs_binary_slow(CS_OP_DIV, a, b);
+}
+static inline cs_value cs_mod(cs_value a, cs_value b) {
+    return CS_BOTH_INT(a, b) && b.u.i != 0 ? cs_int(a.u.i % b.u.i) : cs_binary_slow(CS_OP_MOD, a, b);
+}
+static inline cs_value cs_lt(cs_value a, cs_value b) {
+    return CS_BOTH_INT(a, b) ? cs_bool(a.u.i < b.u.i) : cs_binary_slow(CS_OP_LT, a, b);
+}
+static inline cs_value cs_le(cs_value a, cs_value b) {
+    return CS_BOTH_INT(a, b) ? cs_bool(a.u.i <= b.u.i) : cs_binary_slow(CS_OP_LE, a, b);
+}
+static inline cs_value cs_gt(cs_value a, cs_value b) {
+    return CS_BOTH_INT(a, b) ? cs_bool(a.u.i > b.u.i) : cs_binary_slow(CS_OP_GT, a, b);
+}
+static inline cs_value cs_ge(cs_value a, cs_value b) {
+    return CS_BOTH_INT(a, b) ? cs_bool(a.u.i >= b.u.i) : cs_binary_slow(CS_OP_GE, a, b);
+}
+static inline cs_value cs_eq(cs_value a, cs_value b) {
+    return CS_BOTH_INT(a, b) ? cs_bool(a.u.i == b.u.i) : cs_bool(cs_values_equal(a, b));
+}
+static inline cs_value cs_ne(cs_value a, cs_value b) {
+    return CS_BOTH_INT(a, b) ? cs_bool(a.u.i != b.u.i) : cs_bool(!cs_values_equal(a, b));
+}
+static inline cs_value cs_and(cs_value a, cs_value b) {
+    return a.tag == CS_BOOL && b.tag == CS_BOOL ? cs_bool(a.u.i && b.u.i) : cs_binary_slow(CS_OP_AND, a, b);
+}
+static inline cs_value cs_or(cs_value a, cs_value b) {
+    return a.tag == CS_BOOL && b.tag == CS_BOOL ? cs_bool(a.u.i || b.u.i) : cs_binary_slow(CS_OP_OR, a, b);
+}
+/* sconcat: uno de los operandos debería ser una cadena, así que se salta el
+   camino de enteros; si ninguno lo es (null), el camino lento da el error */
+static inline cs_value cs_sconcat(cs_value a, cs_value b) {
+    return a.tag == CS_STR || b.tag == CS_STR ? cs_concat(a, b) : cs_binary_slow(CS_OP_ADD, a, b);
+}
+static inline cs_value cs_neg(cs_value a) {
+    return a.tag == CS_INT ? cs_int(-a.u.i) : cs_unary_slow(CS_OP_NEG, a);
+}
+static inline cs_value cs_not(cs_value a) {
+    return a.tag == CS_BOOL ? cs_bool(!a.u.i) : cs_unary_slow(CS_OP_NOT, a);
+}
+
+/* Arreglos con verificación de límites */
+static inline cs_value cs_index(cs_value a, cs_value i) {
+    if (a.tag == CS_ARR && i.tag == CS_INT && i.u.i >= 0 && i.u.i < a.u.a->len)
+        return a.u.a->items[i.u.i];
+    return cs_index_fail(a, i);
+}
+static inline void cs_index_set(cs_value a, cs_value i, cs_value v) {
+    if (a.tag == CS_ARR && i.tag == CS_INT && i.u.i >= 0 && i.u.i < a.u.a->len)
+        a.u.a->items[i.u.i] = v;
+    else
+        cs_index_fail(a, i);
+}
+/* Índices que la pasada bce demostró dentro del arreglo */
+static inline cs_value cs_index_unchecked(cs_value a, cs_value i) {
+    return a.u.a->items[i.u.i];
+}
+static inline void cs_index_set_unchecked(cs_value a, cs_value i, cs_value v) {
+    a.u.a->items[i.u.i] = v;
+}
+/* Índice de una dimensión de un arreglo contiguo */
+static inline void cs_bounds(cs_value i, cs_value n) {
+    if (!(i.tag == CS_INT && n.tag == CS_INT && i.u.i >= 0 && i.u.i < n.u.i))
+        cs_bounds_fail(i, n);
+}
+
+/*
+ * Objetos con la clase conocida al compilar: la posición del campo y la ranura
+ * del método vienen del TAC. Si la clase del objeto no tiene ese campo o método
+ * ahí (o no es un objeto), se resuelve por nombre como GET_FIELD y CALL_METHOD.
+ */
+static inline cs_value cs_load_field(cs_value obj, int offset, int id, const char *name, int is_size) {
+    if (obj.tag == CS_OBJ && obj.u.o->cls->field_at[offset] == id) return obj.u.o->fields[offset];
+    return cs_get_field(obj, id, name, is_size);
+}
+static inline void cs_store_field(cs_value obj, int offset, int id, const char *name, cs_value value) {
+    if (obj.tag == CS_OBJ && obj.u.o->cls->field_at[offset] == id)
+        obj.u.o->fields[offset] = value;
+    else
+        cs_set_field(obj, id, name, value);
+}
+static inline int cs_has_method(cs_value obj, int slot, int id) {
+    return obj.tag == CS_OBJ && obj.u.o->cls->methods[slot].selector == id;
+}
+static inline const cs_method *cs_virtual(cs_value obj, int slot, int id, const char *name, int nargs) {
+    if (obj.tag == CS_OBJ) {
+        const cs_method *m = &obj.u.o->cls->methods[slot];
+        if (m->selector == id && m->arity == nargs) return m;
+    }
+    return cs_lookup(obj, id, name, nargs);
+}
+
+/* try/catch: CS_TRY(etiqueta) registra el manejador; un error salta a la etiqueta del catch */
+#define CS_TRY(label) if (setjmp(cs_handlers[cs_push_handler()].env)) goto label
+static inline void cs_end_try(int depth) {
+    if (cs_handler_depth > depth) cs_handler_depth--;
+}
+
+#endif
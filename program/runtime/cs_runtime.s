@@ -0,0 +1,1047 @@
+# Runtime de Compiscript para el backend MIPS32 (tac_mips.py).
+#
+# Representación de valores (una palabra):
+#   entero n   -> (n << 1) | 1          (31 bits)
+#   false/true -> 2 / 6
+#   null       -> 0
+#   puntero    -> múltiplo de 4, apunta a un objeto del heap o de .data:
+#     cadena:  [1][largo en bytes][bytes...][0]
+#     arreglo: [2][largo][elementos...]
+#     objeto:  [3][clase][campos...]
+#   clase:     [nombre][n campos][tabla de campos][valores iniciales][vtable]
+#     tabla de campos: id de campo -> posición (-1 si no existe)
+#     vtable: id de método -> (dirección, aridad), dirección 0 si no existe
+#
+# Las rutinas reciben argumentos en $a0-$a3 y devuelven en $v0. Pueden
+# cambiar $t*, $a*, $v* y $at; guardan $ra y los $s* que usan. Las cadenas
+# constantes (__str_*) y los operadores (__op_*) los emite tac_mips.py.
+
+	.data
+	.align 2
+__cs_hdepth:	.word 0
+__cs_error:	.word 0
+__cs_handlers:	.space 3072		# 256 manejadores x (catch, $sp, $fp)
+__cs_digits:	.space 16
+
+	.text
+
+# ---------------- Memoria y cadenas ----------------
+
+	.ent __cs_malloc
+__cs_malloc:				# $a0 = bytes -> $v0 = dirección alineada a 4
+	addiu $a0, $a0, 3
+	srl $a0, $a0, 2
+	sll $a0, $a0, 2
+	li $v0, 9
+	syscall
+	jr $ra
+	.end __cs_malloc
+
+	.ent __cs_make_string
+__cs_make_string:			# $a0 = bytes, $a1 = largo -> $v0 = cadena nueva
+	addiu $sp, $sp, -24
+	sw $ra, 20($sp)
+	sw $s0, 16($sp)
+	sw $s1, 12($sp)
+	move $s0, $a0
+	move $s1, $a1
+	addiu $a0, $a1, 9
+	jal __cs_malloc
+	li $t0, 1
+	sw $t0, 0($v0)
+	sw $s1, 4($v0)
+	addiu $t1, $v0, 8
+	move $t2, $s0
+	addu $t3, $s0, $s1
+__cs_make_string_copy:
+	beq $t2, $t3, __cs_make_string_done
+	lbu $t4, 0($t2)
+	sb $t4, 0($t1)
+	addiu $t1, $t1, 1
+	addiu $t2, $t2, 1
+	j __cs_make_string_copy
+__cs_make_string_done:
+	sb $zero, 0($t1)
+	lw $s1, 12($sp)
+	lw $s0, 16($sp)
+	lw $ra, 20($sp)
+	addiu $sp, $sp, 24
+	jr $ra
+	.end __cs_make_string
+
+	.ent __cs_concat
+__cs_concat:				# $a0, $a1 = cadenas -> $v0 = $a0 + $a1
+	addiu $sp, $sp, -24
+	sw $ra, 20($sp)
+	sw $s0, 16($sp)
+	sw $s1, 12($sp)
+	move $s0, $a0
+	move $s1, $a1
+	lw $t0, 4($a0)
+	lw $t1, 4($a1)
+	addu $a0, $t0, $t1
+	addiu $a0, $a0, 9
+	jal __cs_malloc
+	li $t0, 1
+	sw $t0, 0($v0)
+	lw $t0, 4($s0)
+	lw $t1, 4($s1)
+	addu $t2, $t0, $t1
+	sw $t2, 4($v0)
+	addiu $t3, $v0, 8		# destino
+	addiu $t4, $s0, 8		# origen
+	addu $t5, $t4, $t0
+__cs_concat_first:
+	beq $t4, $t5, __cs_concat_second_start
+	lbu $t6, 0($t4)
+	sb $t6, 0($t3)
+	addiu $t3, $t3, 1
+	addiu $t4, $t4, 1
+	j __cs_concat_first
+__cs_concat_second_start:
+	addiu $t4, $s1, 8
+	addu $t5, $t4, $t1
+__cs_concat_second:
+	beq $t4, $t5, __cs_concat_done
+	lbu $t6, 0($t4)
+	sb $t6, 0($t3)
+	addiu $t3, $t3, 1
+	addiu $t4, $t4, 1
+	j __cs_concat_second
+__cs_concat_done:
+	sb $zero, 0($t3)
+	lw $s1, 12($sp)
+	lw $s0, 16($sp)
+	lw $ra, 20($sp)
+	addiu $sp, $sp, 24
+	jr $ra
+	.end __cs_concat
+
+	.ent __cs_concat3
+__cs_concat3:				# $a0 + $a1 + $a2 (cadenas)
+	addiu $sp, $sp, -24
+	sw $ra, 20($sp)
+	sw $s0, 16($sp)
+	move $s0, $a2
+	jal __cs_concat
+	move $a0, $v0
+	move $a1, $s0
+	jal __cs_concat
+	lw $s0, 16($sp)
+	lw $ra, 20($sp)
+	addiu $sp, $sp, 24
+	jr $ra
+	.end __cs_concat3
+
+	.ent __cs_concat_n
+__cs_concat_n:				# $a0 = valores, $a1 = cantidad -> $v0 = a + b + c ... (una sola cadena nueva)
+	addiu $sp, $sp, -24
+	sw $ra, 20($sp)
+	sw $s0, 16($sp)
+	sw $s1, 12($sp)
+	sw $s2, 8($sp)
+	sll $t0, $a1, 2
+	addu $s1, $a0, $t0		# fin de los valores
+	addiu $s0, $a0, 4
+	lw $a1, 0($s0)
+	lw $a0, 0($a0)
+	jal __cs_add			# primer par como en sconcat: una cadena, o el error si ninguno lo es
+	sw $v0, 0($s0)
+	addiu $s2, $s0, 4
+__cs_concat_n_text:			# los demás valores pasan a texto en su lugar
+	beq $s2, $s1, __cs_concat_n_length
+	lw $a0, 0($s2)
+	jal __cs_to_text
+	sw $v0, 0($s2)
+	addiu $s2, $s2, 4
+	j __cs_concat_n_text
+__cs_concat_n_length:
+	li $s2, 0
+	move $t0, $s0
+__cs_concat_n_sum:
+	beq $t0, $s1, __cs_concat_n_alloc
+	lw $t1, 0($t0)
+	lw $t1, 4($t1)
+	addu $s2, $s2, $t1
+	addiu $t0, $t0, 4
+	j __cs_concat_n_sum
+__cs_concat_n_alloc:
+	addiu $a0, $s2, 9
+	jal __cs_malloc
+	li $t0, 1
+	sw $t0, 0($v0)
+	sw $s2, 4($v0)
+	addiu $t3, $v0, 8		# destino
+__cs_concat_n_copy:
+	beq $s0, $s1, __cs_concat_n_done
+	lw $t4, 0($s0)
+	lw $t5, 4($t4)
+	addiu $t4, $t4, 8		# origen
+	addu $t5, $t4, $t5
+__cs_concat_n_bytes:
+	beq $t4, $t5, __cs_concat_n_next
+	lbu $t6, 0($t4)
+	sb $t6, 0($t3)
+	addiu $t3, $t3, 1
+	addiu $t4, $t4, 1
+	j __cs_concat_n_bytes
+__cs_concat_n_next:
+	addiu $s0, $s0, 4
+	j __cs_concat_n_copy
+__cs_concat_n_done:
+	sb $zero, 0($t3)
+	lw $s2, 8($sp)
+	lw $s1, 12($sp)
+	lw $s0, 16($sp)
+	lw $ra, 20($sp)
+	addiu $sp, $sp, 24
+	jr $ra
+	.end __cs_concat_n
+
+	.ent __cs_int_text
+__cs_int_text:				# $a0 = entero etiquetado -> $v0 = cadena decimal
+	addiu $sp, $sp, -8
+	sw $ra, 4($sp)
+	sra $t0, $a0, 1
+	li $t1, 0
+	bgez $t0, __cs_int_text_digits
+	li $t1, 1
+	subu $t0, $zero, $t0
+__cs_int_text_digits:
+	la $t2, __cs_digits
+	addiu $t2, $t2, 15
+	move $t5, $t2
+	li $t3, 10
+__cs_int_text_loop:
+	divu $t0, $t3
+	mfhi $t4
+	mflo $t0
+	addiu $t4, $t4, 48
+	sb $t4, 0($t2)
+	addiu $t2, $t2, -1
+	bne $t0, $zero, __cs_int_text_loop
+	beq $t1, $zero, __cs_int_text_make
+	li $t4, 45
+	sb $t4, 0($t2)
+	addiu $t2, $t2, -1
+__cs_int_text_make:
+	addiu $a0, $t2, 1
+	subu $a1, $t5, $t2
+	jal __cs_make_string
+	lw $ra, 4($sp)
+	addiu $sp, $sp, 8
+	jr $ra
+	.end __cs_int_text
+
+	.ent __cs_type
+__cs_type:				# $a0 -> $v0: 0 null, 1 entero, 2 booleano, 3 cadena, 4 arreglo, 5 objeto
+	li $v0, 0
+	beq $a0, $zero, __cs_type_done
+	li $v0, 1
+	andi $t0, $a0, 1
+	bne $t0, $zero, __cs_type_done
+	li $v0, 2
+	andi $t0, $a0, 3
+	bne $t0, $zero, __cs_type_done
+	lw $t0, 0($a0)
+	addiu $v0, $t0, 2
+__cs_type_done:
+	jr $ra
+	.end __cs_type
+
+	.ent __cs_to_text
+__cs_to_text:				# $a0 = valor -> $v0 = cadena (lo que imprime print)
+	addiu $sp, $sp, -24
+	sw $ra, 20($sp)
+	sw $s0, 16($sp)
+	sw $s1, 12($sp)
+	sw $s2, 8($sp)
+	move $s0, $a0
+	jal __cs_type
+	li $t0, 1
+	beq $v0, $t0, __cs_to_text_int
+	li $t0, 2
+	beq $v0, $t0, __cs_to_text_bool
+	li $t0, 3
+	beq $v0, $t0, __cs_to_text_string
+	li $t0, 4
+	beq $v0, $t0, __cs_to_text_array
+	li $t0, 5
+	beq $v0, $t0, __cs_to_text_object
+	la $v0, __str_null
+	j __cs_to_text_done
+__cs_to_text_int:
+	move $a0, $s0
+	jal __cs_int_text
+	j __cs_to_text_done
+__cs_to_text_bool:
+	la $v0, __str_false
+	li $t0, 6
+	bne $s0, $t0, __cs_to_text_done
+	la $v0, __str_true
+	j __cs_to_text_done
+__cs_to_text_string:
+	move $v0, $s0
+	j __cs_to_text_done
+__cs_to_text_array:
+	la $s2, __str_lbracket		# texto acumulado
+	li $s1, 0			# índice
+__cs_to_text_array_loop:
+	lw $t0, 4($s0)
+	beq $s1, $t0, __cs_to_text_array_end
+	beq $s1, $zero, __cs_to_text_array_item
+	move $a0, $s2
+	la $a1, __str_comma
+	jal __cs_concat
+	move $s2, $v0
+__cs_to_text_array_item:
+	sll $t0, $s1, 2
+	addu $t0, $t0, $s0
+	lw $a0, 8($t0)
+	jal __cs_to_text
+	move $a0, $s2
+	move $a1, $v0
+	jal __cs_concat
+	move $s2, $v0
+	addiu $s1, $s1, 1
+	j __cs_to_text_array_loop
+__cs_to_text_array_end:
+	move $a0, $s2
+	la $a1, __str_rbracket
+	jal __cs_concat
+	j __cs_to_text_done
+__cs_to_text_object:
+	lw $t0, 4($s0)
+	la $a0, __str_lt
+	lw $a1, 0($t0)
+	la $a2, __str_gt
+	jal __cs_concat3
+__cs_to_text_done:
+	lw $s2, 8($sp)
+	lw $s1, 12($sp)
+	lw $s0, 16($sp)
+	lw $ra, 20($sp)
+	addiu $sp, $sp, 24
+	jr $ra
+	.end __cs_to_text
+
+	.ent __cs_print
+__cs_print:				# $a0 = valor; imprime su texto y un salto de línea
+	addiu $sp, $sp, -8
+	sw $ra, 4($sp)
+	andi $t0, $a0, 1
+	beq $t0, $zero, __cs_print_text
+	sra $a0, $a0, 1
+	li $v0, 1
+	syscall
+	j __cs_print_newline
+__cs_print_text:
+	jal __cs_to_text
+	addiu $a0, $v0, 8
+	li $v0, 4
+	syscall
+__cs_print_newline:
+	li $a0, 10
+	li $v0, 11
+	syscall
+	lw $ra, 4($sp)
+	addiu $sp, $sp, 8
+	jr $ra
+	.end __cs_print
+
+# ---------------- Errores ----------------
+
+	.ent __cs_throw
+__cs_throw:				# $a0 = mensaje (cadena); salta al catch más reciente
+	lw $t0, __cs_hdepth
+	beq $t0, $zero, __cs_throw_uncaught
+	addiu $t0, $t0, -1
+	sw $t0, __cs_hdepth
+	sw $a0, __cs_error
+	la $t1, __cs_handlers
+	li $t2, 12
+	mul $t2, $t0, $t2
+	addu $t1, $t1, $t2
+	lw $t3, 0($t1)
+	lw $sp, 4($t1)
+	lw $fp, 8($t1)
+	jr $t3
+__cs_throw_uncaught:
+	move $s0, $a0
+	la $t0, __str_error_prefix
+	li $v0, 15
+	li $a0, 2
+	addiu $a1, $t0, 8
+	lw $a2, 4($t0)
+	syscall
+	li $v0, 15
+	li $a0, 2
+	addiu $a1, $s0, 8
+	lw $a2, 4($s0)
+	syscall
+	la $t0, __str_newline
+	li $v0, 15
+	li $a0, 2
+	addiu $a1, $t0, 8
+	li $a2, 1
+	syscall
+	li $v0, 17
+	li $a0, 1
+	syscall
+	.end __cs_throw
+
+	.ent __cs_push_handler
+__cs_push_handler:			# $a0 = dirección del catch; guarda $sp y $fp del llamador
+	lw $t0, __cs_hdepth
+	li $t1, 256
+	bne $t0, $t1, __cs_push_handler_ok
+	la $a0, __str_too_many_try
+	j __cs_throw
+__cs_push_handler_ok:
+	la $t1, __cs_handlers
+	li $t2, 12
+	mul $t2, $t0, $t2
+	addu $t1, $t1, $t2
+	sw $a0, 0($t1)
+	sw $sp, 4($t1)
+	sw $fp, 8($t1)
+	addiu $t0, $t0, 1
+	sw $t0, __cs_hdepth
+	jr $ra
+	.end __cs_push_handler
+
+	.ent __cs_end_try
+__cs_end_try:				# $a0 = profundidad al entrar a la función
+	lw $t0, __cs_hdepth
+	slt $t1, $a0, $t0
+	beq $t1, $zero, __cs_end_try_done
+	addiu $t0, $t0, -1
+	sw $t0, __cs_hdepth
+__cs_end_try_done:
+	jr $ra
+	.end __cs_end_try
+
+	.ent __cs_binary_error
+__cs_binary_error:			# $a0, $a1 = operandos, $a2 = operador -> no retorna
+	addiu $sp, $sp, -24
+	sw $ra, 20($sp)
+	move $s0, $a0
+	move $s1, $a1
+	move $s2, $a2
+	move $a0, $s0
+	jal __cs_to_text
+	move $s0, $v0
+	move $a0, $s1
+	jal __cs_to_text
+	move $s1, $v0
+	la $a0, __str_op_open
+	move $a1, $s2
+	la $a2, __str_invalid_between
+	jal __cs_concat3
+	move $a0, $v0
+	move $a1, $s0
+	la $a2, __str_and
+	jal __cs_concat3
+	move $a0, $v0
+	move $a1, $s1
+	jal __cs_concat
+	move $a0, $v0
+	j __cs_throw
+	.end __cs_binary_error
+
+	.ent __cs_unary_error
+__cs_unary_error:			# $a0 = operando, $a1 = operador -> no retorna
+	addiu $sp, $sp, -24
+	sw $ra, 20($sp)
+	move $s1, $a1
+	jal __cs_to_text
+	move $s0, $v0
+	la $a0, __str_op_open
+	move $a1, $s1
+	la $a2, __str_invalid_on
+	jal __cs_concat3
+	move $a0, $v0
+	move $a1, $s0
+	jal __cs_concat
+	move $a0, $v0
+	j __cs_throw
+	.end __cs_unary_error
+
+	.ent __cs_member_error
+__cs_member_error:			# $a0 + $a1 + $a2 + texto($a3) -> no retorna
+	addiu $sp, $sp, -24
+	sw $ra, 20($sp)
+	move $s0, $a0
+	move $s1, $a1
+	move $s2, $a2
+	move $a0, $a3
+	jal __cs_to_text
+	move $s3, $v0
+	move $a0, $s0
+	move $a1, $s1
+	move $a2, $s2
+	jal __cs_concat3
+	move $a0, $v0
+	move $a1, $s3
+	jal __cs_concat
+	move $a0, $v0
+	j __cs_throw
+	.end __cs_member_error
+
+	.ent __cs_missing_member
+__cs_missing_member:			# $a0 + nombre de la clase $a1 + $a2 + $a3 + "'" -> no retorna
+	addiu $sp, $sp, -24
+	sw $ra, 20($sp)
+	move $s0, $a2
+	move $s1, $a3
+	lw $a1, 0($a1)
+	jal __cs_concat
+	move $a0, $v0
+	move $a1, $s0
+	move $a2, $s1
+	jal __cs_concat3
+	move $a0, $v0
+	la $a1, __str_quote
+	jal __cs_concat
+	move $a0, $v0
+	j __cs_throw
+	.end __cs_missing_member
+
+# ---------------- Operadores ----------------
+
+	.ent __cs_add
+__cs_add:				# $a0 + $a1 cuando no son dos enteros
+	addiu $sp, $sp, -24
+	sw $ra, 20($sp)
+	sw $s0, 16($sp)
+	sw $s1, 12($sp)
+	move $s0, $a0
+	move $s1, $a1
+	jal __cs_type
+	li $t0, 3
+	beq $v0, $t0, __cs_add_concat
+	move $a0, $s1
+	jal __cs_type
+	li $t0, 3
+	beq $v0, $t0, __cs_add_concat
+	move $a0, $s0
+	move $a1, $s1
+	la $a2, __op_add
+	j __cs_binary_error
+__cs_add_concat:
+	move $a0, $s0
+	jal __cs_to_text
+	move $s0, $v0
+	move $a0, $s1
+	jal __cs_to_text
+	move $a0, $s0
+	move $a1, $v0
+	jal __cs_concat
+	lw $s1, 12($sp)
+	lw $s0, 16($sp)
+	lw $ra, 20($sp)
+	addiu $sp, $sp, 24
+	jr $ra
+	.end __cs_add
+
+	.ent __cs_div
+__cs_div:				# $a0 / $a1 (división truncada)
+	and $t0, $a0, $a1
+	andi $t0, $t0, 1
+	bne $t0, $zero, __cs_div_ints
+	la $a2, __op_div
+	j __cs_binary_error
+__cs_div_ints:
+	li $t1, 1
+	bne $a1, $t1, __cs_div_ok
+	la $a0, __str_div_zero
+	j __cs_throw
+__cs_div_ok:
+	sra $t0, $a0, 1
+	sra $t1, $a1, 1
+	div $t0, $t1
+	mflo $v0
+	sll $v0, $v0, 1
+	ori $v0, $v0, 1
+	jr $ra
+	.end __cs_div
+
+	.ent __cs_mod
+__cs_mod:				# $a0 % $a1 (el signo sigue al dividendo)
+	and $t0, $a0, $a1
+	andi $t0, $t0, 1
+	bne $t0, $zero, __cs_mod_ints
+	la $a2, __op_mod
+	j __cs_binary_error
+__cs_mod_ints:
+	li $t1, 1
+	bne $a1, $t1, __cs_mod_ok
+	la $a0, __str_div_zero
+	j __cs_throw
+__cs_mod_ok:
+	sra $t0, $a0, 1
+	sra $t1, $a1, 1
+	div $t0, $t1
+	mfhi $v0
+	sll $v0, $v0, 1
+	ori $v0, $v0, 1
+	jr $ra
+	.end __cs_mod
+
+	.ent __cs_equal
+__cs_equal:				# $a0 == $a1 -> booleano (cadenas por contenido, el resto por identidad)
+	li $v0, 6
+	beq $a0, $a1, __cs_equal_done
+	li $v0, 2
+	beq $a0, $zero, __cs_equal_done
+	beq $a1, $zero, __cs_equal_done
+	andi $t0, $a0, 3
+	bne $t0, $zero, __cs_equal_done
+	andi $t0, $a1, 3
+	bne $t0, $zero, __cs_equal_done
+	lw $t0, 0($a0)
+	li $t1, 1
+	bne $t0, $t1, __cs_equal_done
+	lw $t0, 0($a1)
+	bne $t0, $t1, __cs_equal_done
+	lw $t0, 4($a0)
+	lw $t1, 4($a1)
+	bne $t0, $t1, __cs_equal_done
+	addiu $t2, $a0, 8
+	addiu $t3, $a1, 8
+	addu $t4, $t2, $t0
+__cs_equal_loop:
+	beq $t2, $t4, __cs_equal_true
+	lbu $t5, 0($t2)
+	lbu $t6, 0($t3)
+	bne $t5, $t6, __cs_equal_done
+	addiu $t2, $t2, 1
+	addiu $t3, $t3, 1
+	j __cs_equal_loop
+__cs_equal_true:
+	li $v0, 6
+__cs_equal_done:
+	jr $ra
+	.end __cs_equal
+
+# ---------------- Arreglos ----------------
+
+	.ent __cs_alloc
+__cs_alloc:				# $a0 = tamaño (entero) -> arreglo lleno de null
+	addiu $sp, $sp, -24
+	sw $ra, 20($sp)
+	sw $s0, 16($sp)
+	sra $s0, $a0, 1
+	bgez $s0, __cs_alloc_size
+	li $s0, 0
+__cs_alloc_size:
+	sll $a0, $s0, 2
+	addiu $a0, $a0, 8
+	jal __cs_malloc
+	li $t0, 2
+	sw $t0, 0($v0)
+	sw $s0, 4($v0)
+	addiu $t1, $v0, 8
+	sll $t2, $s0, 2
+	addu $t2, $t1, $t2
+__cs_alloc_clear:
+	beq $t1, $t2, __cs_alloc_done
+	sw $zero, 0($t1)
+	addiu $t1, $t1, 4
+	j __cs_alloc_clear
+__cs_alloc_done:
+	lw $s0, 16($sp)
+	lw $ra, 20($sp)
+	addiu $sp, $sp, 24
+	jr $ra
+	.end __cs_alloc
+
+	.ent __cs_alloc_data
+__cs_alloc_data:			# $a0 = datos, $a1 = largos, $a2 = dimensiones -> arreglo nuevo con los datos
+	addiu $sp, $sp, -32
+	sw $ra, 28($sp)
+	sw $s0, 24($sp)
+	sw $s1, 20($sp)
+	sw $s2, 16($sp)
+	sw $s3, 12($sp)
+	sw $s4, 8($sp)
+	move $s0, $a0			# próximo dato
+	move $s1, $a1
+	move $s2, $a2
+	lw $s3, 0($s1)
+	sll $a0, $s3, 2
+	addiu $a0, $a0, 8
+	jal __cs_malloc
+	li $t0, 2
+	sw $t0, 0($v0)
+	sw $s3, 4($v0)
+	sw $v0, 4($sp)
+	addiu $s4, $v0, 8		# próximo elemento
+	sll $s3, $s3, 2
+	addu $s3, $s4, $s3		# fin de los elementos
+	li $t0, 1
+	bne $s2, $t0, __cs_alloc_data_stride_init
+__cs_alloc_data_copy:
+	beq $s4, $s3, __cs_alloc_data_done
+	lw $t0, 0($s0)
+	sw $t0, 0($s4)
+	addiu $s0, $s0, 4
+	addiu $s4, $s4, 4
+	j __cs_alloc_data_copy
+__cs_alloc_data_stride_init:		# bytes de datos por fila: 4 * largos[1] * ... * largos[dimensiones - 1]
+	li $t0, 4
+	addiu $t1, $s1, 4
+	sll $t2, $s2, 2
+	addu $t2, $s1, $t2
+__cs_alloc_data_stride:
+	beq $t1, $t2, __cs_alloc_data_rows
+	lw $t3, 0($t1)
+	mul $t0, $t0, $t3
+	addiu $t1, $t1, 4
+	j __cs_alloc_data_stride
+__cs_alloc_data_rows:			# cada fila es un arreglo nuevo con las dimensiones restantes
+	sw $t0, 0($sp)
+__cs_alloc_data_row:
+	beq $s4, $s3, __cs_alloc_data_done
+	move $a0, $s0
+	addiu $a1, $s1, 4
+	addiu $a2, $s2, -1
+	jal __cs_alloc_data
+	sw $v0, 0($s4)
+	addiu $s4, $s4, 4
+	lw $t0, 0($sp)
+	addu $s0, $s0, $t0
+	j __cs_alloc_data_row
+__cs_alloc_data_done:
+	lw $v0, 4($sp)
+	lw $s4, 8($sp)
+	lw $s3, 12($sp)
+	lw $s2, 16($sp)
+	lw $s1, 20($sp)
+	lw $s0, 24($sp)
+	lw $ra, 28($sp)
+	addiu $sp, $sp, 32
+	jr $ra
+	.end __cs_alloc_data
+
+	.ent __cs_check_index
+__cs_check_index:			# $a0 = arreglo, $a1 = índice -> $v0 = dirección del elemento
+	beq $a0, $zero, __cs_check_index_not_array
+	andi $t0, $a0, 3
+	bne $t0, $zero, __cs_check_index_not_array
+	lw $t0, 0($a0)
+	li $t1, 2
+	bne $t0, $t1, __cs_check_index_not_array
+	andi $t0, $a1, 1
+	beq $t0, $zero, __cs_check_index_range
+	sra $t0, $a1, 1
+	lw $t1, 4($a0)
+	sltu $t2, $t0, $t1
+	beq $t2, $zero, __cs_check_index_range
+	sll $t0, $t0, 2
+	addu $v0, $a0, $t0
+	addiu $v0, $v0, 8
+	jr $ra
+__cs_check_index_not_array:
+	move $a3, $a0
+	la $a0, __str_cannot_index
+	la $a1, __str_empty
+	la $a2, __str_empty
+	j __cs_member_error
+__cs_check_index_range:
+	addiu $sp, $sp, -24
+	sw $ra, 20($sp)
+	lw $s0, 4($a0)
+	move $a0, $a1
+	jal __cs_to_text
+	la $a0, __str_index_range
+	move $a1, $v0
+	la $a2, __str_size_open
+	jal __cs_concat3
+	move $s1, $v0
+	sll $a0, $s0, 1
+	ori $a0, $a0, 1
+	jal __cs_int_text
+	move $a0, $s1
+	move $a1, $v0
+	la $a2, __str_close_paren
+	jal __cs_concat3
+	move $a0, $v0
+	j __cs_throw
+	.end __cs_check_index
+
+	.ent __cs_bounds
+__cs_bounds:				# falla si el índice $a0 no está en [0, $a1)
+	andi $t0, $a0, 1
+	beq $t0, $zero, __cs_bounds_fail
+	sra $t0, $a0, 1
+	sra $t1, $a1, 1
+	sltu $t2, $t0, $t1
+	beq $t2, $zero, __cs_bounds_fail
+	jr $ra
+__cs_bounds_fail:
+	addiu $sp, $sp, -24
+	sw $ra, 20($sp)
+	move $s0, $a1
+	jal __cs_to_text
+	la $a0, __str_index_range
+	move $a1, $v0
+	la $a2, __str_size_open
+	jal __cs_concat3
+	move $s1, $v0
+	move $a0, $s0
+	jal __cs_int_text
+	move $a0, $s1
+	move $a1, $v0
+	la $a2, __str_close_paren
+	jal __cs_concat3
+	move $a0, $v0
+	j __cs_throw
+	.end __cs_bounds
+
+	.ent __cs_index
+__cs_index:				# $a0[$a1]
+	addiu $sp, $sp, -8
+	sw $ra, 4($sp)
+	jal __cs_check_index
+	lw $v0, 0($v0)
+	lw $ra, 4($sp)
+	addiu $sp, $sp, 8
+	jr $ra
+	.end __cs_index
+
+	.ent __cs_index_set
+__cs_index_set:				# $a0[$a1] = $a2
+	addiu $sp, $sp, -8
+	sw $ra, 4($sp)
+	sw $a2, 0($sp)
+	jal __cs_check_index
+	lw $a2, 0($sp)
+	sw $a2, 0($v0)
+	lw $ra, 4($sp)
+	addiu $sp, $sp, 8
+	jr $ra
+	.end __cs_index_set
+
+	.ent __cs_length
+__cs_length:				# largo de un arreglo o caracteres de una cadena
+	addiu $sp, $sp, -24
+	sw $ra, 20($sp)
+	sw $s0, 16($sp)
+	move $s0, $a0
+	jal __cs_type
+	li $t0, 4
+	beq $v0, $t0, __cs_length_array
+	li $t0, 3
+	beq $v0, $t0, __cs_length_string
+	move $a0, $s0
+	jal __cs_to_text
+	move $a0, $v0
+	la $a1, __str_no_length
+	jal __cs_concat
+	move $a0, $v0
+	j __cs_throw
+__cs_length_array:
+	lw $v0, 4($s0)
+	j __cs_length_done
+__cs_length_string:
+	li $v0, 0
+	addiu $t1, $s0, 8
+	lw $t2, 4($s0)
+	addu $t2, $t1, $t2
+__cs_length_loop:
+	beq $t1, $t2, __cs_length_done
+	lbu $t3, 0($t1)
+	andi $t3, $t3, 192
+	li $t4, 128
+	beq $t3, $t4, __cs_length_next	# byte de continuación de UTF-8
+	addiu $v0, $v0, 1
+__cs_length_next:
+	addiu $t1, $t1, 1
+	j __cs_length_loop
+__cs_length_done:
+	sll $v0, $v0, 1
+	ori $v0, $v0, 1
+	lw $s0, 16($sp)
+	lw $ra, 20($sp)
+	addiu $sp, $sp, 24
+	jr $ra
+	.end __cs_length
+
+# ---------------- Objetos ----------------
+
+	.ent __cs_new_object
+__cs_new_object:			# $a0 = clase -> objeto con los valores iniciales de sus campos
+	addiu $sp, $sp, -24
+	sw $ra, 20($sp)
+	sw $s0, 16($sp)
+	move $s0, $a0
+	lw $a0, 4($s0)
+	sll $a0, $a0, 2
+	addiu $a0, $a0, 8
+	jal __cs_malloc
+	li $t0, 3
+	sw $t0, 0($v0)
+	sw $s0, 4($v0)
+	lw $t1, 4($s0)
+	lw $t2, 12($s0)
+	addiu $t3, $v0, 8
+__cs_new_object_fields:
+	beq $t1, $zero, __cs_new_object_done
+	lw $t4, 0($t2)
+	sw $t4, 0($t3)
+	addiu $t2, $t2, 4
+	addiu $t3, $t3, 4
+	addiu $t1, $t1, -1
+	j __cs_new_object_fields
+__cs_new_object_done:
+	lw $s0, 16($sp)
+	lw $ra, 20($sp)
+	addiu $sp, $sp, 24
+	jr $ra
+	.end __cs_new_object
+
+	.ent __cs_field_address
+__cs_field_address:			# $a0 = objeto, $a1 = id, $a2 = nombre -> $v0 = dirección del campo
+	beq $a0, $zero, __cs_field_address_not_object
+	andi $t0, $a0, 3
+	bne $t0, $zero, __cs_field_address_not_object
+	lw $t0, 0($a0)
+	li $t1, 3
+	bne $t0, $t1, __cs_field_address_not_object
+	lw $t0, 4($a0)
+	lw $t0, 8($t0)
+	sll $t1, $a1, 2
+	addu $t0, $t0, $t1
+	lw $t0, 0($t0)
+	bltz $t0, __cs_field_address_missing
+	sll $t0, $t0, 2
+	addu $v0, $a0, $t0
+	addiu $v0, $v0, 8
+	jr $ra
+__cs_field_address_not_object:
+	move $a3, $a0
+	move $a1, $a2
+	la $a0, __str_access
+	la $a2, __str_on
+	j __cs_member_error
+__cs_field_address_missing:
+	lw $a1, 4($a0)
+	move $a3, $a2
+	la $a0, __str_the_object
+	la $a2, __str_no_field
+	j __cs_missing_member
+	.end __cs_field_address
+
+	.ent __cs_get_field
+__cs_get_field:				# $a0.campo($a1, nombre $a2); $a3 != 0 si es size/length
+	beq $a3, $zero, __cs_get_field_object
+	beq $a0, $zero, __cs_get_field_object
+	andi $t0, $a0, 3
+	bne $t0, $zero, __cs_get_field_object
+	lw $t0, 0($a0)
+	li $t1, 2
+	bne $t0, $t1, __cs_get_field_object
+	lw $v0, 4($a0)
+	sll $v0, $v0, 1
+	ori $v0, $v0, 1
+	jr $ra
+__cs_get_field_object:
+	addiu $sp, $sp, -8
+	sw $ra, 4($sp)
+	jal __cs_field_address
+	lw $v0, 0($v0)
+	lw $ra, 4($sp)
+	addiu $sp, $sp, 8
+	jr $ra
+	.end __cs_get_field
+
+	.ent __cs_set_field
+__cs_set_field:				# $a0.campo($a1, nombre $a2) = $a3
+	addiu $sp, $sp, -8
+	sw $ra, 4($sp)
+	sw $a3, 0($sp)
+	beq $a0, $zero, __cs_set_field_error
+	andi $t0, $a0, 3
+	bne $t0, $zero, __cs_set_field_error
+	lw $t0, 0($a0)
+	li $t1, 3
+	bne $t0, $t1, __cs_set_field_error
+	jal __cs_field_address
+	lw $a3, 0($sp)
+	sw $a3, 0($v0)
+	lw $ra, 4($sp)
+	addiu $sp, $sp, 8
+	jr $ra
+__cs_set_field_error:
+	move $a3, $a0
+	move $a1, $a2
+	la $a0, __str_assign_to
+	la $a2, __str_on
+	j __cs_member_error
+	.end __cs_set_field
+
+	.ent __cs_lookup
+__cs_lookup:				# $a0 = objeto, $a1 = id del método, $a2 = nombre, $a3 = argumentos -> dirección
+	beq $a0, $zero, __cs_lookup_not_object
+	andi $t0, $a0, 3
+	bne $t0, $zero, __cs_lookup_not_object
+	lw $t0, 0($a0)
+	li $t1, 3
+	bne $t0, $t1, __cs_lookup_not_object
+	lw $t0, 4($a0)
+	lw $t0, 16($t0)
+	sll $t1, $a1, 3
+	addu $t0, $t0, $t1
+	lw $v0, 0($t0)
+	beq $v0, $zero, __cs_lookup_missing
+	lw $t1, 4($t0)
+	bne $t1, $a3, __cs_lookup_arity
+	jr $ra
+__cs_lookup_not_object:
+	move $a3, $a0
+	move $a1, $a2
+	la $a0, __str_method_call
+	la $a2, __str_on
+	j __cs_member_error
+__cs_lookup_missing:
+	lw $a1, 4($a0)
+	move $a3, $a2
+	la $a0, __str_the_class
+	la $a2, __str_no_method
+	j __cs_missing_member
+__cs_lookup_arity:
+	move $a0, $a2
+	sll $a1, $t1, 1
+	ori $a1, $a1, 1
+	sll $a2, $a3, 1
+	ori $a2, $a2, 1
+	j __cs_arity_error
+	.end __cs_lookup
+
+	.ent __cs_arity_error
+__cs_arity_error:			# $a0 = nombre, $a1 = esperados, $a2 = recibidos (enteros) -> no retorna
+	addiu $sp, $sp, -24
+	sw $ra, 20($sp)
+	move $s0, $a0
+	move $s1, $a2
+	move $a0, $a1
+	jal __cs_int_text
+	move $s2, $v0
+	move $a0, $s1
+	jal __cs_int_text
+	move $s1, $v0
+	la $a0, __str_quote
+	move $a1, $s0
+	la $a2, __str_expected
+	jal __cs_concat3
+	move $a0, $v0
+	move $a1, $s2
+	la $a2, __str_arguments_got
+	jal __cs_concat3
+	move $a0, $v0
+	move $a1, $s1
+	jal __cs_concat
+	move $a0, $v0
+	j __cs_throw
+	.end __cs_arity_error
@@ -3,6 +3,7 @@ from symbolTable import Symbol_table, Register
 from CompiscriptLexer import CompiscriptLexer
 from CompiscriptParser import CompiscriptParser
 from CompiscriptVisitor import CompiscriptVisitor
+from constant_eval import constant_expression
 import re
 
 
@@ -278,6 +279,9 @@ class semantic_analyzer(CompiscriptVisitor):
 
             if expr_base is None and expr_dim > 0 and decl_base:
                 expr_base = decl_base
+            if decl_base is None and expr_base is None:
+                # Sin tipo declarado, la constante toma el tipo de su inicializador
+                expr_base, expr_dim = self._visit_and_get(ctx.expression())
 
         if decl_base and expr_base and decl_base != expr_base:
             self.add_error(ctx, f"Tipo incompatible: {decl_base} vs {expr_base}")
@@ -286,7 +290,7 @@ class semantic_analyzer(CompiscriptVisitor):
 
         if not self.current_table.insert_symbol(
             identifier=name,
-            type=decl_base,
+            type=decl_base or expr_base,
             scope=self.current_table.scope,
             line_pos=line,
             is_mutable=False,
@@ -294,9 +298,14 @@ class semantic_analyzer(CompiscriptVisitor):
             params=[],
             return_type=None,
             parent_class=None,
-            dim=decl_dim
+            dim=decl_dim or expr_dim
         ):
             self.add_error(ctx, f"Constante {name} ya declarada!")
+        elif ctx.expression() is not None and not (decl_dim or expr_dim):
+            # Valor al compilar: el generador lo sustituye en cada uso (ver constant_eval.py)
+            value = constant_expression(ctx.expression())
+            self.current_table.lookup_local(name).value = value
+            ctx._constant_value = value
 
 
             
@@ -441,6 +450,7 @@ class semantic_analyzer(CompiscriptVisitor):
                     self.visit(right_expr)
                     return None
                 
+                ctx._receiver_class = owner_type
                 rhs_t, rhs_d = self.infer_type_and_dim(right_expr)
                 if mem.type and rhs_t and mem.type != rhs_t:
                     self.add_error(ctx, f"Tipo incompatible al asignar '{owner_type}.{prop_name}': "
@@ -454,6 +464,10 @@ class semantic_analyzer(CompiscriptVisitor):
                 self.visit(right_expr)
                 return None
 
+            # Identifier = expression: se visita la expresión para anotar sus tipos
+            self.visit(ctx.expression(0))
+            return None
+
         except Exception as e:
             self.add_error(ctx, str(e))
             return None
@@ -477,7 +491,12 @@ class semantic_analyzer(CompiscriptVisitor):
 
         rhs_type, rhs_dim = self._visit_and_get(rhs_node) if rhs_node is not None else (None, 0)
 
-        if ctx.lhs.primaryAtom() and ctx.lhs.primaryAtom().Identifier():
+        if ctx.lhs.suffixOp():
+            # a[i] = x / obj.p = x: se compara contra el tipo del elemento o propiedad, no de la variable
+            if lhs_type is not None and rhs_type not in (None, "null") and (lhs_type, lhs_dim) != (rhs_type, rhs_dim):
+                self.add_error(ctx, f"Tipo incompatible en asignación a '{ctx.lhs.getText()}': "
+                                    f"{lhs_type}[{lhs_dim}] vs {rhs_type}[{rhs_dim}]")
+        elif ctx.lhs.primaryAtom() and ctx.lhs.primaryAtom().Identifier():
             name = ctx.lhs.primaryAtom().Identifier().getText()
             sym = self.current_table.lookup_global(name)
             if sym and not sym.is_mutable:
@@ -881,7 +900,11 @@ class semantic_analyzer(CompiscriptVisitor):
 
     # Visit a parse tree produced by CompiscriptParser#PropertyAssignExpr.
     def visitPropertyAssignExpr(self, ctx:CompiscriptParser.PropertyAssignExprContext):
-        return self.visitChildren(ctx)
+        result = self.visitChildren(ctx)
+        owner_type, owner_dim = self._get_inferred(ctx.leftHandSide())
+        if owner_dim == 0 and self._lookup_member(owner_type, ctx.Identifier().getText()):
+            ctx._receiver_class = owner_type
+        return result
 
 
     # Visit a parse tree produced by CompiscriptParser#ExprNoAssign.
@@ -1068,6 +1091,8 @@ class semantic_analyzer(CompiscriptVisitor):
                     base_type, base_dim, last_member = (None, 0), 0, None
                     continue
 
+                # Clase estática del objeto: el generador la usa para la posición del campo o la ranura del método
+                suf._receiver_class = base_type
                 base_type, base_dim = (mem.type or mem.return_type, mem.dim)
                 last_member = mem  
 
@@ -1078,7 +1103,7 @@ class semantic_analyzer(CompiscriptVisitor):
                         self.add_error(ctx, f"Método '{last_member.identifier}' esperaba {len(last_member.params)} parámetros, se dieron {len(args)}")
                     else:
                         for a, p in zip(args, last_member.params):
-                            t, d = self.infer_type_and_dim(a)
+                            t, d = self.infer_expression_type(a)
                             if p["type"] and t != p["type"]:
                                 self.add_error(ctx, f"Parámetro '{p['name']}' esperaba {p['type']}, recibido {t}")
                             if d != (p.get("dimension") or 0):
@@ -1092,7 +1117,7 @@ class semantic_analyzer(CompiscriptVisitor):
                     base_type, base_dim = rb, rd
 
             elif head == '[':
-                idx_type, idx_dim = self.infer_type_and_dim(suf.expression())
+                idx_type, idx_dim = self.infer_expression_type(suf.expression())
                 if idx_type != "integer" or idx_dim != 0:
                     self.add_error(ctx, f"Índice debe ser integer, no {idx_type}[{idx_dim}]")
                 base_dim -= 1
@@ -1110,6 +1135,8 @@ class semantic_analyzer(CompiscriptVisitor):
         name = ctx.Identifier().getText()
         sym = self.current_table.lookup_global(name)
         if sym:
+            if not sym.is_mutable and sym.value is not None:
+                ctx._constant_value = sym.value
             return self._set_inferred(ctx, sym.type, sym.dim)
         self.add_error(ctx, f"Identificador no declarado: {name}")
         return self._set_inferred(ctx, None, 0)
@@ -1159,6 +1186,10 @@ class semantic_analyzer(CompiscriptVisitor):
         if hasattr(parent, "Identifier") and parent.Identifier():
             # caso f(x,y)
             func_name = parent.Identifier().getText()
+        elif hasattr(parent, "primaryAtom") and type(parent.primaryAtom()).__name__ == "IdentifierExprContext" \
+                and parent.suffixOp(0) is ctx:
+            # caso f(x,y) dentro de una expresión: el nombre está en el átomo del leftHandSide
+            func_name = parent.primaryAtom().Identifier().getText()
 
         if func_name:
             sym = self.current_table.lookup_global(func_name)
@@ -1171,7 +1202,7 @@ class semantic_analyzer(CompiscriptVisitor):
                 self.add_error(ctx, f"Función '{func_name}' esperaba {len(sym.params)} parámetros, se dieron {len(args)}")
 
             for a, param in zip(args, sym.params):
-                t, d = self.infer_type_and_dim(a)
+                t, d = self.infer_expression_type(a)
                 if param["type"] and t != param["type"]:
                     self.add_error(ctx, f"Parámetro '{param['name']}' esperaba {param['type']}, recibido {t}")
 
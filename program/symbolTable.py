@@ -24,6 +24,14 @@ class Register:
         self.dim = dim #Si es 1, es un array 1D, si es 2 es un array 2D
         self.address = 0
         self.size = 0
+        self.descriptor = None # Forma del arreglo (ver array_layout.py)
+
+        # Solo para constantes: literal del TAC con su valor si se conoce al compilar (ver constant_eval.py)
+        self.value = None
+
+        # Solo para funciones: registro de activación (ver frame_layout.py)
+        self.frame = None
+        self.frame_size = 0
 
     def update_memory_address(self, relative_memor_addr):
         self.address = relative_memor_addr
@@ -39,6 +47,7 @@ class Symbol_table():
         self.children = [] #Guarda los elementos hijos
         self.scope = "Global" if parent is None else scope
         self.scope_map = {}
+        self.frame = None # Solo en la tabla global: área estática del programa
 
     def insert_symbol(self,identifier, type, scope, line_pos, is_mutable, kind, params, return_type, parent_class, dim):
         if identifier in self.elements:
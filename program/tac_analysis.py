@@ -0,0 +1,774 @@
+"""
+Análisis sobre la tabla de cuádruplos: división en unidades (programa principal,
+funciones y métodos), grafo de flujo de control por unidad, dominadores y vida
+de variables. Las pasadas de optimización y los motores de ejecución usan estas
+estructuras en lugar de recorrer la lista de cuádruplos a mano.
+"""
+import re
+
+INT_RE = re.compile(r"-?\d+")
+NAME_RE = re.compile(r"[A-Za-z_]\w*")
+TEMP_RE = re.compile(r"t\d+")
+
+# Operaciones tipadas: el generador las elige cuando el análisis semántico conoce
+# el tipo de los operandos (entero, cadena o booleano); cada una equivale a su
+# operación genérica, que es la que da el mensaje si un operando resulta null
+TYPED_OPS = {
+    "iadd": "+", "isub": "-", "imul": "*", "idiv": "/", "imod": "%",
+    "icmp_lt": "<", "icmp_le": "<=", "icmp_gt": ">", "icmp_ge": ">=", "icmp_eq": "==", "icmp_ne": "!=",
+    "sconcat": "+", "band": "&&", "bor": "||",
+}
+TYPED_UNARY_OPS = {"ineg": "-", "bnot": "!"}
+BINARY_OPS = {"+", "-", "*", "/", "%", ">", "<", ">=", "<=", "==", "!=", "&&", "||"} | set(TYPED_OPS)
+UNARY_OPS = {"-", "!"} | set(TYPED_UNARY_OPS)
+# Operaciones que pueden lanzar una excepción en tiempo de ejecución
+TRAPPING_OPS = {"/", "%", "idiv", "imod"}
+JUMP_OPS = {"goto", "if", "JUMP_TABLE", "HASH_SWITCH"}
+# Instrucciones que solo delimitan estructura (no se ejecutan dentro de una unidad)
+STRUCTURAL_OPS = {"FUNC", "endfunc", "CLASS", "ENDCLASS", "FIELD", "FIELD_CONST", "INHERIT"}
+CALL_OPS = {"call", "CALL_FUNC", "CALL_METHOD", "CALL_VIRTUAL", "CALL_DIRECT", "CALL_CONSTRUCTOR"}
+# Accesos a arreglos; las formas con 'u' no verifican el índice (la pasada bce demostró que está en rango)
+INDEX_LOADS = ("[]", "[]u")
+INDEX_STORES = ("[]=", "[]=u")
+
+
+def generic_op(op):
+    """Operación genérica de una operación tipada (las demás quedan igual)."""
+    return TYPED_OPS.get(op) or TYPED_UNARY_OPS.get(op, op)
+
+
+def is_string_literal(operand):
+    return isinstance(operand, str) and len(operand) >= 2 and operand[0] == '"' and operand[-1] == '"'
+
+
+def is_constant(operand):
+    """Literal entero, cadena, booleano o null (o un valor que no es texto, como n_params)."""
+    if operand is None:
+        return False
+    if not isinstance(operand, str):
+        return True
+    if INT_RE.fullmatch(operand):
+        return True
+    if is_string_literal(operand):
+        return True
+    return operand in ("true", "false", "null")
+
+
+def is_temp(operand):
+    return isinstance(operand, str) and TEMP_RE.fullmatch(operand) is not None
+
+
+def is_name(operand):
+    return isinstance(operand, str) and NAME_RE.fullmatch(operand) is not None and not is_constant(operand)
+
+
+def operand_names(operand):
+    """Nombres leídos por un operando; 't1[t2]' lee t1 y t2, 'arr.size' lee arr."""
+    if operand is None or is_constant(operand):
+        return []
+    if is_name(operand):
+        return [operand]
+    return [n for n in NAME_RE.findall(operand) if not is_constant(n)][:2]
+
+
+def label_name(label):
+    return label[:-1] if isinstance(label, str) and label.endswith(":") else label
+
+
+def is_label(quad):
+    return quad[0] == "label"
+
+
+def jump_targets(quad):
+    op, arg1, arg2, res = quad
+    if op == "goto":
+        return [label_name(arg1 or res)]
+    if op == "if":
+        return [label_name(res)]
+    if op == "JUMP_TABLE":
+        return [label_name(l) for l in arg2[1]] + [label_name(res)]
+    if op == "HASH_SWITCH":
+        return [label_name(l) for _, l in arg2] + [label_name(res)]
+    if op == "ON_EXCEPTION":
+        return [label_name(res)]
+    return []
+
+
+def ends_block(quad):
+    return quad[0] in JUMP_OPS or quad[0] == "RETURN"
+
+
+def falls_through(quad):
+    return quad[0] not in ("goto", "JUMP_TABLE", "HASH_SWITCH", "RETURN")
+
+
+def quad_uses(quad):
+    """Nombres leídos por la instrucción."""
+    op, arg1, arg2, res = quad
+    if op in BINARY_OPS or op in UNARY_OPS or op in INDEX_LOADS or op == "bounds":
+        return operand_names(arg1) + operand_names(arg2)
+    if op == "=":
+        uses = operand_names(arg1)
+        if isinstance(res, str) and not is_name(res):
+            uses += operand_names(res)
+        return uses
+    if op in INDEX_STORES:
+        return operand_names(arg1) + operand_names(arg2) + operand_names(res)
+    if op in ("if", "length", "GET_FIELD", "LOAD_FIELD", "CALL_VIRTUAL", "CALL_DIRECT", "RETURN", "param",
+              "JUMP_TABLE", "HASH_SWITCH"):
+        return operand_names(arg1)
+    if op == "PRINT":
+        return operand_names(res)
+    if op in ("SET_FIELD", "STORE_FIELD"):
+        return operand_names(arg1) + operand_names(res)
+    if op == "CALL_METHOD":
+        return operand_names(arg1)[:1]
+    if op in ("call", "CALL_FUNC"):
+        return [arg1] if is_temp(arg1) else []
+    if op == "CALL_CONSTRUCTOR":
+        return operand_names(res)
+    if op == "CONCAT":
+        # Concatenación de n operandos: ("CONCAT", (a, b, c, ...), None, t) es t = a + b + c ...
+        return [n for x in arg1 for n in operand_names(x)]
+    return []
+
+
+def argument_count(quad):
+    """Cantidad de param que consume una llamada."""
+    return quad[2][2] if quad[0] in ("CALL_VIRTUAL", "CALL_DIRECT") else quad[2]
+
+
+def quad_defs(quad):
+    """Nombres escritos por la instrucción."""
+    op, arg1, arg2, res = quad
+    if op in BINARY_OPS or op in UNARY_OPS or op in INDEX_LOADS or op in CALL_OPS or op in (
+            "length", "GET_FIELD", "LOAD_FIELD", "alloc", "ALLOC_OBJ", "EXC_ASSIGN", "CONCAT"):
+        if op == "CALL_CONSTRUCTOR":
+            return []
+        return [res] if is_name(res) else []
+    if op == "=":
+        return [res] if is_name(res) else []
+    return []
+
+
+def is_pure(quad):
+    """Una instrucción pura puede eliminarse si su resultado no se usa."""
+    op, arg1, arg2, res = quad
+    if op in TRAPPING_OPS:
+        return is_constant(arg2) and arg2 not in ("0", "-0")
+    if op in BINARY_OPS or op in UNARY_OPS or op in ("length", "[]u", "CONCAT"):
+        return True
+    if op == "=":
+        return is_name(res)
+    return False
+
+
+class basic_block():
+    def __init__(self, index, indices):
+        self.index = index
+        self.indices = indices      # posiciones en la tabla de cuádruplos
+        self.label = None
+        self.succs = []
+        self.preds = []
+
+    def __repr__(self):
+        return f"B{self.index}{self.indices[:1]}..{self.indices[-1:]}"
+
+
+class function_unit():
+    """
+    Una unidad ejecutable: el programa principal, una función o un método.
+    `indices` son las posiciones del cuerpo (sin el encabezado FUNC/param ni
+    las funciones anidadas, que forman sus propias unidades).
+    """
+    def __init__(self, name, owner_class=None, header=None):
+        self.name = name
+        self.owner_class = owner_class
+        self.header = header
+        self.end = None
+        self.params = []
+        self.locals = []            # nombres declarados con 'local' (variables del registro de activación)
+        self.indices = []
+        self.blocks = []
+        self.label_block = {}
+
+    @property
+    def qualified_name(self):
+        return f"{self.owner_class}.{self.name}" if self.owner_class else self.name
+
+    def __repr__(self):
+        return f"<unit {self.qualified_name}>"
+
+
+def split_units(quads):
+    """Divide la tabla de cuádruplos en unidades: main + una por cada FUNC."""
+    main = function_unit("main")
+    units = [main]
+    stack = [("unit", main)]
+    for i, quad in enumerate(quads):
+        op = quad[0]
+        top_kind, top = stack[-1]
+        if op == "CLASS":
+            stack.append(("class", quad[1]))
+        elif op == "ENDCLASS":
+            if top_kind == "class":
+                stack.pop()
+        elif op == "FUNC":
+            owner = top if top_kind == "class" else None
+            unit = function_unit(quad[1], owner, i)
+            units.append(unit)
+            stack.append(("unit", unit))
+        elif op == "endfunc":
+            if top_kind == "unit" and top is not main:
+                top.end = i
+                stack.pop()
+        elif op == "param" and top_kind == "unit" and top is not main and not top.indices \
+                and len(top.params) < (quads[top.header][2] or 0):
+            top.params.append(quad[1])
+        elif op == "local":
+            if top_kind == "unit" and quad[1] not in top.locals:
+                top.locals.append(quad[1])
+        elif op in STRUCTURAL_OPS or top_kind == "class":
+            continue
+        else:
+            top.indices.append(i)
+    return units
+
+
+def try_regions(quads, unit):
+    """
+    Tabla de excepciones de la unidad: (inicio, fin, etiqueta del catch) por
+    cada try, con el rango protegido en posiciones de la tabla de cuádruplos
+    (desde su ON_EXCEPTION hasta la etiqueta del catch, sin incluirla). Los try
+    son léxicos, así que un try anidado queda dentro del rango del externo; la
+    lista va del más interno al más externo y el primer rango que contiene la
+    instrucción que falló es el que la atrapa. Después de END_TRY solo queda el
+    goto al final del try, que no puede fallar.
+    """
+    labels = {label_name(quads[i][3]): i for i in unit.indices if is_label(quads[i])}
+    regions = [(i, labels[label_name(quads[i][3])], label_name(quads[i][3])) for i in unit.indices
+               if quads[i][0] == "ON_EXCEPTION" and label_name(quads[i][3]) in labels]
+    return sorted(regions, key=lambda region: -region[0])
+
+
+def global_names(quads, units):
+    """
+    Nombres que alguna función o método lee o escribe sin ser suyos (ni parámetro,
+    ni 'local', ni temporal): las variables globales del programa. Las demás
+    variables del programa principal no se ven fuera de él.
+    """
+    shared = set()
+    for unit in units:
+        if unit.header is None:
+            continue
+        own = set(unit.params) | set(unit.locals) | {"this"}
+        for i in unit.indices:
+            quad = quads[i]
+            names = quad_uses(quad) + quad_defs(quad)
+            if quad[0] == "CALL_METHOD":
+                names.append(quad[1].rsplit(".", 1)[0])
+            shared.update(n for n in names if is_name(n) and n not in own and not is_temp(n))
+    return shared
+
+
+def string_pool(quads):
+    """
+    Tabla de constantes de cadena: literal del TAC -> índice, sin repetir y en
+    orden de primera aparición. Incluye los literales anidados en los operandos
+    compuestos (datos de un alloc, casos de un HASH_SWITCH).
+    """
+    pool = {}
+    pending = []
+    for quad in quads:
+        pending.extend(reversed(quad[1:]))
+        while pending:
+            operand = pending.pop()
+            if isinstance(operand, tuple):
+                pending.extend(reversed(operand))
+            elif is_string_literal(operand) and operand not in pool:
+                pool[operand] = len(pool)
+    return pool
+
+
+def build_cfg(quads, unit):
+    """Construye los bloques básicos de una unidad y sus aristas."""
+    indices = unit.indices
+    blocks = []
+    current = []
+    for i in indices:
+        if is_label(quads[i]) and current:
+            blocks.append(current)
+            current = []
+        current.append(i)
+        if ends_block(quads[i]) or quads[i][0] == "ON_EXCEPTION":
+            blocks.append(current)
+            current = []
+    if current:
+        blocks.append(current)
+
+    unit.blocks = [basic_block(n, idx) for n, idx in enumerate(blocks)]
+    unit.label_block = {}
+    for block in unit.blocks:
+        first = quads[block.indices[0]]
+        if is_label(first):
+            block.label = label_name(first[3])
+            unit.label_block[block.label] = block
+
+    for n, block in enumerate(unit.blocks):
+        last = quads[block.indices[-1]]
+        targets = []
+        for lbl in jump_targets(last):
+            if lbl in unit.label_block:
+                targets.append(unit.label_block[lbl])
+        if falls_through(last) and n + 1 < len(unit.blocks):
+            targets.append(unit.blocks[n + 1])
+        for succ in targets:
+            if succ not in block.succs:
+                block.succs.append(succ)
+                succ.preds.append(block)
+    return unit.blocks
+
+
+class program_cfg():
+    """Resultado del análisis 'cfg': unidades con sus bloques básicos."""
+    def __init__(self, quads):
+        self.units = split_units(quads)
+        for unit in self.units:
+            build_cfg(quads, unit)
+
+    def unit_named(self, qualified_name):
+        for unit in self.units:
+            if unit.qualified_name == qualified_name:
+                return unit
+        return None
+
+
+def reverse_postorder(entry):
+    """Orden posterior inverso desde la entrada (iterativo, sin límite de recursión)."""
+    order = []
+    seen = {entry}
+    stack = [(entry, iter(entry.succs))]
+    while stack:
+        block, succs = stack[-1]
+        for succ in succs:
+            if succ not in seen:
+                seen.add(succ)
+                stack.append((succ, iter(succ.succs)))
+                break
+        else:
+            stack.pop()
+            order.append(block)
+    order.reverse()
+    return order
+
+
+def compute_dominators(cfg):
+    """
+    Dominadores por unidad (algoritmo iterativo de Cooper, Harvey y Kennedy).
+    Devuelve {unidad: {bloque: dominador inmediato}}.
+    """
+    result = {}
+    for unit in cfg.units:
+        if not unit.blocks:
+            result[unit] = {}
+            continue
+        entry = unit.blocks[0]
+        rpo = reverse_postorder(entry)
+        position = {b: n for n, b in enumerate(rpo)}
+        idom = {entry: entry}
+
+        def intersect(a, b):
+            while a is not b:
+                while position[a] > position[b]:
+                    a = idom[a]
+                while position[b] > position[a]:
+                    b = idom[b]
+            return a
+
+        changed = True
+        while changed:
+            changed = False
+            for block in rpo[1:]:
+                preds = [p for p in block.preds if p in idom]
+                if not preds:
+                    continue
+                new_idom = preds[0]
+                for p in preds[1:]:
+                    new_idom = intersect(p, new_idom)
+                if idom.get(block) is not new_idom:
+                    idom[block] = new_idom
+                    changed = True
+        result[unit] = idom
+    return result
+
+
+def dominates(idom, a, b):
+    """True si el bloque a domina al bloque b."""
+    while True:
+        if a is b:
+            return True
+        parent = idom.get(b)
+        if parent is None or parent is b:
+            return False
+        b = parent
+
+
+class liveness_info():
+    def __init__(self):
+        self.live_in = {}
+        self.live_out = {}
+
+    def live_after(self, quads, block, position):
+        """Nombres vivos justo después de block.indices[position]."""
+        live = set(self.live_out[block])
+        for i in reversed(block.indices[position + 1:]):
+            live.difference_update(quad_defs(quads[i]))
+            live.update(quad_uses(quads[i]))
+        return live
+
+
+def compute_liveness(quads, cfg):
+    """Vida de variables por bloque (flujo de datos hacia atrás)."""
+    info = liveness_info()
+    for unit in cfg.units:
+        use, define = {}, {}
+        for block in unit.blocks:
+            u, d = set(), set()
+            for i in block.indices:
+                for name in quad_uses(quads[i]):
+                    if name not in d:
+                        u.add(name)
+                d.update(quad_defs(quads[i]))
+            use[block], define[block] = u, d
+            info.live_in[block] = set()
+            info.live_out[block] = set()
+        changed = True
+        while changed:
+            changed = False
+            for block in reversed(unit.blocks):
+                out = set()
+                for succ in block.succs:
+                    out |= info.live_in[succ]
+                new_in = use[block] | (out - define[block])
+                if out != info.live_out[block] or new_in != info.live_in[block]:
+                    info.live_out[block] = out
+                    info.live_in[block] = new_in
+                    changed = True
+    return info
+
+
+def dominator_intervals(idom):
+    """
+    Numeración del árbol de dominadores: a domina a b si y solo si
+    enter[a] <= enter[b] y leave[b] <= leave[a]. Cada consulta es O(1)
+    aunque el árbol sea muy profundo.
+    """
+    children = {}
+    roots = []
+    for block, parent in idom.items():
+        if parent is block:
+            roots.append(block)
+        else:
+            children.setdefault(parent, []).append(block)
+    enter, leave = {}, {}
+    clock = 0
+    for root in roots:
+        stack = [(root, False)]
+        while stack:
+            block, done = stack.pop()
+            if done:
+                leave[block] = clock
+                clock += 1
+                continue
+            enter[block] = clock
+            clock += 1
+            stack.append((block, True))
+            stack.extend((child, False) for child in children.get(block, ()))
+    return enter, leave
+
+
+def natural_loops(unit, idom):
+    """Lazos naturales de una unidad: lista de (cabecera, conjunto de bloques)."""
+    loops = {}
+    enter, leave = dominator_intervals(idom)
+    for block in unit.blocks:
+        for succ in block.succs:
+            if succ in idom and block in idom and enter[succ] <= enter[block] and leave[block] <= leave[succ]:
+                body = loops.setdefault(succ, {succ})
+                stack = [block]
+                while stack:
+                    b = stack.pop()
+                    if b not in body:
+                        body.add(b)
+                        stack.extend(b.preds)
+    return list(loops.items())
+
+
+def loop_depths(unit, idom):
+    """Profundidad de anidamiento de lazos para cada bloque de la unidad."""
+    depth = {block: 0 for block in unit.blocks}
+    for _, body in natural_loops(unit, idom):
+        for block in body:
+            depth[block] += 1
+    return depth
+
+
+# Instrucciones sin efectos visibles fuera de la unidad (las llamadas y '[]=' se revisan aparte)
+EFFECT_FREE_OPS = BINARY_OPS | UNARY_OPS | JUMP_OPS | {
+    "=", "[]", "[]u", "length", "bounds", "alloc", "ALLOC_OBJ", "GET_FIELD", "LOAD_FIELD", "label", "param", "RETURN",
+    "ON_EXCEPTION", "END_TRY", "EXC_ASSIGN",
+}
+
+
+def local_array_stores(quads, unit):
+    """
+    Posiciones de los '[]=' de la unidad que escriben en un arreglo creado en
+    ella. Los temporales se siguen dentro de cada bloque (el generador los
+    reutiliza); las variables, en toda la unidad: todas sus definiciones deben
+    ser un 'alloc' o una copia de otra variable que cumpla lo mismo.
+    """
+    fresh = set()           # temporales que tienen un arreglo recién creado
+    sources = {}            # variable -> orígenes de sus definiciones
+    stores = []             # (posición, arreglo, ya se sabe que es local)
+    for i in unit.indices:
+        op, arg1, arg2, res = quads[i]
+        if op == "label":
+            fresh = set()
+        elif op in INDEX_STORES:
+            stores.append((i, res, res in fresh))
+        if op == "alloc":
+            origin = "alloc"
+        elif op == "=" and is_temp(arg1):
+            origin = "alloc" if arg1 in fresh else None
+        elif op == "=" and is_name(arg1):
+            origin = arg1
+        else:
+            origin = None
+        for name in quad_defs(quads[i]):
+            if is_temp(name):
+                (fresh.add if origin == "alloc" else fresh.discard)(name)
+            else:
+                sources.setdefault(name, []).append(origin)
+    arrays = {n for n, origins in sources.items() if None not in origins}
+    changed = True
+    while changed:
+        changed = False
+        for name in list(arrays):
+            if any(o != "alloc" and o not in arrays for o in sources[name]):
+                arrays.discard(name)
+                changed = True
+    return {i for i, array, known in stores if known or array in arrays}
+
+
+def class_parents(quads):
+    """{clase: padre o None} según los marcadores CLASS/INHERIT."""
+    parents = {}
+    current = None
+    for op, arg1, arg2, res in quads:
+        if op == "CLASS":
+            current = arg1
+            parents[arg1] = res if arg2 == "inherits" else None
+        elif op == "INHERIT" and current is not None:
+            parents[current] = arg1
+        elif op == "ENDCLASS":
+            current = None
+    return parents
+
+
+class call_graph():
+    """
+    Grafo de llamadas entre unidades (por nombre calificado: main, f, Clase.m).
+    Una llamada a método cuyo destino no se conoce al compilar tiene una arista
+    a cada método con ese nombre; CALL_CONSTRUCTOR C, al constructor de C y al
+    de cada ancestro. `instantiates` son las clases que cada unidad crea.
+    """
+    def __init__(self, units, parents):
+        self.units = {u.qualified_name: u for u in units}
+        self.parents = parents
+        self.edges = {name: set() for name in self.units}
+        self.instantiates = {name: set() for name in self.units}
+        self.indirect = set()       # unidades con una llamada a través de un temporal
+
+    def resolve(self, class_name, method):
+        """Clase cuyo method ejecuta un objeto de class_name, o None."""
+        for c in self.ancestors(class_name):
+            if f"{c}.{method}" in self.units:
+                return c
+        return None
+
+    def ancestors(self, class_name):
+        chain = []
+        while class_name in self.parents and class_name not in chain:
+            chain.append(class_name)
+            class_name = self.parents[class_name]
+        return chain
+
+
+def build_call_graph(quads, units=None):
+    units = units if units is not None else split_units(quads)
+    graph = call_graph(units, class_parents(quads))
+    functions = {u.name: u.qualified_name for u in units if u.header is not None and u.owner_class is None}
+    methods = {}
+    for unit in units:
+        if unit.owner_class:
+            methods.setdefault(unit.name, set()).add(unit.qualified_name)
+    for unit in units:
+        edges, created = graph.edges[unit.qualified_name], graph.instantiates[unit.qualified_name]
+        for i in unit.indices:
+            op, arg1, arg2, res = quads[i]
+            if op in ("call", "CALL_FUNC"):
+                if is_temp(arg1):
+                    graph.indirect.add(unit.qualified_name)
+                elif arg1 in functions:
+                    edges.add(functions[arg1])
+            elif op == "CALL_METHOD":
+                edges.update(methods.get(arg1.rsplit(".", 1)[1], ()))
+            elif op == "CALL_VIRTUAL":
+                edges.update(methods.get(arg2[1], ()))
+            elif op == "CALL_DIRECT":
+                owner, method, _, guard = arg2
+                edges.add(f"{owner}.{method}")
+                if guard is not None:
+                    edges.update(methods.get(method, ()))
+            elif op in ("ALLOC_OBJ", "CALL_CONSTRUCTOR"):
+                created.add(arg1)
+                if op == "CALL_CONSTRUCTOR":
+                    edges.update(f"{c}.constructor" for c in graph.ancestors(arg1)
+                                 if f"{c}.constructor" in graph.units)
+    return graph
+
+
+def strongly_connected(graph):
+    """
+    Componentes fuertemente conexas del grafo de llamadas (Tarjan, iterativo).
+    Salen en orden topológico inverso: cada componente antes que las que la
+    llaman, así que un análisis de abajo hacia arriba puede recorrerlas en ese
+    orden.
+    """
+    index, low, on_stack = {}, {}, set()
+    stack, components = [], []
+    for root in graph.units:
+        if root in index:
+            continue
+        work = [(root, iter(sorted(graph.edges[root])))]
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, successors = work[-1]
+            for succ in successors:
+                if succ not in index:
+                    index[succ] = low[succ] = len(index)
+                    stack.append(succ)
+                    on_stack.add(succ)
+                    work.append((succ, iter(sorted(graph.edges[succ]))))
+                    break
+                if succ in on_stack:
+                    low[node] = min(low[node], index[succ])
+            else:
+                work.pop()
+                if work:
+                    low[work[-1][0]] = min(low[work[-1][0]], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
+
+
+def recursive_units(graph, components=None):
+    """Unidades que pueden llamarse a sí mismas, directa o indirectamente."""
+    recursive = set()
+    for component in components if components is not None else strongly_connected(graph):
+        if len(component) > 1 or component[0] in graph.edges[component[0]]:
+            recursive.update(component)
+    return recursive
+
+
+def reachable_units(graph, root="main"):
+    """
+    Unidades que se pueden ejecutar desde root y clases vivas (de las que se
+    crea algún objeto, más sus ancestros). Un método C.m solo se alcanza si
+    alguna clase instanciada despacha m a C: sin objetos que lo hereden nadie
+    lo puede llamar. Con una llamada a través de un temporal cualquier función
+    puede ser el destino. Se repite hasta que las clases instanciadas no
+    cambian.
+    """
+    created = set()
+    while True:
+        reached, pending = set(), [root]
+        while pending:
+            name = pending.pop()
+            if name in reached:
+                continue
+            reached.add(name)
+            targets = set(graph.edges[name])
+            if name in graph.indirect:
+                targets.update(n for n, u in graph.units.items() if u.header is not None and u.owner_class is None)
+            for target in targets:
+                unit = graph.units[target]
+                if unit.owner_class is None or unit.name == "constructor" \
+                        or any(graph.resolve(c, unit.name) == unit.owner_class for c in created):
+                    pending.append(target)
+        now_created = set().union(*(graph.instantiates[n] for n in reached))
+        if now_created <= created:
+            break
+        created |= now_created
+    live = {c for cls in created for c in graph.ancestors(cls)}
+    return reached, live
+
+
+def pure_functions(quads, units=None):
+    """
+    Funciones (no métodos) sin efectos: no imprimen, no escriben campos ni
+    arreglos que no hayan creado, no leen ni escriben variables globales y
+    solo llaman a funciones puras. Con los mismos argumentos devuelven el mismo
+    resultado. Se recorren las componentes del grafo de llamadas de abajo
+    hacia arriba: una componente (un grupo de funciones mutuamente recursivas)
+    es pura si cada una lo es por sí misma y lo que llaman fuera del grupo ya
+    resultó puro.
+    """
+    units = units if units is not None else split_units(quads)
+    graph = build_call_graph(quads, units)
+    effect_free = set()
+    for unit in units:
+        if unit.header is None or unit.owner_class is not None:
+            continue
+        own = set(unit.params) | set(unit.locals)
+        stores = local_array_stores(quads, unit)
+        for i in unit.indices:
+            quad = quads[i]
+            op = quad[0]
+            if op in ("call", "CALL_FUNC") and not is_temp(quad[1]):
+                pass
+            elif op in INDEX_STORES and i in stores:
+                pass
+            elif op not in EFFECT_FREE_OPS:
+                break
+            if any(is_name(n) and n not in own and not is_temp(n) for n in quad_uses(quad) + quad_defs(quad)):
+                break
+        else:
+            effect_free.add(unit.qualified_name)
+    pure = set()
+    for component in strongly_connected(graph):
+        members = set(component)
+        if members <= effect_free and all(graph.edges[n] <= pure | members for n in component):
+            pure |= members
+    return pure
+
+
+def format_call_graph(graph):
+    """Texto legible del grafo: llamadas de cada unidad, recursivas e inalcanzables."""
+    recursive = recursive_units(graph)
+    reached, _ = reachable_units(graph)
+    lines = []
+    for name in graph.units:
+        notes = [n for n, flag in (("recursiva", name in recursive), ("inalcanzable", name not in reached)) if flag]
+        callees = ", ".join(sorted(graph.edges[name])) or "-"
+        lines.append(f"{name:<24s} -> {callees}" + (f"  ({', '.join(notes)})" if notes else ""))
+    return "\n".join(lines)
@@ -0,0 +1,752 @@
+"""
+Bytecode de registros para el TAC.
+
+Cada unidad (main, funciones y métodos) se traduce a un arreglo array('q') de
+instrucciones de ancho fijo [opcode, a, b, c]. Los operandos son índices de
+registro del marco: los primeros registros guardan el pool de constantes de la
+unidad (se copian al crear el marco), así que ninguna instrucción distingue
+entre constante y variable. Las variables de main son los registros globales;
+una función los lee y escribe con LOADG/STOREG.
+
+Al seleccionar instrucciones se fusionan las secuencias más comunes del TAC en
+superinstrucciones:
+
+    t = a < b ; if t goto L ; goto M ; L:   ->  JGE a, b, M
+    t = x + 1 ; x = t                       ->  ADDI x, 1, x
+    t = arr[i] ; x = t                      ->  INDEX arr, i, x
+    t = a op b ; x = t                      ->  op a, b, x
+
+El ciclo de despacho vive en una sola función con las variables en locales de
+Python y compara opcodes enteros, sin desempacar tuplas ni comparar cadenas.
+Las operaciones tipadas del TAC (iadd, icmp_lt, sconcat...) tienen sus propios
+opcodes, que hacen la operación de Python después de revisar solo el tipo que
+el generador espera. Si un operando no lo tiene (null o un campo que una
+subclase redeclaró con otro tipo), se hace la operación genérica, que da el
+resultado o el mensaje de siempre.
+
+Los try no generan instrucciones: cada función guarda sus rangos protegidos
+(inicio, fin, pc del catch) y la tabla solo se consulta cuando algo falla.
+"""
+import sys
+from array import array
+from tac_analysis import (
+    BINARY_OPS, UNARY_OPS, TYPED_OPS, program_cfg, compute_liveness, is_constant, is_temp, label_name,
+)
+from tac_runtime import (
+    cs_object, compiscript_error, constant_value, to_text, binary_op, unary_op, values_equal, int_div, int_mod,
+    concat_all, array_data,
+)
+from tac_vm import build_class_table, build_vtables, find_method, new_object, get_field, set_field
+
+# ---------------- Opcodes ----------------
+OPCODES = [
+    "MOV", "ADD", "SUB", "MUL", "DIV", "MOD", "LT", "LE", "GT", "GE", "EQ", "NE", "AND", "OR",
+    "NEG", "NOT", "ADDI", "SUBI", "JMP", "JT", "JF", "JLT", "JLE", "JGT", "JGE", "JEQ", "JNE",
+    "INDEX", "SETINDEX", "ALLOC", "LEN", "PRINT", "PARAM", "CALL", "CALLM", "NEW", "CTOR",
+    "GETF", "SETF", "RET", "HALT", "EXC", "JTABLE", "HSWITCH", "LOADG", "STOREG",
+    "BOUNDS", "LOADF", "STOREF", "CALLV", "CALLD", "INDEXU", "SETINDEXU",
+    "IADD", "ISUB", "IMUL", "IDIV", "IMOD", "ILT", "ILE", "IGT", "IGE", "IEQ", "INE", "IADDI", "ISUBI",
+    "INEG", "BNOT", "CONCAT", "ALLOCD", "CONCATN",
+]
+(MOV, ADD, SUB, MUL, DIV, MOD, LT, LE, GT, GE, EQ, NE, AND, OR,
+ NEG, NOT, ADDI, SUBI, JMP, JT, JF, JLT, JLE, JGT, JGE, JEQ, JNE,
+ INDEX, SETINDEX, ALLOC, LEN, PRINT, PARAM, CALL, CALLM, NEW, CTOR,
+ GETF, SETF, RET, HALT, EXC, JTABLE, HSWITCH, LOADG, STOREG,
+ BOUNDS, LOADF, STOREF, CALLV, CALLD, INDEXU, SETINDEXU,
+ IADD, ISUB, IMUL, IDIV, IMOD, ILT, ILE, IGT, IGE, IEQ, INE, IADDI, ISUBI,
+ INEG, BNOT, CONCAT, ALLOCD, CONCATN) = range(len(OPCODES))
+
+BINARY_OPCODES = {"+": ADD, "-": SUB, "*": MUL, "/": DIV, "%": MOD, "<": LT, "<=": LE, ">": GT,
+                  ">=": GE, "==": EQ, "!=": NE, "&&": AND, "||": OR}
+TYPED_OPCODES = {"iadd": IADD, "isub": ISUB, "imul": IMUL, "idiv": IDIV, "imod": IMOD,
+                 "icmp_lt": ILT, "icmp_le": ILE, "icmp_gt": IGT, "icmp_ge": IGE, "icmp_eq": IEQ, "icmp_ne": INE,
+                 "sconcat": CONCAT, "band": AND, "bor": OR}
+# Los saltos fusionados ya tienen el camino rápido de enteros: las comparaciones tipadas usan los mismos
+COMPARE_JUMPS = {"<": JLT, "<=": JLE, ">": JGT, ">=": JGE, "==": JEQ, "!=": JNE}
+COMPARE_JUMPS.update({op: COMPARE_JUMPS[symbol] for op, symbol in TYPED_OPS.items() if symbol in COMPARE_JUMPS})
+# Salto inverso: 'if a < b goto L; goto M; L:' se vuelve 'if a >= b goto M'
+INVERTED_JUMPS = {JLT: JGE, JGE: JLT, JLE: JGT, JGT: JLE, JEQ: JNE, JNE: JEQ}
+# Operaciones cuyo único efecto es escribir su destino (se puede redirigir 't = ...; x = t')
+RETARGETABLE_OPS = set(BINARY_OPS) | set(UNARY_OPS) | {
+    "[]", "[]u", "length", "GET_FIELD", "LOAD_FIELD", "CALL_FUNC", "call", "CALL_METHOD", "CALL_VIRTUAL", "CALL_DIRECT",
+    "CONCAT",
+}
+NO_DEST = -1
+
+
+class bytecode_function():
+    def __init__(self, name, owner_class=None):
+        self.name = name
+        self.owner_class = owner_class
+        self.code = array("q")
+        self.registers = {}     # nombre u operando constante -> registro
+        self.constants = []     # valores de los primeros registros
+        self.params = []
+        self.this_reg = None
+        self.template = []      # registros iniciales de un marco nuevo
+        self.handlers = []      # (inicio, fin, pc del catch), del try más interno al más externo
+
+    def register(self, name):
+        if name not in self.registers:
+            self.registers[name] = len(self.registers)
+        return self.registers[name]
+
+    def constant(self, value):
+        key = ("const", type(value), value)
+        if key not in self.registers:
+            self.registers[key] = len(self.registers)
+            self.constants.append((self.registers[key], value))
+        return self.registers[key]
+
+    def finish(self):
+        self.template = [None] * len(self.registers)
+        for reg, value in self.constants:
+            self.template[reg] = value
+
+
+class bytecode_program():
+    def __init__(self):
+        self.functions = []
+        self.function_index = {}
+        self.main = None
+        self.classes = {}
+        self.class_names = []
+        self.names = []         # nombres de campos y métodos
+        self.call_sites = []    # (índice del nombre del método, cantidad de argumentos)
+        self.field_sites = []   # (posición, nombre) de LOADF/STOREF
+        self.virtual_sites = [] # (ranura, nombre, cantidad de argumentos) de CALLV
+        self.direct_sites = []  # (índice de la función, guarda, nombre, cantidad de argumentos) de CALLD
+        self.tables = []        # tablas de JTABLE/HSWITCH, datos de ALLOCD y operandos de CONCATN
+
+    def name_index(self, name):
+        if name not in self.names:
+            self.names.append(name)
+        return self.names.index(name)
+
+    def class_index(self, name):
+        if name not in self.class_names:
+            self.class_names.append(name)
+        return self.class_names.index(name)
+
+
+class bytecode_compiler():
+    """Traduce los cuádruplos de cada unidad a bytecode, fusionando superinstrucciones."""
+    def __init__(self, quads):
+        self.quads = quads
+        self.cfg = program_cfg(quads)
+        self.liveness = compute_liveness(quads, self.cfg)
+        self.program = bytecode_program()
+        self.fused = 0
+
+    def compile(self):
+        program = self.program
+        program.classes = build_class_table(self.quads)
+        units = self.cfg.units
+        functions = {}
+        for n, unit in enumerate(units):
+            function = bytecode_function(unit.name, unit.owner_class)
+            if unit.owner_class:
+                function.this_reg = function.register("this")
+            for name in unit.params:
+                function.params.append(function.register(name))
+            for name in unit.locals:
+                function.register(name)
+            functions[unit] = function
+            program.functions.append(function)
+            if unit.owner_class:
+                program.classes[unit.owner_class].methods[unit.name] = n
+            elif unit.header is not None:
+                program.function_index[unit.name] = n
+        program.main = functions[units[0]]
+        for unit in units:
+            self.compile_unit(unit, functions[unit], is_main=unit.header is None)
+        return program
+
+    # ---------------- Selección de instrucciones ----------------
+
+    def compile_unit(self, unit, function, is_main):
+        self.function = function
+        self.is_main = is_main
+        self.out = []           # instrucciones (op, a, b, c) y marcadores ("label", nombre), ("try", catch)
+        for block in unit.blocks:
+            self.compile_block(block)
+        self.out.append((HALT, 0, 0, 0) if is_main else (RET, function.constant(None), 0, 0))
+        self.fuse_branches()
+        self.assemble(function)
+        function.finish()
+
+    def reg(self, operand):
+        """Registro que contiene el valor del operando (LOADG si es una global leída desde una función)."""
+        if operand is None:
+            return self.function.constant(None)
+        if is_constant(operand):
+            return self.function.constant(constant_value(operand))
+        if self.is_main:
+            return self.program_global(operand)
+        if operand in self.function.registers or is_temp(operand):
+            return self.function.register(operand)
+        scratch = self.function.register(("global", operand))
+        self.out.append((LOADG, self.program_global(operand), 0, scratch))
+        return scratch
+
+    def dest(self, operand):
+        """Registro destino; devuelve además el STOREG pendiente si es una global."""
+        if self.is_main:
+            return self.program_global(operand), None
+        if operand in self.function.registers or is_temp(operand):
+            return self.function.register(operand), None
+        scratch = self.function.register(("global", operand))
+        return scratch, (STOREG, scratch, 0, self.program_global(operand))
+
+    def program_global(self, name):
+        return self.program.main.register(name)
+
+    def emit_with_dest(self, op, a, b, dest_operand):
+        c, store = self.dest(dest_operand)
+        self.out.append((op, a, b, c))
+        if store:
+            self.out.append(store)
+
+    def compile_block(self, block):
+        quads = self.quads
+        indices = block.indices
+        n = 0
+        while n < len(indices):
+            quad = quads[indices[n]]
+            following = quads[indices[n + 1]] if n + 1 < len(indices) else None
+            dead_after_next = lambda name: name not in self.liveness.live_after(quads, block, n + 1)
+            op, arg1, arg2, res = quad
+
+            # t = a < b ; if t goto L   ->  JLT a, b, L
+            if op in COMPARE_JUMPS and arg2 is not None and following is not None and following[0] == "if" \
+                    and following[1] == res and is_temp(res) and dead_after_next(res):
+                self.out.append((COMPARE_JUMPS[op], self.reg(arg1), self.reg(arg2), ("label", label_name(following[3]))))
+                self.fused += 1
+                n += 2
+                continue
+
+            # t = <operación> ; x = t   ->  la operación escribe directo en x
+            if op in RETARGETABLE_OPS and following is not None and following[0] == "=" and following[1] == res \
+                    and is_temp(res) and following[3] != res and dead_after_next(res):
+                self.compile_quad((op, arg1, arg2, following[3]))
+                self.fused += 1
+                n += 2
+                continue
+
+            self.compile_quad(quad)
+            n += 1
+
+    def compile_quad(self, quad):
+        op, arg1, arg2, res = quad
+        out = self.out
+        if op == "label":
+            out.append(("label", label_name(res)))
+        elif op in ("+", "-") and arg2 is not None and is_constant(arg2) \
+                and type(constant_value(arg2)) is int:
+            # Suma/resta de un entero inmediato (incluye el incremento de contadores)
+            self.emit_with_dest(ADDI if op == "+" else SUBI, self.reg(arg1), constant_value(arg2), res)
+        elif op in ("iadd", "isub") and is_constant(arg2) and type(constant_value(arg2)) is int:
+            self.emit_with_dest(IADDI if op == "iadd" else ISUBI, self.reg(arg1), constant_value(arg2), res)
+        elif op in TYPED_OPCODES:
+            self.emit_with_dest(TYPED_OPCODES[op], self.reg(arg1), self.reg(arg2), res)
+        elif op in BINARY_OPCODES and arg2 is not None:
+            self.emit_with_dest(BINARY_OPCODES[op], self.reg(arg1), self.reg(arg2), res)
+        elif op in ("-", "!", "ineg", "bnot"):
+            opcode = {"-": NEG, "!": NOT, "ineg": INEG, "bnot": BNOT}[op]
+            self.emit_with_dest(opcode, self.reg(arg1), 0, res)
+        elif op == "=":
+            self.emit_with_dest(MOV, self.reg(arg1), 0, res)
+        elif op == "goto":
+            out.append((JMP, 0, 0, ("label", label_name(arg1 or res))))
+        elif op == "if":
+            out.append((JT, self.reg(arg1), 0, ("label", label_name(res))))
+        elif op == "[]":
+            self.emit_with_dest(INDEX, self.reg(arg1), self.reg(arg2), res)
+        elif op == "[]=":
+            out.append((SETINDEX, self.reg(arg1), self.reg(arg2), self.reg(res)))
+        elif op == "[]u":
+            self.emit_with_dest(INDEXU, self.reg(arg1), self.reg(arg2), res)
+        elif op == "[]=u":
+            out.append((SETINDEXU, self.reg(arg1), self.reg(arg2), self.reg(res)))
+        elif op == "bounds":
+            out.append((BOUNDS, self.reg(arg1), self.reg(arg2), 0))
+        elif op == "alloc" and arg2 is not None:
+            # Arreglo con datos: la tabla guarda la función que copia los valores
+            self.program.tables.append(array_data(arg2))
+            self.emit_with_dest(ALLOCD, 0, len(self.program.tables) - 1, res)
+        elif op == "alloc":
+            self.emit_with_dest(ALLOC, self.reg(arg1), 0, res)
+        elif op == "CONCAT":
+            # La tabla guarda los registros de los operandos
+            self.program.tables.append(tuple(self.reg(x) for x in arg1))
+            self.emit_with_dest(CONCATN, 0, len(self.program.tables) - 1, res)
+        elif op == "length":
+            self.emit_with_dest(LEN, self.reg(arg1), 0, res)
+        elif op == "PRINT":
+            out.append((PRINT, self.reg(res), 0, 0))
+        elif op == "param":
+            out.append((PARAM, self.reg(arg1), 0, 0))
+        elif op in ("CALL_FUNC", "call"):
+            if arg1 not in self.program.function_index:
+                raise compiscript_error(f"Función no definida: {arg1}")
+            self.emit_call(CALL, self.program.function_index[arg1], arg2, res)
+        elif op == "CALL_METHOD":
+            receiver, method = arg1.rsplit(".", 1)
+            self.program.call_sites.append((self.program.name_index(method), arg2))
+            recv = self.reg(receiver)
+            site = len(self.program.call_sites) - 1
+            c, store = self.dest(res) if res else (NO_DEST, None)
+            out.append((CALLM, recv, site, c))
+            if store:
+                out.append(store)
+        elif op == "CALL_VIRTUAL":
+            # El nombre también se registra: si la ranura no corresponde se busca como en CALLM
+            self.program.name_index(arg2[1])
+            self.program.virtual_sites.append(arg2)
+            self.emit_call(CALLV, self.reg(arg1), len(self.program.virtual_sites) - 1, res)
+        elif op == "CALL_DIRECT":
+            owner, method, nargs, guard = arg2
+            self.program.name_index(method)
+            self.program.direct_sites.append((self.program.classes[owner].methods[method], guard, method, nargs))
+            self.emit_call(CALLD, self.reg(arg1), len(self.program.direct_sites) - 1, res)
+        elif op == "ALLOC_OBJ":
+            self.emit_with_dest(NEW, self.program.class_index(arg1), 0, res)
+        elif op == "CALL_CONSTRUCTOR":
+            out.append((CTOR, self.program.class_index(arg1), arg2, self.reg(res)))
+        elif op == "GET_FIELD":
+            self.emit_with_dest(GETF, self.reg(arg1), self.program.name_index(arg2), res)
+        elif op == "SET_FIELD":
+            out.append((SETF, self.reg(arg1), self.program.name_index(arg2), self.reg(res)))
+        elif op == "LOAD_FIELD":
+            self.program.field_sites.append(arg2)
+            self.emit_with_dest(LOADF, self.reg(arg1), len(self.program.field_sites) - 1, res)
+        elif op == "STORE_FIELD":
+            self.program.field_sites.append(arg2)
+            out.append((STOREF, self.reg(arg1), len(self.program.field_sites) - 1, self.reg(res)))
+        elif op == "RETURN":
+            out.append((RET, self.reg(arg1), 0, 0))
+        elif op == "ON_EXCEPTION":
+            # El rango protegido va de aquí a la etiqueta del catch (ver try_regions)
+            out.append(("try", label_name(res)))
+        elif op == "END_TRY":
+            pass
+        elif op == "EXC_ASSIGN":
+            self.emit_with_dest(EXC, 0, 0, res)
+        elif op == "JUMP_TABLE":
+            low, labels = arg2
+            self.program.tables.append((low, [label_name(l) for l in labels]))
+            out.append((JTABLE, self.reg(arg1), len(self.program.tables) - 1, ("label", label_name(res))))
+        elif op == "HASH_SWITCH":
+            self.program.tables.append({constant_value(v): label_name(l) for v, l in arg2})
+            out.append((HSWITCH, self.reg(arg1), len(self.program.tables) - 1, ("label", label_name(res))))
+        else:
+            raise compiscript_error(f"Instrucción TAC no soportada por el bytecode: {op}")
+
+    def emit_call(self, opcode, a, b, res):
+        c, store = self.dest(res) if res else (NO_DEST, None)
+        self.out.append((opcode, a, b, c))
+        if store:
+            self.out.append(store)
+
+    def fuse_branches(self):
+        """'Jcc L; JMP M; L:' -> 'Jinv M; L:' y 'JT t L; JMP M; L:' -> 'JF t M; L:'."""
+        out = self.out
+        result = []
+        n = 0
+        while n < len(out):
+            ins = out[n]
+            if n + 2 < len(out) and ins[0] in (JT,) + tuple(INVERTED_JUMPS) and out[n + 1][0] == JMP \
+                    and out[n + 2] == ("label", ins[3][1]):
+                inverted = JF if ins[0] == JT else INVERTED_JUMPS[ins[0]]
+                result.append((inverted, ins[1], ins[2], out[n + 1][3]))
+                self.fused += 1
+                n += 2
+                continue
+            result.append(ins)
+            n += 1
+        self.out = result
+
+    def assemble(self, function):
+        positions = {}
+        starts = []
+        pc = 0
+        for ins in self.out:
+            if ins[0] == "label":
+                positions[ins[1]] = pc
+            elif ins[0] == "try":
+                starts.append((pc, ins[1]))
+            else:
+                pc += 4
+        self.positions = positions
+        function.handlers = [(start, positions[catch], positions[catch]) for start, catch in reversed(starts)]
+        code = function.code
+        for ins in self.out:
+            if ins[0] in ("label", "try"):
+                continue
+            c = ins[3]
+            if isinstance(c, tuple):
+                c = positions[c[1]]
+            code.extend((ins[0], ins[1], ins[2], c))
+            if ins[0] == JTABLE:
+                low, labels = self.program.tables[ins[2]]
+                self.program.tables[ins[2]] = (low, [positions[l] for l in labels])
+            elif ins[0] == HSWITCH:
+                table = self.program.tables[ins[2]]
+                self.program.tables[ins[2]] = {v: positions[l] for v, l in table.items()}
+
+
+def find_handler(function, pc):
+    """pc del catch del try más interno de function que protege pc, o None."""
+    for start, end, catch in function.handlers:
+        if start <= pc < end:
+            return catch
+    return None
+
+
+def compile_bytecode(quads):
+    compiler = bytecode_compiler(quads)
+    program = compiler.compile()
+    program.fused = compiler.fused
+    return program
+
+
+def disassemble(program, output=sys.stdout):
+    """Listado legible del bytecode (depuración)."""
+    for function in program.functions:
+        owner = f"{function.owner_class}." if function.owner_class else ""
+        consts = ", ".join(f"r{reg}={to_text(v)}" for reg, v in function.constants)
+        print(f"{owner}{function.name}:  [{consts}]", file=output)
+        code = function.code
+        for pc in range(0, len(code), 4):
+            print(f"  {pc:5d}  {OPCODES[code[pc]]:<8s} {code[pc + 1]:5d} {code[pc + 2]:5d} {code[pc + 3]:5d}", file=output)
+
+
+class bytecode_vm():
+    def __init__(self, program, output=sys.stdout):
+        self.program = program
+        self.output = output
+        self.steps = 0
+        # Tabla de métodos ya resuelta por clase (incluye los heredados)
+        self.methods = {}
+        for class_name in program.classes:
+            resolved = {}
+            for method in set(program.names) | {"constructor"}:
+                index = find_method(program.classes, class_name, method)
+                if index is not None:
+                    resolved[method] = program.functions[index]
+            self.methods[class_name] = resolved
+        build_vtables(program.classes, resolve=program.functions.__getitem__)
+
+    def run(self):
+        program = self.program
+        functions = program.functions
+        names = program.names
+        class_names = program.class_names
+        classes = program.classes
+        call_sites = program.call_sites
+        field_sites = program.field_sites
+        virtual_sites = program.virtual_sites
+        direct_sites = program.direct_sites
+        tables = program.tables
+        methods = self.methods
+        write = self.output.write
+        main = program.main
+        main.finish()
+        gregs = main.template[:]
+        self.globals = gregs
+
+        function = main
+        code = main.code
+        regs = gregs
+        pc = 0
+        frames = []             # (función, registros, pc de retorno, registro destino)
+        params = []
+        error_message = None
+        steps = 0
+
+        while True:
+            try:
+                while True:
+                    op = code[pc]
+                    a = code[pc + 1]
+                    b = code[pc + 2]
+                    c = code[pc + 3]
+                    pc += 4
+                    steps += 1
+                    if op == ADDI:
+                        x = regs[a]
+                        regs[c] = x + b if type(x) is int else binary_op("+", x, b)
+                    elif op == SUBI:
+                        x = regs[a]
+                        regs[c] = x - b if type(x) is int else binary_op("-", x, b)
+                    elif op == MOV:
+                        regs[c] = regs[a]
+                    elif op == JLT:
+                        x = regs[a]; y = regs[b]
+                        if (x < y) if type(x) is int and type(y) is int else binary_op("<", x, y):
+                            pc = c
+                    elif op == JGE:
+                        x = regs[a]; y = regs[b]
+                        if (x >= y) if type(x) is int and type(y) is int else binary_op(">=", x, y):
+                            pc = c
+                    elif op == INDEX:
+                        arr = regs[a]; i = regs[b]
+                        if type(arr) is list and type(i) is int and 0 <= i < len(arr):
+                            regs[c] = arr[i]
+                        else:
+                            self.index_error(arr, i)
+                    elif op == INDEXU:
+                        regs[c] = regs[a][regs[b]]
+                    elif op == JMP:
+                        pc = c
+                    elif op == IADDI:
+                        x = regs[a]
+                        regs[c] = x + b if type(x) is int else binary_op("+", x, b)
+                    elif op == IADD:
+                        x = regs[a]; y = regs[b]
+                        regs[c] = x + y if type(x) is int and type(y) is int else binary_op("+", x, y)
+                    elif op == ILT:
+                        x = regs[a]; y = regs[b]
+                        regs[c] = x < y if type(x) is int and type(y) is int else binary_op("<", x, y)
+                    elif op == ISUB:
+                        x = regs[a]; y = regs[b]
+                        regs[c] = x - y if type(x) is int and type(y) is int else binary_op("-", x, y)
+                    elif op == IMUL:
+                        x = regs[a]; y = regs[b]
+                        regs[c] = x * y if type(x) is int and type(y) is int else binary_op("*", x, y)
+                    elif op == IEQ:
+                        x = regs[a]; y = regs[b]
+                        regs[c] = x == y if type(x) is int and type(y) is int else values_equal(x, y)
+                    elif op == CONCAT:
+                        x = regs[a]; y = regs[b]
+                        regs[c] = x + y if type(x) is str and type(y) is str else binary_op("+", x, y)
+                    elif op == CONCATN:
+                        regs[c] = concat_all([regs[r] for r in tables[b]])
+                    elif op == ADD:
+                        x = regs[a]; y = regs[b]
+                        regs[c] = x + y if type(x) is int and type(y) is int else binary_op("+", x, y)
+                    elif op == SUB:
+                        x = regs[a]; y = regs[b]
+                        regs[c] = x - y if type(x) is int and type(y) is int else binary_op("-", x, y)
+                    elif op == MUL:
+                        x = regs[a]; y = regs[b]
+                        regs[c] = x * y if type(x) is int and type(y) is int else binary_op("*", x, y)
+                    elif op == DIV or op == MOD:
+                        x = regs[a]; y = regs[b]
+                        if type(x) is int and type(y) is int and x >= 0 and y > 0:
+                            regs[c] = x // y if op == DIV else x % y
+                        elif type(x) is int and type(y) is int:
+                            regs[c] = int_div(x, y) if op == DIV else int_mod(x, y)
+                        else:
+                            regs[c] = binary_op("/" if op == DIV else "%", x, y)
+                    elif op == SETINDEX:
+                        arr = regs[c]; i = regs[b]
+                        if type(arr) is list and type(i) is int and 0 <= i < len(arr):
+                            arr[i] = regs[a]
+                        else:
+                            self.index_error(arr, i)
+                    elif op == SETINDEXU:
+                        regs[c][regs[b]] = regs[a]
+                    elif op == BOUNDS:
+                        i = regs[a]
+                        if type(i) is not int or not 0 <= i < regs[b]:
+                            raise compiscript_error(f"Índice fuera de rango: {to_text(i)} (tamaño {regs[b]})")
+                    elif op == JGT:
+                        x = regs[a]; y = regs[b]
+                        if (x > y) if type(x) is int and type(y) is int else binary_op(">", x, y):
+                            pc = c
+                    elif op == JLE:
+                        x = regs[a]; y = regs[b]
+                        if (x <= y) if type(x) is int and type(y) is int else binary_op("<=", x, y):
+                            pc = c
+                    elif op == JEQ:
+                        if values_equal(regs[a], regs[b]):
+                            pc = c
+                    elif op == JNE:
+                        if not values_equal(regs[a], regs[b]):
+                            pc = c
+                    elif op == JT:
+                        if regs[a] is True:
+                            pc = c
+                    elif op == JF:
+                        if regs[a] is not True:
+                            pc = c
+                    elif op == LOADG:
+                        regs[c] = gregs[a]
+                    elif op == STOREG:
+                        gregs[c] = regs[a]
+                    elif op == PARAM:
+                        params.append(regs[a])
+                    elif op == CALL or op == CALLM or op == CALLV or op == CALLD or op == CTOR:
+                        if op == CALL:
+                            callee = functions[a]
+                            this = None
+                            nargs = b
+                        elif op == CALLD:
+                            this = regs[a]
+                            index, guard, method_name, nargs = direct_sites[b]
+                            if guard is None or (type(this) is cs_object and this.cls.selectors[guard] == method_name):
+                                callee = functions[index]
+                            else:
+                                callee = methods.get(getattr(this, "class_name", None), {}).get(method_name)
+                                if callee is None:
+                                    del params[len(params) - nargs:]
+                                    raise compiscript_error(f"Llamada al método '{method_name}' sobre {to_text(this)}")
+                        elif op == CALLV:
+                            this = regs[a]
+                            slot, method_name, nargs = virtual_sites[b]
+                            if type(this) is cs_object and this.cls.selectors[slot] == method_name:
+                                callee = this.cls.vtable[slot]
+                            else:
+                                callee = methods.get(getattr(this, "class_name", None), {}).get(method_name)
+                                if callee is None:
+                                    del params[len(params) - nargs:]
+                                    raise compiscript_error(f"Llamada al método '{method_name}' sobre {to_text(this)}")
+                        elif op == CALLM:
+                            this = regs[a]
+                            method_name, nargs = call_sites[b]
+                            method_name = names[method_name]
+                            callee = methods.get(getattr(this, "class_name", None), {}).get(method_name)
+                            if callee is None:
+                                del params[len(params) - nargs:]
+                                raise compiscript_error(f"Llamada al método '{method_name}' sobre {to_text(this)}")
+                        else:
+                            this = regs[c]
+                            nargs = b
+                            callee = methods.get(class_names[a], {}).get("constructor")
+                            c = NO_DEST
+                            if callee is None:
+                                del params[len(params) - nargs:]
+                                continue
+                        if nargs != len(callee.params):
+                            raise compiscript_error(f"'{callee.name}' esperaba {len(callee.params)} argumentos, recibió {nargs}")
+                        new_regs = callee.template[:]
+                        if nargs:
+                            args = params[-nargs:]
+                            del params[-nargs:]
+                            for reg, value in zip(callee.params, args):
+                                new_regs[reg] = value
+                        if callee.this_reg is not None:
+                            new_regs[callee.this_reg] = this
+                        frames.append((function, regs, pc, c))
+                        function = callee
+                        code = callee.code
+                        regs = new_regs
+                        pc = 0
+                    elif op == RET:
+                        value = regs[a]
+                        if not frames:
+                            break
+                        function, regs, pc, dest = frames.pop()
+                        code = function.code
+                        if dest != NO_DEST:
+                            regs[dest] = value
+                    elif op == LT or op == LE or op == GT or op == GE or op == EQ or op == NE or op == AND or op == OR:
+                        regs[c] = binary_op(BINARY_SYMBOLS[op], regs[a], regs[b])
+                    elif op == ILE:
+                        x = regs[a]; y = regs[b]
+                        regs[c] = x <= y if type(x) is int and type(y) is int else binary_op("<=", x, y)
+                    elif op == IGT:
+                        x = regs[a]; y = regs[b]
+                        regs[c] = x > y if type(x) is int and type(y) is int else binary_op(">", x, y)
+                    elif op == IGE:
+                        x = regs[a]; y = regs[b]
+                        regs[c] = x >= y if type(x) is int and type(y) is int else binary_op(">=", x, y)
+                    elif op == INE:
+                        x = regs[a]; y = regs[b]
+                        regs[c] = x != y if type(x) is int and type(y) is int else not values_equal(x, y)
+                    elif op == IDIV or op == IMOD:
+                        x = regs[a]; y = regs[b]
+                        if type(x) is int and type(y) is int:
+                            regs[c] = int_div(x, y) if op == IDIV else int_mod(x, y)
+                        else:
+                            regs[c] = binary_op("/" if op == IDIV else "%", x, y)
+                    elif op == ISUBI:
+                        x = regs[a]
+                        regs[c] = x - b if type(x) is int else binary_op("-", x, b)
+                    elif op == INEG:
+                        x = regs[a]
+                        regs[c] = -x if type(x) is int else unary_op("-", x)
+                    elif op == BNOT:
+                        x = regs[a]
+                        regs[c] = not x if type(x) is bool else unary_op("!", x)
+                    elif op == NEG:
+                        regs[c] = unary_op("-", regs[a])
+                    elif op == NOT:
+                        regs[c] = unary_op("!", regs[a])
+                    elif op == LEN:
+                        x = regs[a]
+                        if type(x) is not list and type(x) is not str:
+                            raise compiscript_error(f"{to_text(x)} no tiene longitud")
+                        regs[c] = len(x)
+                    elif op == ALLOC:
+                        regs[c] = [None] * regs[a]
+                    elif op == ALLOCD:
+                        regs[c] = tables[b]()
+                    elif op == PRINT:
+                        write(to_text(regs[a]) + "\n")
+                    elif op == NEW:
+                        regs[c] = new_object(classes, class_names[a])
+                    elif op == LOADF:
+                        obj = regs[a]
+                        offset, name = field_sites[b]
+                        if type(obj) is cs_object and obj.cls.names[offset] == name:
+                            regs[c] = obj.fields[offset]
+                        else:
+                            regs[c] = get_field(obj, name)
+                    elif op == STOREF:
+                        obj = regs[a]
+                        offset, name = field_sites[b]
+                        if type(obj) is cs_object and obj.cls.names[offset] == name:
+                            obj.fields[offset] = regs[c]
+                        else:
+                            set_field(obj, name, regs[c])
+                    elif op == GETF:
+                        regs[c] = get_field(regs[a], names[b])
+                    elif op == SETF:
+                        set_field(regs[a], names[b], regs[c])
+                    elif op == JTABLE:
+                        x = regs[a]
+                        low, targets = tables[b]
+                        pc = targets[x - low] if type(x) is int and 0 <= x - low < len(targets) else c
+                    elif op == HSWITCH:
+                        x = regs[a]
+                        pc = tables[b].get(x, c) if type(x) is str else c
+                    elif op == EXC:
+                        regs[c] = error_message
+                    elif op == HALT:
+                        break
+                    else:
+                        raise compiscript_error(f"Opcode desconocido: {op}")
+                break
+            except compiscript_error as error:
+                # El pc ya avanzó: se busca la instrucción que falló y, en cada llamador, la llamada
+                catch = find_handler(function, pc - 4)
+                while catch is None and frames:
+                    function, regs, pc, _ = frames.pop()
+                    catch = find_handler(function, pc - 4)
+                if catch is None:
+                    self.steps = steps
+                    raise error
+                code = function.code
+                pc = catch
+                # Los param se apilan justo antes de su llamada: entre sentencias la pila está vacía
+                del params[:]
+                error_message = str(error)
+        self.steps = steps
+        return gregs
+
+    def index_error(self, arr, i):
+        if type(arr) is not list:
+            raise compiscript_error(f"No se puede indexar {to_text(arr)}")
+        raise compiscript_error(f"Índice fuera de rango: {to_text(i)} (tamaño {len(arr)})")
+
+
+BINARY_SYMBOLS = {opcode: symbol for symbol, opcode in BINARY_OPCODES.items()}
+
+
+def run_bytecode(quads, output=sys.stdout):
+    """Compila los cuádruplos a bytecode y los ejecuta; devuelve la VM."""
+    vm = bytecode_vm(compile_bytecode(quads), output)
+    vm.run()
+    return vm
@@ -0,0 +1,464 @@
+"""
+Backend de C: traduce el TAC a C99 y lo compila con el compilador local (cc).
+
+El código generado usa el runtime de runtime/cs_runtime.{h,c}: valores con
+etiqueta, arreglos con verificación de límites, objetos que apuntan a su clase
+(tabla de campos y vtable indexadas por identificadores que se asignan aquí a
+cada nombre de campo y de método, más los campos por posición y los métodos
+por ranura de object_layout.py) y try/catch con setjmp/longjmp.
+
+Cada unidad del TAC es una función de C; las etiquetas y los goto del TAC se
+copian tal cual, así que el flujo de control no se reconstruye. En las
+funciones con try, las variables son volatile para que conserven su valor
+después del longjmp.
+
+Los enteros son de 64 bits (long long); la memoria no se libera.
+"""
+import os
+import shutil
+import subprocess
+from tac_analysis import (
+    BINARY_OPS, TYPED_OPS, split_units, global_names, quad_uses, quad_defs, is_constant, is_temp, is_name, label_name,
+    string_pool,
+)
+from tac_runtime import constant_value
+from tac_vm import build_class_table, class_chain
+
+RUNTIME_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "runtime")
+RUNTIME_SOURCE = os.path.join(RUNTIME_DIR, "cs_runtime.c")
+C_FLAGS = ["-std=c99", "-O2"]
+
+BINARY_FUNCTIONS = {
+    "+": "cs_add", "-": "cs_sub", "*": "cs_mul", "/": "cs_div", "%": "cs_mod",
+    "<": "cs_lt", "<=": "cs_le", ">": "cs_gt", ">=": "cs_ge", "==": "cs_eq", "!=": "cs_ne",
+    "&&": "cs_and", "||": "cs_or",
+    "sconcat": "cs_sconcat",
+}
+# Las demás operaciones tipadas usan la función genérica: su camino rápido ya es el de enteros o
+# booleanos, y un valor que contradice el tipo estático (null o un campo que una subclase redeclara
+# con otro tipo) da el mismo resultado o error que sin tipos
+BINARY_FUNCTIONS.update({op: BINARY_FUNCTIONS[symbol] for op, symbol in TYPED_OPS.items() if op not in BINARY_FUNCTIONS})
+UNARY_FUNCTIONS = {"-": "cs_neg", "!": "cs_not", "ineg": "cs_neg", "bnot": "cs_not"}
+NULL = "CS_NULL_VALUE"
+
+
+class native_build_error(Exception):
+    """El compilador de C no está disponible o rechazó el código generado."""
+    pass
+
+
+def fnv1a(text):
+    """FNV-1a de 32 bits sobre los bytes UTF-8; debe coincidir con cs_hash() del runtime."""
+    h = 2166136261
+    for byte in text.encode("utf-8"):
+        h = ((h ^ byte) * 16777619) & 0xFFFFFFFF
+    return h
+
+
+def c_string_literal(text):
+    """Literal de C para los bytes UTF-8 de text (escapes octales para lo no imprimible)."""
+    out = []
+    for byte in text.encode("utf-8"):
+        ch = chr(byte)
+        if 32 <= byte < 127 and ch not in '"\\?':
+            out.append(ch)
+        else:
+            out.append(f"\\{byte:03o}")
+    return '"' + "".join(out) + '"'
+
+
+def variable(name):
+    return f"v_{name}"
+
+
+def label(name):
+    return f"lbl_{label_name(name)}"
+
+
+class c_emitter():
+    def __init__(self, quads):
+        self.quads = quads
+        self.units = split_units(quads)
+        self.classes = build_class_table(quads)
+        self.shared = global_names(quads, self.units)
+        self.functions = {u.name: u for u in self.units[1:] if not u.owner_class}
+        self.methods = {}           # (clase, método) -> unidad
+        for unit in self.units[1:]:
+            if unit.owner_class:
+                self.methods[(unit.owner_class, unit.name)] = unit
+        # texto -> nombre de la constante; las constantes de cadena del TAC conservan su índice de la tabla
+        self.strings = {constant_value(lit): f"str_{k}" for lit, k in string_pool(quads).items()}
+        self.data = {}              # datos de un alloc (largos, valores) -> arreglo estático
+        self.field_ids = {}
+        self.selector_ids = {}
+        self.collect_member_names()
+
+    def collect_member_names(self):
+        fields = set()
+        selectors = {name for _, name in self.methods}
+        for cls in self.classes.values():
+            fields.update(cls.fields)
+        for op, arg1, arg2, res in self.quads:
+            if op in ("GET_FIELD", "SET_FIELD"):
+                fields.add(arg2)
+            elif op in ("LOAD_FIELD", "STORE_FIELD"):
+                fields.add(arg2[1])
+            elif op == "CALL_METHOD":
+                selectors.add(arg1.rsplit(".", 1)[1])
+            elif op in ("CALL_VIRTUAL", "CALL_DIRECT"):
+                selectors.add(arg2[1])
+        self.field_ids = {name: n for n, name in enumerate(sorted(fields))}
+        self.selector_ids = {name: n for n, name in enumerate(sorted(selectors))}
+
+    # ---------------- Nombres de C ----------------
+
+    def function_name(self, unit):
+        if unit.owner_class:
+            return f"m_{unit.owner_class}_{unit.name}"
+        return f"fn_{unit.name}"
+
+    def string(self, text):
+        if text not in self.strings:
+            self.strings[text] = f"str_{len(self.strings)}"
+        return self.strings[text]
+
+    def array_data(self, data):
+        if data not in self.data:
+            self.data[data] = f"data_{len(self.data)}"
+        return self.data[data]
+
+    def value(self, x):
+        """Expresión de C para un operando del TAC."""
+        if x is None:
+            return NULL
+        if is_constant(x):
+            v = constant_value(x)
+            if v is None:
+                return NULL
+            if v is True or v is False:
+                return f"cs_bool({int(v)})"
+            if isinstance(v, str):
+                return f"cs_str(&{self.string(v)})"
+            return f"cs_int({v}LL)"
+        if not is_name(x):
+            raise native_build_error(f"Operando no soportado por el backend de C: {x}")
+        return variable(x)
+
+    def static_value(self, v):
+        """Inicializador estático de un cs_value (valores iniciales de los campos)."""
+        if v is None:
+            return "{CS_NULL, {0}}"
+        if v is True or v is False:
+            return f"{{CS_BOOL, {{.i = {int(v)}}}}}"
+        if isinstance(v, str):
+            return f"{{CS_STR, {{.s = &{self.string(v)}}}}}"
+        return f"{{CS_INT, {{.i = {v}LL}}}}"
+
+    # ---------------- Programa ----------------
+
+    def emit(self):
+        """Texto del archivo C completo."""
+        bodies = [self.emit_unit(unit) for unit in self.units[1:]]
+        main = self.emit_unit(self.units[0])
+        classes = self.emit_classes()
+
+        data = []
+        for (lengths, values), name in self.data.items():
+            items = ", ".join(self.static_value(constant_value(v)) for v in values)
+            data.append(f"static const cs_value {name}[] = {{{items}}};")
+            data.append(f"static const long long {name}_lengths[] = {{{', '.join(map(str, lengths))}}};")
+
+        lines = ['#include "cs_runtime.h"', ""]
+        for text, name in self.strings.items():
+            lines.append(f"static const cs_string {name} = {{{len(text.encode('utf-8'))}, {c_string_literal(text)}}};")
+        lines.extend(data)
+        if self.shared:
+            lines.append("")
+            lines.extend(f"static cs_value {variable(n)};" for n in sorted(self.shared))
+        lines.append("")
+        for name, n in self.field_ids.items():
+            lines.append(f"#define FIELD_{name} {n}")
+        for name, n in self.selector_ids.items():
+            lines.append(f"#define SEL_{name} {n}")
+        lines.append("")
+        for unit in self.units[1:]:
+            lines.append(self.prototype(unit) + ";")
+        lines.append("")
+        lines.extend(classes)
+        for body in bodies + [main]:
+            lines.append("")
+            lines.extend(body)
+        lines += [
+            "",
+            "int main(void) {",
+            "    cs_runtime_init();",
+            "    cs_main();",
+            "    cs_runtime_exit();",
+            "    return 0;",
+            "}",
+            "",
+        ]
+        return "\n".join(lines)
+
+    def emit_classes(self):
+        """Tabla de campos, valores iniciales, vtable y tablas por posición y por ranura de cada clase."""
+        lines = []
+        n_fields = max(len(self.field_ids), 1)
+        n_selectors = max(len(self.selector_ids), 1)
+        # Las tablas por posición se rellenan hasta la clase más grande: cualquier
+        # posición o ranura del TAC se puede leer en cualquier clase
+        n_offsets = max([len(cls.layout.fields) for cls in self.classes.values()] + [1])
+        n_slots = max([len(cls.layout.methods) for cls in self.classes.values()] + [1])
+        for name, cls in self.classes.items():
+            chain = class_chain(self.classes, name)
+            layout = cls.layout
+            slots = [-1] * n_fields
+            for slot, field in enumerate(layout.fields):
+                slots[self.field_ids[field]] = slot
+            vtable = ["{0, 0}"] * n_selectors
+            for selector, n in self.selector_ids.items():
+                for owner in chain:
+                    unit = self.methods.get((owner.name, selector))
+                    if unit is not None:
+                        vtable[n] = f"{{(cs_fn){self.function_name(unit)}, {len(unit.params)}}}"
+                        break
+            field_at = [self.field_ids[f] for f in layout.fields] + [-1] * (n_offsets - len(layout.fields))
+            methods = ["{0, 0, -1}"] * n_slots
+            for slot, (method, owner) in enumerate(zip(layout.methods, layout.owners)):
+                unit = self.methods[(owner, method)]
+                methods[slot] = (f"{{(cs_fn){self.function_name(unit)}, {len(unit.params)}, "
+                                 f"SEL_{method}}}")
+            init = ", ".join(self.static_value(v) for v in layout.initial) or "{CS_NULL, {0}}"
+            lines += [
+                f"static const int class_{name}_slots[] = {{{', '.join(map(str, slots))}}};",
+                f"static const cs_value class_{name}_init[] = {{{init}}};",
+                f"static const cs_method class_{name}_vtable[] = {{{', '.join(vtable)}}};",
+                f"static const int class_{name}_field_at[] = {{{', '.join(map(str, field_at))}}};",
+                f"static const cs_method class_{name}_methods[] = {{{', '.join(methods)}}};",
+                f"static const cs_class class_{name} = {{{c_string_literal(name)}, {len(layout.fields)}, "
+                f"class_{name}_slots, class_{name}_init, class_{name}_vtable, "
+                f"class_{name}_field_at, class_{name}_methods}};",
+                "",
+            ]
+        return lines
+
+    # ---------------- Unidades ----------------
+
+    def parameters(self, unit):
+        names = (["this"] if unit.owner_class else []) + list(unit.params)
+        return [variable(n) for n in names]
+
+    def prototype(self, unit, qualifier=""):
+        params = ", ".join(f"{qualifier}cs_value {p}" for p in self.parameters(unit)) or "void"
+        return f"static cs_value {self.function_name(unit)}({params})"
+
+    def is_local(self, unit, x):
+        if unit.header is None:
+            return x not in self.shared
+        return x in unit.params or x in unit.locals or x == "this" or is_temp(x)
+
+    def emit_unit(self, unit):
+        quads = self.quads
+        self.unit = unit
+        self.has_try = any(quads[i][0] == "ON_EXCEPTION" for i in unit.indices)
+        # Las variables que cambian entre setjmp y longjmp deben ser volatile
+        qualifier = "volatile " if self.has_try else ""
+        names = []
+        for i in unit.indices:
+            quad = quads[i]
+            used = quad_uses(quad) + quad_defs(quad)
+            if quad[0] == "CALL_METHOD":
+                used.append(quad[1].rsplit(".", 1)[0])
+            for n in used:
+                if is_name(n) and self.is_local(unit, n) and n not in unit.params and n != "this" and n not in names:
+                    names.append(n)
+
+        if unit.header is None:
+            lines = ["static void cs_main(void) {"]
+        else:
+            lines = [self.prototype(unit, qualifier) + " {"]
+        lines += [f"    {qualifier}cs_value {variable(n)} = {{CS_NULL, {{0}}}};" for n in names]
+        if self.has_try:
+            lines.append("    int cs_depth = cs_handler_depth;")
+        params = []
+        for i in unit.indices:
+            lines.extend("    " + line for line in self.emit_quad(quads[i], params))
+        if unit.header is not None:
+            lines.extend("    " + line for line in self.emit_return(NULL))
+        lines.append("}")
+        return lines
+
+    def emit_return(self, value):
+        if self.unit.header is None:
+            return ["return;"]
+        if self.has_try:
+            # Los try que sigan abiertos en esta activación dejan de valer
+            return ["cs_handler_depth = cs_depth;", f"return {value};"]
+        return [f"return {value};"]
+
+    def pop_arguments(self, params, count):
+        if count > len(params):
+            raise native_build_error(f"Llamada con argumentos fuera de orden en {self.unit.qualified_name}")
+        args = params[len(params) - count:] if count else []
+        del params[len(params) - count:]
+        return [self.value(x) for x in args]
+
+    def assign(self, res, expr):
+        if not res:
+            return [f"{expr};"]
+        if not is_name(res):
+            raise native_build_error(f"Destino no soportado por el backend de C: {res}")
+        return [f"{variable(res)} = {expr};"]
+
+    def call_unit(self, callee, args, receiver=None):
+        """Llamada directa con verificación de aridad en tiempo de compilación."""
+        if len(args) != len(callee.params):
+            return f"(cs_arity_error({c_string_literal(callee.name)}, {len(callee.params)}, {len(args)}), {NULL})"
+        if receiver is not None:
+            args = [receiver] + args
+        return f"{self.function_name(callee)}({', '.join(args)})"
+
+    def emit_quad(self, quad, params):
+        op, arg1, arg2, res = quad
+        if op == "label":
+            return [f"{label(res)}: ;"]
+        if op in BINARY_OPS and arg2 is not None:
+            return self.assign(res, f"{BINARY_FUNCTIONS[op]}({self.value(arg1)}, {self.value(arg2)})")
+        if op in UNARY_FUNCTIONS:
+            return self.assign(res, f"{UNARY_FUNCTIONS[op]}({self.value(arg1)})")
+        if op == "=":
+            return self.assign(res, self.value(arg1))
+        if op == "goto":
+            return [f"goto {label(arg1 or res)};"]
+        if op == "if":
+            return [f"if (cs_truth({self.value(arg1)})) goto {label(res)};"]
+        if op == "JUMP_TABLE":
+            low, labels = arg2
+            selector = self.value(arg1)
+            cases = [f"case {low + n}LL: goto {label(l)};" for n, l in enumerate(labels)]
+            return [f"if ({selector}.tag == CS_INT) switch ({selector}.u.i) {{"] + \
+                   ["    " + c for c in cases] + ["}", f"goto {label(res)};"]
+        if op == "HASH_SWITCH":
+            selector = self.value(arg1)
+            buckets = {}
+            for v, l in arg2:
+                buckets.setdefault(fnv1a(constant_value(v)), []).append((constant_value(v), l))
+            lines = [f"switch (cs_hash({selector})) {{"]
+            for h, entries in buckets.items():
+                lines.append(f"case {h}u:")
+                for text, l in entries:
+                    lines.append(f"    if (cs_str_equals({selector}, &{self.string(text)})) goto {label(l)};")
+                lines.append("    break;")
+            return lines + ["}", f"goto {label(res)};"]
+        if op == "RETURN":
+            return self.emit_return(self.value(arg1))
+        if op == "[]":
+            return self.assign(res, f"cs_index({self.value(arg1)}, {self.value(arg2)})")
+        if op == "[]=":
+            return [f"cs_index_set({self.value(res)}, {self.value(arg2)}, {self.value(arg1)});"]
+        if op == "[]u":
+            return self.assign(res, f"cs_index_unchecked({self.value(arg1)}, {self.value(arg2)})")
+        if op == "[]=u":
+            return [f"cs_index_set_unchecked({self.value(res)}, {self.value(arg2)}, {self.value(arg1)});"]
+        if op == "bounds":
+            return [f"cs_bounds({self.value(arg1)}, {self.value(arg2)});"]
+        if op == "alloc" and arg2 is not None:
+            data = self.array_data(arg2)
+            return self.assign(res, f"cs_alloc_data({data}, {data}_lengths, {len(arg2[0])})")
+        if op == "CONCAT":
+            parts = ", ".join(self.value(x) for x in arg1)
+            return self.assign(res, f"cs_concat_n((cs_value[]){{{parts}}}, {len(arg1)})")
+        if op == "alloc":
+            return self.assign(res, f"cs_alloc({self.value(arg1)})")
+        if op == "length":
+            return self.assign(res, f"cs_length({self.value(arg1)})")
+        if op == "PRINT":
+            return [f"cs_print({self.value(res)});"]
+        if op == "param":
+            params.append(arg1)
+            return []
+        if op in ("CALL_FUNC", "call"):
+            args = self.pop_arguments(params, arg2)
+            callee = self.functions.get(arg1)
+            if callee is None:
+                return self.assign(res, f"(cs_undefined_function({c_string_literal(arg1)}), {NULL})")
+            return self.assign(res, self.call_unit(callee, args))
+        if op == "CALL_METHOD":
+            receiver, method = arg1.rsplit(".", 1)
+            args = self.pop_arguments(params, arg2)
+            this = self.value(receiver)
+            signature = ", ".join(["cs_value"] * (len(args) + 1))
+            lookup = f"cs_lookup({this}, SEL_{method}, {c_string_literal(method)}, {len(args)})"
+            call = f"((cs_value (*)({signature}))m->fn)({', '.join([this] + args)})"
+            return ["{", f"    const cs_method *m = {lookup};"] + ["    " + l for l in self.assign(res, call)] + ["}"]
+        if op == "CALL_VIRTUAL":
+            slot, method, nargs = arg2
+            args = self.pop_arguments(params, nargs)
+            this = self.value(arg1)
+            signature = ", ".join(["cs_value"] * (len(args) + 1))
+            lookup = f"cs_virtual({this}, {slot}, SEL_{method}, {c_string_literal(method)}, {len(args)})"
+            call = f"((cs_value (*)({signature}))m->fn)({', '.join([this] + args)})"
+            return ["{", f"    const cs_method *m = {lookup};"] + ["    " + l for l in self.assign(res, call)] + ["}"]
+        if op == "CALL_DIRECT":
+            owner, method, nargs, guard = arg2
+            callee = self.methods[(owner, method)]
+            this = self.value(arg1)
+            if guard is None:
+                return self.assign(res, self.call_unit(callee, self.pop_arguments(params, nargs), receiver=this))
+            # Llamada directa si la clase del objeto tiene el método en la ranura; si no, por nombre
+            args = [self.value(x) for x in params[len(params) - nargs:]] if nargs else []
+            fallback = self.emit_quad(("CALL_METHOD", f"{arg1}.{method}", nargs, res), params)
+            direct = self.assign(res, self.call_unit(callee, args, receiver=this))
+            return [f"if (cs_has_method({this}, {guard}, SEL_{method})) {{"] + ["    " + l for l in direct] + \
+                ["} else {"] + ["    " + l for l in fallback] + ["}"]
+        if op == "ALLOC_OBJ":
+            if arg1 not in self.classes:
+                raise native_build_error(f"Clase no definida: {arg1}")
+            return self.assign(res, f"cs_new_object(&class_{arg1})")
+        if op == "CALL_CONSTRUCTOR":
+            args = self.pop_arguments(params, arg2)
+            for cls in class_chain(self.classes, arg1):
+                constructor = self.methods.get((cls.name, "constructor"))
+                if constructor is not None:
+                    return [self.call_unit(constructor, args, receiver=self.value(res)) + ";"]
+            return []
+        if op == "GET_FIELD":
+            is_size = int(arg2 in ("size", "length"))
+            return self.assign(res, f"cs_get_field({self.value(arg1)}, FIELD_{arg2}, {c_string_literal(arg2)}, {is_size})")
+        if op == "SET_FIELD":
+            return [f"cs_set_field({self.value(arg1)}, FIELD_{arg2}, {c_string_literal(arg2)}, {self.value(res)});"]
+        if op == "LOAD_FIELD":
+            offset, name = arg2
+            is_size = int(name in ("size", "length"))
+            return self.assign(res, f"cs_load_field({self.value(arg1)}, {offset}, FIELD_{name}, "
+                                    f"{c_string_literal(name)}, {is_size})")
+        if op == "STORE_FIELD":
+            offset, name = arg2
+            return [f"cs_store_field({self.value(arg1)}, {offset}, FIELD_{name}, {c_string_literal(name)}, "
+                    f"{self.value(res)});"]
+        if op == "ON_EXCEPTION":
+            return [f"CS_TRY({label(res)});"]
+        if op == "END_TRY":
+            return ["cs_end_try(cs_depth);"]
+        if op == "EXC_ASSIGN":
+            return self.assign(res, "cs_error")
+        raise native_build_error(f"Instrucción TAC no soportada por el backend de C: {op}")
+
+
+def c_source(quads):
+    return c_emitter(quads).emit()
+
+
+def build_native(quads, executable, cc=None):
+    """Escribe <executable>.c y lo compila junto con el runtime; devuelve la ruta del ejecutable."""
+    cc = cc or os.environ.get("CC", "cc")
+    if shutil.which(cc) is None:
+        raise native_build_error(f"No se encontró el compilador de C '{cc}'")
+    source = executable + ".c"
+    with open(source, "w", encoding="utf-8") as f:
+        f.write(c_source(quads))
+    command = [cc] + C_FLAGS + ["-I", RUNTIME_DIR, source, RUNTIME_SOURCE, "-o", executable]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise native_build_error(f"{' '.join(command)}\n{result.stderr}")
+    return executable
@@ -0,0 +1,667 @@
+"""
+Motor de ejecución por closures.
+
+Parte del mismo CFG que usan las pasadas y el bytecode: cada bloque básico se
+convierte en una lista de closures de Python con sus operandos ya resueltos
+(índice de registro o valor constante) y un terminador que devuelve el
+siguiente bloque. Ejecutar es solo llamar funciones, sin decodificar opcodes.
+
+Las llamadas de Compiscript son llamadas de Python (execute se invoca a sí
+mismo), así que un error se propaga naturalmente hasta la activación que lo
+atrapa. Entrar a un try no ejecuta nada: cada bloque sabe al compilarse cuál es
+el bloque del catch que lo protege (los rangos de try_regions empiezan y
+terminan en bordes de bloque) y solo se consulta cuando algo falla.
+"""
+import sys
+import operator
+from tac_analysis import (
+    BINARY_OPS, program_cfg, compute_liveness, try_regions, is_constant, is_temp, label_name, generic_op,
+)
+from tac_runtime import (
+    cs_object, compiscript_error, constant_value, to_text, binary_op, unary_op, int_div, int_mod,
+    TYPED_FUNCTIONS, array_data, concat_all,
+)
+from tac_vm import build_class_table, build_vtables, find_method, new_object, get_field, set_field
+
+# Registros reservados de cada activación
+ERROR = 0       # mensaje del último error atrapado
+RETVAL = 1      # valor de retorno
+RESERVED = 2
+
+REG = 0
+CONST = 1
+
+# Operadores con camino rápido para enteros
+INT_OPS = {
+    "+": operator.add, "-": operator.sub, "*": operator.mul,
+    "/": lambda x, y: x // y if x >= 0 and y > 0 else int_div(x, y),
+    "%": lambda x, y: x % y if x >= 0 and y > 0 else int_mod(x, y),
+    "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+    "==": operator.eq, "!=": operator.ne,
+}
+COMPARE_OPS = {"<", "<=", ">", ">=", "==", "!="}
+# Operaciones tipadas que no son enteras: las del runtime. Las enteras (iadd, icmp_lt, ...)
+# usan el camino rápido de INT_OPS, que ya revisa que los dos operandos sean enteros
+TYPED_CLOSURE_OPS = {op: TYPED_FUNCTIONS[op] for op in ("sconcat", "band", "bor")}
+# Profundidad de recursión de Python permitida mientras corre el motor
+RECURSION_LIMIT = 20000
+
+
+class closure_block():
+    def __init__(self):
+        self.body = []
+        self.term = None
+        self.catch = None       # bloque del catch del try más interno que protege este bloque
+
+
+class closure_function():
+    def __init__(self, name, owner_class=None):
+        self.name = name
+        self.owner_class = owner_class
+        self.registers = {}
+        self.params = []
+        self.this_reg = None
+        self.entry = None
+        self.template = []
+
+    def register(self, name):
+        if name not in self.registers:
+            self.registers[name] = RESERVED + len(self.registers)
+        return self.registers[name]
+
+    def new_registers(self):
+        return self.template[:]
+
+
+def make_typed_binary(op, a, b, c):
+    """
+    c = a op b para una operación tipada: va directo a la función del runtime. Un
+    operando de otro tipo lanza TypeError y entonces la operación genérica da el
+    resultado o el error.
+    """
+    fast = TYPED_CLOSURE_OPS[op]
+    if a[0] == REG and b[0] == REG:
+        ia, ib = a[1], b[1]
+
+        def typed(r):
+            try:
+                r[c] = fast(r[ia], r[ib])
+            except TypeError:
+                r[c] = binary_op(op, r[ia], r[ib])
+        return typed
+    if a[0] == REG:
+        ia, vb = a[1], b[1]
+
+        def typed_const(r):
+            try:
+                r[c] = fast(r[ia], vb)
+            except TypeError:
+                r[c] = binary_op(op, r[ia], vb)
+        return typed_const
+    ga = reader(a)
+    gb = reader(b)
+
+    def typed_generic(r):
+        x = ga(r)
+        y = gb(r)
+        try:
+            r[c] = fast(x, y)
+        except TypeError:
+            r[c] = binary_op(op, x, y)
+    return typed_generic
+
+
+def make_binary(op, a, b, c):
+    """Closure para c = a op b; a y b son (REG, índice) o (CONST, valor)."""
+    if op in TYPED_CLOSURE_OPS:
+        return make_typed_binary(op, a, b, c)
+    op = generic_op(op)
+    fast = INT_OPS.get(op)
+    if fast is not None and a[0] == REG and b[0] == REG:
+        ia, ib = a[1], b[1]
+
+        def binary(r):
+            x = r[ia]
+            y = r[ib]
+            r[c] = fast(x, y) if type(x) is int and type(y) is int else binary_op(op, x, y)
+        return binary
+    if fast is not None and a[0] == REG and type(b[1]) is int:
+        ia, vb = a[1], b[1]
+
+        def binary_const(r):
+            x = r[ia]
+            r[c] = fast(x, vb) if type(x) is int else binary_op(op, x, vb)
+        return binary_const
+    ga = reader(a)
+    gb = reader(b)
+
+    def generic(r):
+        r[c] = binary_op(op, ga(r), gb(r))
+    return generic
+
+
+def make_compare_branch(op, a, b, if_true, if_false):
+    """Terminador fusionado: 't = a op b; if t goto L' sin materializar t."""
+    if op in TYPED_CLOSURE_OPS:
+        fast = TYPED_CLOSURE_OPS[op]
+        ga = reader(a)
+        gb = reader(b)
+
+        def typed_branch(r):
+            x = ga(r)
+            y = gb(r)
+            try:
+                taken = fast(x, y)
+            except TypeError:
+                taken = binary_op(op, x, y)
+            return if_true if taken else if_false
+        return typed_branch
+    op = generic_op(op)
+    fast = INT_OPS.get(op)
+    if fast is not None and a[0] == REG and b[0] == REG:
+        ia, ib = a[1], b[1]
+
+        def branch(r):
+            x = r[ia]
+            y = r[ib]
+            if fast(x, y) if type(x) is int and type(y) is int else binary_op(op, x, y):
+                return if_true
+            return if_false
+        return branch
+    ga = reader(a)
+    gb = reader(b)
+
+    def generic_branch(r):
+        return if_true if binary_op(op, ga(r), gb(r)) is True else if_false
+    return generic_branch
+
+
+def reader(operand):
+    kind, payload = operand
+    if kind == CONST:
+        return lambda r: payload
+    return lambda r: r[payload]
+
+
+class closure_compiler():
+    def __init__(self, quads, output=sys.stdout):
+        self.quads = quads
+        self.output = output
+        self.cfg = program_cfg(quads)
+        self.liveness = compute_liveness(quads, self.cfg)
+        self.classes = build_class_table(quads)
+        self.functions = {}
+        self.globals = [None] * RESERVED
+        self.global_registers = {}
+        self.params = []
+
+    def compile(self):
+        units = self.cfg.units
+        compiled = {}
+        for unit in units:
+            function = closure_function(unit.name, unit.owner_class)
+            if unit.owner_class:
+                function.this_reg = function.register("this")
+            for name in unit.params:
+                function.params.append(function.register(name))
+            for name in unit.locals:
+                function.register(name)
+            compiled[unit] = function
+            if unit.owner_class:
+                self.classes[unit.owner_class].methods[unit.name] = function
+            elif unit.header is not None:
+                self.functions[unit.name] = function
+        build_vtables(self.classes)
+        for unit in units:
+            self.compile_unit(unit, compiled[unit], is_main=unit.header is None)
+        self.globals.extend([None] * (RESERVED + len(self.global_registers) - len(self.globals)))
+        return compiled[units[0]]
+
+    def global_register(self, name):
+        if name not in self.global_registers:
+            self.global_registers[name] = RESERVED + len(self.global_registers)
+        return self.global_registers[name]
+
+    # ---------------- Operandos ----------------
+
+    def operand(self, x, body):
+        """(REG, i) o (CONST, v); una global leída desde una función se copia antes a un registro local."""
+        if x is None:
+            return (CONST, None)
+        if is_constant(x):
+            return (CONST, constant_value(x))
+        if self.is_main:
+            return (REG, self.global_register(x))
+        if x in self.function.registers or is_temp(x):
+            return (REG, self.function.register(x))
+        scratch = self.function.register(("global", x))
+        g, index = self.globals, self.global_register(x)
+
+        def load_global(r):
+            r[scratch] = g[index]
+        body.append(load_global)
+        return (REG, scratch)
+
+    def dest(self, x):
+        """Registro destino y, si es una global desde una función, la closure que la guarda."""
+        if self.is_main:
+            return self.global_register(x), None
+        if x in self.function.registers or is_temp(x):
+            return self.function.register(x), None
+        scratch = self.function.register(("global", x))
+        g, index = self.globals, self.global_register(x)
+
+        def store_global(r):
+            g[index] = r[scratch]
+        return scratch, store_global
+
+    # ---------------- Compilación ----------------
+
+    def compile_unit(self, unit, function, is_main):
+        self.function = function
+        self.is_main = is_main
+        blocks = {block: closure_block() for block in unit.blocks}
+        end = None      # caer al final de la unidad = return null / fin del programa
+        for n, block in enumerate(unit.blocks):
+            following = blocks[unit.blocks[n + 1]] if n + 1 < len(unit.blocks) else end
+            self.compile_block(unit, block, blocks[block], following, blocks)
+        regions = try_regions(self.quads, unit)
+        for block in unit.blocks:
+            first = block.indices[0]
+            catch = next((label for start, end, label in regions if start <= first < end), None)
+            if catch is not None:
+                blocks[block].catch = self.target(unit, blocks, catch)
+        function.entry = blocks[unit.blocks[0]] if unit.blocks else None
+        if not is_main:
+            function.template = [None] * (RESERVED + len(function.registers))
+
+    def target(self, unit, blocks, label):
+        return blocks[unit.label_block[label_name(label)]]
+
+    def compile_block(self, unit, block, compiled, following, blocks):
+        quads = self.quads
+        body = compiled.body
+        indices = [i for i in block.indices if quads[i][0] != "label"]
+        terminator = None
+        if indices and quads[indices[-1]][0] in ("goto", "if", "JUMP_TABLE", "HASH_SWITCH", "RETURN"):
+            terminator = indices.pop()
+
+        # 't = a < b; if t goto L' con t muerto: la comparación se hace dentro del terminador
+        fused_compare = None
+        if terminator is not None and quads[terminator][0] == "if" and indices:
+            op, arg1, arg2, res = quads[indices[-1]]
+            position = block.indices.index(terminator)
+            if generic_op(op) in COMPARE_OPS and res == quads[terminator][1] and is_temp(res) \
+                    and res not in self.liveness.live_after(quads, block, position):
+                fused_compare = quads[indices.pop()]
+
+        for i in indices:
+            self.compile_quad(quads[i], body)
+
+        if terminator is None:
+            compiled.term = lambda r: following
+            return
+        op, arg1, arg2, res = quads[terminator]
+        if op == "goto":
+            target = self.target(unit, blocks, arg1 or res)
+            compiled.term = lambda r: target
+        elif op == "if":
+            target = self.target(unit, blocks, res)
+            if fused_compare is not None:
+                cop, ca, cb, _ = fused_compare
+                compiled.term = make_compare_branch(cop, self.operand(ca, body), self.operand(cb, body), target, following)
+            else:
+                cond = self.operand(arg1, body)
+                read = reader(cond)
+                compiled.term = lambda r: target if read(r) is True else following
+        elif op == "JUMP_TABLE":
+            low, labels = arg2
+            targets = [self.target(unit, blocks, l) for l in labels]
+            miss = self.target(unit, blocks, res)
+            read = reader(self.operand(arg1, body))
+
+            def jump_table(r):
+                x = read(r)
+                return targets[x - low] if type(x) is int and 0 <= x - low < len(targets) else miss
+            compiled.term = jump_table
+        elif op == "HASH_SWITCH":
+            table = {constant_value(v): self.target(unit, blocks, l) for v, l in arg2}
+            miss = self.target(unit, blocks, res)
+            read = reader(self.operand(arg1, body))
+
+            def hash_switch(r):
+                x = read(r)
+                return table.get(x, miss) if type(x) is str else miss
+            compiled.term = hash_switch
+        elif op == "RETURN":
+            read = reader(self.operand(arg1, body))
+
+            def ret(r):
+                r[RETVAL] = read(r)
+                return None
+            compiled.term = ret
+
+    def compile_quad(self, quad, body):
+        op, arg1, arg2, res = quad
+        params = self.params
+        if op in BINARY_OPS and arg2 is not None:
+            a = self.operand(arg1, body)
+            b = self.operand(arg2, body)
+            c, store = self.dest(res)
+            body.append(make_binary(op, a, b, c))
+        elif op in ("-", "!"):
+            read = reader(self.operand(arg1, body))
+            c, store = self.dest(res)
+            body.append(lambda r: r.__setitem__(c, unary_op(op, read(r))))
+        elif op == "ineg":
+            read = reader(self.operand(arg1, body))
+            c, store = self.dest(res)
+
+            def negate(r):
+                x = read(r)
+                r[c] = -x if type(x) is int else unary_op(op, x)
+            body.append(negate)
+        elif op == "bnot":
+            read = reader(self.operand(arg1, body))
+            c, store = self.dest(res)
+
+            def invert(r):
+                x = read(r)
+                r[c] = not x if type(x) is bool else unary_op(op, x)
+            body.append(invert)
+        elif op == "=":
+            a = self.operand(arg1, body)
+            c, store = self.dest(res)
+            if a[0] == REG:
+                ia = a[1]
+
+                def copy(r):
+                    r[c] = r[ia]
+                body.append(copy)
+            else:
+                value = a[1]
+
+                def copy_constant(r):
+                    r[c] = value
+                body.append(copy_constant)
+        elif op == "[]":
+            ia = self.operand(arg1, body)[1]
+            read_index = reader(self.operand(arg2, body))
+            c, store = self.dest(res)
+
+            def index_load(r):
+                arr = r[ia]
+                i = read_index(r)
+                if type(arr) is list and type(i) is int and 0 <= i < len(arr):
+                    r[c] = arr[i]
+                else:
+                    index_error(arr, i)
+            body.append(index_load)
+        elif op == "[]=":
+            read_value = reader(self.operand(arg1, body))
+            read_index = reader(self.operand(arg2, body))
+            ia = self.operand(res, body)[1]
+            store = None
+
+            def index_store(r):
+                arr = r[ia]
+                i = read_index(r)
+                if type(arr) is list and type(i) is int and 0 <= i < len(arr):
+                    arr[i] = read_value(r)
+                else:
+                    index_error(arr, i)
+            body.append(index_store)
+        elif op == "[]u":
+            ia = self.operand(arg1, body)[1]
+            read_index = reader(self.operand(arg2, body))
+            c, store = self.dest(res)
+
+            def unchecked_load(r):
+                r[c] = r[ia][read_index(r)]
+            body.append(unchecked_load)
+        elif op == "[]=u":
+            read_value = reader(self.operand(arg1, body))
+            read_index = reader(self.operand(arg2, body))
+            ia = self.operand(res, body)[1]
+            store = None
+
+            def unchecked_store(r):
+                r[ia][read_index(r)] = read_value(r)
+            body.append(unchecked_store)
+        elif op == "bounds":
+            read_index = reader(self.operand(arg1, body))
+            read_length = reader(self.operand(arg2, body))
+            store = None
+
+            def bounds(r):
+                i = read_index(r)
+                if type(i) is not int or not 0 <= i < read_length(r):
+                    raise compiscript_error(f"Índice fuera de rango: {to_text(i)} (tamaño {read_length(r)})")
+            body.append(bounds)
+        elif op == "alloc" and arg2 is not None:
+            make = array_data(arg2)
+            c, store = self.dest(res)
+            body.append(lambda r: r.__setitem__(c, make()))
+        elif op == "CONCAT":
+            reads = [reader(self.operand(x, body)) for x in arg1]
+            c, store = self.dest(res)
+            body.append(lambda r: r.__setitem__(c, concat_all([read(r) for read in reads])))
+        elif op == "alloc":
+            size = constant_value(arg1) if is_constant(arg1) else None
+            c, store = self.dest(res)
+            body.append(lambda r: r.__setitem__(c, [None] * size))
+        elif op == "length":
+            read = reader(self.operand(arg1, body))
+            c, store = self.dest(res)
+
+            def length(r):
+                x = read(r)
+                if type(x) is not list and type(x) is not str:
+                    raise compiscript_error(f"{to_text(x)} no tiene longitud")
+                r[c] = len(x)
+            body.append(length)
+        elif op == "PRINT":
+            read = reader(self.operand(res, body))
+            write = self.output.write
+            store = None
+            body.append(lambda r: write(to_text(read(r)) + "\n"))
+        elif op == "param":
+            read = reader(self.operand(arg1, body))
+            store = None
+            body.append(lambda r: params.append(read(r)))
+        elif op in ("CALL_FUNC", "call"):
+            if arg1 not in self.functions:
+                raise compiscript_error(f"Función no definida: {arg1}")
+            callee = self.functions[arg1]
+            nargs = arg2
+            c, store = self.dest(res) if res else (None, None)
+            call = self.invoke
+
+            def call_function(r):
+                value = call(callee, nargs, None)
+                if c is not None:
+                    r[c] = value
+            body.append(call_function)
+        elif op == "CALL_METHOD":
+            receiver, method = arg1.rsplit(".", 1)
+            read = reader(self.operand(receiver, body))
+            nargs = arg2
+            c, store = self.dest(res) if res else (None, None)
+            classes = self.classes
+            call = self.invoke
+
+            def call_method(r):
+                this = read(r)
+                callee = find_method(classes, getattr(this, "class_name", None), method)
+                if callee is None:
+                    del params[len(params) - nargs:]
+                    raise compiscript_error(f"Llamada al método '{method}' sobre {to_text(this)}")
+                value = call(callee, nargs, this)
+                if c is not None:
+                    r[c] = value
+            body.append(call_method)
+        elif op == "CALL_VIRTUAL":
+            read = reader(self.operand(arg1, body))
+            slot, method, nargs = arg2
+            c, store = self.dest(res) if res else (None, None)
+            classes = self.classes
+            call = self.invoke
+
+            def call_virtual(r):
+                this = read(r)
+                if type(this) is cs_object and this.cls.selectors[slot] == method:
+                    callee = this.cls.vtable[slot]
+                else:
+                    callee = find_method(classes, getattr(this, "class_name", None), method)
+                    if callee is None:
+                        del params[len(params) - nargs:]
+                        raise compiscript_error(f"Llamada al método '{method}' sobre {to_text(this)}")
+                value = call(callee, nargs, this)
+                if c is not None:
+                    r[c] = value
+            body.append(call_virtual)
+        elif op == "CALL_DIRECT":
+            read = reader(self.operand(arg1, body))
+            owner, method, nargs, guard = arg2
+            target = self.classes[owner].methods[method]
+            c, store = self.dest(res) if res else (None, None)
+            classes = self.classes
+            call = self.invoke
+
+            def call_direct(r):
+                this = read(r)
+                if guard is None or (type(this) is cs_object and this.cls.selectors[guard] == method):
+                    callee = target
+                else:
+                    callee = find_method(classes, getattr(this, "class_name", None), method)
+                    if callee is None:
+                        del params[len(params) - nargs:]
+                        raise compiscript_error(f"Llamada al método '{method}' sobre {to_text(this)}")
+                value = call(callee, nargs, this)
+                if c is not None:
+                    r[c] = value
+            body.append(call_direct)
+        elif op == "ALLOC_OBJ":
+            classes = self.classes
+            c, store = self.dest(res)
+            body.append(lambda r: r.__setitem__(c, new_object(classes, arg1)))
+        elif op == "CALL_CONSTRUCTOR":
+            read = reader(self.operand(res, body))
+            constructor = find_method(self.classes, arg1, "constructor")
+            nargs = arg2
+            call = self.invoke
+            store = None
+            if constructor is None:
+                body.append(lambda r: params.__delitem__(slice(len(params) - nargs, None)))
+            else:
+                body.append(lambda r: call(constructor, nargs, read(r)))
+        elif op == "GET_FIELD":
+            read = reader(self.operand(arg1, body))
+            c, store = self.dest(res)
+
+            body.append(lambda r: r.__setitem__(c, get_field(read(r), arg2)))
+        elif op == "SET_FIELD":
+            read_obj = reader(self.operand(arg1, body))
+            read_value = reader(self.operand(res, body))
+            store = None
+            body.append(lambda r: set_field(read_obj(r), arg2, read_value(r)))
+        elif op == "LOAD_FIELD":
+            read = reader(self.operand(arg1, body))
+            offset, name = arg2
+            c, store = self.dest(res)
+
+            def load_field(r):
+                obj = read(r)
+                if type(obj) is cs_object and obj.cls.names[offset] == name:
+                    r[c] = obj.fields[offset]
+                else:
+                    r[c] = get_field(obj, name)
+            body.append(load_field)
+        elif op == "STORE_FIELD":
+            read_obj = reader(self.operand(arg1, body))
+            read_value = reader(self.operand(res, body))
+            offset, name = arg2
+            store = None
+
+            def store_field(r):
+                obj = read_obj(r)
+                if type(obj) is cs_object and obj.cls.names[offset] == name:
+                    obj.fields[offset] = read_value(r)
+                else:
+                    set_field(obj, name, read_value(r))
+            body.append(store_field)
+        elif op in ("ON_EXCEPTION", "END_TRY"):
+            store = None
+        elif op == "EXC_ASSIGN":
+            c, store = self.dest(res)
+            body.append(lambda r: r.__setitem__(c, r[ERROR]))
+        else:
+            raise compiscript_error(f"Instrucción TAC no soportada por el motor de closures: {op}")
+        if store is not None:
+            body.append(store)
+
+    # ---------------- Ejecución ----------------
+
+    def invoke(self, function, nargs, this):
+        params = self.params
+        if nargs != len(function.params):
+            raise compiscript_error(f"'{function.name}' esperaba {len(function.params)} argumentos, recibió {nargs}")
+        regs = function.new_registers()
+        if nargs:
+            for reg, value in zip(function.params, params[-nargs:]):
+                regs[reg] = value
+            del params[-nargs:]
+        if function.this_reg is not None:
+            regs[function.this_reg] = this
+        return self.execute(function, regs)
+
+    def execute(self, function, regs):
+        block = function.entry
+        params = self.params
+        while True:
+            try:
+                while block is not None:
+                    for instruction in block.body:
+                        instruction(regs)
+                    block = block.term(regs)
+                return regs[RETVAL]
+            except compiscript_error as error:
+                # block sigue siendo el bloque que falló (o el de la llamada que falló)
+                block = block.catch
+                if block is None:
+                    raise
+                # Los param se apilan justo antes de su llamada: entre sentencias la pila está vacía
+                del params[:]
+                regs[ERROR] = str(error)
+
+
+def index_error(arr, i):
+    if type(arr) is not list:
+        raise compiscript_error(f"No se puede indexar {to_text(arr)}")
+    raise compiscript_error(f"Índice fuera de rango: {to_text(i)} (tamaño {len(arr)})")
+
+
+class closure_engine():
+    """Compila los cuádruplos a closures y ejecuta el programa principal."""
+    def __init__(self, quads, output=sys.stdout):
+        self.compiler = closure_compiler(quads, output)
+        self.main = self.compiler.compile()
+        self.globals = None
+
+    def run(self):
+        old_limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(old_limit, RECURSION_LIMIT))
+        try:
+            self.globals = self.compiler.globals
+            self.compiler.execute(self.main, self.globals)
+        except RecursionError:
+            raise compiscript_error("Desbordamiento de la pila de llamadas")
+        finally:
+            sys.setrecursionlimit(old_limit)
+        return self.globals
+
+
+def run_closures(quads, output=sys.stdout):
+    engine = closure_engine(quads, output)
+    engine.run()
+    return engine
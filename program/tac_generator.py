@@ -4,11 +4,63 @@ from CompiscriptLexer import CompiscriptLexer
 from CompiscriptParser import CompiscriptParser
 from CompiscriptVisitor import CompiscriptVisitor
 from symbolTable import Register, Symbol_table
+from tac_analysis import is_constant
+from frame_layout import layout_program
+from array_layout import flat_arrays, array_literal, describe_literal, literal_leaves, literal_data
+from object_layout import compute_layouts, shapes_from_tree
+from constant_eval import constant_expression
 import re
 
+# Umbrales para el despacho de switch (ver emit_switch_dispatch)
+SWITCH_TABLE_MIN_CASES = 4
+SWITCH_TABLE_MIN_DENSITY = 0.4
+SWITCH_LINEAR_MAX_CASES = 3
+
+# Operaciones tipadas según el tipo estático de los operandos (ver typed_op)
+INTEGER, BOOLEAN, STRING = ("integer", 0), ("boolean", 0), ("string", 0)
+INTEGER_OPS = {"+": "iadd", "-": "isub", "*": "imul", "/": "idiv", "%": "imod",
+               "<": "icmp_lt", "<=": "icmp_le", ">": "icmp_gt", ">=": "icmp_ge", "==": "icmp_eq", "!=": "icmp_ne"}
+BOOLEAN_OPS = {"&&": "band", "||": "bor"}
+
+
+def static_type(ctx):
+    """
+    (tipo, dimensión) que el análisis semántico anotó en la expresión, o None.
+    Los nodos que solo envuelven a otra expresión (paréntesis, un primaryExpr)
+    no siempre tienen la anotación: se baja hasta el nodo que la tiene.
+    """
+    while ctx is not None:
+        if hasattr(ctx, "_type_base"):
+            return ctx._type_base, ctx._type_dim
+        rules = [c for c in ctx.getChildren() if isinstance(c, ParserRuleContext)]
+        ctx = rules[0] if len(rules) == 1 else None
+    return None
+
+
+def typed_op(op, left, right):
+    """
+    iadd, sconcat, icmp_lt, band... cuando los tipos de los operandos la
+    determinan; si no, la operación genérica que decide en tiempo de ejecución.
+    """
+    if op == "+" and STRING in (left, right):
+        return "sconcat"
+    if left == right == INTEGER and op in INTEGER_OPS:
+        return INTEGER_OPS[op]
+    if left == right == BOOLEAN and op in BOOLEAN_OPS:
+        return BOOLEAN_OPS[op]
+    return op
+
+
+def result_type(op, left, right):
+    if op in ("+", "-", "*", "/", "%"):
+        if op == "+" and STRING in (left, right):
+            return STRING
+        return INTEGER if left == right == INTEGER else None
+    return BOOLEAN
+
 class tac_generator(CompiscriptVisitor):
 
-    def __init__(self, symbol_table):
+    def __init__(self, symbol_table, contiguous_arrays=True):
         self.symbol_table = symbol_table
         self.quadruple_table = Quadruple()
         self.temporal_counter = 0
@@ -19,38 +71,26 @@ class tac_generator(CompiscriptVisitor):
         self.end = ""
         self.update_line = ""
         self.current_condition = ""
+        # Registros de activación de todo el programa; offsets: ámbito anidado -> offset donde empieza
+        self.frames = layout_program(symbol_table)
         self.offsets = {}
+        for record in self.frames.values():
+            self.offsets.update(record.scope_bases)
+        # Arreglos multidimensionales guardados contiguos: nombre -> array_descriptor
+        self.contiguous_arrays = contiguous_arrays
+        self.flat_arrays = {}
+        # Posición de los campos y ranuras de la vtable de cada clase: nombre -> object_layout
+        self.object_layouts = {}
+        self.temporal_floor = 0
+        self.used_label_prefixes = set()
+        self.function_depth = 0
+        self.try_stack = []
+        self.loop_try_depth = 0
 
     def temporal_generator(self):
         self.temporal_counter += 1
         return f"t{self.temporal_counter}"
     
-    def memory_allocator(self, typ, dimension=None, size=None):
-        scope_key = getattr(self.symbol_table, "scope_name", None) or getattr(self.symbol_table, "name", None) or f"scope_{id(self.symbol_table)}"
-        if scope_key not in self.offsets:
-            self.offsets[scope_key] = 0
-        base_offset = self.offsets[scope_key]
-        t = typ.lower() if isinstance(typ, str) else None
-        if t in ("integer", "int"):
-            bytes_per = 4
-        elif t in ("float", "double"):
-            bytes_per = 8
-        elif t in ("boolean", "bool"):
-            bytes_per = 1
-        elif t in ("string", "char", "char*"):
-            if isinstance(size, int) and size > 0:
-                bytes_per = size
-            else:
-                bytes_per = 8
-        else:
-            bytes_per = 8
-        count = 1
-        if isinstance(dimension, int) and dimension > 0:
-            count = dimension
-        total_bytes = bytes_per * count
-        self.offsets[scope_key] += total_bytes
-        return base_offset
-
     def get_line_number(self, ctx):
         return ctx.start.line if ctx.start else 0
 
@@ -67,29 +107,86 @@ class tac_generator(CompiscriptVisitor):
             self.available_temporals.append(id)
 
     def reset_temporal_counter(self):
-        self.temporal_counter = 0
+        # Los temporales por debajo del piso siguen vivos (p. ej. el índice de un foreach)
+        self.temporal_counter = self.temporal_floor
+
+    def new_label_prefix(self, ctx):
+        """Prefijo único de etiquetas por sentencia: L{línea}, o L{línea}_{columna} si la línea ya se usó."""
+        line = self.get_line_number(ctx)
+        prefix = f"L{line}"
+        if prefix in self.used_label_prefixes:
+            prefix = f"L{line}_{ctx.start.column}"
+        self.used_label_prefixes.add(prefix)
+        return prefix
+
+    def emit_label(self, label):
+        self.quadruple_table.insert_into_table("label", None, None, label)
+
+    def declare_local(self, name):
+        # Dentro de una función, marca el nombre como variable local de su registro de activación
+        if self.function_depth > 0:
+            self.quadruple_table.insert_into_table("local", name, None, None)
+
+    def emit_call(self, callee, call_ctx, method=False, slot=None):
+        """
+        Evalúa los argumentos, emite sus param y la llamada; devuelve el temporal del resultado.
+        Con slot (ranura, nombre), callee es el objeto y la llamada va por su vtable.
+        """
+        args = []
+        if call_ctx.arguments():
+            for expr in call_ctx.arguments().expression():
+                args.append(self.visit(expr))
+        for val in args:
+            self.quadruple_table.insert_into_table("param", val, None, None)
+        temp_ret = self.temporal_generator()
+        if slot is not None:
+            self.quadruple_table.insert_into_table("CALL_VIRTUAL", callee, slot + (len(args),), temp_ret)
+            return temp_ret
+        op = "CALL_METHOD" if method else "CALL_FUNC"
+        self.quadruple_table.insert_into_table(op, callee, len(args), temp_ret)
+        return temp_ret
+
+    def member_ref(self, node, name, method=False):
+        """
+        (posición, nombre) del campo o (ranura, nombre) del método según la clase
+        estática que el análisis semántico anotó en node; None si no se conoce.
+        """
+        layout = self.object_layouts.get(getattr(node, "_receiver_class", None))
+        if layout is None:
+            return None
+        return layout.method_ref(name) if method else layout.field_ref(name)
+
+    def emit_set_field(self, node, obj, name, value):
+        ref = self.member_ref(node, name)
+        if ref is not None:
+            self.quadruple_table.insert_into_table("STORE_FIELD", obj, ref, value)
+        else:
+            self.quadruple_table.insert_into_table("SET_FIELD", obj, name, value)
+
+    def enter_loop(self, continue_lbl, break_lbl):
+        old = (self.start, self.end, self.loop_try_depth)
+        self.start = continue_lbl
+        self.end = break_lbl
+        self.loop_try_depth = len(self.try_stack)
+        return old
+
+    def exit_loop(self, old):
+        self.start, self.end, self.loop_try_depth = old
+
+    def close_loop_tries(self):
+        # break/continue que salen de un try dentro del lazo desactivan sus manejadores
+        for catch_lbl in reversed(self.try_stack[self.loop_try_depth:]):
+            self.quadruple_table.insert_into_table("END_TRY", None, None, catch_lbl)
 
     # Visit a parse tree produced by CompiscriptParser#program.
     def visitProgram(self, ctx:CompiscriptParser.ProgramContext):
+        if self.contiguous_arrays:
+            self.flat_arrays = flat_arrays(ctx)
+        self.object_layouts = compute_layouts(shapes_from_tree(ctx))
         for statement in ctx.statement():
             self.visit(statement)
         return None
 
-    def ensure_scope_allocated(self, scope_key, st):
-        if scope_key not in self.offsets:
-            self.offsets[scope_key] = 0
-        if not hasattr(st, "elements"):
-            return
-        for name, elem in st.elements.items():
-            if getattr(elem, "offset", None) is None:
-                off = self.memory_allocator(getattr(elem, "type", None), getattr(elem, "dim", None), getattr(elem, "size", None))
-                setattr(elem, "offset", off)
-                try:
-                    elem.update_memory_address(off)
-                except Exception:
-                    pass
-
-
     # Visit a parse tree produced by CompiscriptParser#statement.
     def visitStatement(self, ctx:CompiscriptParser.StatementContext):
         return self.visitChildren(ctx)
@@ -110,15 +207,19 @@ class tac_generator(CompiscriptVisitor):
         var_reg = self.symbol_table.elements[var_name]
         var_type = self.symbol_table.elements[var_name].type
         var_dimension = self.symbol_table.elements[var_name].dim
-        elem = self.symbol_table.elements[var_name]
-        offset = self.memory_allocator(elem.type, getattr(elem, "dim", None), getattr(elem, "size", None))
-        setattr(elem, "offset", offset)
+        self.declare_local(var_name)
         if ctx.initializer():
-            value = self.visit(ctx.initializer())
-            if isinstance(ctx.initializer().expression(), CompiscriptParser.ArrayLiteralContext):
-                arr_expr = ctx.initializer().expression()
-                length = len(arr_expr.expression())
-                var_reg.size = length
+            literal = array_literal(ctx.initializer().expression())
+            if literal is not None:
+                descriptor = self.flat_arrays.get(var_name) or describe_literal(var_type, literal)
+                descriptor.element_type = var_type
+                var_reg.descriptor = descriptor
+                var_reg.size = descriptor.count() or len(literal.expression())
+            if literal is not None and descriptor.flat:
+                values = [constant_expression(e) or self.visit(e) for e in literal_leaves(literal, descriptor.rank())]
+                value = self.emit_array(values)
+            else:
+                value = self.visit(ctx.initializer())
             self.quadruple_table.insert_into_table("=", value, None, var_name)
         self.reset_temporal_counter()
 
@@ -128,7 +229,15 @@ class tac_generator(CompiscriptVisitor):
 
     # Visit a parse tree produced by CompiscriptParser#constantDeclaration.
     def visitConstantDeclaration(self, ctx:CompiscriptParser.ConstantDeclarationContext):
-        return self.visitChildren(ctx)
+        const_name = ctx.Identifier().getText()
+        if getattr(ctx, "_constant_value", None) is not None:
+            # Constante evaluada al compilar: cada uso ya es el literal, no ocupa memoria
+            return const_name
+        self.declare_local(const_name)
+        value = self.visit(ctx.expression())
+        self.quadruple_table.insert_into_table("=", value, None, const_name)
+        self.reset_temporal_counter()
+        return const_name
 
 
     # Visit a parse tree produced by CompiscriptParser#typeAnnotation.
@@ -175,7 +284,7 @@ class tac_generator(CompiscriptVisitor):
             obj = self.visit(ctx.expression(0))
             prop = ctx.Identifier().getText()
             value = self.visit(ctx.expression(1))
-            self.quadruple_table.insert_into_table("SET_FIELD", obj, prop, value)
+            self.emit_set_field(ctx, obj, prop, value)
             return f"{obj}.{prop}"
         return None
     
@@ -188,16 +297,18 @@ class tac_generator(CompiscriptVisitor):
     def visitPrintStatement(self, ctx:CompiscriptParser.PrintStatementContext):
         value = self.visit(ctx.expression())
         self.quadruple_table.insert_into_table("PRINT", None, None, value)
-        return self.visitChildren(ctx)
+        self.reset_temporal_counter()
+        return None
 
 
     # Visit a parse tree produced by CompiscriptParser#ifStatement.
     def visitIfStatement(self, ctx: CompiscriptParser.IfStatementContext):
         # Generar etiquetas únicas
         line = int(self.get_line_number(ctx))
-        Ltrue = f"L{line}"
-        Lfalse = f"L{line + 1}"
-        Lend = f"L{line + 2}"
+        prefix = self.new_label_prefix(ctx)
+        Ltrue = f"{prefix}_true"
+        Lfalse = f"{prefix}_false"
+        Lend = f"{prefix}_end"
 
         condition = self.visit(ctx.expression())
         self.current_condition = condition
@@ -205,7 +316,7 @@ class tac_generator(CompiscriptVisitor):
         self.quadruple_table.insert_into_table("if", condition, "goto", Ltrue)
         self.quadruple_table.insert_into_table("goto", Lfalse, None, None)
 
-        self.quadruple_table.insert_into_table("label", None, None, Ltrue)
+        self.emit_label(Ltrue)
         old_table = self.symbol_table
         self.symbol_table = old_table.scope_map.get(f"if_{line}", old_table)
         self.visit(ctx.block(0))
@@ -214,7 +325,7 @@ class tac_generator(CompiscriptVisitor):
         if len(ctx.block()) > 1:
             self.quadruple_table.insert_into_table("goto", Lend, None, None)
 
-        self.quadruple_table.insert_into_table("label", None, None, Lfalse)
+        self.emit_label(Lfalse)
         if len(ctx.block()) > 1:
             self.symbol_table = old_table.scope_map.get(f"else_{line}", old_table)
             self.visit(ctx.block(1))
@@ -222,7 +333,7 @@ class tac_generator(CompiscriptVisitor):
 
         # --- Fin del if ---
         if len(ctx.block()) > 1:
-            self.quadruple_table.insert_into_table("label", None, None, Lend)
+            self.emit_label(Lend)
 
         return None
 
@@ -231,58 +342,60 @@ class tac_generator(CompiscriptVisitor):
 
     # Visit a parse tree produced by CompiscriptParser#whileStatement.
     def visitWhileStatement(self, ctx:CompiscriptParser.WhileStatementContext):
-        initial_tag = "L" + str(self.get_line_number(ctx))
-        next_tag = "L" + str(1+int(self.get_line_number(ctx)))
-        final_tag = "L" + str(2+int(self.get_line_number(ctx)))
-        self.start = initial_tag
-        self.end = final_tag
-        self.quadruple_table.insert_into_table("label", None, None, initial_tag + ":")
+        prefix = self.new_label_prefix(ctx)
+        initial_tag = f"{prefix}_start"
+        next_tag = f"{prefix}_body"
+        final_tag = f"{prefix}_after"
+        old_loop = self.enter_loop(initial_tag, final_tag)
+        self.emit_label(initial_tag)
         value = self.visit(ctx.expression())
         self.quadruple_table.insert_into_table("if", value, "goto", next_tag)
         self.quadruple_table.insert_into_table("goto", final_tag, None, None)
         if ctx.block():
-            self.quadruple_table.insert_into_table("label", None, None, next_tag + ":")
+            self.emit_label(next_tag)
             old_table = self.symbol_table
-            self.symbol_table = old_table.scope_map["while_" + str(self.get_line_number(ctx))]
+            self.symbol_table = old_table.scope_map.get("while_" + str(self.get_line_number(ctx)), old_table)
             self.visit(ctx.block())
             self.quadruple_table.insert_into_table("goto", initial_tag, None, None)
-            self.quadruple_table.insert_into_table("label", None, None, final_tag + ":")
+            self.emit_label(final_tag)
             self.symbol_table = old_table
+        self.exit_loop(old_loop)
 
 
     # Visit a parse tree produced by CompiscriptParser#doWhileStatement.
     def visitDoWhileStatement(self, ctx: CompiscriptParser.DoWhileStatementContext):
         ln = self.get_line_number(ctx)
-        start_lbl = f"L{ln}_start"
-        cond_lbl = f"L{ln}_cond"
-        after_lbl = f"L{ln}_after"
-        self.start = cond_lbl
-        self.end = after_lbl
-        self.quadruple_table.insert_into_table("label", None, None, start_lbl + ":")
+        prefix = self.new_label_prefix(ctx)
+        start_lbl = f"{prefix}_start"
+        cond_lbl = f"{prefix}_cond"
+        after_lbl = f"{prefix}_after"
+        old_loop = self.enter_loop(cond_lbl, after_lbl)
+        self.emit_label(start_lbl)
         if ctx.block():
             old_table = self.symbol_table
-            self.symbol_table = old_table.scope_map.get(f"doWhile_{ln}", old_table)
+            # El análisis semántico registra el ámbito del do-while como while_{línea}
+            self.symbol_table = old_table.scope_map.get(f"while_{ln}", old_table)
             self.visit(ctx.block())
             self.symbol_table = old_table
-        self.quadruple_table.insert_into_table("label", None, None, cond_lbl + ":")
+        self.emit_label(cond_lbl)
         if ctx.expression():
             cond_val = self.visit(ctx.expression())
             self.quadruple_table.insert_into_table("if", cond_val, "goto", start_lbl)
             self.quadruple_table.insert_into_table("goto", after_lbl, None, None)
         else:
             self.quadruple_table.insert_into_table("goto", start_lbl, None, None)
-        self.quadruple_table.insert_into_table("label", None, None, after_lbl + ":")
+        self.emit_label(after_lbl)
+        self.exit_loop(old_loop)
         return None
 
     # Visit a parse tree produced by CompiscriptParser#forStatement.
     def visitForeachStatement(self, ctx: CompiscriptParser.ForeachStatementContext):
         ln = self.get_line_number(ctx)
-        start_lbl = f"L{ln}_start"
-        body_lbl = f"L{ln}_body"
-        update_lbl = f"L{ln}_update"
-        after_lbl = f"L{ln}_after"
-        self.start = update_lbl
-        self.end = after_lbl
+        prefix = self.new_label_prefix(ctx)
+        start_lbl = f"{prefix}_start"
+        body_lbl = f"{prefix}_body"
+        update_lbl = f"{prefix}_update"
+        after_lbl = f"{prefix}_after"
         try:
             iter_name = ctx.Identifier().getText()
         except Exception:
@@ -304,42 +417,49 @@ class tac_generator(CompiscriptVisitor):
                 iterable_val = None
         if not iterable_val:
             return None
+        old_loop = self.enter_loop(update_lbl, after_lbl)
         idx_temp = self.temporal_generator()
+        len_temp = self.temporal_generator()
+        # El índice, la longitud y el arreglo viven durante todo el lazo: no se reciclan
+        old_floor = self.temporal_floor
+        self.temporal_floor = self.temporal_counter
         self.quadruple_table.insert_into_table("=", "0", None, idx_temp)
-        self.quadruple_table.insert_into_table("label", None, None, start_lbl)
+        self.quadruple_table.insert_into_table("length", iterable_val, None, len_temp)
+        self.emit_label(start_lbl)
         cmp_temp = self.temporal_generator()
-        self.quadruple_table.insert_into_table("<", idx_temp, f"{iterable_val}.size", cmp_temp)
+        self.quadruple_table.insert_into_table("icmp_lt", idx_temp, len_temp, cmp_temp)
         self.quadruple_table.insert_into_table("if", cmp_temp, "goto", body_lbl)
         self.quadruple_table.insert_into_table("goto", after_lbl, None, None)
-        self.quadruple_table.insert_into_table("label", None, None, body_lbl)
+        self.emit_label(body_lbl)
         old_table = self.symbol_table
         scope_key = f"foreach_{ln}"
         if hasattr(old_table, "scope_map") and scope_key in old_table.scope_map:
             self.symbol_table = old_table.scope_map[scope_key]
-            self.ensure_scope_allocated(scope_key, self.symbol_table)
         if iter_name:
-            access = f"{iterable_val}[{idx_temp}]"
-            self.quadruple_table.insert_into_table("=", access, None, iter_name)
+            self.declare_local(iter_name)
+            self.quadruple_table.insert_into_table("[]", iterable_val, idx_temp, iter_name)
         if getattr(ctx, "block", None) and ctx.block():
             self.visit(ctx.block())
         self.symbol_table = old_table
-        self.quadruple_table.insert_into_table("label", None, None, update_lbl)
+        self.emit_label(update_lbl)
         inc_temp = self.temporal_generator()
-        self.quadruple_table.insert_into_table("+", idx_temp, "1", inc_temp)
+        self.quadruple_table.insert_into_table("iadd", idx_temp, "1", inc_temp)
         self.quadruple_table.insert_into_table("=", inc_temp, None, idx_temp)
         self.quadruple_table.insert_into_table("goto", start_lbl, None, None)
-        self.quadruple_table.insert_into_table("label", None, None, after_lbl)
+        self.emit_label(after_lbl)
+        self.temporal_floor = old_floor
+        self.exit_loop(old_loop)
         return None
 
     # Visit a parse tree produced by CompiscriptParser#forStatement.
     def visitForStatement(self, ctx: CompiscriptParser.ForStatementContext):
         ln = self.get_line_number(ctx)
-        start_lbl = f"L{ln}_start"
-        body_lbl = f"L{ln}_body"
-        update_lbl = f"L{ln}_update"
-        after_lbl = f"L{ln}_after"
-        self.start = update_lbl
-        self.end = after_lbl
+        prefix = self.new_label_prefix(ctx)
+        start_lbl = f"{prefix}_start"
+        body_lbl = f"{prefix}_body"
+        update_lbl = f"{prefix}_update"
+        after_lbl = f"{prefix}_after"
+        old_loop = self.enter_loop(update_lbl, after_lbl)
         old_table = self.symbol_table
         scope_key = f"for_{ln}"
         self.symbol_table = old_table.scope_map[scope_key]
@@ -350,10 +470,9 @@ class tac_generator(CompiscriptVisitor):
             vdecl = ctx.variableDeclaration()
             self.visit(vdecl)
             init_done = True
-        elif hasattr(ctx, "expressionList") and ctx.expressionList():
+        elif hasattr(ctx, "assignment") and ctx.assignment():
             # Caso: for (i = 0; ...)
-            expr_list = ctx.expressionList(0)
-            self.visit(expr_list)
+            self.visit(ctx.assignment())
             init_done = True
 
 
@@ -374,7 +493,7 @@ class tac_generator(CompiscriptVisitor):
             except Exception:
                 pass
 
-        self.quadruple_table.insert_into_table("label", None, None, start_lbl + ":")
+        self.emit_label(start_lbl)
 
         # Evaluar condición
         if cond_node is not None:
@@ -385,31 +504,34 @@ class tac_generator(CompiscriptVisitor):
             # Sin condición → loop infinito
             self.quadruple_table.insert_into_table("goto", body_lbl, None, None)
 
-        self.quadruple_table.insert_into_table("label", None, None, body_lbl + ":")
+        self.emit_label(body_lbl)
 
 
         if getattr(ctx, "block", None) and ctx.block():
             self.visit(ctx.block())
 
 
-        self.quadruple_table.insert_into_table("label", None, None, update_lbl + ":")
+        self.emit_label(update_lbl)
         if post_node is not None:
             self.visit(post_node)
 
 
         self.quadruple_table.insert_into_table("goto", start_lbl, None, None)
-        self.quadruple_table.insert_into_table("label", None, None, after_lbl + ":")
+        self.emit_label(after_lbl)
         self.symbol_table = old_table
+        self.exit_loop(old_loop)
         self.reset_temporal_counter()
         return None
 
     # Visit a parse tree produced by CompiscriptParser#breakStatement.
     def visitBreakStatement(self, ctx:CompiscriptParser.BreakStatementContext):
+        self.close_loop_tries()
         self.quadruple_table.insert_into_table("goto", self.end, None, None)
 
 
     # Visit a parse tree produced by CompiscriptParser#continueStatement.
     def visitContinueStatement(self, ctx:CompiscriptParser.ContinueStatementContext):
+        self.close_loop_tries()
 
         self.quadruple_table.insert_into_table("goto", self.start, None, None)
 
@@ -428,11 +550,12 @@ class tac_generator(CompiscriptVisitor):
     def visitTryCatchStatement(self, ctx: CompiscriptParser.TryCatchStatementContext):
 
         ln = self.get_line_number(ctx)
-        try_lbl = f"L{ln}_try"
-        catch_lbl = f"L{ln}_catch"
-        end_lbl = f"L{ln}_end"
+        prefix = self.new_label_prefix(ctx)
+        try_lbl = f"{prefix}_try"
+        catch_lbl = f"{prefix}_catch"
+        end_lbl = f"{prefix}_end"
 
-        self.quadruple_table.insert_into_table("label", None, None, try_lbl + ":")
+        self.emit_label(try_lbl)
         self.quadruple_table.insert_into_table("ON_EXCEPTION", "->", None, catch_lbl)
 
         old_table = self.symbol_table
@@ -440,14 +563,17 @@ class tac_generator(CompiscriptVisitor):
         if hasattr(old_table, "scope_map") and scope_key_try in old_table.scope_map:
             self.symbol_table = old_table.scope_map[scope_key_try]
 
+        self.try_stack.append(catch_lbl)
         if ctx.block(0):
             self.visit(ctx.block(0))
+        self.try_stack.pop()
 
-
+        # El bloque try terminó sin excepción: se desactiva su manejador
+        self.quadruple_table.insert_into_table("END_TRY", None, None, catch_lbl)
         self.quadruple_table.insert_into_table("goto", end_lbl, None, None)
 
 
-        self.quadruple_table.insert_into_table("label", None, None, catch_lbl + ":")
+        self.emit_label(catch_lbl)
 
  
         self.symbol_table = old_table
@@ -458,6 +584,7 @@ class tac_generator(CompiscriptVisitor):
   
         exception_var = ctx.Identifier().getText() if ctx.Identifier() else None
         if exception_var:
+            self.declare_local(exception_var)
             self.quadruple_table.insert_into_table("EXC_ASSIGN", '"Exception"', None, exception_var)
 
 
@@ -465,140 +592,148 @@ class tac_generator(CompiscriptVisitor):
             self.visit(ctx.block(1))
 
         self.symbol_table = old_table
-        self.quadruple_table.insert_into_table("label", None, None, end_lbl + ":")
+        self.emit_label(end_lbl)
         return None
 
 
     # Visit a parse tree produced by CompiscriptParser#switchStatement.
     def visitSwitchStatement(self, ctx:CompiscriptParser.SwitchStatementContext):
         ln = self.get_line_number(ctx)
-        end_lbl = f"L{ln}_end"
-        switch_node = None
-        try:
-            if hasattr(ctx, "expression") and len(ctx.expression()) > 0:
-                switch_node = ctx.expression(0)
-            else:
-                switch_node = ctx.getChild(2)
-        except Exception:
-            switch_node = None
+        prefix = self.new_label_prefix(ctx)
+        end_lbl = f"{prefix}_end"
+        default_lbl = f"{prefix}_default"
+        switch_val = self.visit(ctx.expression())
 
-        switch_val = None
-        try:
-            if switch_node is not None:
-                switch_val = self.visit(switch_node)
-        except Exception:
-            switch_val = None
-
-        cases = []
-        default_case = None
-        if hasattr(ctx, "switchCase"):
-            sc_list = ctx.switchCase()
-            if not isinstance(sc_list, list):
-                sc_list = [sc_list]
-            cases = sc_list
-        if hasattr(ctx, "defaultCase"):
-            dc = ctx.defaultCase()
-            if isinstance(dc, list) and len(dc) > 0:
-                default_case = dc[0]
-            elif dc:
-                default_case = dc
-
-        found_cases = []
-        try:
-            txt = ctx.getText()
-            import re
-            m = re.search(r"switch\s*\(\s*([^\)]+)\s*\)", txt, re.DOTALL)
-            switch_txt = m.group(1).strip() if m else None
-            found_cases = re.findall(r"case\s*([^:]+)\s*:", txt, re.DOTALL)
-            if switch_val is None and switch_txt:
-                switch_val = switch_txt
-        except Exception:
-            switch_txt = None
-            found_cases = []
+        cases = list(ctx.switchCase())
+        default_case = ctx.defaultCase()
+        case_labels = [f"{prefix}_case{i}" for i in range(len(cases))]
 
-        produced = False
+        # Se evalúan todos los valores de los case antes de despachar
+        case_pairs = []
         for i, case_ctx in enumerate(cases):
-            case_lbl = f"L{ln}_case{i}"
-            case_val = None
-            try:
-                if hasattr(case_ctx, "expression") and len(case_ctx.expression()) > 0:
-                    case_val = self.visit(case_ctx.expression(0))
-            except Exception:
-                case_val = None
-            if case_val is None and i < len(found_cases):
-                case_val = found_cases[i].strip()
-            if case_val is None or switch_val is None:
-                continue
-            cmp_temp = self.temporal_generator()
-            self.quadruple_table.insert_into_table("==", switch_val, case_val, cmp_temp)
-            self.quadruple_table.insert_into_table("if", cmp_temp, "goto", case_lbl)
-            produced = True
+            # Un case constante (literal, const o expresión de ellas) entra a la tabla de saltos
+            case_val = constant_expression(case_ctx.expression()) or self.visit(case_ctx.expression())
+            if case_val is None:
+                case_val = case_ctx.expression().getText()
+            case_pairs.append((case_val, case_labels[i]))
 
-        if not produced and found_cases and switch_val is not None:
-            for i, cv in enumerate(found_cases):
-                case_lbl = f"L{ln}_case{i}"
-                cmp_temp = self.temporal_generator()
-                self.quadruple_table.insert_into_table("==", switch_val, cv.strip(), cmp_temp)
-                self.quadruple_table.insert_into_table("if", cmp_temp, "goto", case_lbl)
-            produced = True
-
-        if default_case is not None:
-            default_lbl = f"L{ln}_default"
-            self.quadruple_table.insert_into_table("goto", default_lbl, None, None)
-        else:
-            self.quadruple_table.insert_into_table("goto", end_lbl, None, None)
+        miss_lbl = default_lbl if default_case is not None else end_lbl
+        self.emit_switch_dispatch(switch_val, case_pairs, miss_lbl, prefix, static_type(ctx.expression()) == INTEGER)
 
-        case_labels = [f"L{ln}_case{i}" for i in range(max(len(cases), len(found_cases)))]
         for i, case_ctx in enumerate(cases):
-            case_lbl = case_labels[i]
-            self.quadruple_table.insert_into_table("label", None, None, case_lbl + ":")
+            self.emit_label(case_labels[i])
             old_table = self.symbol_table
             scope_key = f"case_{ln}_{i}"
             if hasattr(old_table, "scope_map") and scope_key in old_table.scope_map:
                 self.symbol_table = old_table.scope_map[scope_key]
-            if hasattr(case_ctx, "block") and case_ctx.block():
-                self.visit(case_ctx.block())
-            else:
-                try:
-                    if hasattr(case_ctx, "statement"):
-                        st = case_ctx.statement()
-                        if isinstance(st, list):
-                            for s in st:
-                                self.visit(s)
-                        else:
-                            self.visit(st)
-                except Exception:
-                    pass
+            for st in case_ctx.statement():
+                self.visit(st)
             self.symbol_table = old_table
             self.quadruple_table.insert_into_table("goto", end_lbl, None, None)
 
         if default_case is not None:
-            default_lbl = f"L{ln}_default"
-            self.quadruple_table.insert_into_table("label", None, None, default_lbl + ":")
+            self.emit_label(default_lbl)
             old_table = self.symbol_table
             scope_key = f"default_{ln}"
             if hasattr(old_table, "scope_map") and scope_key in old_table.scope_map:
                 self.symbol_table = old_table.scope_map[scope_key]
-            if hasattr(default_case, "block") and default_case.block():
-                self.visit(default_case.block())
-            else:
-                try:
-                    if hasattr(default_case, "statement"):
-                        st = default_case.statement()
-                        if isinstance(st, list):
-                            for s in st:
-                                self.visit(s)
-                        else:
-                            self.visit(st)
-                except Exception:
-                    pass
+            for st in default_case.statement():
+                self.visit(st)
             self.symbol_table = old_table
             self.quadruple_table.insert_into_table("goto", end_lbl, None, None)
 
-        self.quadruple_table.insert_into_table("label", None, None, end_lbl + ":")
+        self.emit_label(end_lbl)
         self.reset_temporal_counter()
         return None
 
+    def classify_switch_cases(self, case_pairs):
+        """
+        Devuelve "integer" si todos los case son literales enteros, "string" si todos
+        son literales de cadena y None en cualquier otro caso (expresiones, variables, mezcla).
+        """
+        values = [value for value, _ in case_pairs]
+        if not values or not all(isinstance(v, str) for v in values):
+            return None
+        if all(re.fullmatch(r"-?\d+", v) for v in values):
+            return "integer"
+        if all(len(v) >= 2 and v[0] == '"' and v[-1] == '"' for v in values):
+            return "string"
+        return None
+
+    def emit_switch_dispatch(self, switch_val, case_pairs, miss_lbl, prefix, integer=False):
+        """
+        Elige la forma de despacho según el análisis de los case:
+          - enteros densos   -> JUMP_TABLE (un solo salto indexado)
+          - enteros dispersos -> árbol de búsqueda binaria balanceado (si el switch es entero)
+          - cadenas          -> HASH_SWITCH (tabla hash literal -> etiqueta)
+          - pocos case o case no constantes -> cadena lineal de == / if goto
+        integer indica que la expresión del switch es entera: las comparaciones
+        son entonces icmp_eq / icmp_lt.
+        """
+        kind = self.classify_switch_cases(case_pairs)
+
+        if kind == "integer":
+            # Si hay case repetidos se queda el primero, igual que la cadena lineal
+            by_value = {}
+            for value, lbl in case_pairs:
+                by_value.setdefault(int(value), lbl)
+            entries = sorted(by_value.items())
+            low, high = entries[0][0], entries[-1][0]
+            density = len(entries) / (high - low + 1)
+            if len(entries) >= SWITCH_TABLE_MIN_CASES and density >= SWITCH_TABLE_MIN_DENSITY:
+                labels = tuple(by_value.get(v, miss_lbl) for v in range(low, high + 1))
+                self.quadruple_table.insert_into_table("JUMP_TABLE", switch_val, (low, labels), miss_lbl)
+                return
+            if integer and len(entries) > SWITCH_LINEAR_MAX_CASES:
+                self.emit_binary_search(switch_val, entries, miss_lbl, prefix)
+                return
+
+        if kind == "string" and len(case_pairs) > 1:
+            table = {}
+            for value, lbl in case_pairs:
+                table.setdefault(value, lbl)
+            self.quadruple_table.insert_into_table("HASH_SWITCH", switch_val, tuple(table.items()), miss_lbl)
+            return
+
+        self.emit_linear_switch(switch_val, case_pairs, miss_lbl, integer)
+
+    def emit_linear_switch(self, switch_val, case_pairs, miss_lbl, integer=False):
+        equal = "icmp_eq" if integer else "=="
+        for case_val, case_lbl in case_pairs:
+            cmp_temp = self.temporal_generator()
+            self.quadruple_table.insert_into_table(equal, switch_val, case_val, cmp_temp)
+            self.quadruple_table.insert_into_table("if", cmp_temp, "goto", case_lbl)
+        self.quadruple_table.insert_into_table("goto", miss_lbl, None, None)
+
+    def emit_binary_search(self, switch_val, entries, miss_lbl, prefix):
+        """
+        Árbol de comparaciones balanceado sobre los case ordenados: O(log N) saltos
+        por ejecución. Las hojas con pocos case terminan en una cadena lineal.
+        Solo se usa con un switch entero, cuyo único valor no entero posible es
+        null (un campo sin inicializar): ese va directo al default, igual que en
+        la JUMP_TABLE y la cadena lineal, antes de la primera comparación '<'.
+        """
+        null_temp = self.temporal_generator()
+        self.quadruple_table.insert_into_table("==", switch_val, "null", null_temp)
+        self.quadruple_table.insert_into_table("if", null_temp, "goto", miss_lbl)
+        node_counter = [0]
+
+        def emit_range(lo, hi):
+            if hi - lo <= SWITCH_LINEAR_MAX_CASES:
+                self.emit_linear_switch(switch_val, [(str(v), lbl) for v, lbl in entries[lo:hi]], miss_lbl, True)
+                return
+            mid = (lo + hi) // 2
+            left_lbl = f"{prefix}_bs{node_counter[0]}"
+            node_counter[0] += 1
+            cmp_temp = self.temporal_generator()
+            self.quadruple_table.insert_into_table("icmp_lt", switch_val, str(entries[mid][0]), cmp_temp)
+            self.quadruple_table.insert_into_table("if", cmp_temp, "goto", left_lbl)
+            emit_range(mid, hi)
+            self.emit_label(left_lbl)
+            emit_range(lo, mid)
+
+        emit_range(0, len(entries))
+
 
     # Visit a parse tree produced by CompiscriptParser#defaultCase.
     def visitDefaultCase(self, ctx:CompiscriptParser.DefaultCaseContext):
@@ -623,8 +758,15 @@ class tac_generator(CompiscriptVisitor):
 
         old_table = self.symbol_table
         self.symbol_table = old_table.scope_map["function_" + func_name]
+        # El cuerpo usa sus propios temporales y no hereda el piso del foreach que lo rodea
+        old_state = (self.temporal_counter, self.temporal_floor, self.start, self.end, self.try_stack, self.loop_try_depth)
+        self.temporal_counter = self.temporal_floor = 0
+        self.try_stack, self.loop_try_depth = [], 0
+        self.function_depth += 1
         if ctx.block():
             self.visit(ctx.block())
+        self.function_depth -= 1
+        self.temporal_counter, self.temporal_floor, self.start, self.end, self.try_stack, self.loop_try_depth = old_state
         self.symbol_table = old_table
         self.reset_temporal_counter()
         self.quadruple_table.insert_into_table("endfunc", None, None, None)
@@ -680,15 +822,22 @@ class tac_generator(CompiscriptVisitor):
             return self.visitFunctionDeclaration(child)
         elif rule_name == "VariableDeclaration":
             var_name = child.Identifier().getText()
-            self.quadruple_table.insert_into_table("FIELD", None, None, var_name)
+            init = child.initializer().expression() if child.initializer() else None
+            self.quadruple_table.insert_into_table("FIELD", self.field_initializer(init), None, var_name)
             return var_name
         elif rule_name == "ConstantDeclaration":
             const_name = child.Identifier().getText()
-            self.quadruple_table.insert_into_table("FIELD_CONST", None, None, const_name)
+            init = child.expression()
+            self.quadruple_table.insert_into_table("FIELD_CONST", self.field_initializer(init), None, const_name)
             return const_name
         return None
 
 
+    def field_initializer(self, expr):
+        # Solo los valores constantes viajan en FIELD; cada instancia nueva los copia al crearse
+        return constant_expression(expr) if expr is not None else None
+
+
     # Visit a parse tree produced by CompiscriptParser#expression.
     def visitExpression(self, ctx:CompiscriptParser.ExpressionContext):
         return self.visit(ctx.assignmentExpr())
@@ -699,47 +848,40 @@ class tac_generator(CompiscriptVisitor):
         if ctx.lhs and ctx.assignmentExpr():
             rhs = self.visit(ctx.assignmentExpr())
             lhs_ctx = ctx.leftHandSide()
-            base = None
-            if hasattr(lhs_ctx, "primaryAtom") and lhs_ctx.primaryAtom():
-                base = self.visit(lhs_ctx.primaryAtom())
-            suffixes = list(lhs_ctx.suffixOp()) if hasattr(lhs_ctx, "suffixOp") and lhs_ctx.suffixOp() else []
-            if suffixes:
-                for i, suffix in enumerate(suffixes):
-                    rule_name = type(suffix).__name__.replace("Context", "")
-                    if rule_name == "CallExpr":
-                        args = []
-                        if suffix.arguments():
-                            for expr in suffix.arguments().expression():
-                                val = self.visit(expr)
-                                args.append(val)
-                                self.quadruple_table.insert_into_table("param", val, None, None)
-                        temp_ret = self.temporal_generator()
-                        self.quadruple_table.insert_into_table("call", base, len(args), temp_ret)
-                        base = temp_ret
-                    elif rule_name == "IndexExpr":
-                        idx_val = self.visit(suffix.expression())
-                        if i == len(suffixes) - 1:
-                            self.quadruple_table.insert_into_table("[]=", rhs, idx_val, base)
-                            return base
-                        else:
-                            tmp = self.temporal_generator()
-                            self.quadruple_table.insert_into_table("[]", base, idx_val, tmp)
-                            base = tmp
-                    elif rule_name == "PropertyAccessExpr":
-                        prop_name = suffix.Identifier().getText()
-                        base = f"{base}.{prop_name}"
-                self.quadruple_table.insert_into_table("=", rhs, None, base)
-                return base
-            else:
+            suffixes = list(lhs_ctx.suffixOp()) if lhs_ctx.suffixOp() else []
+            if not suffixes:
                 left = self.visit(lhs_ctx)
                 self.quadruple_table.add("=", rhs, None, left)
                 return left
+            atom = self.visit(lhs_ctx.primaryAtom())
+            descriptor = self.flat_arrays.get(atom)
+            if descriptor is not None and len(suffixes) == descriptor.rank():
+                # Elemento de un arreglo contiguo: un solo store
+                index = self.emit_flat_index(descriptor, suffixes)
+                self.quadruple_table.insert_into_table("[]=", rhs, index, atom)
+                return rhs
+            # Todos los sufijos menos el último producen la base; el último decide el tipo de store
+            base = self.visit_suffixes(atom, suffixes[:-1])
+            last = suffixes[-1]
+            rule_name = type(last).__name__.replace("Context", "")
+            if rule_name == "IndexExpr":
+                idx_val = self.visit(last.expression())
+                self.quadruple_table.insert_into_table("[]=", rhs, idx_val, base)
+            elif rule_name == "PropertyAccessExpr":
+                self.emit_set_field(last, base, last.Identifier().getText(), rhs)
+            else:
+                # f() = x no es un destino válido; se evalúa la llamada y se descarta el valor
+                self.visit_suffixes(base, [last])
+            return rhs
         return self.visitChildren(ctx)
 
 
     # Visit a parse tree produced by CompiscriptParser#PropertyAssignExpr.
     def visitPropertyAssignExpr(self, ctx:CompiscriptParser.PropertyAssignExprContext):
-        return self.visitChildren(ctx)
+        rhs = self.visit(ctx.assignmentExpr())
+        obj = self.visit(ctx.leftHandSide())
+        self.emit_set_field(ctx, obj, ctx.Identifier().getText(), rhs)
+        return rhs
 
 
     # Visit a parse tree produced by CompiscriptParser#ExprNoAssign.
@@ -749,63 +891,87 @@ class tac_generator(CompiscriptVisitor):
 
     # Visit a parse tree produced by CompiscriptParser#TernaryExpr.
     def visitTernaryExpr(self, ctx:CompiscriptParser.TernaryExprContext):
-        return self.visitChildren(ctx)
+        cond = self.visit(ctx.logicalOrExpr())
+        if not ctx.expression():
+            return cond
+        prefix = self.new_label_prefix(ctx)
+        true_lbl = f"{prefix}_tern_true"
+        false_lbl = f"{prefix}_tern_false"
+        end_lbl = f"{prefix}_tern_end"
+        result = self.temporal_generator()
+        self.quadruple_table.insert_into_table("if", cond, "goto", true_lbl)
+        self.quadruple_table.insert_into_table("goto", false_lbl, None, None)
+        self.emit_label(true_lbl)
+        self.quadruple_table.insert_into_table("=", self.visit(ctx.expression(0)), None, result)
+        self.quadruple_table.insert_into_table("goto", end_lbl, None, None)
+        self.emit_label(false_lbl)
+        self.quadruple_table.insert_into_table("=", self.visit(ctx.expression(1)), None, result)
+        self.emit_label(end_lbl)
+        return result
+
+
+    def emit_binary_chain(self, ctx, operands):
+        """
+        a op b op c ... de izquierda a derecha, con la operación tipada de cada paso.
+        Desde el primer '+' de cadenas, los '+' que siguen se juntan en un solo
+        CONCAT: el resultado se arma una vez en lugar de copiar la cadena parcial
+        en cada paso.
+        """
+        left = self.visit(operands[0])
+        left_type = static_type(operands[0])
+        parts = None        # operandos de la concatenación pendiente
+        for i in range(1, len(operands)):
+            op = ctx.getChild(2*i - 1).getText()
+            if parts and op != "+":
+                left, parts = self.emit_concat(parts), None
+            right = self.visit(operands[i])
+            right_type = static_type(operands[i])
+            typed = typed_op(op, left_type, right_type)
+            if typed == "sconcat":
+                parts = (parts or [left]) + [right]
+                left_type = STRING
+                continue
+            temp = self.temporal_generator()
+            self.quadruple_table.insert_into_table(typed, left, right, temp)
+            left, left_type = temp, result_type(op, left_type, right_type)
+        return self.emit_concat(parts) if parts else left
+
+    def emit_concat(self, parts):
+        """t = a + b + ... de cadenas: sconcat con dos operandos, CONCAT con más."""
+        temp = self.temporal_generator()
+        if len(parts) == 2:
+            self.quadruple_table.insert_into_table("sconcat", parts[0], parts[1], temp)
+        else:
+            self.quadruple_table.insert_into_table("CONCAT", tuple(parts), None, temp)
+        return temp
 
 
     # Visit a parse tree produced by CompiscriptParser#logicalOrExpr.
     def visitLogicalOrExpr(self, ctx:CompiscriptParser.LogicalOrExprContext):
         if len(ctx.logicalAndExpr()) == 1:
             return self.visit(ctx.logicalAndExpr(0))
-        left = self.visit(ctx.logicalAndExpr(0))
-        for i in range(1, len(ctx.logicalAndExpr())):
-            op = ctx.getChild(2*i - 1).getText()  
-            right = self.visit(ctx.logicalAndExpr(i))
-            temp = self.temporal_generator()
-            self.quadruple_table.insert_into_table(op, left, right, temp)
-            left = temp
-        return left
+        return self.emit_binary_chain(ctx, ctx.logicalAndExpr())
 
 
     # Visit a parse tree produced by CompiscriptParser#logicalAndExpr.
     def visitLogicalAndExpr(self, ctx:CompiscriptParser.LogicalAndExprContext):
         if len(ctx.equalityExpr()) == 1:
             return self.visit(ctx.equalityExpr(0))
-        left = self.visit(ctx.equalityExpr(0))
-        for i in range(1, len(ctx.equalityExpr())):
-            op = ctx.getChild(2*i - 1).getText()  
-            right = self.visit(ctx.equalityExpr(i))
-            temp = self.temporal_generator()
-            self.quadruple_table.insert_into_table(op, left, right, temp)
-            left = temp
-        return left
+        return self.emit_binary_chain(ctx, ctx.equalityExpr())
 
 
     # Visit a parse tree produced by CompiscriptParser#equalityExpr.
     def visitEqualityExpr(self, ctx:CompiscriptParser.EqualityExprContext):
         if len(ctx.relationalExpr()) == 1:
             return self.visit(ctx.relationalExpr(0))
-        left = self.visit(ctx.relationalExpr(0))
-        for i in range(1, len(ctx.relationalExpr())):
-            op = ctx.getChild(2*i - 1).getText()  
-            right = self.visit(ctx.relationalExpr(i))
-            temp = self.temporal_generator()
-            self.quadruple_table.insert_into_table(op, left, right, temp)
-            left = temp
-        return left
+        return self.emit_binary_chain(ctx, ctx.relationalExpr())
 
 
     # Visit a parse tree produced by CompiscriptParser#relationalExpr.
     def visitRelationalExpr(self, ctx:CompiscriptParser.RelationalExprContext):
         if len(ctx.additiveExpr()) == 1:
             return self.visit(ctx.additiveExpr(0))
-        left = self.visit(ctx.additiveExpr(0))
-        for i in range(1, len(ctx.additiveExpr())):
-            op = ctx.getChild(2*i - 1).getText()  
-            right = self.visit(ctx.additiveExpr(i))
-            temp = self.temporal_generator()
-            self.quadruple_table.insert_into_table(op, left, right, temp)
-            left = temp
-        return left
+        return self.emit_binary_chain(ctx, ctx.additiveExpr())
 
 
     # Visit a parse tree produced by CompiscriptParser#additiveExpr.
@@ -813,28 +979,14 @@ class tac_generator(CompiscriptVisitor):
 
         if len(ctx.multiplicativeExpr()) == 1:
             return self.visit(ctx.multiplicativeExpr(0))
-        left = self.visit(ctx.multiplicativeExpr(0))
-        for i in range(1, len(ctx.multiplicativeExpr())):
-            op = ctx.getChild(2*i - 1).getText()  
-            right = self.visit(ctx.multiplicativeExpr(i))
-            temp = self.temporal_generator()
-            self.quadruple_table.insert_into_table(op, left, right, temp)
-            left = temp
-        return left
+        return self.emit_binary_chain(ctx, ctx.multiplicativeExpr())
 
 
     # Visit a parse tree produced by CompiscriptParser#multiplicativeExpr.
     def visitMultiplicativeExpr(self, ctx: CompiscriptParser.MultiplicativeExprContext):
         if len(ctx.unaryExpr()) == 1:
             return self.visit(ctx.unaryExpr(0))
-        left = self.visit(ctx.unaryExpr(0))
-        for i in range(1, len(ctx.unaryExpr())):
-            op = ctx.getChild(2*i - 1).getText()  # '*', '/', '%'
-            right = self.visit(ctx.unaryExpr(i))
-            temp = self.temporal_generator()
-            self.quadruple_table.insert_into_table(op, left, right, temp)
-            left = temp
-        return left
+        return self.emit_binary_chain(ctx, ctx.unaryExpr())
 
 
     # Visit a parse tree produced by CompiscriptParser#unaryExpr.
@@ -845,7 +997,12 @@ class tac_generator(CompiscriptVisitor):
         # Si hay un operador unario
         op = ctx.getChild(0).getText()
         value = self.visit(ctx.unaryExpr())
-        temp = self.quadruple_table.new_temp()
+        operand = static_type(ctx.unaryExpr())
+        if op == "-" and operand == INTEGER:
+            op = "ineg"
+        elif op == "!" and operand == BOOLEAN:
+            op = "bnot"
+        temp = self.temporal_generator()
         self.quadruple_table.add(op, value, None, temp)
         return temp
 
@@ -861,6 +1018,8 @@ class tac_generator(CompiscriptVisitor):
 
     # Visit a parse tree produced by CompiscriptParser#literalExpr.
     def visitLiteralExpr(self, ctx: CompiscriptParser.LiteralExprContext):
+        if ctx.arrayLiteral():
+            return self.visit(ctx.arrayLiteral())
         return ctx.getText()
 
 
@@ -872,28 +1031,38 @@ class tac_generator(CompiscriptVisitor):
         # Si no tiene sufijos (no es llamada ni acceso), devolvemos el identificador base
         if not ctx.suffixOp():
             return base
-
-        # Iterar sobre todos los sufijos (puede haber llamados encadenados o propiedades)
-        for suffix in ctx.suffixOp():
+        return self.visit_suffixes(base, list(ctx.suffixOp()))
+
+    def visit_suffixes(self, base, suffixes):
+        """Aplica llamadas, índices y accesos a propiedad sobre la base, en orden."""
+        descriptor = self.flat_arrays.get(base) if isinstance(base, str) else None
+        if descriptor is not None and len(suffixes) >= descriptor.rank():
+            # Arreglo contiguo: los primeros índices son un solo acceso
+            index = self.emit_flat_index(descriptor, suffixes[:descriptor.rank()])
+            temp = self.temporal_generator()
+            self.quadruple_table.insert_into_table("[]", base, index, temp)
+            base = temp
+            suffixes = suffixes[descriptor.rank():]
+        i = 0
+        while i < len(suffixes):
+            suffix = suffixes[i]
             rule_name = type(suffix).__name__.replace("Context", "")
+            next_rule = type(suffixes[i + 1]).__name__.replace("Context", "") if i + 1 < len(suffixes) else None
 
-            # --- LLAMADA A FUNCIÓN O MÉTODO ---
-            if rule_name == "CallExpr":
-                args = []
-                if suffix.arguments():
-                    for expr in suffix.arguments().expression():
-                        val = self.visit(expr)
-                        args.append(val)
-                        self.quadruple_table.insert_into_table("param", val, None, None)
-
-                n_args = len(args)
-                temp_ret = self.temporal_generator()
-                # Si base es un objeto.prop, es método de clase
-                if "." in base:
-                    self.quadruple_table.insert_into_table("CALL_METHOD", base, n_args, temp_ret)
+            # --- LLAMADA A MÉTODO: obj.m(...) ---
+            if rule_name == "PropertyAccessExpr" and next_rule == "CallExpr":
+                prop_name = suffix.Identifier().getText()
+                slot = self.member_ref(suffix, prop_name, method=True)
+                if slot is not None:
+                    base = self.emit_call(base, suffixes[i + 1], slot=slot)
                 else:
-                    self.quadruple_table.insert_into_table("CALL_FUNC", base, n_args, temp_ret)
-                base = temp_ret
+                    base = self.emit_call(f"{base}.{prop_name}", suffixes[i + 1], method=True)
+                i += 2
+                continue
+
+            # --- LLAMADA A FUNCIÓN ---
+            if rule_name == "CallExpr":
+                base = self.emit_call(base, suffix)
             # --- ACCESO POR ÍNDICE (arrays) ---
             elif rule_name == "IndexExpr":
                 index_val = self.visit(suffix.expression())
@@ -905,15 +1074,21 @@ class tac_generator(CompiscriptVisitor):
             elif rule_name == "PropertyAccessExpr":
                 prop_name = suffix.Identifier().getText()
                 temp = self.temporal_generator()
-                self.quadruple_table.insert_into_table("GET_FIELD", base, prop_name, temp)
+                ref = self.member_ref(suffix, prop_name)
+                if ref is not None:
+                    self.quadruple_table.insert_into_table("LOAD_FIELD", base, ref, temp)
+                else:
+                    self.quadruple_table.insert_into_table("GET_FIELD", base, prop_name, temp)
                 base = temp
+            i += 1
 
         return base
 
 
     # Visit a parse tree produced by CompiscriptParser#IdentifierExpr.
     def visitIdentifierExpr(self, ctx:CompiscriptParser.IdentifierExprContext):
-        return ctx.Identifier().getText()
+        # Una constante con valor conocido al compilar se sustituye por su literal
+        return getattr(ctx, "_constant_value", None) or ctx.Identifier().getText()
 
 
     # Visit a parse tree produced by CompiscriptParser#NewExpr.
@@ -922,9 +1097,9 @@ class tac_generator(CompiscriptVisitor):
         args = []
         if ctx.arguments():
             for expr in ctx.arguments().expression():
-                arg_val = self.visit(expr)
-                args.append(arg_val)
-                self.quadruple_table.insert_into_table("param", arg_val, None, None)
+                args.append(self.visit(expr))
+        for arg_val in args:
+            self.quadruple_table.insert_into_table("param", arg_val, None, None)
 
         # Crear un temporal para la instancia
         temp_obj = self.temporal_generator()
@@ -983,17 +1158,63 @@ class tac_generator(CompiscriptVisitor):
 
     # Visit a parse tree produced by CompiscriptParser#arrayLiteral.
     def visitArrayLiteral(self, ctx: CompiscriptParser.ArrayLiteralContext):
+        data = literal_data(ctx)
+        if data is not None:
+            return self.emit_array_data(data)
         elements = []
         for expr in ctx.expression():
-            val = self.visit(expr)
+            val = constant_expression(expr) or self.visit(expr)
             elements.append(val)
+        return self.emit_array(elements)
+
+    def emit_array(self, elements):
+        """Reserva un arreglo con los valores dados; devuelve el temporal."""
+        if elements and all(is_constant(val) for val in elements):
+            return self.emit_array_data(((len(elements),), tuple(elements)))
         size = len(elements)
         arr_temp = self.temporal_generator()
         self.quadruple_table.insert_into_table("alloc", size, None, arr_temp)
         for i, val in enumerate(elements):
-            self.quadruple_table.insert_into_table("=", val, None, f"{arr_temp}[{i}]")
+            self.quadruple_table.insert_into_table("[]=", val, str(i), arr_temp)
         return arr_temp
 
+    def emit_array_data(self, data):
+        """Un solo alloc que copia los datos (largos, valores) a un arreglo nuevo."""
+        arr_temp = self.temporal_generator()
+        self.quadruple_table.insert_into_table("alloc", data[0][0], data, arr_temp)
+        return arr_temp
+
+    def emit_flat_index(self, descriptor, index_suffixes):
+        """
+        Posición en orden por filas de los índices de un arreglo contiguo. Cada
+        índice se verifica contra el largo de su dimensión (bounds), así que un
+        índice fuera de rango falla igual que con filas separadas.
+        """
+        offset = None
+        constant = 0
+        for suffix, length, stride in zip(index_suffixes, descriptor.lengths, descriptor.strides()):
+            index = self.visit(suffix.expression())
+            if isinstance(index, str) and index.isdigit() and int(index) < length:
+                constant += int(index) * stride
+                continue
+            self.quadruple_table.insert_into_table("bounds", index, str(length), None)
+            term = index
+            if stride != 1:
+                term = self.temporal_generator()
+                self.quadruple_table.insert_into_table("imul", index, str(stride), term)
+            if offset is not None:
+                total = self.temporal_generator()
+                self.quadruple_table.insert_into_table("iadd", offset, term, total)
+                term = total
+            offset = term
+        if offset is None:
+            return str(constant)
+        if constant:
+            total = self.temporal_generator()
+            self.quadruple_table.insert_into_table("iadd", offset, str(constant), total)
+            offset = total
+        return offset
+
 
 
     # Visit a parse tree produced by CompiscriptParser#type.
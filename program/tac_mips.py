@@ -0,0 +1,826 @@
+"""
+Backend de MIPS32: traduce el TAC a ensamblador de MIPS (sintaxis de SPIM/MARS).
+
+Cada unidad del TAC es una subrutina con su registro de activación sobre
+$sp/$fp. Cada variable y temporal tiene una palabra en el marco; las que
+elige el asignador de registros (tac_regalloc.py) viven en $s0-$s7, que la
+subrutina guarda y restaura. Los registros $t* solo se usan dentro de una
+instrucción del TAC; las globales van en .data. Los primeros cuatro argumentos se pasan en $a0-$a3 y el resto en el
+área de argumentos del llamador, como en la convención o32; el valor de
+retorno va en $v0. En un método, 'this' es el primer argumento.
+
+Marco de una subrutina ($fp = $sp del llamador):
+
+     k*4($fp)        argumento k >= 4 (lo escribe el llamador)
+      -4($fp)        $ra guardado
+      -8($fp)        $fp del llamador
+    -12-4*s($fp)     variable o temporal s (luego la profundidad de try y los $s guardados)
+       k*4($sp)      argumento k de las llamadas que hace la subrutina
+
+Los valores son palabras con etiqueta (ver runtime/cs_runtime.s): los
+enteros son de 31 bits con el bit bajo en 1, así que la suma, la resta, la
+multiplicación y las comparaciones de enteros se hacen en línea sobre la
+palabra etiquetada. Lo demás (cadenas, arreglos, objetos, print, errores y
+try/catch) lo resuelven las rutinas del runtime, que se agrega al final del
+archivo generado. print usa las llamadas al sistema de SPIM.
+
+mips_simulator.py ejecuta el resultado sin instalar SPIM ni MARS.
+"""
+import io
+import os
+import sys
+from tac_analysis import (
+    BINARY_OPS, UNARY_OPS, CALL_OPS, split_units, global_names, quad_uses, quad_defs, is_constant, is_temp, is_name,
+    label_name, generic_op, string_pool,
+)
+from tac_runtime import compiscript_error, constant_value
+from tac_vm import build_class_table, class_chain
+from tac_regalloc import allocate_registers, format_allocation_report
+from mips_simulator import mips_simulator
+
+RUNTIME_ASSEMBLY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "runtime", "cs_runtime.s")
+ERROR_PREFIX = "Error en tiempo de ejecución: "
+INT_MIN = -(1 << 30)
+INT_MAX = (1 << 30) - 1
+# Posición de las tablas field_at y methods en el descriptor de clase
+CLASS_FIELD_AT = 20
+CLASS_METHODS = 24
+TRUE = 6
+FALSE = 2
+
+# Cadenas que usa el runtime (las etiquetas están fijas en cs_runtime.s)
+RUNTIME_STRINGS = {
+    "__str_null": "null", "__str_true": "true", "__str_false": "false",
+    "__str_lbracket": "[", "__str_rbracket": "]", "__str_comma": ", ", "__str_lt": "<", "__str_gt": ">",
+    "__str_newline": "\n", "__str_empty": "", "__str_quote": "'", "__str_close_paren": ")",
+    "__str_error_prefix": ERROR_PREFIX,
+    "__str_too_many_try": "Demasiados try anidados",
+    "__str_div_zero": "División entre cero",
+    "__str_op_open": "Operación '", "__str_invalid_between": "' inválida entre ", "__str_and": " y ",
+    "__str_invalid_on": "' inválida sobre ",
+    "__str_cannot_index": "No se puede indexar ",
+    "__str_index_range": "Índice fuera de rango: ", "__str_size_open": " (tamaño ",
+    "__str_no_length": " no tiene longitud",
+    "__str_access": "Acceso a '", "__str_assign_to": "Asignación a '", "__str_on": "' sobre ",
+    "__str_the_object": "El objeto ", "__str_no_field": " no tiene el campo '",
+    "__str_method_call": "Llamada al método '",
+    "__str_the_class": "La clase '", "__str_no_method": "' no tiene el método '",
+    "__str_expected": "' esperaba ", "__str_arguments_got": " argumentos, recibió ",
+}
+OPERATORS = {
+    "+": "__op_add", "-": "__op_sub", "*": "__op_mul", "/": "__op_div", "%": "__op_mod",
+    "<": "__op_lt", "<=": "__op_le", ">": "__op_gt", ">=": "__op_ge", "&&": "__op_and", "||": "__op_or",
+    "!": "__op_not",
+}
+# Comparación de enteros etiquetados: (instrucción slt, invertir operandos, negar el resultado)
+COMPARISONS = {"<": (False, False), ">": (True, False), ">=": (False, True), "<=": (True, True)}
+ARITHMETIC = {"+", "-", "*"}
+SAVED_REGISTERS = [f"$s{k}" for k in range(8)]
+
+
+class mips_build_error(Exception):
+    """El TAC usa algo que el backend de MIPS no puede representar."""
+    pass
+
+
+def asm_string(label, text):
+    """Cadena del runtime en .data: [1][largo][bytes][0]; lo no imprimible va con .byte."""
+    data = text.encode("utf-8")
+    lines = ["\t.align 2", f"{label}:\t.word 1, {len(data)}"]
+    run = []
+    for byte in data:
+        if 32 <= byte < 127:
+            run.append("\\" + chr(byte) if chr(byte) in '"\\' else chr(byte))
+            continue
+        if run:
+            lines.append(f'\t.ascii "{"".join(run)}"')
+            run = []
+        lines.append(f"\t.byte {byte}")
+    if run:
+        lines.append(f'\t.ascii "{"".join(run)}"')
+    lines.append("\t.byte 0")
+    return lines
+
+
+def label(name):
+    return f"lbl_{label_name(name)}"
+
+
+class mips_emitter():
+    def __init__(self, quads, registers=len(SAVED_REGISTERS), allocator="linear"):
+        if not 0 <= registers <= len(SAVED_REGISTERS):
+            raise mips_build_error(f"El backend de MIPS asigna entre 0 y {len(SAVED_REGISTERS)} registros")
+        self.quads = quads
+        self.units = split_units(quads)
+        self.classes = build_class_table(quads)
+        self.shared = global_names(quads, self.units)
+        self.allocations = None
+        if registers:
+            # Un error vuelve al catch sin pasar por los epílogos: las unidades con try quedan en memoria
+            self.allocations = allocate_registers(
+                quads, registers, allocatable=lambda unit, x: self.is_local(unit, x),
+                exclude=lambda unit: any(quads[i][0] == "ON_EXCEPTION" for i in unit.indices), method=allocator)
+        self.allocation = None
+        self.position = 0
+        self.functions = {u.name: u for u in self.units[1:] if not u.owner_class}
+        self.methods = {}           # (clase, método) -> unidad
+        for unit in self.units[1:]:
+            if unit.owner_class:
+                self.methods[(unit.owner_class, unit.name)] = unit
+        # texto -> etiqueta; las constantes de cadena del TAC conservan su índice de la tabla
+        self.strings = {constant_value(lit): f"str_{k}" for lit, k in string_pool(quads).items()}
+        self.data = {}              # datos de un alloc (largos, valores) -> palabras en .data
+        self.tables = []            # tablas de saltos de JUMP_TABLE
+        self.field_ids = {}
+        self.selector_ids = {}
+        self.internal = 0
+        self.collect_member_names()
+
+    def collect_member_names(self):
+        fields = set()
+        selectors = {name for _, name in self.methods}
+        for cls in self.classes.values():
+            fields.update(cls.fields)
+        for op, arg1, arg2, res in self.quads:
+            if op in ("GET_FIELD", "SET_FIELD"):
+                fields.add(arg2)
+            elif op in ("LOAD_FIELD", "STORE_FIELD"):
+                fields.add(arg2[1])
+            elif op == "CALL_METHOD":
+                selectors.add(arg1.rsplit(".", 1)[1])
+            elif op in ("CALL_VIRTUAL", "CALL_DIRECT"):
+                selectors.add(arg2[1])
+        self.field_ids = {name: n for n, name in enumerate(sorted(fields))}
+        self.selector_ids = {name: n for n, name in enumerate(sorted(selectors))}
+
+    # ---------------- Nombres ----------------
+
+    def function_name(self, unit):
+        if unit.header is None:
+            return "main"
+        if unit.owner_class:
+            return f"m_{unit.owner_class}_{unit.name}"
+        return f"fn_{unit.name}"
+
+    def string(self, text):
+        if text not in self.strings:
+            self.strings[text] = f"str_{len(self.strings)}"
+        return self.strings[text]
+
+    def array_data(self, data):
+        if data not in self.data:
+            self.data[data] = f"data_{len(self.data)}"
+        return self.data[data]
+
+    def new_label(self):
+        self.internal += 1
+        return f"_m{self.internal}"
+
+    def word(self, v):
+        """Palabra etiquetada de una constante."""
+        if v is None:
+            return 0
+        if v is True or v is False:
+            return TRUE if v else FALSE
+        if isinstance(v, str):
+            return self.string(v)
+        if not INT_MIN <= v <= INT_MAX:
+            raise mips_build_error(f"Entero fuera del rango de 31 bits del backend de MIPS: {v}")
+        return (v << 1) | 1
+
+    # ---------------- Operandos ----------------
+
+    def slot(self, x):
+        return f"{-12 - 4 * self.slots[x]}($fp)"
+
+    def register(self, x):
+        """Registro de x en la instrucción actual, o None si está en memoria."""
+        if self.allocation is None or x not in self.slots:
+            return None
+        k = self.allocation.location(x, self.position)
+        return None if k is None else SAVED_REGISTERS[k]
+
+    def read(self, x, scratch):
+        """(instrucciones, registro) con el operando x; solo usa scratch si x no está en registro."""
+        reg = self.register(x) if is_name(x) else None
+        if reg is not None:
+            return [], reg
+        return self.load(x, scratch), scratch
+
+    def target(self, x, scratch):
+        """Registro donde conviene calcular el resultado x."""
+        return (self.register(x) if x and is_name(x) else None) or scratch
+
+    def load(self, x, reg):
+        """Instrucciones que dejan el operando x en reg."""
+        if is_name(x) and self.register(x) is not None:
+            source = self.register(x)
+            return [] if source == reg else [f"move {reg}, {source}"]
+        if x is None:
+            return [f"move {reg}, $zero"]
+        if is_constant(x):
+            w = self.word(constant_value(x))
+            if isinstance(w, str):
+                return [f"la {reg}, {w}"]
+            return [f"li {reg}, {w}"] if w else [f"move {reg}, $zero"]
+        if not is_name(x):
+            raise mips_build_error(f"Operando no soportado por el backend de MIPS: {x}")
+        if x in self.slots:
+            return [f"lw {reg}, {self.slot(x)}"]
+        return [f"lw {reg}, g_{x}"]
+
+    def store(self, reg, x):
+        if not x:
+            return []
+        if not is_name(x):
+            raise mips_build_error(f"Destino no soportado por el backend de MIPS: {x}")
+        target = self.register(x)
+        if target is not None:
+            lines = [] if target == reg else [f"move {target}, {reg}"]
+            if x in self.allocation.split:
+                # Una variable partida también se escribe en memoria
+                lines.append(f"sw {target}, {self.slot(x)}")
+            return lines
+        if x in self.slots:
+            return [f"sw {reg}, {self.slot(x)}"]
+        return [f"sw {reg}, g_{x}"]
+
+    def constant_int(self, x):
+        return is_constant(x) and type(constant_value(x)) is int
+
+    # ---------------- Programa ----------------
+
+    def emit(self):
+        """Texto del archivo .s completo (programa + runtime)."""
+        text = []
+        for n, unit in enumerate(self.units):
+            text.extend(self.emit_unit(unit, self.allocations[n] if self.allocations else None))
+        classes = self.emit_classes()
+
+        lines = ["# Generado por el compilador de Compiscript (backend MIPS32)", "", "\t.data"]
+        for name in sorted(self.shared):
+            lines += ["\t.align 2", f"g_{name}:\t.word 0"]
+        lines += classes
+        for table, targets in self.tables:
+            lines += ["\t.align 2", f"{table}:\t.word {', '.join(targets)}"]
+        for (lengths, values), name in self.data.items():
+            words = [str(self.word(constant_value(v))) for v in values]
+            lines += ["\t.align 2", f"{name}:\t.word {', '.join(words)}",
+                      f"{name}_lengths:\t.word {', '.join(map(str, lengths))}"]
+        for text_, name in self.strings.items():
+            lines += asm_string(name, text_)
+        for name, text_ in RUNTIME_STRINGS.items():
+            lines += asm_string(name, text_)
+        for op, name in OPERATORS.items():
+            lines += asm_string(name, op)
+        lines += ["", "\t.text", "\t.globl main"]
+        lines += text
+        with open(RUNTIME_ASSEMBLY, encoding="utf-8") as f:
+            lines += ["", f.read()]
+        return "\n".join(lines)
+
+    def emit_classes(self):
+        """
+        Descriptor de cada clase: nombre, campos, tabla de campos, valores
+        iniciales, vtable por id de método, id del campo en cada posición y
+        método de cada ranura (dirección, aridad, id; rellenas hasta la clase
+        más grande).
+        """
+        lines = []
+        n_fields = max(len(self.field_ids), 1)
+        n_selectors = max(len(self.selector_ids), 1)
+        n_offsets = max([len(cls.layout.fields) for cls in self.classes.values()] + [1])
+        n_slots = max([len(cls.layout.methods) for cls in self.classes.values()] + [1])
+        for name, cls in self.classes.items():
+            chain = class_chain(self.classes, name)
+            layout = cls.layout
+            slots = [-1] * n_fields
+            for slot, field in enumerate(layout.fields):
+                slots[self.field_ids[field]] = slot
+            vtable = ["0, 0"] * n_selectors
+            for selector, n in self.selector_ids.items():
+                for cls in chain:
+                    unit = self.methods.get((cls.name, selector))
+                    if unit is not None:
+                        vtable[n] = f"{self.function_name(unit)}, {len(unit.params)}"
+                        break
+            field_at = [self.field_ids[f] for f in layout.fields] + [-1] * (n_offsets - len(layout.fields))
+            methods = ["0, 0, -1"] * n_slots
+            for slot, (method, owner) in enumerate(zip(layout.methods, layout.owners)):
+                unit = self.methods[(owner, method)]
+                methods[slot] = f"{self.function_name(unit)}, {len(unit.params)}, {self.selector_ids[method]}"
+            init = [str(self.word(v)) for v in layout.initial] or ["0"]
+            lines += [
+                "\t.align 2",
+                f"class_{name}:\t.word {self.string(name)}, {len(layout.fields)}, class_{name}_slots, "
+                f"class_{name}_init, class_{name}_vtable, class_{name}_field_at, class_{name}_methods",
+                f"class_{name}_slots:\t.word {', '.join(map(str, slots))}",
+                f"class_{name}_init:\t.word {', '.join(init)}",
+                f"class_{name}_vtable:\t.word {', '.join(vtable)}",
+                f"class_{name}_field_at:\t.word {', '.join(map(str, field_at))}",
+                f"class_{name}_methods:\t.word {', '.join(methods)}",
+            ]
+        return lines
+
+    # ---------------- Unidades ----------------
+
+    def is_local(self, unit, x):
+        if unit.header is None:
+            return x not in self.shared
+        return x in unit.params or x in unit.locals or x == "this" or is_temp(x)
+
+    def emit_unit(self, unit, allocation=None):
+        quads = self.quads
+        self.unit = unit
+        self.allocation = allocation
+        self.position = 0
+        self.has_try = any(quads[i][0] == "ON_EXCEPTION" for i in unit.indices)
+        params = (["this"] if unit.owner_class else []) + list(unit.params)
+        names = list(params)
+        max_args = 4
+        self.uses = {}
+        pending = 0
+        for i in unit.indices:
+            quad = quads[i]
+            used = quad_uses(quad)
+            if quad[0] == "CALL_METHOD":
+                used.append(quad[1].rsplit(".", 1)[0])
+            for n in used:
+                self.uses[n] = self.uses.get(n, 0) + 1
+            for n in used + quad_defs(quad):
+                if is_name(n) and self.is_local(unit, n) and n not in names:
+                    names.append(n)
+            if quad[0] == "param":
+                pending += 1
+            elif quad[0] in CALL_OPS:
+                max_args = max(max_args, pending + 1)
+                pending = 0
+            elif quad[0] == "CONCAT":
+                max_args = max(max_args, len(quad[1]))
+        self.slots = {n: k for k, n in enumerate(names)}
+        n_slots = len(names)
+        if self.has_try:
+            self.depth_slot = f"{-12 - 4 * n_slots}($fp)"
+            n_slots += 1
+        saved = []
+        if unit.header is not None and self.allocations is not None:
+            # Con try se guardan todos: un error atrapado aquí pudo salir de una llamada que los usaba
+            saved = SAVED_REGISTERS if self.has_try else [SAVED_REGISTERS[k] for k in allocation.used_registers()]
+        saved = [(reg, f"{-12 - 4 * (n_slots + k)}($fp)") for k, reg in enumerate(saved)]
+        n_slots += len(saved)
+        frame = 8 + 4 * n_slots + 4 * max_args
+        frame = (frame + 7) & -8
+        name = self.function_name(unit)
+        self.return_label = f"{name}_ret"
+
+        lines = ["", f"\t.ent {name}", f"{name}:"]
+        body = [
+            "sw $ra, -4($sp)",
+            "sw $fp, -8($sp)",
+            "move $fp, $sp",
+            f"addiu $sp, $sp, -{frame}",
+        ]
+        for k, p in enumerate(params):
+            if k < 4:
+                body.append(f"sw $a{k}, {self.slot(p)}")
+            else:
+                body += [f"lw $t0, {4 * k}($fp)", f"sw $t0, {self.slot(p)}"]
+        # Las variables empiezan en null
+        body += [f"sw $zero, {self.slot(n)}" for n in names[len(params):]]
+        if self.has_try:
+            body += ["lw $t0, __cs_hdepth", f"sw $t0, {self.depth_slot}"]
+        body += [f"sw {reg}, {slot}" for reg, slot in saved]
+        for n, k in (allocation.entry if allocation else []):
+            if n in params and params.index(n) < 4:
+                body.append(f"move {SAVED_REGISTERS[k]}, $a{params.index(n)}")
+            elif n in params:
+                body.append(f"lw {SAVED_REGISTERS[k]}, {self.slot(n)}")
+            else:
+                body.append(f"move {SAVED_REGISTERS[k]}, $zero")
+        lines += ["\t" + line for line in body]
+
+        pending = []
+        indices = unit.indices
+        skip = set()
+        reloads = allocation.reloads if allocation else {}
+        for position, i in enumerate(indices):
+            if i in skip:
+                continue
+            self.position = position
+            quad = quads[i]
+            following = quads[indices[position + 1]] if position + 1 < len(indices) else None
+            if self.fusable(quad, following) and position + 1 not in reloads:
+                skip.add(indices[position + 1])
+                code = self.emit_compare_branch(quad, label(following[3]))
+            else:
+                code = self.emit_quad(quad, pending)
+            if position in reloads:
+                # Variables partidas que vuelven a un registro; después de la etiqueta del bloque
+                loads = [f"lw {SAVED_REGISTERS[k]}, {self.slot(n)}" for n, k in reloads[position]]
+                code = code[:1] + loads + code[1:] if quad[0] == "label" else loads + code
+            for line in code:
+                lines.append(line if line.endswith(":") else "\t" + line)
+
+        lines.append(f"{self.return_label}:")
+        epilogue = []
+        if unit.header is None:
+            epilogue += ["li $v0, 10", "syscall"]
+        else:
+            if self.has_try:
+                # Los try que sigan abiertos en esta activación dejan de valer
+                epilogue += [f"lw $t0, {self.depth_slot}", "sw $t0, __cs_hdepth"]
+            epilogue += [f"lw {reg}, {slot}" for reg, slot in saved]
+            epilogue += ["move $sp, $fp", "lw $ra, -4($sp)", "lw $fp, -8($sp)", "jr $ra"]
+        lines += ["\t" + line for line in epilogue]
+        lines.append(f"\t.end {name}")
+        return lines
+
+    def fusable(self, quad, following):
+        """'t = a < b; if t goto L' con t usado solo por el if: se emite una rama directa."""
+        op, arg1, arg2, res = quad
+        return following is not None and following[0] == "if" and generic_op(op) in COMPARISONS and arg2 is not None \
+            and following[1] == res and is_temp(res) and self.uses.get(res) == 1
+
+    # ---------------- Instrucciones ----------------
+
+    def object_checks(self, x, slow):
+        """(instrucciones, registro con x); salta a slow si x no es un objeto."""
+        lines, reg = self.read(x, "$t0")
+        return lines + [f"beq {reg}, $zero, {slow}", f"andi $t1, {reg}, 3", f"bne $t1, $zero, {slow}",
+                        f"lw $t1, 0({reg})", "li $t2, 3", f"bne $t1, $t2, {slow}"], reg
+
+    def emit_field(self, op, obj, ref, value):
+        """LOAD_FIELD/STORE_FIELD: acceso directo si la clase del objeto tiene el campo en esa posición."""
+        offset, name = ref
+        if op == "LOAD_FIELD":
+            fallback = self.emit_quad(("GET_FIELD", obj, name, None), [])
+        else:
+            fallback = self.emit_quad(("SET_FIELD", obj, name, value), [])
+        if obj is None or is_constant(obj):
+            return fallback + (self.store("$v0", value) if op == "LOAD_FIELD" else [])
+        slow, done = self.new_label(), self.new_label()
+        lines, reg = self.object_checks(obj, slow)
+        lines += [f"lw $t1, 4({reg})", f"lw $t1, {CLASS_FIELD_AT}($t1)", f"lw $t1, {4 * offset}($t1)",
+                  f"li $t2, {self.field_ids[name]}", f"bne $t1, $t2, {slow}"]
+        if op == "LOAD_FIELD":
+            lines += [f"lw $v0, {8 + 4 * offset}({reg})", f"b {done}", f"{slow}:"]
+            return lines + fallback + [f"{done}:"] + self.store("$v0", value)
+        load, source = self.read(value, "$t1")
+        lines += load + [f"sw {source}, {8 + 4 * offset}({reg})", f"b {done}", f"{slow}:"]
+        return lines + fallback + [f"{done}:"]
+
+    def call_routine(self, routine, args):
+        """Carga args en $a0.. y llama a una rutina del runtime."""
+        lines = []
+        for k, x in enumerate(args):
+            if isinstance(x, tuple):            # ("la", etiqueta) o ("li", valor)
+                lines.append(f"{x[0]} $a{k}, {x[1]}")
+            else:
+                lines += self.load(x, f"$a{k}")
+        return lines + [f"jal {routine}"]
+
+    def int_checks(self, operands, target):
+        """Salta a target si los operandos no constantes son enteros."""
+        regs = [reg for x, reg in operands if not self.constant_int(x)]
+        if not regs:
+            return [f"b {target}"]
+        if len(regs) == 2:
+            return [f"and $t3, {regs[0]}, {regs[1]}", "andi $t3, $t3, 1", f"bne $t3, $zero, {target}"]
+        return [f"andi $t3, {regs[0]}, 1", f"bne $t3, $zero, {target}"]
+
+    def element_address(self, array, index):
+        """
+        (instrucciones, registro base, desplazamiento) de array[index] sin
+        verificar el índice: los elementos empiezan en 8 y un entero etiquetado
+        2n+1 desplazado una vez da 4n+2.
+        """
+        lines, base = self.read(array, "$t0")
+        if self.constant_int(index):
+            return lines, base, 8 + 4 * constant_value(index)
+        more, i = self.read(index, "$t1")
+        return lines + more + [f"sll $t1, {i}, 1", f"addu $t1, {base}, $t1"], "$t1", 6
+
+    def emit_binary(self, op, arg1, arg2, res):
+        if op == "sconcat":
+            # Uno de los operandos es una cadena: directo a __cs_add, sin el camino de enteros
+            return self.call_routine("__cs_add", [arg1, arg2]) + self.store("$v0", res)
+        # Un '+' puede ser una concatenación, también un iadd si un operando no resulta entero
+        concat = op in ("+", "iadd")
+        op = generic_op(op)
+        if op in ("/", "%"):
+            routine = "__cs_div" if op == "/" else "__cs_mod"
+            return self.call_routine(routine, [arg1, arg2]) + self.store("$v0", res)
+        if op in ("==", "!="):
+            return self.emit_equality(op, arg1, arg2, res)
+        lines, a = self.read(arg1, "$t0")
+        more, b = self.read(arg2, "$t1")
+        lines += more
+        d = self.target(res, "$t2")
+        if op in ("&&", "||"):
+            fast = self.new_label()
+            slow = self.new_label()
+            lines += [
+                "li $t4, 2",
+                f"andi $t3, {a}, 3", f"bne $t3, $t4, {slow}",
+                f"andi $t3, {b}, 3", f"beq $t3, $t4, {fast}",
+                f"{slow}:",
+                f"move $a0, {a}", f"move $a1, {b}", f"la $a2, {OPERATORS[op]}", "jal __cs_binary_error",
+                f"{fast}:",
+                f"{'and' if op == '&&' else 'or'} {d}, {a}, {b}",
+            ]
+            return lines + self.store(d, res)
+        if any(is_constant(x) and not self.constant_int(x) for x in (arg1, arg2)):
+            # Un operando constante que no es entero: nunca hay camino rápido
+            if concat:
+                return lines + [f"move $a0, {a}", f"move $a1, {b}", "jal __cs_add"] + self.store("$v0", res)
+            return lines + [f"move $a0, {a}", f"move $a1, {b}", f"la $a2, {OPERATORS[op]}", "jal __cs_binary_error"]
+
+        fast = self.new_label()
+        lines += self.int_checks([(arg1, a), (arg2, b)], fast)
+        done = None
+        if concat:
+            done = self.new_label()
+            lines += [f"move $a0, {a}", f"move $a1, {b}", "jal __cs_add", f"move {d}, $v0", f"b {done}"]
+        else:
+            lines += [f"move $a0, {a}", f"move $a1, {b}", f"la $a2, {OPERATORS[op]}", "jal __cs_binary_error"]
+        lines.append(f"{fast}:")
+        if op == "+":
+            # (2a+1) + (2b+1) - 1 = 2(a+b) + 1
+            lines += [f"addu {d}, {a}, {b}", f"addiu {d}, {d}, -1"]
+        elif op == "-":
+            lines += [f"subu {d}, {a}, {b}", f"addiu {d}, {d}, 1"]
+        elif op == "*":
+            # a * 2b + 1
+            lines += [f"sra $t3, {a}, 1", f"addiu $t4, {b}, -1", f"mul {d}, $t3, $t4", f"addiu {d}, {d}, 1"]
+        else:
+            # El orden de las palabras etiquetadas es el de los enteros
+            swap, negate = COMPARISONS[op]
+            left, right = (b, a) if swap else (a, b)
+            lines.append(f"slt {d}, {left}, {right}")
+            if negate:
+                lines.append(f"xori {d}, {d}, 1")
+            lines += [f"sll {d}, {d}, 2", f"ori {d}, {d}, 2"]
+        if done:
+            lines.append(f"{done}:")
+        return lines + self.store(d, res)
+
+    def emit_compare_branch(self, quad, target):
+        op, arg1, arg2, res = quad
+        op = generic_op(op)
+        lines, a = self.read(arg1, "$t0")
+        more, b = self.read(arg2, "$t1")
+        lines += more
+        if any(is_constant(x) and not self.constant_int(x) for x in (arg1, arg2)):
+            return lines + [f"move $a0, {a}", f"move $a1, {b}", f"la $a2, {OPERATORS[op]}", "jal __cs_binary_error"]
+        fast = self.new_label()
+        lines += self.int_checks([(arg1, a), (arg2, b)], fast)
+        lines += [f"move $a0, {a}", f"move $a1, {b}", f"la $a2, {OPERATORS[op]}", "jal __cs_binary_error"]
+        branch = {"<": "blt", ">": "bgt", "<=": "ble", ">=": "bge"}[op]
+        return lines + [f"{fast}:", f"{branch} {a}, {b}, {target}"]
+
+    def emit_equality(self, op, arg1, arg2, res):
+        simple = any(is_constant(x) and not isinstance(constant_value(x), str) for x in (arg1, arg2))
+        if simple:
+            # Contra un entero, booleano o null basta comparar las palabras
+            lines, a = self.read(arg1, "$t0")
+            more, b = self.read(arg2, "$t1")
+            lines += more
+            d = self.target(res, "$t2")
+            lines += [f"xor {d}, {a}, {b}", f"sltiu {d}, {d}, 1", f"sll {d}, {d}, 2", f"ori {d}, {d}, 2"]
+            if op == "!=":
+                lines.append(f"xori {d}, {d}, 4")
+            return lines + self.store(d, res)
+        lines = self.call_routine("__cs_equal", [arg1, arg2])
+        if op == "!=":
+            lines.append("xori $v0, $v0, 4")
+        return lines + self.store("$v0", res)
+
+    def emit_unary(self, op, arg1, res):
+        op = generic_op(op)
+        lines, a = self.read(arg1, "$t0")
+        d = self.target(res, "$t2")
+        fast = self.new_label()
+        if op == "-":
+            lines += [f"andi $t3, {a}, 1", f"bne $t3, $zero, {fast}"]
+            operator = "__op_sub"
+            result = [f"subu {d}, $zero, {a}", f"addiu {d}, {d}, 2"]
+        else:
+            lines += [f"andi $t3, {a}, 3", "li $t4, 2", f"beq $t3, $t4, {fast}"]
+            operator = "__op_not"
+            result = [f"xori {d}, {a}, 4"]
+        lines += [f"move $a0, {a}", f"la $a1, {operator}", "jal __cs_unary_error", f"{fast}:"]
+        return lines + result + self.store(d, res)
+
+    def pop_arguments(self, params, count):
+        if count > len(params):
+            raise mips_build_error(f"Llamada con argumentos fuera de orden en {self.unit.qualified_name}")
+        args = params[len(params) - count:] if count else []
+        del params[len(params) - count:]
+        return args
+
+    def pass_arguments(self, args):
+        """$a0-$a3 y, desde el quinto, el área de argumentos en k*4($sp)."""
+        lines = []
+        for k, x in enumerate(args):
+            if k < 4:
+                lines += self.load(x, f"$a{k}")
+            else:
+                lines += self.load(x, "$t0") + [f"sw $t0, {4 * k}($sp)"]
+        return lines
+
+    def throw_constant(self, message):
+        return [f"la $a0, {self.string(message)}", "jal __cs_throw"]
+
+    def call_unit(self, callee, args, receiver=None):
+        """Llamada directa con verificación de aridad en tiempo de compilación."""
+        if len(args) != len(callee.params):
+            return self.throw_constant(f"'{callee.name}' esperaba {len(callee.params)} argumentos, recibió {len(args)}")
+        if receiver is not None:
+            args = [receiver] + args
+        return self.pass_arguments(args) + [f"jal {self.function_name(callee)}"]
+
+    def emit_quad(self, quad, params):
+        op, arg1, arg2, res = quad
+        if op == "label":
+            return [f"{label(res)}:"]
+        if op in BINARY_OPS and arg2 is not None:
+            return self.emit_binary(op, arg1, arg2, res)
+        if op in UNARY_OPS:
+            return self.emit_unary(op, arg1, res)
+        if op == "=":
+            lines, a = self.read(arg1, self.target(res, "$t0"))
+            return lines + self.store(a, res)
+        if op == "goto":
+            return [f"j {label(arg1 or res)}"]
+        if op == "if":
+            lines, a = self.read(arg1, "$t0")
+            return lines + [f"li $t1, {TRUE}", f"beq {a}, $t1, {label(res)}"]
+        if op == "JUMP_TABLE":
+            low, labels = arg2
+            table = f"_table{len(self.tables)}"
+            self.tables.append((table, [label(l) for l in labels]))
+            default = label(res)
+            lines, a = self.read(arg1, "$t0")
+            return lines + [
+                f"andi $t1, {a}, 1", f"beq $t1, $zero, {default}",
+                f"sra $t1, {a}, 1", f"addiu $t1, $t1, {-low}",
+                f"sltiu $t2, $t1, {len(labels)}", f"beq $t2, $zero, {default}",
+                "sll $t1, $t1, 2", f"la $t2, {table}", "addu $t1, $t1, $t2", "lw $t1, 0($t1)", "jr $t1",
+            ]
+        if op == "HASH_SWITCH":
+            # Sin tabla hash en MIPS: se compara contra cada cadena del switch
+            lines = []
+            for v, l in arg2:
+                lines += self.call_routine("__cs_equal", [arg1, v])
+                lines += [f"li $t0, {TRUE}", f"beq $v0, $t0, {label(l)}"]
+            return lines + [f"j {label(res)}"]
+        if op == "RETURN":
+            if self.unit.header is None:
+                return [f"j {self.return_label}"]
+            return self.load(arg1, "$v0") + [f"j {self.return_label}"]
+        if op == "[]":
+            return self.call_routine("__cs_index", [arg1, arg2]) + self.store("$v0", res)
+        if op == "[]=":
+            return self.call_routine("__cs_index_set", [res, arg2, arg1])
+        if op == "[]u":
+            lines, address, offset = self.element_address(arg1, arg2)
+            target = self.target(res, "$t2")
+            return lines + [f"lw {target}, {offset}({address})"] + self.store(target, res)
+        if op == "[]=u":
+            lines, address, offset = self.element_address(res, arg2)
+            more, value = self.read(arg1, "$t2")
+            return lines + more + [f"sw {value}, {offset}({address})"]
+        if op == "bounds":
+            return self.call_routine("__cs_bounds", [arg1, arg2])
+        if op == "alloc" and arg2 is not None:
+            data = self.array_data(arg2)
+            return (self.call_routine("__cs_alloc_data", [("la", data), ("la", f"{data}_lengths"), ("li", len(arg2[0]))])
+                    + self.store("$v0", res))
+        if op == "CONCAT":
+            # Los operandos van en el área de argumentos de la pila y la rutina arma una sola cadena
+            lines = []
+            for k, x in enumerate(arg1):
+                more, value = self.read(x, "$t0")
+                lines += more + [f"sw {value}, {4 * k}($sp)"]
+            return lines + ["move $a0, $sp", f"li $a1, {len(arg1)}", "jal __cs_concat_n"] + self.store("$v0", res)
+        if op == "alloc":
+            return self.call_routine("__cs_alloc", [arg1]) + self.store("$v0", res)
+        if op == "length":
+            return self.call_routine("__cs_length", [arg1]) + self.store("$v0", res)
+        if op == "PRINT":
+            return self.call_routine("__cs_print", [res])
+        if op == "param":
+            params.append(arg1)
+            return []
+        if op in ("CALL_FUNC", "call"):
+            args = self.pop_arguments(params, arg2)
+            callee = self.functions.get(arg1)
+            if callee is None:
+                return self.throw_constant(f"Función no definida: {arg1}")
+            return self.call_unit(callee, args) + self.store("$v0", res)
+        if op == "CALL_METHOD":
+            receiver, method = arg1.rsplit(".", 1)
+            args = self.pop_arguments(params, arg2)
+            lines = self.call_routine("__cs_lookup", [
+                receiver, ("li", self.selector_ids[method]), ("la", self.string(method)), ("li", len(args)),
+            ])
+            lines.append("move $t9, $v0")
+            return lines + self.pass_arguments([receiver] + args) + ["jalr $t9"] + self.store("$v0", res)
+        if op == "CALL_VIRTUAL":
+            slot, method, nargs = arg2
+            args = self.pop_arguments(params, nargs)
+            selector = self.selector_ids[method]
+            lookup = self.call_routine("__cs_lookup", [
+                arg1, ("li", selector), ("la", self.string(method)), ("li", len(args)),
+            ]) + ["move $t9, $v0"]
+            call = self.pass_arguments([arg1] + args) + ["jalr $t9"] + self.store("$v0", res)
+            if arg1 is None or is_constant(arg1):
+                return lookup + call
+            # Entrada de la ranura en la tabla de métodos: se usa si es el mismo método con la misma aridad
+            slow, done = self.new_label(), self.new_label()
+            lines, reg = self.object_checks(arg1, slow)
+            lines += [f"lw $t1, 4({reg})", f"lw $t1, {CLASS_METHODS}($t1)",
+                      f"lw $t2, {12 * slot + 8}($t1)", f"li $t3, {selector}", f"bne $t2, $t3, {slow}",
+                      f"lw $t2, {12 * slot + 4}($t1)", f"li $t3, {len(args)}", f"bne $t2, $t3, {slow}",
+                      f"lw $t9, {12 * slot}($t1)", f"b {done}", f"{slow}:"]
+            return lines + lookup + [f"{done}:"] + call
+        if op == "CALL_DIRECT":
+            owner, method, nargs, guard = arg2
+            callee = self.methods[(owner, method)]
+            if guard is None:
+                args = self.pop_arguments(params, nargs)
+                return self.call_unit(callee, args, receiver=arg1) + self.store("$v0", res)
+            args = params[len(params) - nargs:] if nargs else []
+            fallback = self.emit_quad(("CALL_METHOD", f"{arg1}.{method}", nargs, None), params)
+            if arg1 is None or is_constant(arg1):
+                return fallback + self.store("$v0", res)
+            # Llamada directa si la clase del objeto tiene el método en la ranura; si no, por nombre
+            slow, done = self.new_label(), self.new_label()
+            lines, reg = self.object_checks(arg1, slow)
+            lines += [f"lw $t1, 4({reg})", f"lw $t1, {CLASS_METHODS}($t1)", f"lw $t2, {12 * guard + 8}($t1)",
+                      f"li $t3, {self.selector_ids[method]}", f"bne $t2, $t3, {slow}"]
+            lines += self.call_unit(callee, args, receiver=arg1) + [f"b {done}", f"{slow}:"]
+            return lines + fallback + [f"{done}:"] + self.store("$v0", res)
+        if op == "ALLOC_OBJ":
+            if arg1 not in self.classes:
+                raise mips_build_error(f"Clase no definida: {arg1}")
+            return [f"la $a0, class_{arg1}", "jal __cs_new_object"] + self.store("$v0", res)
+        if op == "CALL_CONSTRUCTOR":
+            args = self.pop_arguments(params, arg2)
+            for cls in class_chain(self.classes, arg1):
+                constructor = self.methods.get((cls.name, "constructor"))
+                if constructor is not None:
+                    return self.call_unit(constructor, args, receiver=res)
+            return []
+        if op == "GET_FIELD":
+            is_size = int(arg2 in ("size", "length"))
+            return self.call_routine("__cs_get_field", [
+                arg1, ("li", self.field_ids[arg2]), ("la", self.string(arg2)), ("li", is_size),
+            ]) + self.store("$v0", res)
+        if op == "SET_FIELD":
+            return self.call_routine("__cs_set_field", [
+                arg1, ("li", self.field_ids[arg2]), ("la", self.string(arg2)), res,
+            ])
+        if op in ("LOAD_FIELD", "STORE_FIELD"):
+            return self.emit_field(op, arg1, arg2, res)
+        if op == "ON_EXCEPTION":
+            return [f"la $a0, {label(res)}", "jal __cs_push_handler"]
+        if op == "END_TRY":
+            return [f"lw $a0, {self.depth_slot}", "jal __cs_end_try"]
+        if op == "EXC_ASSIGN":
+            return ["lw $t0, __cs_error"] + self.store("$t0", res)
+        raise mips_build_error(f"Instrucción TAC no soportada por el backend de MIPS: {op}")
+
+
+def mips_source(quads, registers=len(SAVED_REGISTERS), report=None, allocator="linear"):
+    """
+    Ensamblador del programa. allocator es "linear" o "coloring" (ver
+    tac_regalloc.py); si se pasa report (un flujo), se escribe ahí la
+    asignación de registros.
+    """
+    emitter = mips_emitter(quads, registers, allocator)
+    source = emitter.emit()
+    if report is not None and emitter.allocations is not None:
+        print(format_allocation_report(emitter.allocations), file=report)
+    return source
+
+
+def run_mips(quads, output=sys.stdout, profile=None, registers=len(SAVED_REGISTERS), report=None,
+             allocator="linear"):
+    """
+    Ejecuta el programa en el simulador de MIPS. Un error no atrapado sale con
+    código 1 y su mensaje en la salida de errores del programa; aquí se
+    convierte en compiscript_error como en los demás motores. Si se pasa
+    profile (un flujo), se escribe ahí el perfil por función.
+    """
+    errors = io.StringIO()
+    simulator = mips_simulator(mips_source(quads, registers, report, allocator), output, errors)
+    code = simulator.run()
+    if profile is not None:
+        print(simulator.format_profile(), file=profile)
+    message = errors.getvalue()
+    if code != 0:
+        if message.startswith(ERROR_PREFIX):
+            message = message[len(ERROR_PREFIX):]
+        raise compiscript_error(message.rstrip("\n"))
+    return simulator
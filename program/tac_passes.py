@@ -0,0 +1,930 @@
+"""
+Pasadas de optimización sobre los cuádruplos. Cada pasada recibe la lista de
+cuádruplos y el pass_manager (para pedir análisis ya calculados) y devuelve una
+lista nueva. Las pasadas se registran en PASSES con los análisis que preservan.
+"""
+from tac_analysis import (
+    BINARY_OPS, UNARY_OPS, CALL_OPS, TRAPPING_OPS, INDEX_LOADS, INDEX_STORES, is_constant, is_temp, is_name, is_label, label_name,
+    split_units, global_names, jump_targets, quad_defs, quad_uses, operand_names, is_pure, natural_loops,
+    reachable_units, dominates, generic_op, try_regions,
+)
+from tac_runtime import (
+    compiscript_error, constant_value, format_constant, binary_op, unary_op, to_text,
+)
+from object_layout import compute_layouts, shapes_from_quads, implementation, slot_implementation, method_slot
+
+
+class tac_pass():
+    def __init__(self, name, function, preserves=(), description=""):
+        self.name = name
+        self.function = function
+        self.preserves = tuple(preserves)
+        self.description = description
+
+    def run(self, quads, manager):
+        return self.function(quads, manager)
+
+
+# ---------------- Evaluación de constantes ----------------
+
+def fold_binary(op, a, b):
+    """Evalúa op con la misma semántica que el runtime; None si no se puede plegar."""
+    try:
+        return binary_op(op, a, b)
+    except compiscript_error:
+        # La operación falla al correr (p. ej. división entre cero): se deja para el runtime
+        return None
+
+
+def fold_unary(op, a):
+    try:
+        return unary_op(op, a)
+    except compiscript_error:
+        return None
+
+
+def substitute_uses(quad, env):
+    """Reemplaza los operandos leídos que tienen un valor conocido en env."""
+    op, arg1, arg2, res = quad
+
+    def sub(x):
+        return env.get(x, x) if isinstance(x, str) else x
+
+    if op in BINARY_OPS or op in UNARY_OPS:
+        return (op, sub(arg1), sub(arg2), res)
+    if op in ("=", "if", "RETURN", "param", "JUMP_TABLE", "HASH_SWITCH"):
+        return (op, sub(arg1), arg2, res)
+    if op in INDEX_LOADS:
+        return (op, arg1, sub(arg2), res)
+    if op == "bounds":
+        return (op, sub(arg1), sub(arg2), res)
+    if op in INDEX_STORES:
+        return (op, sub(arg1), sub(arg2), res)
+    if op in ("PRINT", "SET_FIELD", "STORE_FIELD"):
+        return (op, arg1, arg2, sub(res))
+    if op == "CONCAT":
+        return (op, tuple(sub(x) for x in arg1), arg2, res)
+    return quad
+
+
+def fold_concat(quad):
+    """
+    Une los literales vecinos de un CONCAT. El primer par se pliega como un
+    sconcat; desde ahí el resultado parcial es una cadena y basta unir el texto.
+    Con un operando queda una copia y con dos un sconcat.
+    """
+    _, parts, _, res = quad
+    merged = [parts[0]]
+    for x in parts[1:]:
+        if is_constant(x) and is_constant(merged[-1]):
+            a, b = constant_value(merged[-1]), constant_value(x)
+            value = fold_binary("sconcat", a, b) if len(merged) == 1 else to_text(a) + to_text(b)
+            if isinstance(value, str):
+                merged[-1] = format_constant(value)
+                continue
+        merged.append(x)
+    if len(merged) == 1:
+        return ("=", merged[0], None, res)
+    if len(merged) == 2:
+        return ("sconcat", merged[0], merged[1], res)
+    return ("CONCAT", tuple(merged), None, res)
+
+
+def kill(env, name):
+    env.pop(name, None)
+    for key in [k for k, v in env.items() if v == name]:
+        del env[key]
+
+
+def in_bounds(quad):
+    """Un bounds con índice y largo constantes que nunca falla."""
+    _, index, length, _ = quad
+    if not (is_constant(index) and is_constant(length)):
+        return False
+    index, length = constant_value(index), constant_value(length)
+    return type(index) is int and type(length) is int and 0 <= index < length
+
+
+def repeated_bounds(quads, block):
+    """Posiciones de bounds ya verificados antes en el bloque (sin redefinir sus operandos)."""
+    checked = set()
+    repeated = []
+    for i in block.indices:
+        quad = quads[i]
+        if quad[0] == "bounds":
+            if quad[1:3] in checked:
+                repeated.append(i)
+            checked.add(quad[1:3])
+        elif quad[0] in CALL_OPS:
+            checked = {c for c in checked if all(not is_name(x) or is_temp(x) for x in c)}
+        for name in quad_defs(quad):
+            checked = {c for c in checked if name not in c}
+    return repeated
+
+
+# ---------------- Pasadas ----------------
+
+def const_fold(quads, manager):
+    """Propagación local de constantes y copias, y plegado de operaciones constantes."""
+    cfg = manager.get_analysis("cfg")
+    out = list(quads)
+    for unit in cfg.units:
+        for block in unit.blocks:
+            env = {}
+            for i in block.indices:
+                quad = substitute_uses(out[i], env)
+                op, arg1, arg2, res = quad
+                if op in BINARY_OPS and arg2 is not None and is_constant(arg1) and is_constant(arg2):
+                    value = fold_binary(op, constant_value(arg1), constant_value(arg2))
+                    if value is not None:
+                        quad = ("=", format_constant(value), None, res)
+                elif op in UNARY_OPS and arg2 is None and is_constant(arg1):
+                    value = fold_unary(op, constant_value(arg1))
+                    if value is not None:
+                        quad = ("=", format_constant(value), None, res)
+                elif op == "CONCAT":
+                    quad = fold_concat(quad)
+                out[i] = quad
+
+                op, arg1, arg2, res = quad
+                if op in CALL_OPS:
+                    # Una llamada puede modificar cualquier variable global
+                    for key in [k for k, v in env.items() if not is_temp(k) or (is_name(v) and not is_temp(v))]:
+                        del env[key]
+                for name in quad_defs(quad):
+                    kill(env, name)
+                if op == "=" and is_name(res):
+                    if is_constant(arg1):
+                        env[res] = arg1
+                    elif is_temp(res) and is_name(arg1) and arg1 != res:
+                        env[res] = arg1
+    return out
+
+
+def branch_fold(quads, manager):
+    """Convierte saltos con condición o selector constante en goto o los elimina."""
+    out = []
+    for quad in quads:
+        op, arg1, arg2, res = quad
+        if op == "if" and arg1 in ("true", "false"):
+            if arg1 == "true":
+                out.append(("goto", res, None, None))
+            continue
+        if op == "JUMP_TABLE" and is_constant(arg1) and not isinstance(constant_value(arg1), bool):
+            low, labels = arg2
+            value = constant_value(arg1)
+            target = labels[value - low] if isinstance(value, int) and 0 <= value - low < len(labels) else res
+            out.append(("goto", target, None, None))
+            continue
+        if op == "HASH_SWITCH" and is_constant(arg1):
+            target = dict(arg2).get(arg1, res)
+            out.append(("goto", target, None, None))
+            continue
+        out.append(quad)
+    return out
+
+
+COALESCIBLE_OPS = BINARY_OPS | UNARY_OPS | {"[]", "[]u", "length", "GET_FIELD", "LOAD_FIELD", "alloc", "call", "CALL_FUNC",
+                                "CALL_METHOD", "CALL_VIRTUAL", "CALL_DIRECT", "CONCAT"}
+
+
+def copy_coalesce(quads, manager):
+    """
+    Fusiona 't = a op b' seguido de 'x = t' en 'x = a op b' cuando t muere ahí.
+    Es el patrón que deja el generador después de cada declaración y asignación.
+    """
+    cfg = manager.get_analysis("cfg")
+    liveness = manager.get_analysis("liveness")
+    out = list(quads)
+    removed = set()
+    for unit in cfg.units:
+        for block in unit.blocks:
+            for pos in range(len(block.indices) - 1):
+                i, j = block.indices[pos], block.indices[pos + 1]
+                if i in removed:
+                    continue
+                first, second = out[i], out[j]
+                if first[0] not in COALESCIBLE_OPS or not is_temp(first[3]):
+                    continue
+                if second[0] != "=" or second[1] != first[3] or not is_name(second[3]):
+                    continue
+                if first[3] in liveness.live_after(out, block, pos + 1):
+                    continue
+                out[i] = (first[0], first[1], first[2], second[3])
+                removed.add(j)
+    return [q for n, q in enumerate(out) if n not in removed]
+
+
+def jump_thread(quads, manager):
+    """Redirige saltos a cadenas de goto y elimina goto a la instrucción siguiente."""
+    label_pos = {}
+    for n, quad in enumerate(quads):
+        if is_label(quad):
+            label_pos[label_name(quad[3])] = n
+
+    def final_target(label):
+        seen = set()
+        while label in label_pos and label not in seen:
+            seen.add(label)
+            n = label_pos[label] + 1
+            while n < len(quads) and is_label(quads[n]):
+                n += 1
+            if n < len(quads) and quads[n][0] == "goto":
+                label = label_name(quads[n][1] or quads[n][3])
+            else:
+                break
+        return label
+
+    out = []
+    for quad in quads:
+        op, arg1, arg2, res = quad
+        if op == "goto":
+            out.append(("goto", final_target(label_name(arg1 or res)), None, None))
+        elif op == "if":
+            out.append((op, arg1, arg2, final_target(label_name(res))))
+        elif op == "JUMP_TABLE":
+            low, labels = arg2
+            out.append((op, arg1, (low, tuple(final_target(label_name(l)) for l in labels)), final_target(label_name(res))))
+        elif op == "HASH_SWITCH":
+            out.append((op, arg1, tuple((v, final_target(label_name(l))) for v, l in arg2), final_target(label_name(res))))
+        else:
+            out.append(quad)
+
+    result = []
+    for n, quad in enumerate(out):
+        if quad[0] == "goto":
+            k = n + 1
+            falls_into = False
+            while k < len(out) and is_label(out[k]):
+                if label_name(out[k][3]) == quad[1]:
+                    falls_into = True
+                    break
+                k += 1
+            if falls_into:
+                continue
+        result.append(quad)
+    return result
+
+
+def unreachable(quads, manager):
+    """Elimina los bloques básicos a los que no se puede llegar desde la entrada de su unidad."""
+    cfg = manager.get_analysis("cfg")
+    dead = set()
+    for unit in cfg.units:
+        if not unit.blocks:
+            continue
+        reached = {unit.blocks[0]}
+        stack = [unit.blocks[0]]
+        while stack:
+            for succ in stack.pop().succs:
+                if succ not in reached:
+                    reached.add(succ)
+                    stack.append(succ)
+        for block in unit.blocks:
+            if block not in reached:
+                dead.update(block.indices)
+    # Las etiquetas que todavía son destino de un salto vivo se conservan
+    targets = set()
+    for n, quad in enumerate(quads):
+        if n not in dead:
+            targets.update(jump_targets(quad))
+    return [q for n, q in enumerate(quads) if n not in dead or (is_label(q) and label_name(q[3]) in targets)]
+
+
+def dce(quads, manager):
+    """
+    Elimina definiciones puras de temporales que no se usan después (según vida
+    de variables), las copias 'x = x' y los bounds que no pueden fallar: con
+    índice constante en rango o repetidos en el bloque.
+    """
+    cfg = manager.get_analysis("cfg")
+    liveness = manager.get_analysis("liveness")
+    removed = set()
+    for unit in cfg.units:
+        for block in unit.blocks:
+            removed.update(repeated_bounds(quads, block))
+            live = set(liveness.live_out[block])
+            for i in reversed(block.indices):
+                quad = quads[i]
+                if i in removed or quad[0] == "bounds" and in_bounds(quad) or quad[0] == "=" and quad[1] == quad[3]:
+                    removed.add(i)
+                    continue
+                defs = quad_defs(quad)
+                if defs and is_pure(quad) and all(is_temp(d) and d not in live for d in defs):
+                    removed.add(i)
+                    continue
+                live.difference_update(defs)
+                live.update(quad_uses(quad))
+    return [q for n, q in enumerate(quads) if n not in removed]
+
+
+# "+" no: la concatenación de cadenas depende del orden
+COMMUTATIVE_OPS = {"*", "==", "!=", "&&", "||", "iadd", "imul", "icmp_eq", "icmp_ne", "band", "bor"}
+
+
+def local_cse(quads, manager):
+    """Eliminación de subexpresiones comunes dentro de cada bloque básico."""
+    cfg = manager.get_analysis("cfg")
+    out = list(quads)
+    for unit in cfg.units:
+        for block in unit.blocks:
+            available = {}
+            for i in block.indices:
+                quad = out[i]
+                op, arg1, arg2, res = quad
+                key = None
+                if (op in BINARY_OPS or op in UNARY_OPS) and op not in TRAPPING_OPS and is_name(res):
+                    operands = (arg1, arg2)
+                    if op in COMMUTATIVE_OPS and str(arg1) > str(arg2):
+                        operands = (arg2, arg1)
+                    key = (op,) + operands
+                    if key in available and available[key] != res:
+                        out[i] = ("=", available[key], None, res)
+                if op in CALL_OPS:
+                    available = {k: v for k, v in available.items()
+                                 if is_temp(v) and all(not is_name(x) or is_temp(x) for x in k[1:])}
+                for name in quad_defs(out[i]):
+                    available = {k: v for k, v in available.items() if v != name and name not in k[1:]}
+                if key is not None and res not in key[1:] and is_temp(res):
+                    available.setdefault(key, res)
+    return out
+
+
+# Un valor de cada tipo: una operación sin división da error o no según el tipo de sus operandos
+TYPE_SAMPLES = {int: 1, bool: True, str: "a"}
+
+
+def hoisted_sample(op, arg1, arg2, samples):
+    """
+    Valor de ejemplo del resultado de op si la operación no puede fallar, o None
+    si puede. Cada operando debe ser un literal o un temporal ya sacado del lazo
+    (samples: temporal -> valor de ejemplo de su tipo): leer una variable puede
+    fallar si no está inicializada y su tipo al correr no se conoce.
+    """
+    def sample(x):
+        if x is None or is_constant(x):
+            return constant_value(x)
+        return samples[x]
+
+    if any(x is not None and not is_constant(x) and x not in samples for x in (arg1, arg2)):
+        return None
+    if op in UNARY_OPS and arg2 is None:
+        value = fold_unary(op, sample(arg1))
+    else:
+        value = fold_binary(op, sample(arg1), sample(arg2))
+    return None if value is None else TYPE_SAMPLES[type(value)]
+
+
+def licm(quads, manager):
+    """
+    Saca de los lazos naturales los cálculos de temporales cuyos operandos no
+    cambian dentro del lazo. El código se coloca justo antes de la etiqueta de
+    la cabecera, que solo se alcanza por caída desde el bloque anterior, así que
+    corre aunque el cuerpo no se ejecute: solo se sacan operaciones que no
+    pueden fallar (ver hoisted_sample) y nunca fuera del try que las protege.
+    """
+    cfg = manager.get_analysis("cfg")
+    dominators = manager.get_analysis("dominators")
+    liveness = manager.get_analysis("liveness")
+    hoisted = {}     # posición de la etiqueta de cabecera -> [índices movidos]
+    moved = set()
+    for unit in cfg.units:
+        idom = dominators[unit]
+        loops = sorted(natural_loops(unit, idom), key=lambda item: -len(item[1]))
+        for header, body in loops:
+            outside = [p for p in header.preds if p not in body]
+            if len(outside) != 1 or header.index == 0:
+                continue
+            pre = outside[0]
+            if pre is not unit.blocks[header.index - 1] or quads[pre.indices[-1]][0] in ("goto", "if", "JUMP_TABLE", "HASH_SWITCH", "RETURN", "ON_EXCEPTION"):
+                continue
+            if not is_label(quads[header.indices[0]]):
+                continue
+            start = header.indices[0]
+            regions = try_regions(quads, unit)
+
+            def same_try(i):
+                return all((lo <= i < hi) == (lo <= start < hi) for lo, hi, _ in regions)
+
+            loop_indices = sorted(i for b in body for i in b.indices if i not in moved)
+            def_count = {}
+            for i in loop_indices:
+                for name in quad_defs(quads[i]):
+                    def_count[name] = def_count.get(name, 0) + 1
+            exit_live = set()
+            for b in body:
+                for succ in b.succs:
+                    if succ not in body:
+                        exit_live |= liveness.live_in[succ]
+
+            changed = True
+            chosen = []
+            samples = {}
+            while changed:
+                changed = False
+                for i in loop_indices:
+                    if i in moved:
+                        continue
+                    op, arg1, arg2, res = quads[i]
+                    if not (op in BINARY_OPS or op in UNARY_OPS) or op in TRAPPING_OPS or not is_temp(res):
+                        continue
+                    if def_count.get(res) != 1 or res in liveness.live_in[header] or res in exit_live:
+                        continue
+                    # Los operandos son literales o temporales ya sacados: no cambian dentro del lazo
+                    sample = hoisted_sample(op, arg1, arg2, samples)
+                    if sample is not None and same_try(i):
+                        samples[res] = sample
+                        moved.add(i)
+                        chosen.append(i)
+                        del def_count[res]
+                        changed = True
+            if chosen:
+                hoisted.setdefault(header.indices[0], []).extend(sorted(chosen))
+
+    out = []
+    for n, quad in enumerate(quads):
+        for i in hoisted.get(n, []):
+            out.append(quads[i])
+        if n not in moved:
+            out.append(quad)
+    return out
+
+
+# ---------------- Grafo de llamadas ----------------
+
+def dead_functions(quads, manager):
+    """
+    Elimina lo que el programa principal no puede ejecutar según el grafo de
+    llamadas (ver reachable_units): funciones completas y clases de las que
+    nunca se crea un objeto, con sus métodos. A un método no alcanzado de una
+    clase viva solo se le vacía el cuerpo: conserva su ranura en la vtable,
+    porque las llamadas virtuales ya tienen el número de ranura.
+    """
+    graph = manager.get_analysis("callgraph")
+    reached, live = reachable_units(graph)
+    removed = set()
+    for name, unit in graph.units.items():
+        if unit.header is None or name in reached or unit.owner_class and unit.owner_class not in live:
+            continue
+        if unit.owner_class:
+            removed.update(unit.indices)
+        else:
+            removed.update(range(unit.header, unit.end + 1))
+    start = None
+    for i, quad in enumerate(quads):
+        if quad[0] == "CLASS":
+            start = i
+        elif quad[0] == "ENDCLASS" and start is not None:
+            if quads[start][1] not in live:
+                removed.update(range(start, i + 1))
+            start = None
+    if not removed:
+        return quads
+    return [q for i, q in enumerate(quads) if i not in removed]
+
+
+# ---------------- Llamadas a métodos ----------------
+
+def devirtualize(quads, manager):
+    """
+    Análisis de jerarquía de clases: una llamada a método con un único destino
+    posible en todo el programa se vuelve CALL_DIRECT recv, (Clase, método, n, guarda), t.
+
+    - Sobre 'this' en un método de C basta con que ninguna subclase de C
+      redefina el método: 'this' siempre es un objeto de C o de una subclase,
+      así que la llamada no necesita guarda (guarda None).
+    - Sobre cualquier otro objeto el tipo declarado no garantiza su clase; si
+      todas las clases que tienen el método en su ranura comparten la
+      implementación, la guarda es la ranura: el motor verifica que la clase
+      del objeto tenga el método ahí y, si no, lo busca por nombre.
+
+    Solo se cambia la llamada si la cantidad de argumentos coincide con la del
+    método, para no adelantar el error de aridad.
+    """
+    layouts = compute_layouts(shapes_from_quads(quads))
+    if not layouts:
+        return quads
+    units = split_units(quads)
+    arity = {(u.owner_class, u.name): len(u.params) for u in units if u.owner_class}
+    out = list(quads)
+    for unit in units:
+        for i in unit.indices:
+            op, arg1, arg2, res = quads[i]
+            if op == "CALL_VIRTUAL":
+                receiver, (slot, method, nargs) = arg1, arg2
+            elif op == "CALL_METHOD":
+                receiver, method = arg1.rsplit(".", 1)
+                slot, nargs = method_slot(layouts, method), arg2
+            else:
+                continue
+            owner, guard = None, None
+            if receiver == "this" and unit.owner_class:
+                owner = implementation(layouts, unit.owner_class, method)
+            if owner is None and slot is not None:
+                owner, guard = slot_implementation(layouts, slot, method), slot
+            if owner is not None and arity.get((owner, method)) == nargs:
+                out[i] = ("CALL_DIRECT", receiver, (owner, method, nargs, guard), res)
+    return out
+
+
+# ---------------- Objetos que no escapan ----------------
+
+FIELD_READS = ("GET_FIELD", "LOAD_FIELD")
+FIELD_WRITES = ("SET_FIELD", "STORE_FIELD")
+
+
+def field_name(quad):
+    return quad[2][1] if quad[0] in ("LOAD_FIELD", "STORE_FIELD") else quad[2]
+
+
+def constructor_effect(quads, layouts, constructors, class_name, nargs):
+    """
+    [(campo, operando)] que deja el constructor de class_name, donde operando
+    es ("param", k) o una constante; None si el constructor hace algo más que
+    asignar parámetros o constantes a campos de this (o la aridad no coincide).
+    """
+    cls = class_name
+    while cls in layouts and (cls, "constructor") not in constructors:
+        cls = layouts[cls].parent
+    unit = constructors.get((cls, "constructor"))
+    if unit is None:
+        return [] if nargs == 0 else None
+    if len(unit.params) != nargs:
+        return None
+    effect = []
+    for i in unit.indices:
+        op, arg1, arg2, res = quads[i]
+        if op not in FIELD_WRITES or arg1 != "this" or field_name(quads[i]) not in layouts[class_name].offsets:
+            return None
+        if res in unit.params:
+            effect.append((field_name(quads[i]), ("param", unit.params.index(res))))
+        elif is_constant(res):
+            effect.append((field_name(quads[i]), res))
+        else:
+            return None
+    return effect
+
+
+def object_accesses(quads, block, start, layout, shared, live_out):
+    """
+    Recorre el bloque desde la instrucción que sigue a la creación del objeto
+    (block.indices[start]) y devuelve las posiciones de las copias y de los
+    accesos a campos, o None si el objeto escapa: se pasa a una llamada, se
+    guarda en un arreglo o en otro objeto, se imprime, se compara, se devuelve,
+    se copia a una variable global o sigue vivo al salir del bloque.
+    """
+    aliases = {quads[block.indices[start]][3]}
+    accesses = []
+    for i in block.indices[start + 1:]:
+        quad = quads[i]
+        op, arg1, arg2, res = quad
+        if op == "=" and arg1 in aliases and is_name(res):
+            if res in shared:
+                return None
+            aliases.add(res)
+            accesses.append(i)
+            continue
+        if op in FIELD_READS + FIELD_WRITES and arg1 in aliases:
+            if field_name(quad) not in layout.offsets or op in FIELD_WRITES and res in aliases:
+                return None
+            accesses.append(i)
+            aliases.difference_update(quad_defs(quad))
+            continue
+        if op == "CALL_CONSTRUCTOR" and res in aliases:
+            return None
+        if aliases & set(quad_uses(quad)) or op == "CALL_METHOD" and operand_names(arg1)[0] in aliases:
+            return None
+        aliases.difference_update(quad_defs(quad))
+    if aliases & live_out:
+        return None
+    return accesses
+
+
+def scalar_replace(quads, manager):
+    """
+    Análisis de escape y reemplazo escalar: un objeto que se crea, se usa y se
+    descarta dentro de un mismo bloque básico sin escapar (ver object_accesses)
+    no se reserva. Cada campo pasa a un temporal: 'ALLOC_OBJ' inicializa los
+    temporales con los valores iniciales de la clase, el constructor se
+    reemplaza por su efecto (si solo asigna parámetros o constantes a campos),
+    y las lecturas y escrituras de campos se vuelven copias que const_fold y
+    copy_coalesce limpian después.
+    """
+    layouts = compute_layouts(shapes_from_quads(quads))
+    if not layouts:
+        return quads
+    cfg = manager.get_analysis("cfg")
+    liveness = manager.get_analysis("liveness")
+    shared = global_names(quads, cfg.units)
+    constructors = {(u.owner_class, u.name): u for u in cfg.units if u.owner_class and u.name == "constructor"}
+    temps = [int(x[1:]) for q in quads for x in q if is_temp(x)]
+    counter = [max(temps, default=0)]
+
+    def new_temp():
+        counter[0] += 1
+        return f"t{counter[0]}"
+
+    replaced = {}           # posición -> cuádruplos que la reemplazan (lista vacía: se elimina)
+    for unit in cfg.units:
+        for block in unit.blocks:
+            for k, i in enumerate(block.indices):
+                op, class_name, _, obj = quads[i]
+                if op != "ALLOC_OBJ" or class_name not in layouts or k + 1 >= len(block.indices):
+                    continue
+                call = quads[block.indices[k + 1]]
+                if call[0] != "CALL_CONSTRUCTOR" or call[3] != obj or k < call[2]:
+                    continue
+                args = [quads[j] for j in block.indices[k - call[2]:k]]
+                if any(q[0] != "param" for q in args):
+                    continue
+                effect = constructor_effect(quads, layouts, constructors, class_name, call[2])
+                layout = layouts[class_name]
+                accesses = object_accesses(quads, block, k + 1, layout, shared, liveness.live_out[block])
+                if effect is None or accesses is None:
+                    continue
+                fields = {f: new_temp() for f in layout.fields}
+                replaced[i] = [("=", format_constant(v), None, fields[f]) for f, v in zip(layout.fields, layout.initial)]
+                for j in block.indices[k - call[2]:k]:
+                    replaced[j] = []
+                replaced[block.indices[k + 1]] = [
+                    ("=", args[v[1]][1] if isinstance(v, tuple) else v, None, fields[f]) for f, v in effect]
+                for j in accesses:
+                    access_op, arg1, _, res = quads[j]
+                    if access_op in FIELD_READS:
+                        replaced[j] = [("=", fields[field_name(quads[j])], None, res)]
+                    elif access_op in FIELD_WRITES:
+                        replaced[j] = [("=", res, None, fields[field_name(quads[j])])]
+                    else:
+                        replaced[j] = []
+    if not replaced:
+        return quads
+    out = []
+    for i, quad in enumerate(quads):
+        out.extend(replaced.get(i, [quad]))
+    return out
+
+
+# ---------------- Límites de arreglos ----------------
+
+class index_ranges():
+    """
+    Intervalos de los enteros de una unidad, para demostrar que un índice cae
+    dentro de su arreglo. Un intervalo es (bajo, alto, arreglo): sin arreglo,
+    bajo <= x <= alto; con arreglo = (nombre, cabecera de un lazo), bajo <= x
+    y x <= largo del arreglo + alto mientras se está dentro de ese lazo.
+
+    Los intervalos salen de constantes, de +, - y * con operandos acotados y
+    de las variables de inducción de lazos 'while (i < límite)' que solo
+    crecen ('i = i + k' con k >= 0). El límite es una constante, un valor
+    acotado o el 'length' de un arreglo calculado justo antes del lazo (el
+    foreach), siempre que ni el límite ni el arreglo cambien dentro del lazo.
+    Cada uso se resuelve con su única definición alcanzante; si hay más de
+    una, el valor no se acota.
+    """
+    MAX_DEPTH = 16
+
+    def __init__(self, quads, unit, idom, shared):
+        self.quads = quads
+        self.unit = unit
+        self.idom = idom
+        self.shared = shared
+        self.own = set(unit.params) | set(unit.locals) | {"this"}
+        self.position = {i: (block, k) for block in unit.blocks for k, i in enumerate(block.indices)}
+        # Lazos de adentro hacia afuera
+        self.loops = sorted(natural_loops(unit, idom), key=lambda item: len(item[1]))
+        self.bodies = dict(self.loops)
+        self.inductions = {}
+        self.definitions = {}
+
+    def global_name(self, name):
+        """Una llamada puede cambiar las variables globales."""
+        if is_temp(name):
+            return False
+        return name in self.shared if self.unit.header is None else name not in self.own
+
+    def clobbers(self, quad, name):
+        return name in quad_defs(quad) or quad[0] in CALL_OPS and self.global_name(name)
+
+    def reaching_def(self, name, block, k):
+        """Única definición de name que llega antes de block.indices[k]: posición, "entry" o None."""
+        key = (name, block.index, k)
+        if key not in self.definitions:
+            self.definitions[key] = self.find_def(name, block, k)
+        return self.definitions[key]
+
+    def find_def(self, name, block, k):
+        while True:
+            for i in reversed(block.indices[:k]):
+                if self.clobbers(self.quads[i], name):
+                    return i if name in quad_defs(self.quads[i]) else None
+            parent = self.idom.get(block)
+            if parent is None:
+                return None
+            if parent is block:
+                return "entry"
+            # Bloques por los que se llega a block desde su dominador inmediato
+            between = set()
+            stack = list(block.preds)
+            while stack:
+                b = stack.pop()
+                if b is parent or b in between or b not in self.idom:
+                    continue
+                between.add(b)
+                stack.extend(b.preds)
+            if any(self.clobbers(self.quads[i], name) for b in between for i in b.indices):
+                return None
+            block, k = parent, len(parent.indices)
+
+    def clobbered_in(self, name, blocks):
+        return any(self.clobbers(self.quads[i], name) for b in blocks for i in b.indices)
+
+    def induction(self, header, body):
+        if header not in self.inductions:
+            self.inductions[header] = None      # evita ciclos mientras se calcula
+            self.inductions[header] = self.find_induction(header, body)
+        return self.inductions[header]
+
+    def find_induction(self, header, body):
+        """(variable, intervalo, bloque del cuerpo, incrementos) de 'cabecera: t = i < límite; if t goto cuerpo'."""
+        if len(header.indices) < 2:
+            return None
+        branch = self.quads[header.indices[-1]]
+        compare = self.quads[header.indices[-2]]
+        if branch[0] != "if" or generic_op(compare[0]) != "<" or compare[3] != branch[1]:
+            return None
+        entry = self.unit.label_block.get(label_name(branch[3]))
+        outside = [p for p in header.preds if p not in body]
+        if entry is None or entry not in body or entry.preds != [header] or len(outside) != 1:
+            return None
+        _, var, bound, _ = compare
+        pre = outside[0]
+        end = len(pre.indices)
+        if not is_name(var):
+            return None
+        increments = []
+        for b in body:
+            for k, i in enumerate(b.indices):
+                quad = self.quads[i]
+                if not self.clobbers(quad, var):
+                    continue
+                op, arg1, arg2, res = quad
+                if generic_op(op) != "+" or res != var or arg1 != var or not is_constant(arg2):
+                    return None
+                step = constant_value(arg2)
+                if type(step) is not int or step < 0:
+                    return None
+                increments.append((b, k))
+        start = self.range_at(var, pre, end)
+        if start is None or start[0] < 0:
+            return None
+        if is_name(bound) and self.clobbered_in(bound, body):
+            return None
+        d = self.reaching_def(bound, pre, end) if is_name(bound) else None
+        if isinstance(d, int) and self.quads[d][0] == "length" and self.position[d][0] is pre:
+            array = self.quads[d][1]
+            after = [self.quads[i] for i in pre.indices[self.position[d][1] + 1:]]
+            if not is_name(array) or self.clobbered_in(array, body) or any(self.clobbers(q, array) for q in after):
+                return None
+            return var, (start[0], -1, (array, header)), entry, increments
+        limit = self.range_at(bound, pre, end)
+        if limit is None or limit[2] is not None:
+            return None
+        return var, (start[0], limit[1] - 1, None), entry, increments
+
+    def incremented_before(self, body, header, increments, block, k):
+        """True si algún incremento puede ejecutarse entre la cabecera y block.indices[k]."""
+        for b, j in increments:
+            if b is block and j < k:
+                return True
+            seen = set()
+            stack = [s for s in b.succs if s in body and s is not header]
+            while stack:
+                s = stack.pop()
+                if s is block:
+                    return True
+                if s in seen:
+                    continue
+                seen.add(s)
+                stack.extend(n for n in s.succs if n in body and n is not header)
+        return False
+
+    def range_at(self, x, block, k, depth=0):
+        """Intervalo de x antes de block.indices[k], o None si no se puede acotar."""
+        if is_constant(x):
+            value = constant_value(x)
+            return (value, value, None) if type(value) is int else None
+        if not is_name(x) or depth > self.MAX_DEPTH:
+            return None
+        for header, body in self.loops:
+            if block not in body:
+                continue
+            info = self.induction(header, body)
+            if info is None or info[0] != x:
+                continue
+            var, interval, entry, increments = info
+            if dominates(self.idom, entry, block) and not self.incremented_before(body, header, increments, block, k):
+                return interval
+        d = self.reaching_def(x, block, k)
+        if not isinstance(d, int):
+            return None
+        op, arg1, arg2, _ = self.quads[d]
+        op = generic_op(op)
+        block, k = self.position[d]
+        if op == "=":
+            return self.range_at(arg1, block, k, depth + 1)
+        if op not in ("+", "-", "*") or arg2 is None:
+            return None
+        a = self.range_at(arg1, block, k, depth + 1)
+        b = self.range_at(arg2, block, k, depth + 1)
+        if a is None or b is None:
+            return None
+        if op == "+" and (a[2] is None or b[2] is None):
+            return a[0] + b[0], a[1] + b[1], a[2] or b[2]
+        if op == "-" and b[2] is None:
+            return a[0] - b[1], a[1] - b[0], a[2]
+        if op == "*" and a[2] is None and b[2] is None and a[0] >= 0 and b[0] >= 0:
+            return a[0] * b[0], a[1] * b[1], None
+        return None
+
+    def array_length(self, array, block, k, depth=0):
+        """Largo del arreglo si su única definición es un 'alloc' de tamaño constante (o una copia de uno)."""
+        d = self.reaching_def(array, block, k) if is_name(array) and depth <= self.MAX_DEPTH else None
+        if not isinstance(d, int):
+            return None
+        op, arg1, _, _ = self.quads[d]
+        if op == "alloc" and is_constant(arg1) and type(constant_value(arg1)) is int:
+            return constant_value(arg1)
+        if op == "=":
+            return self.array_length(arg1, *self.position[d], depth + 1)
+        return None
+
+    def within(self, array, index, block, k):
+        """True si array[index] no puede salirse del arreglo."""
+        interval = self.range_at(index, block, k)
+        if interval is None or interval[0] < 0:
+            return False
+        _, high, symbolic = interval
+        if symbolic is not None:
+            name, header = symbolic
+            return name == array and high < 0 and block in self.bodies[header]
+        length = self.array_length(array, block, k)
+        return length is not None and high < length
+
+    def below(self, index, limit, block, k):
+        """True si 'bounds index, limit' nunca falla."""
+        if not is_constant(limit) or type(constant_value(limit)) is not int:
+            return False
+        interval = self.range_at(index, block, k)
+        return interval is not None and interval[2] is None and 0 <= interval[0] and interval[1] < constant_value(limit)
+
+
+def bce(quads, manager):
+    """
+    Eliminación de verificaciones de límites: un acceso cuyo índice está
+    demostrado dentro del arreglo (ver index_ranges) pasa a '[]u' / '[]=u',
+    que los motores ejecutan sin verificar, y un 'bounds' que nunca falla se
+    borra. Las unidades con try se dejan como están: el CFG no tiene aristas
+    hacia el catch y las definiciones alcanzantes no serían exactas.
+    """
+    cfg = manager.get_analysis("cfg")
+    dominators = manager.get_analysis("dominators")
+    shared = global_names(quads, cfg.units)
+    out = list(quads)
+    removed = set()
+    for unit in cfg.units:
+        if any(quads[i][0] == "ON_EXCEPTION" for i in unit.indices):
+            continue
+        ranges = index_ranges(quads, unit, dominators[unit], shared)
+        for block in unit.blocks:
+            if block not in ranges.idom:
+                continue
+            for k, i in enumerate(block.indices):
+                op, arg1, arg2, res = quads[i]
+                if op == "[]" and ranges.within(arg1, arg2, block, k):
+                    out[i] = ("[]u", arg1, arg2, res)
+                elif op == "[]=" and ranges.within(res, arg2, block, k):
+                    out[i] = ("[]=u", arg1, arg2, res)
+                elif op == "bounds" and ranges.below(arg1, arg2, block, k):
+                    removed.add(i)
+    return [quad for i, quad in enumerate(out) if i not in removed]
+
+
+PASSES = {p.name: p for p in [
+    tac_pass("const_fold", const_fold, preserves=("cfg", "dominators"),
+             description="propagación y plegado de constantes"),
+    tac_pass("branch_fold", branch_fold, description="saltos con condición constante"),
+    tac_pass("copy_coalesce", copy_coalesce, description="fusión de 't = ...; x = t'"),
+    tac_pass("jump_thread", jump_thread, description="cadenas de goto y goto a la siguiente"),
+    tac_pass("unreachable", unreachable, description="bloques inalcanzables"),
+    tac_pass("dce", dce, description="temporales muertos"),
+    tac_pass("local_cse", local_cse, preserves=("cfg", "dominators"),
+             description="subexpresiones comunes por bloque"),
+    tac_pass("licm", licm, description="código invariante fuera de los lazos"),
+    tac_pass("dead_functions", dead_functions,
+             description="funciones, métodos y clases que el programa principal no alcanza"),
+    tac_pass("devirtualize", devirtualize, preserves=("cfg", "dominators"),
+             description="llamadas a métodos con un único destino (jerarquía de clases)"),
+    tac_pass("scalar_replace", scalar_replace,
+             description="objetos que no escapan del bloque: campos en temporales"),
+    tac_pass("bce", bce, description="accesos a arreglos con el índice demostrado en rango"),
+]}
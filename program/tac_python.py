@@ -0,0 +1,782 @@
+"""
+Backend de Python: traduce el TAC a un ast.Module y lo ejecuta con compile().
+
+Cada unidad del TAC se vuelve una función de Python: las funciones de
+Compiscript quedan a nivel de módulo, los métodos dentro de una clase de Python
+con __slots__ (un slot por campo) y el programa principal en _main. Los
+arreglos son listas de Python y las variables globales del programa son
+globales del módulo.
+
+El flujo de control se reconstruye por regiones: una región empieza en la
+entrada o en un bloque destino de algún salto y sigue por los bloques a los que
+solo se llega cayendo. Una región con un único salto de entrada se copia en el
+lugar del salto (así un if/else queda como un if de Python); las demás se
+despachan con un ciclo 'while True' sobre el número de región. El resultado lo
+ejecuta el intérprete de CPython, así que sirve también como motor de
+referencia para comparar la salida de los otros motores.
+"""
+import ast
+import re
+import sys
+from tac_analysis import (
+    BINARY_OPS, program_cfg, compute_liveness, compute_dominators, loop_depths,
+    jump_targets, global_names, quad_defs, is_constant, is_temp, is_name, label_name, generic_op,
+)
+from tac_runtime import (
+    compiscript_error, constant_value, to_text, binary_op, unary_op, concat_all, values_equal, int_div, int_mod,
+    array_rows, copy_rows,
+)
+from tac_vm import build_class_table, class_chain
+
+COMPARE_AST = {"<": ast.Lt, "<=": ast.LtE, ">": ast.Gt, ">=": ast.GtE, "==": ast.Eq, "!=": ast.NotEq}
+ARITH_AST = {"-": ast.Sub, "*": ast.Mult}
+TERMINATORS = ("goto", "if", "JUMP_TABLE", "HASH_SWITCH", "RETURN", "ON_EXCEPTION")
+# Profundidad de recursión de Python permitida mientras corre el programa
+RECURSION_LIMIT = 20000
+
+# Prefijos de los nombres generados (evitan choques con palabras reservadas de Python)
+VAR_PREFIX = "v_"
+FUNC_PREFIX = "fn_"
+CLASS_PREFIX = "cls_"
+METHOD_PREFIX = "m_"
+FIELD_PREFIX = "f_"
+
+
+# ---------------- Constructores de nodos ----------------
+
+def name(identifier, store=False):
+    return ast.Name(id=identifier, ctx=ast.Store() if store else ast.Load())
+
+
+def const(value):
+    return ast.Constant(value=value)
+
+
+def call(function, *args):
+    func = name(function) if isinstance(function, str) else function
+    return ast.Call(func=func, args=list(args), keywords=[])
+
+
+def assign(target, value):
+    return ast.Assign(targets=[target], value=value)
+
+
+def compare(left, op, right):
+    return ast.Compare(left=left, ops=[COMPARE_AST[op]()], comparators=[right])
+
+
+def is_int_check(expr):
+    # type(x) is int (un booleano no pasa)
+    return ast.Compare(left=call("type", expr), ops=[ast.Is()], comparators=[name("int")])
+
+
+def is_bool_check(expr):
+    return ast.Compare(left=call("type", expr), ops=[ast.Is()], comparators=[name("bool")])
+
+
+# ---------------- Soporte en tiempo de ejecución ----------------
+
+class py_instance():
+    """Base de las clases generadas; se imprime como los objetos de los otros motores."""
+    __slots__ = ()
+    class_name = None
+
+    def __repr__(self):
+        return f"<{self.class_name}>"
+
+
+def index_error(arr, i):
+    if type(arr) is not list:
+        raise compiscript_error(f"No se puede indexar {to_text(arr)}")
+    raise compiscript_error(f"Índice fuera de rango: {to_text(i)} (tamaño {len(arr)})")
+
+
+def bounds_error(i, n):
+    raise compiscript_error(f"Índice fuera de rango: {to_text(i)} (tamaño {n})")
+
+
+def size_field(obj, field):
+    """obj.size / obj.length: longitud de un arreglo o el campo de un objeto."""
+    if type(obj) is list:
+        return len(obj)
+    return getattr(obj, FIELD_PREFIX + field)
+
+
+def runtime_error(error):
+    """Convierte un error de Python del programa generado al error de Compiscript equivalente."""
+    if isinstance(error, compiscript_error):
+        return error
+    if isinstance(error, RecursionError):
+        return compiscript_error("Desbordamiento de la pila de llamadas")
+    if isinstance(error, NameError):
+        # UnboundLocalError no trae .name: se toma del mensaje
+        match = re.search(r"'" + VAR_PREFIX + r"(\w+)'", str(error))
+        if match:
+            return compiscript_error(f"Variable no inicializada: {match.group(1)}")
+    if isinstance(error, AttributeError) and getattr(error, "name", None):
+        member = error.name
+        if member.startswith(METHOD_PREFIX):
+            return compiscript_error(f"Llamada al método '{member[len(METHOD_PREFIX):]}' sobre {to_text(error.obj)}")
+        if member.startswith(FIELD_PREFIX):
+            return compiscript_error(f"Acceso a '{member[len(FIELD_PREFIX):]}' sobre {to_text(error.obj)}")
+    return compiscript_error(f"Operación inválida: {error}")
+
+
+# Errores de Python que el programa generado puede lanzar y que un try/catch atrapa
+RUNTIME_ERRORS = (compiscript_error, RecursionError, NameError, AttributeError, TypeError)
+
+
+def error_text(error):
+    return str(runtime_error(error))
+
+
+# ---------------- Traducción ----------------
+
+class python_region():
+    """Bloque destino de saltos más los bloques a los que solo se llega cayendo desde él."""
+    def __init__(self, head):
+        self.head = head
+        self.blocks = [head]
+        self.incoming = 0
+        self.forced = False     # destino de un catch o de una tabla: siempre se despacha
+        self.number = None
+
+
+class python_translator():
+    def __init__(self, quads):
+        self.quads = quads
+        self.cfg = program_cfg(quads)
+        self.liveness = compute_liveness(quads, self.cfg)
+        self.dominators = compute_dominators(self.cfg)
+        self.classes = build_class_table(quads)
+        self.function_names = {u.name for u in self.cfg.units if u.header is not None and not u.owner_class}
+        self.methods = {}
+        for unit in self.cfg.units:
+            if unit.owner_class:
+                self.methods.setdefault(unit.owner_class, set()).add(unit.name)
+        self.tables = []        # (nombre, valor) de las tablas de switch y los datos de arreglos, globales del módulo
+        # Solo las variables que usan las funciones son globales del módulo
+        self.shared_names = global_names(quads, self.cfg.units)
+
+    def translate(self):
+        """ast.Module con las funciones, las clases y _main; no ejecuta nada."""
+        units = self.cfg.units
+        functions = []
+        methods = {class_name: [] for class_name in self.classes}
+        for unit in units[1:]:
+            if unit.owner_class:
+                if unit.owner_class not in methods:
+                    raise compiscript_error(f"Clase no definida: {unit.owner_class}")
+                methods[unit.owner_class].append(self.translate_unit(unit, METHOD_PREFIX + unit.name))
+            else:
+                functions.append(self.translate_unit(unit, FUNC_PREFIX + unit.name))
+        main = self.translate_unit(units[0], "_main")
+        body = [assign(name(table, store=True), value) for table, value in self.tables]
+        body += self.class_definitions(methods) + functions + [main]
+        return ast.fix_missing_locations(ast.Module(body=body, type_ignores=[]))
+
+    # ---------------- Clases ----------------
+
+    def class_definitions(self, methods):
+        """Clases en orden de herencia (el padre antes que la subclase)."""
+        ordered = []
+        for class_name in self.classes:
+            for cls in reversed(class_chain(self.classes, class_name)):
+                if cls not in ordered:
+                    ordered.append(cls)
+        definitions = []
+        for cls in ordered:
+            chain = class_chain(self.classes, cls.name)
+            inherited = set()
+            for ancestor in chain[1:]:
+                inherited.update(ancestor.fields)
+            fields = {}
+            for ancestor in reversed(chain):
+                fields.update(ancestor.fields)
+            init = ast.FunctionDef(
+                name="__init__",
+                args=self.arguments(["self"]),
+                body=[assign(ast.Attribute(value=name("self"), attr=FIELD_PREFIX + f, ctx=ast.Store()), const(v))
+                      for f, v in fields.items()] or [ast.Pass()],
+                decorator_list=[], returns=None)
+            body = [
+                assign(name("__slots__", store=True),
+                       ast.Tuple(elts=[const(FIELD_PREFIX + f) for f in cls.fields if f not in inherited], ctx=ast.Load())),
+                assign(name("class_name", store=True), const(cls.name)),
+                init,
+            ] + methods.get(cls.name, [])
+            base = CLASS_PREFIX + cls.parent if cls.parent in self.classes else "_py_instance"
+            definitions.append(ast.ClassDef(name=CLASS_PREFIX + cls.name, bases=[name(base)], keywords=[],
+                                            body=body, decorator_list=[]))
+        return definitions
+
+    # ---------------- Unidades ----------------
+
+    def arguments(self, names):
+        return ast.arguments(posonlyargs=[], args=[ast.arg(arg=n) for n in names], vararg=None,
+                             kwonlyargs=[], kw_defaults=[], kwarg=None, defaults=[])
+
+    def translate_unit(self, unit, function_name):
+        self.unit = unit
+        self.is_main = unit.header is None
+        self.local_names = set(unit.params) | set(unit.locals)
+        if unit.owner_class:
+            self.local_names.add("this")
+        self.has_try = False
+        self.int_names = self.integer_names(unit)
+        self.known_sizes = {}
+        self.build_regions(unit)
+
+        body = []
+        if self.dispatched:
+            body.append(assign(name("_b", store=True), const(self.regions[unit.blocks[0]].number)))
+            body.extend(self.dispatch_loop())
+        elif unit.blocks:
+            body.extend(self.emit_region(self.regions[unit.blocks[0]], []))
+        if not body:
+            body.append(ast.Return(value=None))
+
+        globals_written = sorted(n for n in self.assigned_names(unit) if not self.is_local(n))
+        prologue = [ast.Global(names=[VAR_PREFIX + n for n in globals_written])] if globals_written else []
+        # Como en la VM, las variables locales de una función empiezan en null
+        prologue += [assign(self.store(n), const(None)) for n in unit.locals if n not in unit.params]
+        if self.has_try:
+            prologue.append(assign(name("_handlers", store=True), ast.List(elts=[], ctx=ast.Load())))
+            prologue.append(assign(name("_error", store=True), const(None)))
+        params = (["this"] if unit.owner_class else []) + list(unit.params)
+        return ast.FunctionDef(name=function_name, args=self.arguments([VAR_PREFIX + p for p in params]),
+                               body=prologue + body, decorator_list=[], returns=None)
+
+    def assigned_names(self, unit):
+        names = set()
+        for i in unit.indices:
+            names.update(n for n in quad_defs(self.quads[i]) if is_name(n))
+        return names
+
+    def is_local(self, x):
+        if self.is_main:
+            return x not in self.shared_names
+        return x in self.local_names or is_temp(x)
+
+    def integer_names(self, unit):
+        """
+        Variables locales que siempre son enteras: todas sus definiciones producen un
+        entero (literal, aritmética o length). Se parte de suponer que todas lo son
+        y se descartan las que tienen alguna definición que no, hasta estabilizar.
+        """
+        definitions = {}
+        for i in unit.indices:
+            quad = self.quads[i]
+            for n in quad_defs(quad):
+                definitions.setdefault(n, []).append(quad)
+        candidates = {n for n in definitions if self.is_local(n) and n not in unit.params and n != "this"}
+
+        def integer(x):
+            if is_constant(x):
+                return type(constant_value(x)) is int
+            return x in candidates
+
+        def produces_int(quad):
+            op, arg1, arg2, res = quad
+            if op in ("-", "*", "/", "%") and arg2 is not None or op == "length":
+                return True
+            if op in ("isub", "imul", "idiv", "imod", "ineg"):
+                return True
+            if op == "-":
+                return integer(arg1)
+            # Con un operando que no resulta entero, '+' concatena aunque el tipo estático sea integer
+            if op in ("+", "iadd"):
+                return integer(arg1) and integer(arg2)
+            if op == "=":
+                return integer(arg1)
+            return False
+
+        changed = True
+        while changed:
+            changed = False
+            for n in list(candidates):
+                if not all(produces_int(quad) for quad in definitions[n]):
+                    candidates.discard(n)
+                    changed = True
+        return candidates
+
+    def build_regions(self, unit):
+        quads = self.quads
+        blocks = unit.blocks
+        targeted = set()
+        forced = set()
+        for block in blocks:
+            last = quads[block.indices[-1]]
+            labels = jump_targets(last)
+            targeted.update(labels)
+            if last[0] in ("ON_EXCEPTION", "JUMP_TABLE", "HASH_SWITCH"):
+                forced.update(labels)
+                self.has_try = self.has_try or last[0] == "ON_EXCEPTION"
+
+        self.regions = {}
+        current = None
+        for n, block in enumerate(blocks):
+            if n == 0 or block.label in targeted:
+                current = python_region(block)
+                current.forced = block.label in forced
+            else:
+                current.blocks.append(block)
+            self.regions[block] = current
+
+        # Saltos de entrada a cada región (la entrada cuenta como uno)
+        if blocks:
+            self.regions[blocks[0]].incoming += 1
+        for block in blocks:
+            for succ in block.succs:
+                if self.regions[succ].head is succ:
+                    self.regions[succ].incoming += 1
+
+        depth = loop_depths(unit, self.dominators[unit]) if blocks else {}
+        heads = [r for b, r in self.regions.items() if r.head is b]
+        dispatched = [r for r in heads if r.forced or r.incoming > 1]
+        entry = self.regions[blocks[0]] if blocks else None
+        if dispatched and entry not in dispatched:
+            dispatched.append(entry)
+        # Las cabeceras de los lazos más internos se prueban primero en la cadena de despacho
+        dispatched.sort(key=lambda r: (-depth.get(r.head, 0), r.head.index))
+        for number, region in enumerate(dispatched):
+            region.number = number
+        self.dispatched = dispatched
+
+    def dispatch_loop(self):
+        """while True: if _b == 0: ... elif _b == 1: ... (envuelto en try si la unidad atrapa errores)."""
+        chain = None
+        for region in reversed(self.dispatched):
+            code = self.emit_region(region, [])
+            if chain is None:
+                chain = code
+            else:
+                chain = [ast.If(test=compare(name("_b"), "==", const(region.number)), body=code, orelse=chain)]
+        loop = ast.While(test=const(True), body=chain, orelse=[])
+        if not self.has_try:
+            return [loop]
+        handler = ast.ExceptHandler(type=name("_RUNTIME_ERRORS"), name="_exc", body=[
+            ast.If(test=ast.UnaryOp(op=ast.Not(), operand=name("_handlers")), body=[ast.Raise(exc=None, cause=None)], orelse=[]),
+            assign(name("_b", store=True), call(ast.Attribute(value=name("_handlers"), attr="pop", ctx=ast.Load()))),
+            assign(name("_error", store=True), call("_error_text", name("_exc"))),
+        ])
+        guarded = ast.Try(body=[loop], handlers=[handler], orelse=[], finalbody=[])
+        return [ast.While(test=const(True), body=[guarded], orelse=[])]
+
+    # ---------------- Regiones y saltos ----------------
+
+    def emit_region(self, region, inlining):
+        """Código de una región; siempre termina en return o en un salto."""
+        inlining = inlining + [region]
+        code = []
+        params = []
+        # Los tamaños conocidos de arreglos valen solo dentro de la región
+        saved_sizes, self.known_sizes = self.known_sizes, {}
+        for block in region.blocks:
+            following = self.unit.blocks[block.index + 1] if block.index + 1 < len(self.unit.blocks) else None
+            if self.emit_block(block, following, code, params, inlining):
+                break
+        else:
+            # La región cae en la siguiente región o al final de la unidad
+            code.extend(self.jump(following, inlining))
+        self.known_sizes = saved_sizes
+        return code
+
+    def jump(self, block, inlining):
+        """Transferencia a un bloque cabecera: copia de la región, _b = n; continue, o return al final."""
+        if block is None:
+            return [ast.Return(value=None)]
+        region = self.regions[block]
+        if region.number is None and region not in inlining:
+            return self.emit_region(region, inlining)
+        if region.number is None:
+            raise compiscript_error(f"Región sin despacho en {self.unit.qualified_name}")
+        return [assign(name("_b", store=True), const(region.number)), ast.Continue()]
+
+    def target(self, label):
+        return self.unit.label_block[label_name(label)]
+
+    def emit_block(self, block, following, code, params, inlining):
+        """Agrega el código del bloque; devuelve True si el bloque termina la región."""
+        quads = self.quads
+        indices = [i for i in block.indices if quads[i][0] != "label"]
+        terminator = None
+        if indices and quads[indices[-1]][0] in TERMINATORS:
+            terminator = indices.pop()
+
+        # 't = a < b; if t goto L' con t muerto: la comparación va directo en el if
+        fused = None
+        if terminator is not None and quads[terminator][0] == "if" and indices:
+            op, arg1, arg2, res = quads[indices[-1]]
+            position = block.indices.index(terminator)
+            if generic_op(op) in COMPARE_AST and res == quads[terminator][1] and is_temp(res) \
+                    and res not in self.liveness.live_after(quads, block, position):
+                fused = quads[indices.pop()]
+
+        for i in indices:
+            self.emit_quad(quads[i], code, params)
+        if terminator is None:
+            return False
+
+        op, arg1, arg2, res = quads[terminator]
+        falls_into_region = following is not None and self.regions[following] is self.regions[block]
+        if op == "goto":
+            code.extend(self.jump(self.target(arg1 or res), inlining))
+            return True
+        if op == "RETURN":
+            code.append(ast.Return(value=self.value(arg1)))
+            return True
+        if op == "if":
+            test = self.value(arg1)
+            if fused is not None:
+                test = self.binary(*fused[:3])
+                fallback = self.binary_fallback(*fused[:3])
+                if fallback is not None:
+                    # La comparación puede lanzar TypeError: se evalúa antes, fuera del if
+                    code.extend(self.guarded([assign(name("_c", store=True), test)],
+                                             [assign(name("_c", store=True), fallback)]))
+                    test = name("_c")
+            code.append(ast.If(test=test, body=self.jump(self.target(res), inlining), orelse=[]))
+        elif op == "ON_EXCEPTION":
+            number = self.regions[self.target(res)].number
+            code.append(ast.Expr(value=call(ast.Attribute(value=name("_handlers"), attr="append", ctx=ast.Load()),
+                                            const(number))))
+        elif op in ("JUMP_TABLE", "HASH_SWITCH"):
+            miss = self.regions[self.target(res)].number
+            table = f"_table{len(self.tables)}"
+            selector = self.value(arg1)
+            if op == "JUMP_TABLE":
+                low, labels = arg2
+                numbers = ast.Tuple(elts=[const(self.regions[self.target(l)].number) for l in labels], ctx=ast.Load())
+                self.tables.append((table, numbers))
+                offset = ast.BinOp(left=self.value(arg1), op=ast.Sub(), right=const(low))
+                in_range = ast.BoolOp(op=ast.And(), values=[
+                    is_int_check(selector),
+                    ast.Compare(left=const(0), ops=[ast.LtE(), ast.Lt()],
+                                comparators=[offset, const(len(labels))]),
+                ])
+                lookup = ast.Subscript(value=name(table), slice=ast.BinOp(left=self.value(arg1), op=ast.Sub(),
+                                                                          right=const(low)), ctx=ast.Load())
+                number = ast.IfExp(test=in_range, body=lookup, orelse=const(miss))
+            else:
+                entries = ast.Dict(keys=[const(constant_value(v)) for v, _ in arg2],
+                                   values=[const(self.regions[self.target(l)].number) for _, l in arg2])
+                self.tables.append((table, entries))
+                get = ast.Attribute(value=name(table), attr="get", ctx=ast.Load())
+                number = ast.IfExp(test=compare(call("type", selector), "==", name("str")),
+                                   body=call(get, self.value(arg1), const(miss)), orelse=const(miss))
+            code.append(assign(name("_b", store=True), number))
+            code.append(ast.Continue())
+            return True
+        if falls_into_region:
+            return False
+        code.extend(self.jump(following, inlining))
+        return True
+
+    # ---------------- Operandos ----------------
+
+    def value(self, x):
+        if x is None:
+            return const(None)
+        if is_constant(x):
+            return const(constant_value(x))
+        if not is_name(x):
+            raise compiscript_error(f"Operando no soportado por el backend de Python: {x}")
+        return name(VAR_PREFIX + x)
+
+    def store(self, x):
+        if not is_name(x):
+            raise compiscript_error(f"Destino no soportado por el backend de Python: {x}")
+        return name(VAR_PREFIX + x, store=True)
+
+    def text(self, x):
+        """Operando como texto para concatenarlo; un literal de cadena va tal cual."""
+        if is_constant(x) and isinstance(constant_value(x), str):
+            return self.value(x)
+        return call("_to_text", self.value(x))
+
+    def is_string_constant(self, x):
+        return is_constant(x) and isinstance(constant_value(x), str)
+
+    def is_int_operand(self, x):
+        if is_constant(x):
+            return type(constant_value(x)) is int
+        return x in self.int_names
+
+    def type_guarded(self, op, a, b, fast, check, known):
+        """
+        fast si los operandos tienen el tipo que espera la operación; si no, la
+        operación genérica. Solo se prueba (check) lo que no se sabe al traducir
+        (known): el tipo estático puede no cumplirse al correr, con null o con un
+        campo que una subclase redeclara con otro tipo.
+        """
+        checks = [check(self.value(x)) for x in (a, b) if not known(x)]
+        if not checks:
+            return fast
+        test = checks[0] if len(checks) == 1 else ast.BoolOp(op=ast.And(), values=checks)
+        return ast.IfExp(test=test, body=fast, orelse=call("_binary_op", const(op), self.value(a), self.value(b)))
+
+    def int_guarded(self, op, a, b, fast):
+        return self.type_guarded(op, a, b, fast, is_int_check, self.is_int_operand)
+
+    def binary(self, op, a, b):
+        """
+        Expresión para a op b. Las operaciones enteras y lógicas revisan el tipo de
+        los operandos que no se conoce; sconcat es la única que puede lanzar
+        TypeError, y binary_fallback da la operación genérica que la repite.
+        """
+        if op == "sconcat":
+            # Con un literal de cadena el resultado siempre es texto; si no, el operando
+            # que queda sin convertir debe ser una cadena o '+' de Python lanza TypeError
+            if self.is_string_constant(a) or self.is_string_constant(b):
+                return ast.BinOp(left=self.text(a), op=ast.Add(), right=self.text(b))
+            if is_constant(a):
+                return ast.BinOp(left=self.text(a), op=ast.Add(), right=self.value(b))
+            return ast.BinOp(left=self.value(a), op=ast.Add(), right=self.text(b))
+        if op in ("icmp_eq", "icmp_ne"):
+            op = generic_op(op)
+            return self.int_guarded(op, a, b, compare(self.value(a), op, self.value(b)))
+        if op == "iadd":
+            return self.int_guarded("+", a, b, ast.BinOp(left=self.value(a), op=ast.Add(), right=self.value(b)))
+        op = generic_op(op)
+        if op in ARITH_AST:
+            return self.int_guarded(op, a, b, ast.BinOp(left=self.value(a), op=ARITH_AST[op](), right=self.value(b)))
+        if op in ("<", "<=", ">", ">="):
+            return self.int_guarded(op, a, b, compare(self.value(a), op, self.value(b)))
+        if op in ("==", "!="):
+            # Contra un literal basta el == de Python; arreglos y objetos se comparan por identidad
+            if is_constant(a) or is_constant(b):
+                return compare(self.value(a), op, self.value(b))
+            equal = call("_values_equal", self.value(a), self.value(b))
+            return equal if op == "==" else ast.UnaryOp(op=ast.Not(), operand=equal)
+        if op in ("&&", "||"):
+            fast = ast.BoolOp(op=ast.And() if op == "&&" else ast.Or(), values=[self.value(a), self.value(b)])
+            return self.type_guarded(op, a, b, fast, is_bool_check,
+                                     lambda x: is_constant(x) and type(constant_value(x)) is bool)
+        if op == "+":
+            string_a = is_constant(a) and isinstance(constant_value(a), str)
+            string_b = is_constant(b) and isinstance(constant_value(b), str)
+            if string_a or string_b:
+                left = self.value(a) if string_a else call("_to_text", self.value(a))
+                right = self.value(b) if string_b else call("_to_text", self.value(b))
+                return ast.BinOp(left=left, op=ast.Add(), right=right)
+            return self.int_guarded(op, a, b, ast.BinOp(left=self.value(a), op=ast.Add(), right=self.value(b)))
+        if op in ("/", "%"):
+            fast = call("_int_div" if op == "/" else "_int_mod", self.value(a), self.value(b))
+            # Con divisor positivo y dividendo no negativo, // y % de Python coinciden con los de C
+            if is_constant(b) and type(constant_value(b)) is int and constant_value(b) > 0:
+                floor = ast.BinOp(left=self.value(a), op=ast.FloorDiv() if op == "/" else ast.Mod(), right=self.value(b))
+                fast = ast.IfExp(test=compare(self.value(a), ">=", const(0)), body=floor, orelse=fast)
+            return self.int_guarded(op, a, b, fast)
+        return call("_binary_op", const(op), self.value(a), self.value(b))
+
+    def binary_fallback(self, op, a, b):
+        """Operación genérica para cuando binary(op, a, b) lanza TypeError; None si no puede lanzarlo."""
+        if op != "sconcat" or self.is_string_constant(a) or self.is_string_constant(b):
+            return None
+        return call("_binary_op", const("+"), self.value(a), self.value(b))
+
+    def guarded(self, fast, slow):
+        """try: fast except TypeError: slow (las sentencias van sin try si no hay alternativa)."""
+        if slow is None:
+            return fast
+        handler = ast.ExceptHandler(type=name("TypeError"), name=None, body=slow)
+        return [ast.Try(body=fast, handlers=[handler], orelse=[], finalbody=[])]
+
+    # ---------------- Instrucciones ----------------
+
+    def in_bounds(self, array, index):
+        """Índice literal dentro de un arreglo recién reservado con tamaño literal."""
+        if array not in self.known_sizes or not is_constant(index):
+            return False
+        i = constant_value(index)
+        return type(i) is int and 0 <= i < self.known_sizes[array]
+
+    def pop_arguments(self, params, count):
+        if count > len(params):
+            raise compiscript_error(f"Llamada con argumentos fuera del bloque en {self.unit.qualified_name}")
+        args = params[len(params) - count:] if count else []
+        del params[len(params) - count:]
+        return [self.value(x) for x in args]
+
+    def result(self, res, expr, code, fallback=None):
+        """res = expr; con fallback, si expr lanza TypeError se asigna la operación genérica."""
+        def statement(value):
+            return assign(self.store(res), value) if res else ast.Expr(value=value)
+        code.extend(self.guarded([statement(expr)], fallback and [statement(fallback)]))
+
+    def emit_quad(self, quad, code, params):
+        op, arg1, arg2, res = quad
+        for n in quad_defs(quad):
+            self.known_sizes.pop(n, None)
+        if op in BINARY_OPS and arg2 is not None:
+            self.result(res, self.binary(op, arg1, arg2), code, self.binary_fallback(op, arg1, arg2))
+        elif op in ("-", "ineg"):
+            negated = ast.UnaryOp(op=ast.USub(), operand=self.value(arg1))
+            if not self.is_int_operand(arg1):
+                negated = ast.IfExp(test=is_int_check(self.value(arg1)), body=negated,
+                                    orelse=call("_unary_op", const("-"), self.value(arg1)))
+            self.result(res, negated, code)
+        elif op in ("!", "bnot"):
+            inverted = ast.IfExp(test=is_bool_check(self.value(arg1)),
+                                 body=ast.UnaryOp(op=ast.Not(), operand=self.value(arg1)),
+                                 orelse=call("_unary_op", const("!"), self.value(arg1)))
+            self.result(res, inverted, code)
+        elif op == "=":
+            self.result(res, self.value(arg1), code)
+        elif op == "[]u" or op == "[]" and self.in_bounds(arg1, arg2):
+            self.result(res, ast.Subscript(value=self.value(arg1), slice=self.value(arg2), ctx=ast.Load()), code)
+        elif op == "[]":
+            in_range = ast.Compare(left=const(0), ops=[ast.LtE(), ast.Lt()],
+                                   comparators=[self.value(arg2), call("len", self.value(arg1))])
+            element = ast.Subscript(value=self.value(arg1), slice=self.value(arg2), ctx=ast.Load())
+            self.result(res, ast.IfExp(test=in_range, body=element,
+                                       orelse=call("_index_error", self.value(arg1), self.value(arg2))), code)
+        elif op == "[]=u" or op == "[]=" and self.in_bounds(res, arg2):
+            code.append(assign(ast.Subscript(value=self.value(res), slice=self.value(arg2), ctx=ast.Store()),
+                               self.value(arg1)))
+        elif op == "[]=":
+            in_range = ast.Compare(left=const(0), ops=[ast.LtE(), ast.Lt()],
+                                   comparators=[self.value(arg2), call("len", self.value(res))])
+            element = ast.Subscript(value=self.value(res), slice=self.value(arg2), ctx=ast.Store())
+            code.append(ast.If(test=in_range, body=[assign(element, self.value(arg1))],
+                               orelse=[ast.Expr(value=call("_index_error", self.value(res), self.value(arg2)))]))
+        elif op == "bounds":
+            in_range = ast.Compare(left=const(0), ops=[ast.LtE(), ast.Lt()],
+                                   comparators=[self.value(arg1), self.value(arg2)])
+            code.append(ast.If(test=ast.UnaryOp(op=ast.Not(), operand=in_range),
+                               body=[ast.Expr(value=call("_bounds_error", self.value(arg1), self.value(arg2)))],
+                               orelse=[]))
+        elif op == "alloc" and arg2 is not None:
+            # Los datos quedan en una tupla del módulo; cada ejecución copia una lista nueva
+            data = f"_data{len(self.tables)}"
+            self.tables.append((data, const(array_rows(arg2))))
+            self.known_sizes[res] = constant_value(arg1)
+            rank = len(arg2[0])
+            self.result(res, call("list", name(data)) if rank == 1 else call("_copy_rows", name(data), const(rank)),
+                        code)
+        elif op == "CONCAT":
+            # El primer par es un sconcat (solo él puede fallar); el resto ya se une a una cadena
+            join = ast.Attribute(value=const(""), attr="join", ctx=ast.Load())
+            parts = [self.binary("sconcat", arg1[0], arg1[1])] + [self.text(x) for x in arg1[2:]]
+            fallback = None
+            if self.binary_fallback("sconcat", arg1[0], arg1[1]) is not None:
+                fallback = call("_concat_all", ast.Tuple(elts=[self.value(x) for x in arg1], ctx=ast.Load()))
+            self.result(res, call(join, ast.Tuple(elts=parts, ctx=ast.Load())), code, fallback)
+        elif op == "alloc":
+            if is_constant(arg1):
+                self.known_sizes[res] = constant_value(arg1)
+            self.result(res, ast.BinOp(left=ast.List(elts=[const(None)], ctx=ast.Load()), op=ast.Mult(),
+                                       right=self.value(arg1)), code)
+        elif op == "length":
+            self.result(res, call("_length", self.value(arg1)), code)
+        elif op == "PRINT":
+            code.append(ast.Expr(value=call("_print", self.value(res))))
+        elif op == "param":
+            params.append(arg1)
+        elif op in ("CALL_FUNC", "call"):
+            if arg1 not in self.function_names:
+                raise compiscript_error(f"Función no definida: {arg1}")
+            self.result(res, call(FUNC_PREFIX + arg1, *self.pop_arguments(params, arg2)), code)
+        elif op == "CALL_METHOD":
+            receiver, method = arg1.rsplit(".", 1)
+            bound = ast.Attribute(value=self.value(receiver), attr=METHOD_PREFIX + method, ctx=ast.Load())
+            self.result(res, call(bound, *self.pop_arguments(params, arg2)), code)
+        elif op == "CALL_VIRTUAL":
+            # Los atributos de la clase de Python ya se resuelven por el MRO; la ranura no aporta
+            self.emit_quad(("CALL_METHOD", f"{arg1}.{arg2[1]}", arg2[2], res), code, params)
+        elif op == "CALL_DIRECT":
+            owner, method, nargs, guard = arg2
+            if guard is not None:
+                self.emit_quad(("CALL_METHOD", f"{arg1}.{method}", nargs, res), code, params)
+            else:
+                # Sin guarda: la función de la clase dueña, sin crear el método ligado
+                function = ast.Attribute(value=name(CLASS_PREFIX + owner), attr=METHOD_PREFIX + method, ctx=ast.Load())
+                self.result(res, call(function, self.value(arg1), *self.pop_arguments(params, nargs)), code)
+        elif op == "ALLOC_OBJ":
+            if arg1 not in self.classes:
+                raise compiscript_error(f"Clase no definida: {arg1}")
+            self.result(res, call(CLASS_PREFIX + arg1), code)
+        elif op == "CALL_CONSTRUCTOR":
+            args = self.pop_arguments(params, arg2)
+            if any("constructor" in self.methods.get(cls.name, ()) for cls in class_chain(self.classes, arg1)):
+                bound = ast.Attribute(value=self.value(res), attr=METHOD_PREFIX + "constructor", ctx=ast.Load())
+                code.append(ast.Expr(value=call(bound, *args)))
+        elif op == "GET_FIELD":
+            if arg2 in ("size", "length"):
+                self.result(res, call("_size_field", self.value(arg1), const(arg2)), code)
+            else:
+                self.result(res, ast.Attribute(value=self.value(arg1), attr=FIELD_PREFIX + arg2, ctx=ast.Load()), code)
+        elif op == "SET_FIELD":
+            target = ast.Attribute(value=self.value(arg1), attr=FIELD_PREFIX + arg2, ctx=ast.Store())
+            code.append(assign(target, self.value(res)))
+        elif op in ("LOAD_FIELD", "STORE_FIELD"):
+            # Los campos ya son __slots__: CPython les da una posición fija en la instancia
+            named = "GET_FIELD" if op == "LOAD_FIELD" else "SET_FIELD"
+            self.emit_quad((named, arg1, arg2[1], res), code, params)
+        elif op == "END_TRY":
+            code.append(ast.If(test=name("_handlers"), body=[
+                ast.Expr(value=call(ast.Attribute(value=name("_handlers"), attr="pop", ctx=ast.Load())))], orelse=[]))
+        elif op == "EXC_ASSIGN":
+            self.result(res, name("_error"), code)
+        else:
+            raise compiscript_error(f"Instrucción TAC no soportada por el backend de Python: {op}")
+
+
+def length(value):
+    if type(value) is not list and type(value) is not str:
+        raise compiscript_error(f"{to_text(value)} no tiene longitud")
+    return len(value)
+
+
+def python_module(quads):
+    return python_translator(quads).translate()
+
+
+def python_source(quads):
+    """Código Python equivalente al TAC (para inspección)."""
+    return ast.unparse(python_module(quads))
+
+
+class python_engine():
+    """Traduce los cuádruplos a un módulo de Python, lo compila con compile() y ejecuta _main."""
+    def __init__(self, quads, output=sys.stdout):
+        self.module = python_module(quads)
+        self.code = compile(self.module, "<compiscript>", "exec")
+        write = output.write
+        self.namespace = {
+            "_py_instance": py_instance,
+            "_RUNTIME_ERRORS": RUNTIME_ERRORS,
+            "_error_text": error_text,
+            "_index_error": index_error,
+            "_bounds_error": bounds_error,
+            "_size_field": size_field,
+            "_length": length,
+            "_copy_rows": copy_rows,
+            "_to_text": to_text,
+            "_binary_op": binary_op,
+            "_unary_op": unary_op,
+            "_concat_all": concat_all,
+            "_values_equal": values_equal,
+            "_int_div": int_div,
+            "_int_mod": int_mod,
+            "_print": lambda value: write(to_text(value) + "\n"),
+        }
+
+    def run(self):
+        exec(self.code, self.namespace)
+        old_limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(old_limit, RECURSION_LIMIT))
+        try:
+            self.namespace["_main"]()
+        except RUNTIME_ERRORS as error:
+            raise runtime_error(error) from None
+        finally:
+            sys.setrecursionlimit(old_limit)
+        return self.namespace
+
+
+def run_python(quads, output=sys.stdout):
+    engine = python_engine(quads, output)
+    engine.run()
+    return engine
@@ -0,0 +1,466 @@
+"""
+Asignación de registros sobre el TAC: barrido lineal (linear scan) y
+coloreo de grafos al estilo Chaitin-Briggs.
+
+Las instrucciones de cada unidad se numeran en el orden del TAC (posición =
+índice dentro de unit.indices). El intervalo de vida de una variable va de
+la primera a la última posición en que está viva según compute_liveness: sus
+usos y definiciones, el inicio de los bloques donde entra viva y el final de
+los bloques donde sale viva. Así un solo rango cubre también los lazos.
+
+Los intervalos se recorren por su inicio con un conjunto de activos de a lo
+sumo R elementos, así que el costo es O(n log n + n*R). Cuando no queda un
+registro libre se compara el peso del intervalo nuevo con el del activo más
+barato; el peso es la suma de 10^profundidad_de_lazo de cada uso y
+definición. El perdedor se parte: conserva el registro (o la memoria) hasta
+el punto de conflicto y el resto vuelve a la cola desde su siguiente uso,
+donde puede conseguir otro registro.
+
+El resultado por unidad (unit_allocation) dice en qué registro está cada
+variable en cada posición (None = en memoria). Una variable partida vive
+también en memoria: el backend escribe en memoria cada definición y la
+vuelve a cargar en las posiciones de 'reloads' (inicio de cada trozo que
+empieza leyéndola e inicio de los bloques donde entra viva).
+
+El coloreo (para -O2) construye el grafo de interferencia con la misma vida
+de variables, une de forma conservadora (criterio de Briggs) los 'x = t'
+que deja el generador tras cada declaración, simplifica los nodos de grado
+< R y, si no queda ninguno, saca con optimismo el de menor peso/grado. En
+la selección, un nodo sin color libre queda entero en memoria; como el
+backend usa registros auxiliares propios para los operandos en memoria, no
+hace falta reescribir el programa y volver a construir el grafo.
+"""
+import heapq
+from itertools import combinations
+from bisect import bisect_left, bisect_right
+from tac_analysis import (
+    program_cfg, compute_liveness, compute_dominators, loop_depths, quad_uses, quad_defs, is_name, argument_count,
+)
+
+CALLS = ("CALL_FUNC", "call", "CALL_METHOD", "CALL_VIRTUAL", "CALL_DIRECT", "CALL_CONSTRUCTOR")
+MAX_DEPTH = 8
+ALLOCATORS = {"linear": "barrido lineal", "coloring": "coloreo de grafos"}
+
+
+class variable_uses():
+    """Posiciones donde aparece una variable, con su peso acumulado para partir intervalos en O(log n)."""
+    def __init__(self, name):
+        self.name = name
+        self.positions = []
+        self.prefix = [0]
+        self.reads = set()
+        self.split = False
+
+    def add(self, position, weight, read):
+        if self.positions and self.positions[-1] == position:
+            self.prefix[-1] += weight
+        else:
+            self.positions.append(position)
+            self.prefix.append(self.prefix[-1] + weight)
+        if read:
+            self.reads.add(position)
+
+
+class live_interval():
+    """Trozo [start, end] de la vida de una variable con sus usos uses.positions[lo:hi]."""
+    def __init__(self, uses, start, end, lo, hi):
+        self.uses = uses
+        self.start = start
+        self.end = end
+        self.lo = lo
+        self.hi = hi
+        self.register = None
+
+    @property
+    def name(self):
+        return self.uses.name
+
+    @property
+    def weight(self):
+        return self.uses.prefix[self.hi] - self.uses.prefix[self.lo]
+
+    def weight_from(self, position):
+        """Peso de los usos que quedan desde position."""
+        cut = bisect_left(self.uses.positions, position, self.lo, self.hi)
+        return self.uses.prefix[self.hi] - self.uses.prefix[cut]
+
+    def split(self, position):
+        """Parte en [start, position-1] y el resto desde el siguiente uso >= position (o None)."""
+        self.uses.split = True
+        cut = bisect_left(self.uses.positions, position, self.lo, self.hi)
+        head = live_interval(self.uses, self.start, position - 1, self.lo, cut)
+        tail = None
+        if cut < self.hi:
+            tail = live_interval(self.uses, self.uses.positions[cut], self.end, cut, self.hi)
+        return head, tail
+
+
+class unit_allocation():
+    """Registros de una unidad: trozos por variable, recargas y estadísticas."""
+    def __init__(self, unit, registers, method="linear"):
+        self.unit = unit
+        self.registers = registers
+        self.method = method
+        self.pieces = {}            # variable -> [(inicio, fin, registro)] ordenados
+        self.starts = {}
+        self.split = set()          # variables que también viven en memoria
+        self.reloads = {}           # posición -> [(variable, registro)]
+        self.entry = []             # (variable, registro) vivas al entrar y nunca partidas
+        self.intervals = 0
+        self.spilled = 0
+        self.spill_cost = 0
+        self.coalesced = 0          # movimientos x = y que quedaron en el mismo registro
+        self.note = ""
+
+    def location(self, name, position):
+        """Registro de name en position, o None si está en memoria."""
+        starts = self.starts.get(name)
+        if not starts:
+            return None
+        k = bisect_right(starts, position) - 1
+        if k < 0:
+            return None
+        start, end, register = self.pieces[name][k]
+        return register if position <= end else None
+
+    def used_registers(self):
+        return sorted({register for pieces in self.pieces.values() for _, _, register in pieces})
+
+
+def build_intervals(quads, unit, liveness, depths, allocatable):
+    """Intervalos de vida de las variables asignables de una unidad."""
+    position_of = {i: p for p, i in enumerate(unit.indices)}
+    uses = {}
+    bounds = {}
+
+    def touch(name, position, weight, read):
+        if name not in uses:
+            uses[name] = variable_uses(name)
+            bounds[name] = [position, position]
+        uses[name].add(position, weight, read)
+        low, high = bounds[name]
+        bounds[name] = [min(low, position), max(high, position)]
+
+    def extend(name, position):
+        low, high = bounds[name]
+        bounds[name] = [min(low, position), max(high, position)]
+
+    arguments = call_arguments(quads, unit)
+    for block in unit.blocks:
+        weight = 10 ** min(depths.get(block, 0), MAX_DEPTH)
+        for i in block.indices:
+            position = position_of[i]
+            quad = quads[i]
+            for name in quad_uses(quad) + arguments.get(i, []):
+                if is_name(name) and allocatable(name):
+                    touch(name, position, weight, True)
+            for name in quad_defs(quad):
+                if is_name(name) and allocatable(name):
+                    touch(name, position, weight, False)
+    for block in unit.blocks:
+        first = position_of[block.indices[0]]
+        last = position_of[block.indices[-1]]
+        for name in liveness.live_in.get(block, ()):
+            if name in bounds:
+                extend(name, first)
+        for name in liveness.live_out.get(block, ()):
+            if name in bounds:
+                extend(name, last)
+
+    intervals = []
+    for name, info in uses.items():
+        start, end = bounds[name]
+        intervals.append(live_interval(info, start, end, 0, len(info.positions)))
+    return intervals
+
+
+def linear_scan(intervals, registers):
+    """
+    Barrido lineal con partición. Devuelve los trozos resultantes; los que
+    quedaron con register None viven en memoria.
+    """
+    queue = [(iv.start, n, iv) for n, iv in enumerate(intervals)]
+    heapq.heapify(queue)
+    sequence = len(queue)
+    free = list(range(registers))
+    active = []
+    done = []
+    while queue:
+        start, _, current = heapq.heappop(queue)
+        still = []
+        for iv in active:
+            if iv.end < start:
+                free.append(iv.register)
+                done.append(iv)
+            else:
+                still.append(iv)
+        active = still
+        if free:
+            current.register = min(free)
+            free.remove(current.register)
+            active.append(current)
+            continue
+        victim = min(active, key=lambda iv: (iv.weight_from(start), -iv.end)) if active else None
+        if victim is not None and victim.weight_from(start) < current.weight:
+            # El activo más barato cede su registro desde aquí
+            active.remove(victim)
+            head, tail = victim.split(start)
+            if head.start <= head.end:
+                head.register = victim.register
+                done.append(head)
+            current.register = victim.register
+            active.append(current)
+        else:
+            # El nuevo se queda en memoria en este uso y reintenta en el siguiente
+            head, tail = current.split(start + 1)
+            done.append(head)
+        if tail is not None:
+            sequence += 1
+            heapq.heappush(queue, (tail.start, sequence, tail))
+    done.extend(active)
+    return done
+
+
+def call_arguments(quads, unit):
+    """{índice de la llamada: argumentos}; los 'param' se leen recién en la llamada."""
+    result = {}
+    pending = []
+    for i in unit.indices:
+        quad = quads[i]
+        if quad[0] == "param":
+            pending.append(quad[1])
+        elif quad[0] in CALLS:
+            count = argument_count(quad)
+            if not isinstance(count, int):
+                count = len(pending)
+            result[i] = pending[len(pending) - count:] if count else []
+            del pending[len(pending) - count:]
+    return result
+
+
+def linear_scan_unit(quads, unit, liveness, depths, registers, allocatable):
+    result = unit_allocation(unit, registers)
+    intervals = build_intervals(quads, unit, liveness, depths, allocatable)
+    result.intervals = len(intervals)
+    pieces = linear_scan(intervals, registers)
+
+    by_name = {}
+    for piece in pieces:
+        by_name.setdefault(piece.name, []).append(piece)
+    whole = {iv.name: iv for iv in intervals}
+    for name, parts in by_name.items():
+        info = whole[name].uses
+        in_register = sorted((p.start, p.end, p.register) for p in parts if p.register is not None)
+        memory_cost = sum(p.weight for p in parts if p.register is None)
+        if memory_cost:
+            result.spilled += 1
+            result.spill_cost += memory_cost
+        if in_register:
+            result.pieces[name] = in_register
+            result.starts[name] = [start for start, _, _ in in_register]
+        if info.split:
+            result.split.add(name)
+            for start, _, register in in_register:
+                if start in info.reads:
+                    result.reloads.setdefault(start, []).append((name, register))
+
+    position_of = {i: p for p, i in enumerate(unit.indices)}
+    for block in unit.blocks:
+        first = position_of[block.indices[0]]
+        for name in sorted(liveness.live_in.get(block, ())):
+            register = result.location(name, first) if name in result.pieces else None
+            if register is None:
+                continue
+            if name in result.split:
+                entry = result.reloads.setdefault(first, [])
+                if (name, register) not in entry:
+                    entry.append((name, register))
+            elif first == 0:
+                result.entry.append((name, register))
+    return result
+
+
+def build_interference(quads, unit, liveness, allocatable):
+    """Grafo de interferencia {nombre: vecinos} y movimientos (destino, origen) entre nombres asignables."""
+    adjacency = {}
+    moves = []
+
+    def node(name):
+        if name not in adjacency:
+            adjacency[name] = set()
+
+    arguments = call_arguments(quads, unit)
+    for block in unit.blocks:
+        live = {n for n in liveness.live_out.get(block, ()) if allocatable(n)}
+        for n in live:
+            node(n)
+        for i in reversed(block.indices):
+            quad = quads[i]
+            defs = [n for n in quad_defs(quad) if is_name(n) and allocatable(n)]
+            uses = [n for n in quad_uses(quad) + arguments.get(i, []) if is_name(n) and allocatable(n)]
+            for n in defs + uses:
+                node(n)
+            if quad[0] == "=" and defs and is_name(quad[1]) and allocatable(quad[1]):
+                # El origen de una copia no interfiere con el destino
+                moves.append((defs[0], quad[1]))
+                live.discard(quad[1])
+            for d in defs:
+                for n in live:
+                    if n != d:
+                        adjacency[d].add(n)
+                        adjacency[n].add(d)
+            live.difference_update(defs)
+            live.update(uses)
+    if unit.blocks:
+        # Lo que entra vivo (parámetros y variables aún en null) se define a la vez al entrar
+        entry = [n for n in liveness.live_in.get(unit.blocks[0], ()) if n in adjacency]
+        for a, b in combinations(entry, 2):
+            adjacency[a].add(b)
+            adjacency[b].add(a)
+    return adjacency, moves
+
+
+def coalesce(adjacency, moves, registers):
+    """Une destino y origen de cada copia si no interfieren y el nodo unido tiene < R vecinos de grado >= R."""
+    alias = {}
+
+    def find(n):
+        while n in alias:
+            n = alias[n]
+        return n
+
+    changed = True
+    while changed:
+        changed = False
+        for a, b in moves:
+            a, b = find(a), find(b)
+            if a == b or b in adjacency[a]:
+                continue
+            neighbors = adjacency[a] | adjacency[b]
+            if sum(1 for n in neighbors if len(adjacency[n]) >= registers) >= registers:
+                continue
+            for n in adjacency[b]:
+                adjacency[n].discard(b)
+                adjacency[n].add(a)
+            adjacency[a] |= adjacency[b]
+            del adjacency[b]
+            alias[b] = a
+            changed = True
+    return find
+
+
+def color_graph(adjacency, weights, registers):
+    """Simplificación con derrame optimista y selección de colores. Devuelve {nodo: color}."""
+    degree = {n: len(neighbors) for n, neighbors in adjacency.items()}
+    low = [n for n in adjacency if degree[n] < registers]
+    candidates = [(weights.get(n, 0) / max(degree[n], 1), n) for n in adjacency]
+    heapq.heapify(candidates)
+    removed = set()
+    stack = []
+    while len(stack) < len(adjacency):
+        if low:
+            n = low.pop()
+            if n in removed:
+                continue
+        else:
+            # Ninguno con grado < R: el más barato por vecino se apila igual (quizá alcance un color)
+            key, n = heapq.heappop(candidates)
+            if n in removed:
+                continue
+            current = weights.get(n, 0) / max(degree[n], 1)
+            if current > key:
+                heapq.heappush(candidates, (current, n))
+                continue
+        removed.add(n)
+        stack.append(n)
+        for m in adjacency[n]:
+            if m not in removed:
+                degree[m] -= 1
+                if degree[m] == registers - 1:
+                    low.append(m)
+    colors = {}
+    for n in reversed(stack):
+        taken = {colors[m] for m in adjacency[n] if m in colors}
+        free = next((c for c in range(registers) if c not in taken), None)
+        if free is not None:
+            colors[n] = free
+    return colors
+
+
+def coloring_unit(quads, unit, liveness, depths, registers, allocatable):
+    result = unit_allocation(unit, registers, "coloring")
+    intervals = build_intervals(quads, unit, liveness, depths, allocatable)
+    weights = {iv.name: iv.weight for iv in intervals}
+    adjacency, moves = build_interference(quads, unit, liveness, allocatable)
+    names = list(adjacency)
+    result.intervals = len(names)
+    find = coalesce(adjacency, moves, registers)
+    root_weights = {}
+    for name in names:
+        root = find(name)
+        root_weights[root] = root_weights.get(root, 0) + weights.get(name, 0)
+    colors = color_graph(adjacency, root_weights, registers)
+
+    # Sin partir: el registro vale en toda la unidad
+    everywhere = len(unit.indices)
+    for name in names:
+        color = colors.get(find(name))
+        if color is None:
+            if weights.get(name, 0):
+                result.spilled += 1
+                result.spill_cost += weights[name]
+            continue
+        result.pieces[name] = [(0, everywhere, color)]
+        result.starts[name] = [0]
+    result.coalesced = sum(1 for a, b in moves if find(a) == find(b) and a in result.pieces)
+    if unit.blocks:
+        for name in sorted(liveness.live_in.get(unit.blocks[0], ())):
+            if name in result.pieces:
+                result.entry.append((name, result.pieces[name][0][2]))
+    return result
+
+
+def allocate_registers(quads, registers=8, allocatable=None, exclude=None, method="linear"):
+    """
+    Asigna registros en cada unidad del programa con el método dado
+    ("linear" o "coloring"). allocatable(unidad, nombre) decide qué nombres
+    pueden ir en registro (por omisión, todos) y exclude(unidad) deja una
+    unidad entera en memoria. Devuelve una unit_allocation por unidad, en el
+    orden de split_units.
+    """
+    if method not in ALLOCATORS:
+        raise ValueError(f"Asignador de registros desconocido: {method}")
+    allocate_unit = linear_scan_unit if method == "linear" else coloring_unit
+    cfg = program_cfg(quads)
+    liveness = compute_liveness(quads, cfg)
+    dominators = compute_dominators(cfg)
+    result = []
+    for unit in cfg.units:
+        if exclude is not None and exclude(unit):
+            allocation = unit_allocation(unit, registers, method)
+            allocation.note = "en memoria"
+            result.append(allocation)
+            continue
+        depths = loop_depths(unit, dominators[unit])
+        accept = (lambda name: True) if allocatable is None else (lambda name, u=unit: allocatable(u, name))
+        result.append(allocate_unit(quads, unit, liveness, depths, registers, accept))
+    return result
+
+
+def format_allocation_report(allocations):
+    """Tabla de intervalos, registros usados y derrames por función."""
+    registers = allocations[0].registers if allocations else 0
+    method = ALLOCATORS[allocations[0].method] if allocations else ""
+    lines = [
+        f"Asignación de registros ({method}, {registers} registros)",
+        f"{'unidad':24s} {'variables':>10s} {'registros':>9s} {'derramadas':>10s} {'partidas':>8s} "
+        f"{'unidas':>7s} {'costo':>8s}",
+    ]
+    for allocation in allocations:
+        lines.append(
+            f"{allocation.unit.qualified_name:24s} {allocation.intervals:10d} "
+            f"{len(allocation.used_registers()):9d} {allocation.spilled:10d} "
+            f"{len(allocation.split):8d} {allocation.coalesced:7d} {allocation.spill_cost:8d}"
+            + (f"  ({allocation.note})" if allocation.note else "")
+        )
+    return "\n".join(lines)
@@ -0,0 +1,256 @@
+"""
+Semántica de valores de Compiscript compartida por el plegado de constantes y
+los motores de ejecución: conversión de literales del TAC, operadores y
+representación de objetos. Así el optimizador nunca pliega una operación con un
+resultado distinto al que daría el programa al correr.
+"""
+import operator
+import sys
+from tac_analysis import TYPED_OPS, TYPED_UNARY_OPS
+
+
+class compiscript_error(Exception):
+    """Error en tiempo de ejecución; lo atrapa el try/catch del programa."""
+    pass
+
+
+class cs_object():
+    """Instancia de una clase: su clase (disposición y vtable) y los valores de los campos por posición."""
+    __slots__ = ("cls", "fields")
+
+    def __init__(self, cls, fields):
+        self.cls = cls
+        self.fields = fields
+
+    @property
+    def class_name(self):
+        return self.cls.name
+
+    def __repr__(self):
+        return f"<{self.class_name}>"
+
+
+def constant_value(operand):
+    """
+    Valor Python de un literal del TAC ('5', '"hola"', 'true', 'null'). Las
+    cadenas se internan: todas las apariciones de un literal, en cualquier
+    unidad o motor, son el mismo objeto y compararlas se resuelve por identidad.
+    """
+    if not isinstance(operand, str):
+        return operand
+    if operand == "true":
+        return True
+    if operand == "false":
+        return False
+    if operand == "null":
+        return None
+    if operand.startswith('"'):
+        return sys.intern(operand[1:-1])
+    return int(operand)
+
+
+def format_constant(value):
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if value is None:
+        return "null"
+    if isinstance(value, str):
+        return f'"{value}"'
+    return str(value)
+
+
+def to_text(value):
+    """Texto de un valor tal como lo imprime print o lo concatena '+'."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if value is None:
+        return "null"
+    if isinstance(value, list):
+        return "[" + ", ".join(to_text(v) for v in value) + "]"
+    return str(value)
+
+
+def is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def values_equal(a, b):
+    # Arreglos y objetos se comparan por identidad; el resto por tipo y valor
+    if a is b:
+        return True
+    if isinstance(a, (list, cs_object)) or isinstance(b, (list, cs_object)):
+        return a is b
+    return type(a) is type(b) and a == b
+
+
+def int_div(a, b):
+    """División entera truncada hacia cero, como en C."""
+    if b == 0:
+        raise compiscript_error("División entre cero")
+    q = abs(a) // abs(b)
+    return q if (a >= 0) == (b >= 0) else -q
+
+
+def int_mod(a, b):
+    return a - b * int_div(a, b)
+
+
+def binary_op(op, a, b):
+    """Evalúa un operador binario; lanza compiscript_error si los operandos no son válidos."""
+    op = TYPED_OPS.get(op, op)
+    if op == "+":
+        if isinstance(a, str) or isinstance(b, str):
+            return to_text(a) + to_text(b)
+        if is_int(a) and is_int(b):
+            return a + b
+    elif op == "==":
+        return values_equal(a, b)
+    elif op == "!=":
+        return not values_equal(a, b)
+    elif op in ("&&", "||"):
+        if isinstance(a, bool) and isinstance(b, bool):
+            return (a and b) if op == "&&" else (a or b)
+    elif is_int(a) and is_int(b):
+        if op == "-":
+            return a - b
+        if op == "*":
+            return a * b
+        if op == "/":
+            return int_div(a, b)
+        if op == "%":
+            return int_mod(a, b)
+        if op == "<":
+            return a < b
+        if op == "<=":
+            return a <= b
+        if op == ">":
+            return a > b
+        if op == ">=":
+            return a >= b
+    raise compiscript_error(f"Operación '{op}' inválida entre {to_text(a)} y {to_text(b)}")
+
+
+def unary_op(op, a):
+    op = TYPED_UNARY_OPS.get(op, op)
+    if op == "-" and is_int(a):
+        return -a
+    if op == "!" and isinstance(a, bool):
+        return not a
+    raise compiscript_error(f"Operación '{op}' inválida sobre {to_text(a)}")
+
+
+# ---------------- Operaciones tipadas ----------------
+# El análisis semántico eligió cada operación tipada por el tipo estático de sus
+# operandos, pero al correr un valor puede contradecirlo: null (un campo sin
+# inicializar o una función que no devuelve nada) o un campo que una subclase
+# redeclara con otro tipo. Cada función revisa la clase exacta de sus operandos
+# y si no es la esperada lanza TypeError; el motor repite entonces la operación
+# genérica, que da el resultado o el mensaje de error de siempre.
+
+def int_operation(function):
+    """Operación entera tipada: solo entre enteros (un booleano no lo es)."""
+    def typed(a, b):
+        if a.__class__ is int and b.__class__ is int:
+            return function(a, b)
+        raise TypeError
+    return typed
+
+
+def typed_and(a, b):
+    if a.__class__ is bool and b.__class__ is bool:
+        return a and b
+    raise TypeError
+
+
+def typed_or(a, b):
+    if a.__class__ is bool and b.__class__ is bool:
+        return a or b
+    raise TypeError
+
+
+def typed_neg(a):
+    if a.__class__ is int:
+        return -a
+    raise TypeError
+
+
+def typed_not(a):
+    if a.__class__ is bool:
+        return not a
+    raise TypeError
+
+
+def concat(a, b):
+    if a.__class__ is str and b.__class__ is str:
+        return a + b
+    if isinstance(a, str) or isinstance(b, str):
+        return to_text(a) + to_text(b)
+    raise TypeError
+
+
+def concat_all(values):
+    """
+    CONCAT: a + b + c ... con una sola unión en lugar de una cadena nueva por
+    cada '+'. Solo el primer par puede fallar (si ninguno de los dos es una
+    cadena); desde ahí el resultado parcial ya es una cadena.
+    """
+    first = typed_binary("sconcat", values[0], values[1])
+    return "".join([to_text(first)] + [v if v.__class__ is str else to_text(v) for v in values[2:]])
+
+
+TYPED_FUNCTIONS = {
+    "iadd": int_operation(operator.add), "isub": int_operation(operator.sub), "imul": int_operation(operator.mul),
+    "idiv": int_operation(int_div), "imod": int_operation(int_mod),
+    "icmp_lt": int_operation(operator.lt), "icmp_le": int_operation(operator.le),
+    "icmp_gt": int_operation(operator.gt), "icmp_ge": int_operation(operator.ge),
+    "icmp_eq": int_operation(operator.eq), "icmp_ne": int_operation(operator.ne),
+    "sconcat": concat, "band": typed_and, "bor": typed_or,
+}
+TYPED_UNARY_FUNCTIONS = {"ineg": typed_neg, "bnot": typed_not}
+
+
+def typed_binary(op, a, b):
+    """Operación tipada; si un operando no es del tipo esperado, la genérica da el resultado o el error de siempre."""
+    try:
+        return TYPED_FUNCTIONS[op](a, b)
+    except TypeError:
+        return binary_op(op, a, b)
+
+
+def typed_unary(op, a):
+    try:
+        return TYPED_UNARY_FUNCTIONS[op](a)
+    except TypeError:
+        return unary_op(op, a)
+
+
+# ---------------- Arreglos con datos ----------------
+# Un literal de arreglo con todos sus elementos constantes se emite como
+# 'alloc n, (largos, valores)': los valores son literales del TAC en orden por
+# filas y largos tiene uno por dimensión. Cada ejecución crea un arreglo nuevo
+# copiando los datos, porque el programa puede modificarlo.
+
+def array_rows(data):
+    """Valores de un alloc con datos, anidados en filas según sus largos (tuplas)."""
+    lengths, values = data
+    rows = tuple(constant_value(v) for v in values)
+    for n in reversed(lengths[1:]):
+        rows = tuple(rows[k:k + n] for k in range(0, len(rows), n))
+    return rows
+
+
+def copy_rows(rows, rank):
+    if rank == 1:
+        return list(rows)
+    return [copy_rows(row, rank - 1) for row in rows]
+
+
+def array_data(data):
+    """Función sin argumentos que crea cada vez un arreglo nuevo con los datos del alloc."""
+    rows = array_rows(data)
+    rank = len(data[0])
+    if rank == 1:
+        return lambda: list(rows)
+    return lambda: copy_rows(rows, rank)
@@ -3,8 +3,29 @@ from CompiscriptLexer import CompiscriptLexer
 from CompiscriptParser import CompiscriptParser
 from semantic_analizer import semantic_analyzer
 from tac_generator import tac_generator
+from pass_manager import optimize
+from tac_vm import run_tac, tac_vm
+from tac_analysis import (
+    split_units, try_regions, pure_functions, build_call_graph, strongly_connected, recursive_units, reachable_units, format_call_graph,
+)
+from tac_bytecode import run_bytecode, compile_bytecode, OPCODES
+from tac_closure import run_closures
+from tac_python import run_python
+from tac_c import build_native
+from tac_mips import run_mips
+from tac_x86 import build_x86
+from tac_regalloc import allocate_registers, format_allocation_report
+from frame_layout import format_layout
+from object_layout import compute_layouts, shapes_from_quads, format_objects
+import platform
+from tac_runtime import compiscript_error, constant_value
+import io
+import os
+import shutil
+import subprocess
+import tempfile
 
-def run_code_gen(code_snippet: str):
+def run_code_gen(code_snippet: str, tac_file="code.txt"):
     input_stream = InputStream(code_snippet)
     lexer = CompiscriptLexer(input_stream)
     stream = CommonTokenStream(lexer)
@@ -14,7 +35,8 @@ def run_code_gen(code_snippet: str):
     analyzer.visit(tree)
     intermediate_code_generator = tac_generator(analyzer.global_table)
     intermediate_code_generator.visit(tree)
-    intermediate_code_generator.quadruple_table.write_tac("code.txt")
+    if tac_file:
+        intermediate_code_generator.quadruple_table.write_tac(tac_file)
     return analyzer, intermediate_code_generator
 
 code = """ let hola:integer = (1+3)-(4*(5/2));
@@ -105,3 +127,667 @@ for scope_key, st in getattr(analyzer.global_table, "scope_map", {}).items():
 
 print("\n[OK] Memory allocator: offsets impresos y comprobaciones básicas realizadas.")
 
+print("\n--- REGISTROS DE ACTIVACIÓN ---")
+frame_analyzer, frame_gen = run_code_gen("""function f(a: integer, b: boolean): integer {
+        let x: integer = 0;
+        if (b) { let y: integer = 1; let z: boolean = true; x = y; } else { let w: string = "a"; x = 2; }
+        for (let i: integer = 0; i < 3; i = i + 1) { x = x + i; }
+        return x + a;
+    }
+    print(f(1, true));""", tac_file=None)
+f_reg = frame_analyzer.global_table.elements["f"]
+f_scope = frame_analyzer.global_table.scope_map["function_f"]
+record = f_reg.frame
+assert f_reg.frame_size == record.size and record.size % 8 == 0, record.size
+assert record.return_offset == 0 and record.params == {"a": 4, "b": 8}, (record.return_offset, record.params)
+locals_start = record.return_address + 8
+assert f_scope.elements["x"].offset == locals_start
+# Los ámbitos hermanos empiezan en el mismo offset, después de las variables de la función
+sibling_base = locals_start + 4
+for scope in ("if_3", "else_3", "for_4"):
+    assert record.scope_bases[scope] == sibling_base, (scope, record.scope_bases)
+assert f_scope.scope_map["if_3"].elements["y"].offset == sibling_base
+assert f_scope.scope_map["else_3"].elements["w"].offset == (sibling_base + 7) // 8 * 8    # cadena: puntero alineado
+assert f_scope.scope_map["for_4"].elements["i"].offset == sibling_base
+widest = max(offset + size for _, _, offset, size in record.slots)
+assert record.size == (widest + 7) // 8 * 8, (record.size, widest)
+for _, name, offset, size in record.slots:
+    assert offset % min(size, 8) == 0, f"{name} desalineado en {offset}"
+print(format_layout({"f": record}))
+print("\n[OK] Registros de activación: parámetros, retorno y ámbitos hermanos superpuestos.")
+
+print("\n--- ARREGLOS CONTIGUOS ---")
+array_analyzer, array_gen = run_code_gen("""let m: integer[][] = [[1, 2, 3], [4, 5, 6]];
+    let rows: integer[][] = [[1, 2], [3, 4]];
+    let i: integer = 1;
+    m[i][2] = m[0][1] + m[i][i];
+    print(m[1][2]);
+    foreach (row in rows) { print(row[0]); }""", tac_file=None)
+descriptor = array_analyzer.global_table.elements["m"].descriptor
+assert descriptor.flat and descriptor.lengths == [2, 3] and descriptor.strides() == [3, 1], descriptor
+assert descriptor.count() == 6 and descriptor.size() == 24, str(descriptor)
+assert array_analyzer.global_table.elements["m"].size == 6
+# rows se recorre con foreach (se ve cada fila): queda anidado
+assert not array_analyzer.global_table.elements["rows"].descriptor.flat
+quads = array_gen.quadruple_table.quadruples
+# Los literales constantes son un solo alloc con sus datos: m contiguo en orden por filas, rows con sus dos dimensiones
+assert ("alloc", 6, ((6,), ("1", "2", "3", "4", "5", "6")), "t1") in quads, quads[:3]
+assert ("alloc", 2, ((2, 2), ("1", "2", "3", "4")), "t1") in quads, quads[:3]
+assert not any(q[0] == "[]=" for q in quads[:3]), quads[:3]
+m_loads = [q for q in quads if q[0] == "[]" and q[1] == "m"]
+assert len(m_loads) == 3 and ("[]", "m", "1", m_loads[0][3]) in quads, m_loads     # m[0][1] es constante
+assert [q[1:3] for q in quads if q[0] == "bounds"] == [("i", "2"), ("i", "3"), ("i", "2")], quads
+assert sum(1 for q in quads if q[0] == "[]" and q[1] == "rows") == 1
+_, array_gen = run_code_gen("""let m: integer[][] = [[1, 2, 3], [4, 5, 6]];
+    function touch(i: integer) {
+        m[i][1] = m[i][0] + m[i][2];
+        print(m[0][1]);
+    }
+    touch(1);""", tac_file=None)
+quads = optimize(array_gen.quadruple_table.quadruples, opt_level=1, verbose=False)
+# El mismo i se verifica una vez por bloque y el índice constante 0 no necesita verificación
+assert [q[1:3] for q in quads if q[0] == "bounds"] == [("i", "2")], quads
+bounds_program = """let arr: integer[] = [4, 5, 6];
+    let m: integer[][] = [[1, 2, 3], [4, 5, 6]];
+    let s: integer = 0;
+    foreach (x in arr) { s = s + x; }
+    for (let i: integer = 0; i < 2; i = i + 1) {
+        for (let j: integer = 0; j < 3; j = j + 1) { s = s + m[i][j]; }
+    }
+    for (let i: integer = 0; i < 3; i = i + 1) { arr[i] = arr[i] + 1; }
+    function head(v: integer[], n: integer): integer {
+        let t: integer = 0;
+        for (let i: integer = 0; i < n; i = i + 1) { t = t + v[i]; }
+        return t;
+    }
+    print(s + head(arr, 2));"""
+_, array_gen = run_code_gen(bounds_program, tac_file=None)
+quads = optimize(array_gen.quadruple_table.quadruples, opt_level=2, verbose=False)
+# foreach, los for contra el largo del literal y la matriz quedan sin verificar; n puede ser cualquier valor
+assert [q[1:3] for q in quads if q[0] in ("[]", "[]=", "bounds")] == [("v", "i")], quads
+assert ("[]u", "m", "t3", "t4") in quads and sum(1 for q in quads if q[0] == "[]=u" and q[3] == "arr") == 1, quads
+data_program = """const N: integer = 3;
+    let x: integer = 5;
+    let grid: integer[][] = [[1, N], [N * 2, 4]];
+    let ragged: integer[][] = [[1], [2, 3]];
+    let names: string[] = ["a", "b" + N];
+    let mixed: integer[] = [1, x, 3];
+    function fresh(): integer[] { return [7, 8]; }
+    let a: integer[] = fresh();
+    a[0] = 0;
+    for (let i: integer = 0; i < 2; i = i + 1) { let t: integer[] = [0, 0]; t[i] = i + 1; print(t); }
+    print(grid); print(ragged); print(names); print(mixed); print(a); print(fresh());"""
+_, array_gen = run_code_gen(data_program, tac_file=None)
+quads = array_gen.quadruple_table.quadruples
+assert ("alloc", 2, ((2, 2), ("1", "3", "6", "4")), "t1") in quads, quads
+assert ("alloc", 2, ((2,), ('"a"', '"b3"')), "t1") in quads, quads
+# Solo ragged (no es rectangular: cada fila tiene sus datos) y mixed (x se conoce al correr) escriben elemento por
+# elemento; el resto de los '[]=' son del programa
+assert [q[3] for q in quads if q[0] == "[]="] == ["t3", "t3", "t1", "t1", "t1", "a", "t"], quads
+_, array_gen = run_code_gen("let big: integer[] = [" + ", ".join(map(str, range(1000))) + "];", tac_file=None)
+assert len(array_gen.quadruple_table.quadruples) == 2, array_gen.quadruple_table.quadruples[:3]
+print(descriptor)
+print("\n[OK] Arreglos: matrices rectangulares contiguas con un solo acceso por elemento y accesos en rango sin verificar;")
+print("     los literales constantes se copian de sus datos con un solo alloc.")
+
+print("\n--- DISPOSICIÓN DE OBJETOS ---")
+object_program = """class Shape {
+        let name: string = "figura";
+        let sides: integer = 0;
+        function area(): integer { return 0; }
+        function describe(): string { return this.name + " de " + this.sides + " lados"; }
+    }
+    class Square : Shape {
+        let side: integer = 3;
+        let sides: integer = 4;
+        function area(): integer { return this.side * this.side; }
+        function grow() { this.side = this.side + 1; }
+    }
+    class Other {
+        let sides: integer = 7;
+        let name: string = "otro";
+        function describe(): string { return "soy " + this.name; }
+    }
+    let s: Shape = new Square();
+    let q: Square = new Square();
+    q.grow();
+    print(s.describe() + " " + s.area() + " " + q.area());
+    let o: Shape = new Other();
+    print(o.describe() + " " + o.sides);"""
+_, object_gen = run_code_gen(object_program, tac_file=None)
+layouts = object_gen.object_layouts
+square = layouts["Square"]
+# Heredados primero; sides redeclarado conserva su posición y solo cambia el valor inicial
+assert square.fields == ["name", "sides", "side"] and square.initial == [None, None, None], square.fields
+assert square.methods == ["area", "describe", "grow"] and square.owners == ["Square", "Shape", "Square"]
+from_quads = compute_layouts(shapes_from_quads(object_gen.quadruple_table.quadruples))
+assert all(from_quads[n].fields == l.fields and from_quads[n].methods == l.methods for n, l in layouts.items())
+assert from_quads["Square"].initial == ["figura", 4, 3], from_quads["Square"].initial
+quads = object_gen.quadruple_table.quadruples
+assert [q[1:3] for q in quads if q[0] == "CALL_VIRTUAL"] == [
+    ("q", (2, "grow", 0)), ("s", (1, "describe", 0)), ("s", (0, "area", 0)), ("q", (0, "area", 0)),
+    ("o", (1, "describe", 0))]
+assert ("LOAD_FIELD", "this", (2, "side")) in [q[:3] for q in quads] and not any(q[0] == "GET_FIELD" for q in quads)
+calls = [q[1:3] for q in optimize(quads, passes=["devirtualize"], verbose=False)
+         if q[0] in ("CALL_VIRTUAL", "CALL_DIRECT")]
+# area se redefine en Square: queda virtual; los demás tienen una sola implementación con guarda de ranura
+assert calls == [("q", ("Square", "grow", 0, 2)), ("s", ("Shape", "describe", 0, 1)), ("s", (0, "area", 0)),
+                 ("q", (0, "area", 0)), ("o", ("Shape", "describe", 0, 1))], calls
+this_program = """class A {
+        function f(): integer { return 1; }
+        function g(): integer { return this.f() + this.h(); }
+        function h(): integer { return 2; }
+    }
+    class B : A { function f(): integer { return 3; } }
+    let b: A = new B();
+    print(b.g());"""
+_, this_gen = run_code_gen(this_program, tac_file=None)
+calls = [q for q in optimize(this_gen.quadruple_table.quadruples, passes=["devirtualize"], verbose=False)
+         if q[0] in ("CALL_VIRTUAL", "CALL_DIRECT")]
+# Sobre this no hace falta guarda: ninguna subclase de A redefine h
+assert [(q[0], q[1], q[2][:2]) for q in calls] == [
+    ("CALL_VIRTUAL", "this", (0, "f")), ("CALL_DIRECT", "this", ("A", "h")), ("CALL_DIRECT", "b", ("A", "g"))], calls
+assert calls[1][2][3] is None and calls[2][2][3] == 1
+escape_program = """class Point {
+        let x: integer;
+        let y: integer;
+        function constructor(x: integer, y: integer) { this.x = x; this.y = y; }
+    }
+    class Pair { let a: integer = 1; let b: integer = 2; }
+    function show(o: Point): integer { return o.x; }
+    function dist(n: integer): integer {
+        let total: integer = 0;
+        for (let i: integer = 0; i < n; i = i + 1) {
+            let p: Point = new Point(i, i * 2);
+            total = total + p.x * p.y;
+            let q: Pair = new Pair();
+            total = total + q.a + q.b + show(new Point(i, 0));
+        }
+        return total;
+    }
+    print(dist(10));"""
+_, escape_gen = run_code_gen(escape_program, tac_file=None)
+quads = optimize(escape_gen.quadruple_table.quadruples, opt_level=1, verbose=False)
+# p y q no salen del bloque: sus campos quedan en temporales; el Point que recibe show escapa
+assert [q[1] for q in quads if q[0] == "ALLOC_OBJ"] == ["Point"], [q for q in quads if q[0] == "ALLOC_OBJ"]
+assert not any(q[0] in ("GET_FIELD", "LOAD_FIELD") and q[1] in ("p", "q") for q in quads)
+print(format_objects(layouts))
+print("\n[OK] Objetos: campos heredados primero, métodos redefinidos en la ranura del padre, llamadas desvirtualizadas y objetos que no escapan en temporales.")
+
+print("\n--- GRAFO DE LLAMADAS ---")
+reachability_program = """function unused(n: integer): integer { return n + 1; }
+    function helper(n: integer): integer { return n * 2; }
+    function rec(n: integer): integer { if (n == 0) { return 0; } return rec(n - 1) + helper(1); }
+    class Animal {
+        let name: string = "x";
+        function speak(): string { return "..."; }
+        function never(): string { return "nunca"; }
+    }
+    class Dog : Animal { function speak(): string { return "guau"; } }
+    class Cat : Animal { function speak(): string { return "miau"; } }
+    class Ghost { function boo(): string { return "boo"; } }
+    let a: Animal = new Dog();
+    print(a.speak());
+    print(rec(3));"""
+_, graph_gen = run_code_gen(reachability_program, tac_file=None)
+quads = graph_gen.quadruple_table.quadruples
+graph = build_call_graph(quads)
+assert graph.edges["main"] == {"Animal.speak", "Dog.speak", "Cat.speak", "rec"}, graph.edges["main"]
+components = strongly_connected(graph)
+# Cada componente sale antes que quien la llama
+assert components.index(["helper"]) < components.index(["rec"]) < components.index(["main"]), components
+assert recursive_units(graph, components) == {"rec"}
+reached, live = reachable_units(graph)
+# Animal.speak no se alcanza: el único objeto es un Dog, que lo redefine
+assert reached == {"main", "rec", "helper", "Dog.speak"} and live == {"Dog", "Animal"}, (reached, live)
+quads = optimize(quads, passes=["dead_functions"], verbose=False)
+assert [q[1] for q in quads if q[0] in ("FUNC", "CLASS")] == ["helper", "rec", "Animal", "speak", "never", "Dog", "speak"]
+# Los métodos no alcanzados de una clase viva quedan vacíos y conservan su ranura
+assert ("RETURN", '"nunca"', None, None) not in quads and ("RETURN", '"..."', None, None) not in quads
+print(format_call_graph(graph))
+print("\n[OK] Grafo de llamadas: componentes recursivas y funciones, métodos y clases inalcanzables eliminados.")
+
+print("\n--- DESPACHO DE SWITCH ---")
+switch_cases = [
+    ("denso", """let x: integer = 2;
+        switch (x) { case 1: print(1); case 2: print(2); case 3: print(3); case 5: print(5); }""", "JUMP_TABLE"),
+    ("disperso", """let x: integer = 2;
+        switch (x) { case 1: print(1); case 10: print(2); case 100: print(3); case 1000: print(4); case 10000: print(5); }""", "icmp_lt"),
+    ("cadenas", """let s: string = "b";
+        switch (s) { case "a": print(1); case "b": print(2); default: print(0); }""", "HASH_SWITCH"),
+    ("pocos", """let x: integer = 2;
+        switch (x) { case 1: print(1); case 2: print(2); }""", "icmp_eq"),
+]
+for name, snippet, expected_op in switch_cases:
+    _, gen = run_code_gen(snippet, tac_file=None)
+    ops = [q[0] for q in gen.quadruple_table.quadruples]
+    assert expected_op in ops, f"Switch {name}: se esperaba {expected_op} en {ops}"
+    print(f"{name:10s} -> {expected_op}")
+# Un selector null (campo entero sin inicializar) va al default con cualquiera de las tres formas
+null_switch = """class A { let v: integer; }
+    let a: A = new A();
+    switch (a.v) { case 1: print(1); case 2: print(2); default: print("lineal"); }
+    switch (a.v) { case 1: print(1); case 2: print(2); case 3: print(3); case 5: print(5); default: print("tabla"); }
+    switch (a.v) { case 0: print(0); case 10: print(10); case 200: print(200); case 3000: print(3000); default: print("arbol"); }"""
+_, gen = run_code_gen(null_switch, tac_file=None)
+ops = [q[0] for q in gen.quadruple_table.quadruples]
+assert "JUMP_TABLE" in ops and "icmp_lt" in ops and "icmp_eq" in ops, ops
+for level in (0, 2):
+    quads = optimize(gen.quadruple_table.quadruples, opt_level=level, verbose=False)
+    for engine in (run_tac, run_bytecode, run_closures, run_python):
+        out = io.StringIO()
+        engine(quads, output=out)
+        assert out.getvalue() == "lineal\ntabla\narbol\n", f"{engine.__name__} -O{level}: salió {out.getvalue()!r}"
+
+print("\n[OK] Switch: selección de despacho según densidad de los case; un selector null va al default.")
+
+print("\n--- OPERACIONES TIPADAS ---")
+typed_program = """let n: integer = 7;
+    let s: string = "n=";
+    let ok: boolean = n > 3;
+    let arr: integer[] = [1, 2, 3];
+    let total: integer = 0;
+    foreach (x in arr) { total = total + x * n; }
+    let t: string = s + total;
+    print(t + (n % 4));
+    print(!ok || -n < n / 2);
+    print(n == 7 && total != 0);"""
+_, gen = run_code_gen(typed_program, tac_file=None)
+quads = gen.quadruple_table.quadruples
+ops = [q[0] for q in quads]
+typed_ops = ["iadd", "imul", "imod", "idiv", "icmp_gt", "icmp_lt", "icmp_eq", "icmp_ne", "sconcat", "bnot", "ineg",
+             "band", "bor"]
+for op in typed_ops:
+    assert op in ops, f"Se esperaba {op} en {ops}"
+# Con una cadena de un lado, '+' es concatenación aunque el otro operando sea un entero
+assert any(q[0] == "sconcat" and q[1] == "s" for q in quads), quads
+assert "+" not in ops and "==" not in ops and "!" not in ops, ops
+print(" ".join(typed_ops))
+# Un campo sin inicializar es null aunque su tipo sea integer: la operación genérica da el error de siempre
+_, gen = run_code_gen("""class A { let v: integer; let b: boolean; let s: string; }
+    let a: A = new A();
+    try { print(a.v * 2); } catch (e) { print(e); }
+    try { print(a.v + 1); } catch (e) { print(e); }
+    try { print(a.s + a.s); } catch (e) { print(e); }
+    try { print(!a.b); } catch (e) { print(e); }
+    try { print(-a.v + 1); } catch (e) { print(e); }
+    try { print(a.b || a.v == 0); } catch (e) { print(e); }
+    print(a.v == 0);""", tac_file=None)
+expected = ("Operación '*' inválida entre null y 2\nOperación '+' inválida entre null y 1\n"
+            "Operación '+' inválida entre null y null\nOperación '!' inválida sobre null\n"
+            "Operación '-' inválida sobre null\nOperación '||' inválida entre null y false\nfalse\n")
+for level in (0, 2):
+    quads = optimize(gen.quadruple_table.quadruples, opt_level=level, verbose=False)
+    assert any(q[0] == "imul" for q in quads) and any(q[0] == "sconcat" for q in quads), quads
+    for engine in (run_tac, run_bytecode, run_closures, run_python):
+        out = io.StringIO()
+        engine(quads, output=out)
+        assert out.getvalue() == expected, f"{engine.__name__} -O{level}: salió {out.getvalue()!r}"
+# Un campo redeclarado con otro tipo en una subclase también contradice el tipo estático
+_, gen = run_code_gen("""class Shape {
+        let sides: integer = 0; let ok: boolean = true;
+        function get(): integer { return this.sides; }
+        function flag(): boolean { return this.ok; }
+    }
+    class Sq : Shape { let sides: string = "ab"; let ok: integer = 1; }
+    let s: Shape = new Sq();
+    let k: integer = s.get();
+    let f: boolean = s.flag();
+    try { print(k * 2); } catch (e) { print(e); }
+    try { print(k < 3); } catch (e) { print(e); }
+    try { print(-k); } catch (e) { print(e); }
+    try { print(!f); } catch (e) { print(e); }
+    try { print(f && true); } catch (e) { print(e); }
+    print(k + 1);
+    print(k == 1);""", tac_file=None)
+expected = ("Operación '*' inválida entre ab y 2\nOperación '<' inválida entre ab y 3\n"
+            "Operación '-' inválida sobre ab\nOperación '!' inválida sobre 1\n"
+            "Operación '&&' inválida entre 1 y true\nab1\nfalse\n")
+for level in (0, 1, 2):
+    quads = optimize(gen.quadruple_table.quadruples, opt_level=level, verbose=False)
+    for engine in (run_tac, run_bytecode, run_closures, run_python):
+        out = io.StringIO()
+        engine(quads, output=out)
+        assert out.getvalue() == expected, f"{engine.__name__} -O{level}: salió {out.getvalue()!r}"
+
+print("\n[OK] Tipos: el generador elige iadd, sconcat, icmp_*, band/bor y bnot/ineg; si un valor no tiene el tipo estático se recurre a la operación genérica.")
+
+print("\n--- CONSTANTES ---")
+const_program = """const N: integer = 4;
+    const M = N * 2 + 1;
+    const SALUDO: string = "n=" + N;
+    function doble(x: integer): integer { return x * 2; }
+    const D: integer = doble(N);
+    function f(N: integer): integer { const K: integer = M - 1; return N + K; }
+    class Caja { let v: integer = M; }
+    let c: Caja = new Caja();
+    print(SALUDO + " " + f(1) + " " + c.v + " " + D);
+    switch (D) { case N: print("a"); case N + 1: print("b"); case M - 3: print("c"); case M - 1: print("d"); }"""
+_, gen = run_code_gen(const_program, tac_file=None)
+quads = gen.quadruple_table.quadruples
+stores = [q[3] for q in quads if q[0] == "=" and q[3] in ("N", "M", "SALUDO", "D", "K")]
+# Solo D ocupa memoria: su inicializador es una llamada
+assert stores == ["D"], stores
+assert ("FIELD", "9", None, "v") in quads, quads
+# El parámetro N de f oculta a la constante global
+assert any(q[0] == "iadd" and q[1:3] == ("N", "8") for q in quads), quads
+assert any(q[0] == "JUMP_TABLE" and q[2][0] == 4 for q in quads), quads
+print("stores:", stores)
+print("\n[OK] Constantes: se evalúan al compilar, se sustituyen en cada uso y sus case arman la tabla de saltos.")
+
+print("\n--- CONSTANTES DE CADENA ---")
+string_program = """function nivel(n: integer): string {
+        switch (n) { case 0: return "info"; case 1: return "aviso"; default: return "error"; }
+    }
+    function etiqueta(s: string): integer {
+        switch (s) { case "info": return 1; case "aviso": return 2; case "error": return 3; }
+        return 0;
+    }
+    let total: integer = 0;
+    for (let i: integer = 0; i < 4; i = i + 1) {
+        let msg: string = nivel(i % 3);
+        if (msg == "info") { total = total + 10; }
+        total = total + etiqueta(msg);
+    }
+    print("info" + ": " + total);"""
+_, gen = run_code_gen(string_program, tac_file=None)
+quads = gen.quadruple_table.quadruples
+pool = gen.quadruple_table.string_pool()
+uses = sum(str(q).count('\'"info"\'') for q in quads)
+# "info" aparece en varias instrucciones (y en el HASH_SWITCH) pero ocupa una sola entrada
+assert uses >= 3 and list(pool) == ['"info"', '"aviso"', '"error"', '": "'], (uses, pool)
+assert list(pool.values()) == list(range(len(pool))), pool
+# Internadas: dos literales iguales son el mismo objeto en los motores
+assert constant_value('"in' + 'fo"') is constant_value('"info"')
+print("tabla:", pool)
+print("\n[OK] Cadenas: cada literal ocupa una entrada de la tabla de constantes y se interna al cargarse.")
+
+print("\n--- CONCATENACIÓN ---")
+concat_program = """const PREFIJO: string = "[" + "log" + "]";
+    function linea(k: integer, msg: string): string { return PREFIJO + " " + k + ": " + msg + "!"; }
+    let reporte: string = "";
+    for (let i: integer = 0; i < 3; i = i + 1) { reporte = reporte + linea(i, "ok") + ";"; }
+    print(reporte);
+    print(1 + 2 + "=" + 1 + 2);"""
+_, gen = run_code_gen(concat_program, tac_file=None)
+quads = gen.quadruple_table.quadruples
+concats = [q for q in quads if q[0] == "CONCAT"]
+# Cada cadena de '+' es una sola instrucción; 1 + 2 se suma antes de la primera cadena
+assert ("CONCAT", ('"[log]"', '" "', "k", '": "', "msg", '"!"'), None, concats[0][3]) in concats, concats
+assert not any(q[0] == "sconcat" for q in quads), quads
+assert any(q[0] == "CONCAT" and q[1][1:] == ('"="', "1", "2") for q in quads), concats
+# El plegado une los literales vecinos y deja un sconcat si quedan dos operandos
+folded = optimize([("CONCAT", ('"a"', "x", '"b"', "1", "true"), None, "t1"),
+                   ("CONCAT", ('"a"', '"b"', "x"), None, "t2"), ("CONCAT", ('"a"', "2", '"c"'), None, "t3"),
+                   ("PRINT", None, None, "t1"), ("PRINT", None, None, "t2"), ("PRINT", None, None, "t3")],
+                  passes=["const_fold"], verbose=False)
+assert folded[:3] == [("CONCAT", ('"a"', "x", '"b1true"'), None, "t1"), ("sconcat", '"ab"', "x", "t2"),
+                      ("=", '"a2c"', None, "t3")], folded
+# Solo el primer par puede fallar: dos null no son una concatenación
+_, gen = run_code_gen("""class Registro { let nota: string; }
+    let r: Registro = new Registro();
+    try { print(r.nota + r.nota + "x"); } catch (e) { print(e); }
+    print(r.nota + "x" + r.nota);""", tac_file=None)
+for engine in (run_tac, run_bytecode, run_closures, run_python):
+    out = io.StringIO()
+    engine(gen.quadruple_table.quadruples, output=out)
+    assert out.getvalue() == "Operación '+' inválida entre null y null\nnullxnull\n", (engine.__name__, out.getvalue())
+print("concat:", concats[0])
+print("\n[OK] Concatenación: cada cadena de '+' de cadenas es un solo CONCAT y el plegado une sus literales.")
+
+print("\n--- MÁQUINA VIRTUAL DE TAC ---")
+vm_programs = [
+    ("recursión", """function fib(n: integer): integer {
+            if (n < 2) { return n; }
+            return fib(n - 1) + fib(n - 2);
+        }
+        print(fib(15));""", "610\n"),
+    ("clases", """class Animal {
+            let name: string;
+            function constructor(name: string) { this.name = name; }
+            function speak(): string { return this.name + " hace ruido"; }
+        }
+        class Dog : Animal {
+            function speak(): string { return this.name + " ladra"; }
+        }
+        let a: Animal = new Dog("Rex");
+        print(a.speak());""", "Rex ladra\n"),
+    # Other no es un Shape: la posición y la ranura no corresponden y se busca por nombre
+    ("objetos", object_program, "figura de 4 lados 9 16\nsoy otro 7\n"),
+    ("métodos", this_program, "5\n"),
+    ("escape", escape_program, "645\n"),
+    ("alcanzables", reachability_program, "guau\n6\n"),
+    ("límites", bounds_program, "47\n"),
+    ("tipos", typed_program, "n=423\ntrue\ntrue\n"),
+    ("constantes", const_program, "n=4 9 9 8\nd\n"),
+    ("cadenas", string_program, "info: 27\n"),
+    ("concatenar", concat_program, "[log] 0: ok!;[log] 1: ok!;[log] 2: ok!;\n3=12\n"),
+    ("datos", data_program, "[1, 0]\n[0, 2]\n[[1, 3], [6, 4]]\n[[1], [2, 3]]\n[a, b3]\n[1, 5, 3]\n[0, 8]\n[7, 8]\n"),
+    ("arreglos", """let arr: integer[] = [4, 5, 6];
+        let s: integer = 0;
+        foreach (x in arr) { s = s + x; }
+        arr[0] = s;
+        print(arr[0]);""", "15\n"),
+    ("switch", """let r: string = "";
+        for (let i: integer = 0; i < 5; i = i + 1) {
+            switch (i) { case 0: r = r + "a"; case 1: r = r + "b"; case 2: r = r + "c"; case 3: r = r + "d"; default: r = r + "-"; }
+        }
+        print(r);""", "abcd-\n"),
+    ("excepciones", """let arr: integer[] = [1, 2, 3];
+        try { print(arr[5]); } catch (e) { print("atrapado"); }""", "atrapado\n"),
+    ("matrices", """let m: integer[][] = [[1, 2, 3], [4, 5, 6]];
+        let s: integer = 0;
+        for (let i: integer = 0; i < 2; i = i + 1) {
+            for (let j: integer = 0; j < 3; j = j + 1) { m[i][j] = m[i][j] * 2; s = s + m[i][j]; }
+        }
+        print(s);
+        try { print(m[0][3]); } catch (e) { print(e); }""", "42\nÍndice fuera de rango: 3 (tamaño 3)\n"),
+]
+for name, snippet, expected in vm_programs:
+    _, gen = run_code_gen(snippet, tac_file=None)
+    for level in (0, 2):
+        quads = optimize(gen.quadruple_table.quadruples, opt_level=level, verbose=False)
+        for engine in (run_tac, run_bytecode, run_closures, run_python):
+            out = io.StringIO()
+            engine(quads, output=out)
+            assert out.getvalue() == expected, \
+                f"{engine.__name__} {name} -O{level}: se esperaba {expected!r}, salió {out.getvalue()!r}"
+    print(f"{name:12s} -> {expected.strip()}")
+
+_, gen = run_code_gen("""let g: integer = 1;
+    function fib(n: integer): integer { if (n < 2) { return n; } return fib(n - 1) + fib(n - 2); }
+    function table(n: integer): integer { let a: integer[] = [0, 0]; a[1] = fib(n); return a[1]; }
+    function shifted(n: integer): integer { return n + g; }
+    function loud(n: integer): integer { print(n); return n; }
+    print(table(20) + shifted(1) + loud(3));
+    g = 2;
+    print(shifted(1) + loud(3));""", tac_file=None)
+quads = gen.quadruple_table.quadruples
+# shifted lee una global y loud imprime: no se memorizan
+assert pure_functions(quads) == {"fib", "table"}, pure_functions(quads)
+plain, memo = io.StringIO(), io.StringIO()
+plain_vm = run_tac(quads, output=plain)
+memo_vm = run_tac(quads, output=memo, memoize=8)
+assert memo.getvalue() == plain.getvalue() == "3\n6770\n3\n6\n", memo.getvalue()
+assert memo_vm.steps * 50 < plain_vm.steps and memo_vm.memo_hits == 18, (memo_vm.steps, plain_vm.steps, memo_vm.memo_hits)
+print(f"fib(20)      -> {plain_vm.steps} pasos, memorizado {memo_vm.steps}")
+
+nested_try = """let arr: integer[] = [1, 2, 3];
+    function g(k: integer): integer { return arr[k]; }
+    let r: string = "";
+    for (let i: integer = 0; i < 6; i = i + 2) {
+        try {
+            try { r = r + g(i); } catch (e1) { r = r + "[" + e1 + "]"; print(arr[i]); }
+            r = r + ";";
+        } catch (e2) { r = r + " afuera"; break; }
+    }
+    print(r);"""
+_, gen = run_code_gen(nested_try, tac_file=None)
+quads = gen.quadruple_table.quadruples
+main_unit = split_units(quads)[0]
+(inner_start, inner_end, inner_catch), (outer_start, outer_end, outer_catch) = try_regions(quads, main_unit)
+# El try interno (y su catch) queda dentro del rango del externo
+assert outer_start < inner_start < inner_end < outer_end, try_regions(quads, main_unit)
+assert quads[inner_end] == ("label", None, None, inner_catch) and quads[outer_end][3] == outer_catch
+vm = tac_vm(quads, output=io.StringIO())
+# Entrar a un try no ejecuta nada: no quedan instrucciones de try en el código cargado
+assert not any(ins[4] in ("ON_EXCEPTION", "END_TRY") for ins in vm.main.code)
+(inner_pc, inner_end_pc, inner_catch_pc), (outer_pc, outer_end_pc, _) = vm.main.handlers
+assert outer_pc <= inner_pc < inner_end_pc == inner_catch_pc < outer_end_pc, vm.main.handlers
+for engine in (run_tac, run_bytecode, run_closures, run_python):
+    out = io.StringIO()
+    engine(quads, output=out)
+    assert out.getvalue() == "1;3;[Índice fuera de rango: 4 (tamaño 3)] afuera\n", (engine.__name__, out.getvalue())
+
+# Con un operando null, el backend de Python da el mismo error que la VM y no el de CPython
+for op, a, b in [("-", "x", "5"), ("*", "5", "x"), ("/", "x", "5"), ("%", "x", "2"), ("<", "x", "5"),
+                 (">=", "5", "x"), ("&&", "x", "true"), ("||", "x", "true"), ("-", "x", None), ("!", "x", None)]:
+    quads = [("=", "null", None, "x"), (op, a, b, "t1"), ("PRINT", None, None, "t1")]
+    errors = []
+    for engine in (run_tac, run_python):
+        try:
+            engine(quads, output=io.StringIO())
+            raise AssertionError(f"{engine.__name__}: se esperaba un error con {op}")
+        except compiscript_error as error:
+            errors.append(str(error))
+    assert errors[0] == errors[1] and "inválida" in errors[0], errors
+
+# licm no saca lo que puede fallar: el lazo puede no ejecutarse o el try atrapa el error
+for snippet, expected in [
+    ("""let x: integer; let i: integer = 0;
+        while (i < 0) { let y: integer = x + 1; print(y); i = i + 1; }
+        print("done");""", "done\n"),
+    ("""let x: integer; let i: integer = 0;
+        while (i < 2) { try { let y: integer = x + 1; print(y); } catch (e) { print("caught"); } i = i + 1; }
+        print("done");""", "caught\ncaught\ndone\n"),
+]:
+    _, gen = run_code_gen(snippet, tac_file=None)
+    for level in (0, 1, 2):
+        quads = optimize(gen.quadruple_table.quadruples, opt_level=level, verbose=False)
+        for engine in (run_tac, run_bytecode, run_closures, run_python):
+            out = io.StringIO()
+            engine(quads, output=out)
+            assert out.getvalue() == expected, f"{engine.__name__} -O{level}: salió {out.getvalue()!r}"
+
+print("\n[OK] VM: los programas producen la misma salida con -O0 y -O2; las funciones puras se memorizan.")
+
+print("\n--- BACKEND DE C ---")
+if shutil.which(os.environ.get("CC", "cc")) is None:
+    print("[SKIP] No hay compilador de C; no se prueba el backend nativo.")
+else:
+    with tempfile.TemporaryDirectory() as build_dir:
+        for name, snippet, expected in vm_programs:
+            _, gen = run_code_gen(snippet, tac_file=None)
+            quads = optimize(gen.quadruple_table.quadruples, opt_level=2, verbose=False)
+            executable = build_native(quads, os.path.join(build_dir, "programa"))
+            result = subprocess.run([executable], capture_output=True, text=True)
+            assert result.stdout == expected, f"C {name}: se esperaba {expected!r}, salió {result.stdout!r}"
+            print(f"{name:12s} -> {result.stdout.strip()}")
+    print("\n[OK] Backend de C: los ejecutables imprimen lo mismo que la VM.")
+
+print("\n--- BACKEND DE x86-64 ---")
+if platform.machine().lower() not in ("x86_64", "amd64") or shutil.which("as") is None \
+        or shutil.which(os.environ.get("CC", "cc")) is None:
+    print("[SKIP] No es x86-64 o faltan as/cc; no se prueba el backend de ensamblador.")
+else:
+    with tempfile.TemporaryDirectory() as build_dir:
+        for name, snippet, expected in vm_programs:
+            _, gen = run_code_gen(snippet, tac_file=None)
+            for level in (0, 2):
+                quads = optimize(gen.quadruple_table.quadruples, opt_level=level, verbose=False)
+                executable = build_x86(quads, os.path.join(build_dir, "programa"))
+                result = subprocess.run([executable], capture_output=True, text=True)
+                assert result.stdout == expected, f"x86-64 {name} -O{level}: se esperaba {expected!r}, salió {result.stdout!r}"
+            print(f"{name:12s} -> {result.stdout.strip()}")
+        _, gen = run_code_gen("""let arr: integer[] = [1, 2, 3];
+            print("antes");
+            print(arr[3]);""", tac_file=None)
+        executable = build_x86(gen.quadruple_table.quadruples, os.path.join(build_dir, "error"))
+        result = subprocess.run([executable], capture_output=True, text=True)
+        assert result.returncode == 1 and result.stdout == "antes\n", (result.returncode, result.stdout)
+        assert result.stderr == "Error en tiempo de ejecución: Índice fuera de rango: 3 (tamaño 3)\n", result.stderr
+    print("\n[OK] Backend de x86-64: los ejecutables imprimen lo mismo que la VM.")
+
+print("\n--- BACKEND DE MIPS (SIMULADOR) ---")
+for name, snippet, expected in vm_programs:
+    _, gen = run_code_gen(snippet, tac_file=None)
+    for level in (0, 2):
+        quads = optimize(gen.quadruple_table.quadruples, opt_level=level, verbose=False)
+        out = io.StringIO()
+        simulator = run_mips(quads, output=out)
+        assert out.getvalue() == expected, f"MIPS {name} -O{level}: se esperaba {expected!r}, salió {out.getvalue()!r}"
+    instructions, cycles = simulator.totals()
+    print(f"{name:12s} -> {instructions} instrucciones, {cycles} ciclos")
+
+_, gen = run_code_gen(vm_programs[0][1], tac_file=None)
+simulator = run_mips(gen.quadruple_table.quadruples, output=io.StringIO())
+profile = {row[0]: row for row in simulator.profile()}
+assert profile["fn_fib"][1] == 1973, f"fib(15) debía hacer 1973 llamadas: {profile['fn_fib']}"
+assert profile["fn_fib"][3] >= profile["fn_fib"][2] > 0
+
+_, gen = run_code_gen("""let arr: integer[] = [1, 2, 3];
+    print("antes");
+    print(arr[3]);""", tac_file=None)
+out = io.StringIO()
+try:
+    run_mips(gen.quadruple_table.quadruples, output=out)
+    raise AssertionError("Se esperaba un error en tiempo de ejecución")
+except compiscript_error as error:
+    assert str(error) == "Índice fuera de rango: 3 (tamaño 3)", str(error)
+assert out.getvalue() == "antes\n", out.getvalue()
+print("\n[OK] MIPS: el simulador imprime lo mismo que la VM y cuenta instrucciones y ciclos por función.")
+
+print("\n--- ASIGNACIÓN DE REGISTROS ---")
+for name, snippet, expected in vm_programs:
+    _, gen = run_code_gen(snippet, tac_file=None)
+    quads = optimize(gen.quadruple_table.quadruples, opt_level=2, verbose=False)
+    for registers in (0, 1, 2):
+        for allocator in ("linear", "coloring"):
+            out = io.StringIO()
+            run_mips(quads, output=out, registers=registers, allocator=allocator)
+            assert out.getvalue() == expected, \
+                f"MIPS {name} con {registers} registros ({allocator}): salió {out.getvalue()!r}"
+
+_, gen = run_code_gen("""let n: integer = 20;
+    let total: integer = 0;
+    for (let i: integer = 0; i < n; i = i + 1) {
+        for (let j: integer = 0; j < n; j = j + 1) { total = total + i * j - n; }
+    }
+    print(total);""", tac_file=None)
+quads = optimize(gen.quadruple_table.quadruples, opt_level=2, verbose=False)
+cycles = {}
+for registers, allocator in ((0, "linear"), (2, "linear"), (8, "linear"), (2, "coloring"), (8, "coloring")):
+    out = io.StringIO()
+    cycles[registers, allocator] = run_mips(quads, output=out, registers=registers, allocator=allocator).totals()[1]
+    assert out.getvalue() == "28100\n", f"{registers} registros ({allocator}): salió {out.getvalue()!r}"
+assert cycles[8, "linear"] < cycles[0, "linear"], f"Con registros debía haber menos ciclos: {cycles}"
+assert cycles[8, "coloring"] < cycles[0, "linear"], f"Con registros debía haber menos ciclos: {cycles}"
+main = allocate_registers(quads, 2)[0]
+assert main.spilled > 0 and main.split and len(main.used_registers()) == 2, format_allocation_report([main])
+# Con pocos registros se quedan las variables del lazo interno, que pesan más
+assert main.location("j", main.unit.indices.index(max(
+    i for i in main.unit.indices if quads[i][0] == "iadd" and quads[i][3] == "j"))) is not None, \
+    format_allocation_report([main])
+print(format_allocation_report([main]))
+# -O0 deja 'x = t' tras cada declaración: el coloreo las une y la copia desaparece
+quads = gen.quadruple_table.quadruples
+colored = allocate_registers(quads, 8, method="coloring")[0]
+assert colored.coalesced > 0 and colored.spilled == 0, format_allocation_report([colored])
+print(format_allocation_report([colored]))
+for (registers, allocator), value in sorted(cycles.items()):
+    print(f"ciclos con {registers} registros ({allocator}): {value}")
+print("\n[OK] Registros: misma salida con barrido lineal y coloreo; derrames y copias unidas por función.")
+
+print("\n--- SUPERINSTRUCCIONES DEL BYTECODE ---")
+_, gen = run_code_gen("""let s: integer = 0;
+    for (let i: integer = 0; i < 10; i = i + 1) { s = s + i; }
+    print(s);""", tac_file=None)
+program = compile_bytecode(optimize(gen.quadruple_table.quadruples, opt_level=2, verbose=False))
+main_ops = [program.main.code[pc] for pc in range(0, len(program.main.code), 4)]
+names = [OPCODES[op] for op in main_ops]
+assert "JGE" in names and "IADDI" in names, f"Se esperaban JGE e IADDI en {names}"
+# Las sumas de enteros son opcodes tipados: no miran el tipo de los valores
+assert "IADD" in names and "ADD" not in names, f"Se esperaba IADD en {names}"
+assert "LT" not in names and "JT" not in names, f"La comparación y el salto debían fusionarse: {names}"
+print(" ".join(names))
+print("\n[OK] Bytecode: comparación+salto e incremento fusionados.")
@@ -0,0 +1,566 @@
+"""
+Máquina virtual que interpreta directamente los cuádruplos del TAC.
+
+El cargador recorre cada unidad (programa principal, funciones y métodos) una
+sola vez: resuelve las etiquetas a posiciones, decodifica los operandos en
+(constante | ranura local | variable global) y asocia a cada instrucción su
+manejador. El ciclo principal solo busca la instrucción, avanza el pc y llama
+al manejador; las llamadas usan una pila explícita de marcos, así que la
+recursión del programa no consume la pila de Python.
+
+Entrar a un try no ejecuta nada: cada función tiene su tabla de rangos
+protegidos (ver try_regions) y solo cuando algo falla se busca el rango que
+contiene la instrucción, primero en la función que falló y luego en cada
+llamador, en la instrucción de la llamada.
+
+Con memoize=N (opcional) las funciones puras (ver pure_functions) guardan sus
+últimos N resultados por función, indexados por los valores de los
+argumentos: una recursión como fib pasa de exponencial a lineal. Solo se
+memorizan llamadas cuyos argumentos y resultado son escalares (números,
+booleanos, cadenas o null); con un arreglo u objeto la llamada se ejecuta
+normalmente.
+"""
+import sys
+from collections import OrderedDict
+from tac_analysis import (
+    split_units, pure_functions, try_regions, is_constant, is_temp, label_name, BINARY_OPS, TYPED_OPS, TYPED_UNARY_OPS,
+)
+from tac_runtime import (
+    compiscript_error, cs_object, constant_value, to_text, binary_op, unary_op, typed_binary, typed_unary, is_int,
+    array_data, concat_all,
+)
+from object_layout import shapes_from_quads, compute_layouts
+
+# Tipos de operando decodificado
+CONST = 0
+LOCAL = 1
+GLOBAL = 2
+
+# Valores que una función memorizada puede recibir y devolver
+SCALAR_TYPES = (int, float, bool, str, type(None))
+
+
+class vm_function():
+    """Código cargado de una unidad: instrucciones decodificadas y ranuras locales."""
+    def __init__(self, name, owner_class=None):
+        self.name = name
+        self.owner_class = owner_class
+        self.code = []
+        self.slots = {}         # nombre -> índice de ranura
+        self.params = []        # índices de ranura de los parámetros, en orden
+        self.this_slot = None
+        self.handlers = []      # (inicio, fin, pc del catch), del try más interno al más externo
+        self.memo = None        # OrderedDict (argumentos -> resultado) si la función se memoriza
+
+    def slot(self, name):
+        if name not in self.slots:
+            self.slots[name] = len(self.slots)
+        return self.slots[name]
+
+
+class vm_class():
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.parent = parent
+        self.fields = {}        # campo propio -> valor inicial
+        self.methods = {}       # nombre -> código del método en cada motor
+        self.layout = None      # object_layout: posiciones de los campos y ranuras de la vtable
+        self.names = []         # nombre del campo en cada posición (relleno con None)
+        self.selectors = []     # nombre del método en cada ranura (relleno con None)
+        self.vtable = []        # método de cada ranura (ver build_vtables)
+
+
+def build_class_table(quads):
+    """
+    Clases declaradas en el TAC: padre, campos y disposición de sus objetos (sin
+    métodos). names y selectors se rellenan hasta la clase más grande, así que
+    cualquier posición o ranura del TAC se puede verificar sin revisar el largo.
+    """
+    shapes = shapes_from_quads(quads)
+    layouts = compute_layouts(shapes)
+    n_fields = max((len(l.fields) for l in layouts.values()), default=0)
+    n_methods = max((len(l.methods) for l in layouts.values()), default=0)
+    classes = {}
+    for name, shape in shapes.items():
+        cls = vm_class(name, shape.parent)
+        cls.fields = shape.fields
+        cls.layout = layouts[name]
+        cls.names = cls.layout.fields + [None] * (n_fields - len(cls.layout.fields))
+        cls.selectors = cls.layout.methods + [None] * (n_methods - len(cls.layout.methods))
+        classes[name] = cls
+    return classes
+
+
+def build_vtables(classes, resolve=None):
+    """Llena la vtable de cada clase con los métodos que el motor cargó en methods."""
+    for cls in classes.values():
+        layout = cls.layout
+        vtable = [classes[owner].methods.get(method) for method, owner in zip(layout.methods, layout.owners)]
+        if resolve is not None:
+            vtable = [resolve(m) for m in vtable]
+        cls.vtable = vtable + [None] * (len(cls.selectors) - len(vtable))
+
+
+def class_chain(classes, class_name):
+    """La clase y sus ancestros, de la más derivada a la raíz."""
+    chain = []
+    cls = classes.get(class_name)
+    while cls is not None and cls not in chain:
+        chain.append(cls)
+        cls = classes.get(cls.parent)
+    return chain
+
+
+def new_object(classes, class_name):
+    cls = classes.get(class_name)
+    if cls is None:
+        raise compiscript_error(f"Clase no definida: {class_name}")
+    return cs_object(cls, list(cls.layout.initial))
+
+
+def find_method(classes, class_name, method):
+    for cls in class_chain(classes, class_name):
+        if method in cls.methods:
+            return cls.methods[method]
+    return None
+
+
+def get_field(obj, name):
+    """Campo por nombre; lo usan GET_FIELD y LOAD_FIELD cuando la posición no corresponde."""
+    if isinstance(obj, list) and name in ("size", "length"):
+        return len(obj)
+    if not isinstance(obj, cs_object):
+        raise compiscript_error(f"Acceso a '{name}' sobre {to_text(obj)}")
+    offset = obj.cls.layout.offsets.get(name)
+    if offset is None:
+        raise compiscript_error(f"El objeto {obj.class_name} no tiene el campo '{name}'")
+    return obj.fields[offset]
+
+
+def set_field(obj, name, value):
+    if not isinstance(obj, cs_object):
+        raise compiscript_error(f"Asignación a '{name}' sobre {to_text(obj)}")
+    offset = obj.cls.layout.offsets.get(name)
+    if offset is None:
+        raise compiscript_error(f"El objeto {obj.class_name} no tiene el campo '{name}'")
+    obj.fields[offset] = value
+
+
+class vm_frame():
+    def __init__(self, function, return_dest=None):
+        self.function = function
+        self.code = function.code
+        self.slots = [None] * len(function.slots)
+        self.pc = 0
+        self.return_dest = return_dest
+        self.memo_key = None
+
+
+class tac_vm():
+    def __init__(self, quads, output=sys.stdout, memoize=0):
+        self.quads = quads
+        self.output = output
+        self.memoize = memoize
+        self.memo_hits = 0
+        self.globals = {}
+        self.functions = {}
+        self.classes = {}
+        self.param_stack = []
+        self.frames = []
+        self.current_error = None
+        self.running = False
+        self.steps = 0
+        self.handlers_table = {
+            "=": self.op_copy,
+            "[]": self.op_index_load,
+            "[]=": self.op_index_store,
+            "[]u": self.op_unchecked_load,
+            "[]=u": self.op_unchecked_store,
+            "alloc": self.op_alloc,
+            "length": self.op_length,
+            "bounds": self.op_bounds,
+            "goto": self.op_goto,
+            "if": self.op_if,
+            "JUMP_TABLE": self.op_jump_table,
+            "HASH_SWITCH": self.op_hash_switch,
+            "PRINT": self.op_print,
+            "param": self.op_param,
+            "CALL_FUNC": self.op_call_func,
+            "call": self.op_call_func,
+            "CALL_METHOD": self.op_call_method,
+            "ALLOC_OBJ": self.op_alloc_obj,
+            "CALL_CONSTRUCTOR": self.op_call_constructor,
+            "GET_FIELD": self.op_get_field,
+            "SET_FIELD": self.op_set_field,
+            "LOAD_FIELD": self.op_load_field,
+            "STORE_FIELD": self.op_store_field,
+            "CALL_VIRTUAL": self.op_call_virtual,
+            "CALL_DIRECT": self.op_call_direct,
+            "RETURN": self.op_return,
+            "HALT": self.op_halt,
+            "EXC_ASSIGN": self.op_exc_assign,
+        }
+        self.main = self.load()
+
+    # ---------------- Carga ----------------
+
+    def load(self):
+        units = split_units(self.quads)
+        self.classes = build_class_table(self.quads)
+        loaded = {}
+        for unit in units:
+            function = vm_function(unit.name, unit.owner_class)
+            if unit.owner_class:
+                function.this_slot = function.slot("this")
+            for name in unit.params:
+                function.params.append(function.slot(name))
+            for name in unit.locals:
+                function.slot(name)
+            loaded[unit] = function
+            if unit.owner_class:
+                self.classes[unit.owner_class].methods[unit.name] = function
+            elif unit.name != "main" or unit.header is not None:
+                self.functions[unit.name] = function
+        build_vtables(self.classes)
+        if self.memoize > 0:
+            for name in pure_functions(self.quads, units):
+                self.functions[name].memo = OrderedDict()
+        for unit, function in loaded.items():
+            self.load_code(unit, function, is_main=unit.header is None)
+        return loaded[units[0]]
+
+    def load_code(self, unit, function, is_main):
+        # Primera pasada: posición de cada etiqueta y de cada ON_EXCEPTION (ninguno de los dos se emite)
+        positions = {}
+        starts = {}
+        pc = 0
+        for i in unit.indices:
+            op = self.quads[i][0]
+            if op == "label":
+                positions[label_name(self.quads[i][3])] = pc
+            elif op == "ON_EXCEPTION":
+                starts[i] = pc
+            elif op != "END_TRY":
+                pc += 1
+        function.handlers = [(starts[start], positions[catch], positions[catch])
+                             for start, _, catch in try_regions(self.quads, unit)]
+
+        def target(label):
+            return positions[label_name(label)]
+
+        def operand(x):
+            if x is None:
+                return (CONST, None)
+            if is_constant(x):
+                return (CONST, constant_value(x))
+            if not is_main and (x in function.slots or is_temp(x)):
+                return (LOCAL, function.slot(x))
+            return (GLOBAL, x)
+
+        for i in unit.indices:
+            op, arg1, arg2, res = self.quads[i]
+            if op in ("label", "ON_EXCEPTION", "END_TRY"):
+                continue
+            if op in TYPED_OPS:
+                ins = (self.op_typed_binary, operand(arg1), operand(arg2), operand(res), op)
+            elif op in TYPED_UNARY_OPS:
+                ins = (self.op_typed_unary, operand(arg1), None, operand(res), op)
+            elif op in BINARY_OPS and arg2 is not None:
+                ins = (self.op_binary, operand(arg1), operand(arg2), operand(res), op)
+            elif op in ("-", "!"):
+                ins = (self.op_unary, operand(arg1), None, operand(res), op)
+            elif op == "goto":
+                ins = (self.op_goto, target(arg1 or res), None, None, op)
+            elif op == "if":
+                ins = (self.op_if, operand(arg1), None, target(res), op)
+            elif op == "JUMP_TABLE":
+                low, labels = arg2
+                ins = (self.op_jump_table, operand(arg1), (low, [target(l) for l in labels]), target(res), op)
+            elif op == "HASH_SWITCH":
+                table = {constant_value(value): target(l) for value, l in arg2}
+                ins = (self.op_hash_switch, operand(arg1), table, target(res), op)
+            elif op == "CALL_METHOD":
+                receiver, method = arg1.rsplit(".", 1)
+                ins = (self.op_call_method, (operand(receiver), method), arg2, operand(res), op)
+            elif op in ("CALL_FUNC", "call"):
+                ins = (self.op_call_func, arg1, arg2, operand(res), op)
+            elif op == "alloc" and arg2 is not None:
+                ins = (self.op_alloc_data, None, array_data(arg2), operand(res), op)
+            elif op == "CONCAT":
+                ins = (self.op_concat, tuple(operand(x) for x in arg1), None, operand(res), op)
+            elif op in ("ALLOC_OBJ", "CALL_CONSTRUCTOR"):
+                ins = (self.handlers_table[op], arg1, arg2, operand(res), op)
+            elif op in ("GET_FIELD", "SET_FIELD", "LOAD_FIELD", "STORE_FIELD", "CALL_VIRTUAL"):
+                ins = (self.handlers_table[op], operand(arg1), arg2, operand(res), op)
+            elif op == "CALL_DIRECT":
+                # El método destino se resuelve al cargar
+                owner, method, nargs, guard = arg2
+                ins = (self.op_call_direct, operand(arg1), (self.classes[owner].methods[method], guard, method, nargs),
+                       operand(res), op)
+            elif op in self.handlers_table:
+                ins = (self.handlers_table[op], operand(arg1), operand(arg2), operand(res), op)
+            else:
+                raise compiscript_error(f"Instrucción TAC no soportada por la VM: {op}")
+            function.code.append(ins)
+        if is_main:
+            function.code.append((self.op_halt, None, None, None, "HALT"))
+        else:
+            function.code.append((self.op_return, (CONST, None), None, None, "RETURN"))
+
+    # ---------------- Operandos ----------------
+
+    def read(self, frame, operand):
+        kind, payload = operand
+        if kind == CONST:
+            return payload
+        if kind == LOCAL:
+            return frame.slots[payload]
+        try:
+            return self.globals[payload]
+        except KeyError:
+            raise compiscript_error(f"Variable no inicializada: {payload}")
+
+    def write(self, frame, operand, value):
+        kind, payload = operand
+        if kind == LOCAL:
+            frame.slots[payload] = value
+        elif kind == GLOBAL:
+            self.globals[payload] = value
+
+    # ---------------- Ejecución ----------------
+
+    def run(self):
+        self.frames = [vm_frame(self.main)]
+        self.running = True
+        while self.running:
+            frame = self.frames[-1]
+            ins = frame.code[frame.pc]
+            frame.pc += 1
+            self.steps += 1
+            try:
+                ins[0](frame, ins)
+            except compiscript_error as error:
+                self.throw(error)
+        return self.globals
+
+    def throw(self, error):
+        """Desenrolla hasta el marco cuya tabla tiene un rango con la instrucción en curso, o termina el programa."""
+        for depth in range(len(self.frames) - 1, -1, -1):
+            frame = self.frames[depth]
+            pc = frame.pc - 1       # el pc ya avanzó: la instrucción que falló o la llamada en curso
+            for start, end, catch_pc in frame.function.handlers:
+                if start <= pc < end:
+                    del self.frames[depth + 1:]
+                    # Los param se apilan justo antes de su llamada: entre sentencias la pila está vacía
+                    del self.param_stack[:]
+                    frame.pc = catch_pc
+                    self.current_error = str(error)
+                    return
+        self.running = False
+        raise error
+
+    def op_copy(self, frame, ins):
+        self.write(frame, ins[3], self.read(frame, ins[1]))
+
+    def op_binary(self, frame, ins):
+        self.write(frame, ins[3], binary_op(ins[4], self.read(frame, ins[1]), self.read(frame, ins[2])))
+
+    def op_unary(self, frame, ins):
+        self.write(frame, ins[3], unary_op(ins[4], self.read(frame, ins[1])))
+
+    def op_typed_binary(self, frame, ins):
+        # Sin despacho por operador: el generador ya eligió la operación y solo se revisa el tipo
+        self.write(frame, ins[3], typed_binary(ins[4], self.read(frame, ins[1]), self.read(frame, ins[2])))
+
+    def op_typed_unary(self, frame, ins):
+        self.write(frame, ins[3], typed_unary(ins[4], self.read(frame, ins[1])))
+
+    def op_concat(self, frame, ins):
+        self.write(frame, ins[3], concat_all([self.read(frame, x) for x in ins[1]]))
+
+    def checked_index(self, array, index):
+        if not isinstance(array, list):
+            raise compiscript_error(f"No se puede indexar {to_text(array)}")
+        if not is_int(index) or not 0 <= index < len(array):
+            raise compiscript_error(f"Índice fuera de rango: {to_text(index)} (tamaño {len(array)})")
+        return index
+
+    def op_index_load(self, frame, ins):
+        array = self.read(frame, ins[1])
+        index = self.checked_index(array, self.read(frame, ins[2]))
+        self.write(frame, ins[3], array[index])
+
+    def op_index_store(self, frame, ins):
+        array = self.read(frame, ins[3])
+        index = self.checked_index(array, self.read(frame, ins[2]))
+        array[index] = self.read(frame, ins[1])
+
+    def op_unchecked_load(self, frame, ins):
+        self.write(frame, ins[3], self.read(frame, ins[1])[self.read(frame, ins[2])])
+
+    def op_unchecked_store(self, frame, ins):
+        self.read(frame, ins[3])[self.read(frame, ins[2])] = self.read(frame, ins[1])
+
+    def op_bounds(self, frame, ins):
+        index = self.read(frame, ins[1])
+        length = self.read(frame, ins[2])
+        if not is_int(index) or not 0 <= index < length:
+            raise compiscript_error(f"Índice fuera de rango: {to_text(index)} (tamaño {length})")
+
+    def op_alloc(self, frame, ins):
+        self.write(frame, ins[3], [None] * self.read(frame, ins[1]))
+
+    def op_alloc_data(self, frame, ins):
+        self.write(frame, ins[3], ins[2]())
+
+    def op_length(self, frame, ins):
+        value = self.read(frame, ins[1])
+        if not isinstance(value, (list, str)):
+            raise compiscript_error(f"{to_text(value)} no tiene longitud")
+        self.write(frame, ins[3], len(value))
+
+    def op_goto(self, frame, ins):
+        frame.pc = ins[1]
+
+    def op_if(self, frame, ins):
+        if self.read(frame, ins[1]) is True:
+            frame.pc = ins[3]
+
+    def op_jump_table(self, frame, ins):
+        value = self.read(frame, ins[1])
+        low, targets = ins[2]
+        if is_int(value) and 0 <= value - low < len(targets):
+            frame.pc = targets[value - low]
+        else:
+            frame.pc = ins[3]
+
+    def op_hash_switch(self, frame, ins):
+        value = self.read(frame, ins[1])
+        frame.pc = ins[2].get(value, ins[3]) if isinstance(value, str) else ins[3]
+
+    def op_print(self, frame, ins):
+        self.output.write(to_text(self.read(frame, ins[3])) + "\n")
+
+    def op_param(self, frame, ins):
+        self.param_stack.append(self.read(frame, ins[1]))
+
+    def pop_args(self, count):
+        if count == 0:
+            return []
+        args = self.param_stack[-count:]
+        del self.param_stack[-count:]
+        return args
+
+    def invoke(self, function, args, return_dest, this=None):
+        if len(args) != len(function.params):
+            raise compiscript_error(f"'{function.name}' esperaba {len(function.params)} argumentos, recibió {len(args)}")
+        new_frame = vm_frame(function, return_dest)
+        for slot, value in zip(function.params, args):
+            new_frame.slots[slot] = value
+        if function.this_slot is not None:
+            new_frame.slots[function.this_slot] = this
+        self.frames.append(new_frame)
+
+    def op_call_func(self, frame, ins):
+        function = self.functions.get(ins[1])
+        if function is None:
+            raise compiscript_error(f"Función no definida: {ins[1]}")
+        args = self.pop_args(ins[2])
+        if function.memo is not None and all(type(a) in SCALAR_TYPES for a in args):
+            # El tipo va en la clave: 1, 1.0 y true son iguales para Python
+            key = tuple((type(a), a) for a in args)
+            if key in function.memo:
+                function.memo.move_to_end(key)
+                self.memo_hits += 1
+                self.write(frame, ins[3], function.memo[key])
+                return
+            self.invoke(function, args, ins[3])
+            self.frames[-1].memo_key = key
+            return
+        self.invoke(function, args, ins[3])
+
+    def op_call_method(self, frame, ins):
+        receiver_operand, method = ins[1]
+        receiver = self.read(frame, receiver_operand)
+        args = self.pop_args(ins[2])
+        if not isinstance(receiver, cs_object):
+            raise compiscript_error(f"Llamada al método '{method}' sobre {to_text(receiver)}")
+        function = find_method(self.classes, receiver.class_name, method)
+        if function is None:
+            raise compiscript_error(f"La clase '{receiver.class_name}' no tiene el método '{method}'")
+        self.invoke(function, args, ins[3], this=receiver)
+
+    def op_call_virtual(self, frame, ins):
+        receiver = self.read(frame, ins[1])
+        slot, method, nargs = ins[2]
+        if type(receiver) is cs_object and receiver.cls.selectors[slot] == method:
+            self.invoke(receiver.cls.vtable[slot], self.pop_args(nargs), ins[3], this=receiver)
+        else:
+            self.op_call_method(frame, (None, (ins[1], method), nargs, ins[3]))
+
+    def op_call_direct(self, frame, ins):
+        receiver = self.read(frame, ins[1])
+        function, guard, method, nargs = ins[2]
+        if guard is None or (type(receiver) is cs_object and receiver.cls.selectors[guard] == method):
+            self.invoke(function, self.pop_args(nargs), ins[3], this=receiver)
+        else:
+            self.op_call_method(frame, (None, (ins[1], method), nargs, ins[3]))
+
+    def op_alloc_obj(self, frame, ins):
+        self.write(frame, ins[3], new_object(self.classes, ins[1]))
+
+    def op_call_constructor(self, frame, ins):
+        obj = self.read(frame, ins[3])
+        args = self.pop_args(ins[2])
+        constructor = find_method(self.classes, ins[1], "constructor")
+        if constructor is not None:
+            self.invoke(constructor, args, None, this=obj)
+
+    def op_get_field(self, frame, ins):
+        self.write(frame, ins[3], get_field(self.read(frame, ins[1]), ins[2]))
+
+    def op_set_field(self, frame, ins):
+        set_field(self.read(frame, ins[1]), ins[2], self.read(frame, ins[3]))
+
+    def op_load_field(self, frame, ins):
+        obj = self.read(frame, ins[1])
+        offset, name = ins[2]
+        if type(obj) is cs_object and obj.cls.names[offset] == name:
+            self.write(frame, ins[3], obj.fields[offset])
+        else:
+            self.write(frame, ins[3], get_field(obj, name))
+
+    def op_store_field(self, frame, ins):
+        obj = self.read(frame, ins[1])
+        offset, name = ins[2]
+        if type(obj) is cs_object and obj.cls.names[offset] == name:
+            obj.fields[offset] = self.read(frame, ins[3])
+        else:
+            set_field(obj, name, self.read(frame, ins[3]))
+
+    def op_return(self, frame, ins):
+        value = self.read(frame, ins[1])
+        if len(self.frames) == 1:
+            self.running = False
+            return
+        self.frames.pop()
+        if frame.return_dest is not None:
+            self.write(self.frames[-1], frame.return_dest, value)
+        if frame.memo_key is not None and type(value) in SCALAR_TYPES:
+            memo = frame.function.memo
+            memo[frame.memo_key] = value
+            if len(memo) > self.memoize:
+                memo.popitem(last=False)
+
+    def op_halt(self, frame, ins):
+        self.running = False
+
+    def op_exc_assign(self, frame, ins):
+        self.write(frame, ins[3], self.current_error)
+
+
+def run_tac(quads, output=sys.stdout, memoize=0):
+    """Carga y ejecuta los cuádruplos; devuelve la VM (globales, pasos ejecutados)."""
+    vm = tac_vm(quads, output, memoize)
+    vm.run()
+    return vm
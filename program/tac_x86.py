@@ -0,0 +1,870 @@
+"""
+Backend de x86-64: traduce el TAC a ensamblador AT&T (System V) y lo
+ensambla con 'as'; el ejecutable se enlaza con cc contra un objeto del
+runtime de C (runtime/cs_runtime.c), que se compila una sola vez y queda en
+caché, así que construir un programa no pasa por el compilador de C.
+
+Los valores son los mismos cs_value del backend de C: 16 bytes (etiqueta y
+dato) que la convención System V pasa en un par de registros. Cada función
+del TAC recibe sus argumentos como una función de C con parámetros cs_value
+(rdi:rsi, rdx:rcx, r8:r9 y el resto en la pila) y devuelve en rax:rdx, de
+modo que el código generado llama directamente a las funciones del runtime.
+
+Cada variable y temporal ocupa 16 bytes del marco sobre %rbp; las globales
+van en .bss. Los caminos rápidos de enteros, booleanos e índices se emiten
+en línea y los caminos lentos (cadenas, errores) quedan al final de cada
+función. try usa _setjmp sobre el jmp_buf que registra cs_try_buffer().
+"""
+import hashlib
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+from tac_analysis import (
+    BINARY_OPS, UNARY_OPS, CALL_OPS, INDEX_LOADS, INDEX_STORES, split_units, global_names, quad_uses, quad_defs,
+    is_constant, is_temp, is_name, label_name, generic_op, string_pool,
+)
+from tac_runtime import constant_value
+from tac_vm import build_class_table, class_chain
+from tac_c import RUNTIME_DIR, RUNTIME_SOURCE, native_build_error, fnv1a, c_string_literal
+
+RUNTIME_HEADER = os.path.join(RUNTIME_DIR, "cs_runtime.h")
+RUNTIME_C_FLAGS = ["-std=c99", "-O2", "-c"]
+
+# Etiquetas de cs_value y operadores de cs_binary_slow/cs_unary_slow (cs_runtime.h)
+NULL, INT, BOOL, STR, ARR, OBJ = range(6)
+OP_CODES = {"+": 0, "-": 1, "*": 2, "/": 3, "%": 4, "<": 5, "<=": 6, ">": 7, ">=": 8, "&&": 9, "||": 10}
+# Desplazamientos de field_at y methods en cs_class
+CLASS_FIELD_AT = 40
+CLASS_METHODS = 48
+OP_NEG = 11
+OP_NOT = 12
+# Comparación de enteros: salto condicional y setcc
+CONDITIONS = {"<": "l", "<=": "le", ">": "g", ">=": "ge", "==": "e", "!=": "ne"}
+# Registros de los argumentos cs_value en la convención System V
+ARG_PAIRS = [("%rdi", "%rsi"), ("%rdx", "%rcx"), ("%r8", "%r9")]
+REG32 = {"%rax": "%eax", "%rdi": "%edi", "%rsi": "%esi", "%rdx": "%edx", "%rcx": "%ecx", "%r8": "%r8d", "%r9": "%r9d"}
+INT32_MIN = -(1 << 31)
+INT32_MAX = (1 << 31) - 1
+
+
+def fits_imm32(v):
+    return INT32_MIN <= v <= INT32_MAX
+
+
+def label(name):
+    return f".L{label_name(name)}"
+
+
+class x86_emitter():
+    def __init__(self, quads):
+        self.quads = quads
+        self.units = split_units(quads)
+        self.classes = build_class_table(quads)
+        self.shared = global_names(quads, self.units)
+        self.functions = {u.name: u for u in self.units[1:] if not u.owner_class}
+        self.methods = {}           # (clase, método) -> unidad
+        for unit in self.units[1:]:
+            if unit.owner_class:
+                self.methods[(unit.owner_class, unit.name)] = unit
+        # texto -> cs_string estático; las constantes de cadena del TAC conservan su índice de la tabla
+        self.strings = {constant_value(lit): f"str_{k}" for lit, k in string_pool(quads).items()}
+        self.cstrings = {}          # texto -> char[] (nombres para los mensajes de error)
+        self.data = {}              # datos de un alloc (largos, valores) -> arreglo estático de cs_value
+        self.tables = []
+        self.field_ids = {}
+        self.selector_ids = {}
+        self.internal = 0
+        self.collect_member_names()
+
+    def collect_member_names(self):
+        fields = set()
+        selectors = {name for _, name in self.methods}
+        for cls in self.classes.values():
+            fields.update(cls.fields)
+        for op, arg1, arg2, res in self.quads:
+            if op in ("GET_FIELD", "SET_FIELD"):
+                fields.add(arg2)
+            elif op in ("LOAD_FIELD", "STORE_FIELD"):
+                fields.add(arg2[1])
+            elif op == "CALL_METHOD":
+                selectors.add(arg1.rsplit(".", 1)[1])
+            elif op in ("CALL_VIRTUAL", "CALL_DIRECT"):
+                selectors.add(arg2[1])
+        self.field_ids = {name: n for n, name in enumerate(sorted(fields))}
+        self.selector_ids = {name: n for n, name in enumerate(sorted(selectors))}
+
+    # ---------------- Nombres ----------------
+
+    def function_name(self, unit):
+        if unit.header is None:
+            return "cs_main"
+        if unit.owner_class:
+            return f"m_{unit.owner_class}_{unit.name}"
+        return f"fn_{unit.name}"
+
+    def string(self, text):
+        if text not in self.strings:
+            self.strings[text] = f"str_{len(self.strings)}"
+        return self.strings[text]
+
+    def cstring(self, text):
+        if text not in self.cstrings:
+            self.cstrings[text] = f"cstr_{len(self.cstrings)}"
+        return self.cstrings[text]
+
+    def array_data(self, data):
+        if data not in self.data:
+            self.data[data] = f"data_{len(self.data)}"
+        return self.data[data]
+
+    def new_label(self):
+        self.internal += 1
+        return f".Lx{self.internal}"
+
+    # ---------------- Operandos ----------------
+
+    def constant(self, x):
+        """(etiqueta, dato) de una constante; el dato de una cadena es su símbolo."""
+        v = constant_value(x)
+        if v is None:
+            return NULL, 0
+        if v is True or v is False:
+            return BOOL, int(v)
+        if isinstance(v, str):
+            return STR, self.string(v)
+        return INT, v
+
+    def home(self, x):
+        """Direcciones de la etiqueta y del dato de una variable."""
+        if not is_name(x):
+            raise native_build_error(f"Operando no soportado por el backend de x86-64: {x}")
+        if x in self.slots:
+            offset = -16 * (self.slots[x] + 1)
+            return f"{offset}(%rbp)", f"{offset + 8}(%rbp)"
+        return f"g_{x}(%rip)", f"g_{x}+8(%rip)"
+
+    def tag_operand(self, x):
+        if x is None:
+            return f"${NULL}"
+        if is_constant(x):
+            return f"${self.constant(x)[0]}"
+        return self.home(x)[0]
+
+    def data_operand(self, x):
+        """Operando del dato para una instrucción, o None si hay que cargarlo antes."""
+        if x is None:
+            return "$0"
+        if is_constant(x):
+            tag, data = self.constant(x)
+            if tag == STR or not fits_imm32(data):
+                return None
+            return f"${data}"
+        return self.home(x)[1]
+
+    def load_data(self, x, reg):
+        if is_constant(x):
+            tag, data = self.constant(x)
+            if tag == STR:
+                return [f"leaq {data}(%rip), {reg}"]
+            if not fits_imm32(data):
+                return [f"movabsq ${data}, {reg}"]
+            return [f"movq ${data}, {reg}"]
+        return [f"movq {self.data_operand(x)}, {reg}"]
+
+    def load_pair(self, x, tag_reg, data_reg):
+        """Carga un cs_value en dos registros (para pasarlo a una función)."""
+        if x is None or is_constant(x):
+            return [f"movl {self.tag_operand(x)}, {REG32[tag_reg]}"] + self.load_data(x, data_reg)
+        tag, data = self.home(x)
+        return [f"movq {tag}, {tag_reg}", f"movq {data}, {data_reg}"]
+
+    def store_pair(self, tag_reg, data_reg, res):
+        if not res:
+            return []
+        tag, data = self.home(res)
+        return [f"movq {tag_reg}, {tag}", f"movq {data_reg}, {data}"]
+
+    def store_tagged(self, tag, data_reg, res):
+        if not res:
+            return []
+        home_tag, home_data = self.home(res)
+        return [f"movq ${tag}, {home_tag}", f"movq {data_reg}, {home_data}"]
+
+    def copy(self, x, res):
+        """res = x sin pasar por una llamada (usa %rax como intermedio)."""
+        if not res:
+            return []
+        tag, data = self.home(res)
+        if x is None or is_constant(x):
+            lines = [f"movq {self.tag_operand(x)}, {tag}"]
+            operand = self.data_operand(x)
+            if operand is None:
+                return lines + self.load_data(x, "%rax") + [f"movq %rax, {data}"]
+            return lines + [f"movq {operand}, {data}"]
+        src_tag, src_data = self.home(x)
+        return [f"movq {src_tag}, %rax", f"movq %rax, {tag}", f"movq {src_data}, %rax", f"movq %rax, {data}"]
+
+    def is_int_constant(self, x):
+        return is_constant(x) and type(constant_value(x)) is int
+
+    def tag_checks(self, operands, slow):
+        """Salta a slow si algún operando no constante no tiene la etiqueta esperada."""
+        lines = []
+        for x, tag in operands:
+            if is_constant(x) or x is None:
+                continue
+            lines += [f"cmpl ${tag}, {self.home(x)[0]}", f"jne {slow}"]
+        return lines
+
+    # ---------------- Programa ----------------
+
+    def emit(self):
+        text = []
+        for unit in self.units[1:] + [self.units[0]]:
+            text.extend(self.emit_unit(unit))
+        classes = self.emit_classes()
+
+        lines = ["# Generado por el compilador de Compiscript (backend x86-64, System V)", "\t.text"]
+        lines += text
+        lines += [
+            "",
+            "\t.globl main",
+            "\t.type main, @function",
+            "main:",
+            "\tpushq %rbp",
+            "\tmovq %rsp, %rbp",
+            "\tcall cs_runtime_init@PLT",
+            "\tcall cs_main",
+            "\tcall cs_runtime_exit@PLT",
+            "\txorl %eax, %eax",
+            "\tpopq %rbp",
+            "\tret",
+            "\t.size main, .-main",
+        ]
+        if self.tables:
+            lines += ["", "\t.section .rodata", "\t.align 4"]
+            for table, targets in self.tables:
+                lines.append(f"{table}:")
+                lines += [f"\t.long {t}-{table}" for t in targets]
+        if self.data:
+            # Los datos apuntan a cadenas: solo lectura después de reubicarlos
+            lines += ["", '\t.section .data.rel.ro,"aw"', "\t.align 8"]
+            for (lengths, values), name in self.data.items():
+                lines.append(f"{name}:")
+                for v in values:
+                    lines += self.static_value(constant_value(v))
+                lines += [f"{name}_lengths:", f"\t.quad {', '.join(map(str, lengths))}"]
+        lines += ["", "\t.data", "\t.align 8"]
+        lines += classes
+        for text_, name in self.strings.items():
+            lines += [f"{name}:", f"\t.quad {len(text_.encode('utf-8'))}, {name}_chars"]
+        lines += ["", "\t.section .rodata"]
+        for text_, name in self.strings.items():
+            lines += [f"{name}_chars:", f"\t.string {c_string_literal(text_)}"]
+        for text_, name in self.cstrings.items():
+            lines += [f"{name}:", f"\t.string {c_string_literal(text_)}"]
+        if self.shared:
+            lines += ["", "\t.bss", "\t.align 16"]
+            for name in sorted(self.shared):
+                lines += [f"g_{name}:", "\t.zero 16"]
+        lines += ["", '\t.section .note.GNU-stack,"",@progbits', ""]
+        return "\n".join(lines)
+
+    def static_value(self, v):
+        """Inicializador de un cs_value en .data (valores iniciales de los campos)."""
+        if v is None:
+            return [f"\t.long {NULL}, 0", "\t.quad 0"]
+        if v is True or v is False:
+            return [f"\t.long {BOOL}, 0", f"\t.quad {int(v)}"]
+        if isinstance(v, str):
+            return [f"\t.long {STR}, 0", f"\t.quad {self.string(v)}"]
+        return [f"\t.long {INT}, 0", f"\t.quad {v}"]
+
+    def emit_classes(self):
+        """cs_class de cada clase con su tabla de campos, valores iniciales, vtable y tablas por posición."""
+        lines = []
+        n_fields = max(len(self.field_ids), 1)
+        n_selectors = max(len(self.selector_ids), 1)
+        n_offsets = max([len(cls.layout.fields) for cls in self.classes.values()] + [1])
+        n_slots = max([len(cls.layout.methods) for cls in self.classes.values()] + [1])
+        for name, cls in self.classes.items():
+            chain = class_chain(self.classes, name)
+            layout = cls.layout
+            slots = [-1] * n_fields
+            for slot, field in enumerate(layout.fields):
+                slots[self.field_ids[field]] = slot
+            field_at = [self.field_ids[f] for f in layout.fields] + [-1] * (n_offsets - len(layout.fields))
+            lines += [
+                f"class_{name}:",
+                f"\t.quad {self.cstring(name)}",
+                f"\t.long {len(layout.fields)}, 0",
+                f"\t.quad class_{name}_slots, class_{name}_init, class_{name}_vtable",
+                f"\t.quad class_{name}_field_at, class_{name}_methods",
+                f"class_{name}_slots:",
+                f"\t.long {', '.join(map(str, slots))}",
+                f"class_{name}_field_at:",
+                f"\t.long {', '.join(map(str, field_at))}",
+                "\t.align 8",
+                f"class_{name}_methods:",
+            ]
+            for slot in range(n_slots):
+                if slot < len(layout.methods):
+                    unit = self.methods[(layout.owners[slot], layout.methods[slot])]
+                    lines += [f"\t.quad {self.function_name(unit)}",
+                              f"\t.long {len(unit.params)}, {self.selector_ids[layout.methods[slot]]}"]
+                else:
+                    lines += ["\t.quad 0", "\t.long 0, -1"]
+            lines.append(f"class_{name}_init:")
+            for value in layout.initial:
+                lines += self.static_value(value)
+            if not layout.fields:
+                lines += self.static_value(None)
+            lines.append(f"class_{name}_vtable:")
+            vtable = [["\t.quad 0", "\t.long 0, 0"]] * n_selectors
+            for selector, n in self.selector_ids.items():
+                for cls in chain:
+                    unit = self.methods.get((cls.name, selector))
+                    if unit is not None:
+                        vtable[n] = [f"\t.quad {self.function_name(unit)}", f"\t.long {len(unit.params)}, 0"]
+                        break
+            lines += [line for entry in vtable for line in entry]
+        return lines
+
+    # ---------------- Unidades ----------------
+
+    def is_local(self, unit, x):
+        if unit.header is None:
+            return x not in self.shared
+        return x in unit.params or x in unit.locals or x == "this" or is_temp(x)
+
+    def emit_unit(self, unit):
+        quads = self.quads
+        self.unit = unit
+        self.has_try = any(quads[i][0] == "ON_EXCEPTION" for i in unit.indices)
+        params = (["this"] if unit.owner_class else []) + list(unit.params)
+        names = list(params)
+        self.uses = {}
+        max_args = 0
+        pending = 0
+        for i in unit.indices:
+            quad = quads[i]
+            used = quad_uses(quad)
+            if quad[0] == "CALL_METHOD":
+                used.append(quad[1].rsplit(".", 1)[0])
+            for n in used:
+                self.uses[n] = self.uses.get(n, 0) + 1
+            for n in used + quad_defs(quad):
+                if is_name(n) and self.is_local(unit, n) and n not in names:
+                    names.append(n)
+            if quad[0] == "param":
+                pending += 1
+            elif quad[0] in CALL_OPS:
+                max_args = max(max_args, pending + 1)
+                pending = 0
+            elif quad[0] == "CONCAT":
+                # Los operandos de cs_concat_n van en el área de salida, como los argumentos en la pila
+                max_args = max(max_args, len(ARG_PAIRS) + len(quad[1]))
+        self.slots = {n: k for k, n in enumerate(names)}
+        # Dos palabras extra: la profundidad de manejadores al entrar y el hash de HASH_SWITCH
+        scratch = -16 * (len(names) + 1)
+        self.depth_slot = f"{scratch}(%rbp)"
+        self.hash_slot = f"{scratch + 8}(%rbp)"
+        frame = 16 * (len(names) + 1) + 16 * max(0, max_args - len(ARG_PAIRS))
+        name = self.function_name(unit)
+        self.return_label = f".L{name}_ret"
+        self.cold = []
+
+        lines = ["", f"\t.type {name}, @function", f"{name}:"]
+        body = ["pushq %rbp", "movq %rsp, %rbp", f"subq ${frame}, %rsp"]
+        for k, p in enumerate(params):
+            tag, data = self.home(p)
+            if k < len(ARG_PAIRS):
+                body += [f"movq {ARG_PAIRS[k][0]}, {tag}", f"movq {ARG_PAIRS[k][1]}, {data}"]
+            else:
+                offset = 16 + 16 * (k - len(ARG_PAIRS))
+                body += [f"movq {offset}(%rbp), %rax", f"movq %rax, {tag}",
+                         f"movq {offset + 8}(%rbp), %rax", f"movq %rax, {data}"]
+        # Las variables empiezan en null
+        body += [f"movq ${NULL}, {self.home(n)[0]}" for n in names[len(params):]]
+        if self.has_try:
+            body += ["movl cs_handler_depth(%rip), %eax", f"movq %rax, {self.depth_slot}"]
+        lines += ["\t" + line for line in body]
+
+        call_params = []
+        indices = unit.indices
+        skip = set()
+        for position, i in enumerate(indices):
+            if i in skip:
+                continue
+            quad = quads[i]
+            following = quads[indices[position + 1]] if position + 1 < len(indices) else None
+            if self.fusable(quad, following):
+                skip.add(indices[position + 1])
+                code = self.emit_compare_branch(quad, label(following[3]))
+            else:
+                code = self.emit_quad(quad, call_params)
+            lines += [line if line.endswith(":") else "\t" + line for line in code]
+
+        epilogue = [f"movq ${NULL}, %rax"] if unit.header is not None else []
+        epilogue.append(f"{self.return_label}:")
+        if self.has_try:
+            # Los try que sigan abiertos en esta activación dejan de valer
+            epilogue += [f"movq {self.depth_slot}, %rcx", "movl %ecx, cs_handler_depth(%rip)"]
+        epilogue += ["leave", "ret"]
+        lines += [line if line.endswith(":") else "\t" + line for line in epilogue]
+        # Caminos lentos, fuera de la ruta principal
+        lines += [line if line.endswith(":") else "\t" + line for line in self.cold]
+        lines.append(f"\t.size {name}, .-{name}")
+        return lines
+
+    def fusable(self, quad, following):
+        """'t = a < b; if t goto L' con t usado solo por el if: comparación y salto directos."""
+        op, arg1, arg2, res = quad
+        return following is not None and following[0] == "if" and generic_op(op) in ("<", "<=", ">", ">=") \
+            and arg2 is not None and following[1] == res and is_temp(res) and self.uses.get(res) == 1 \
+            and not any(is_constant(x) and not self.is_int_constant(x) for x in (arg1, arg2))
+
+    # ---------------- Caminos lentos ----------------
+
+    def slow_binary(self, op, arg1, arg2):
+        """Llamada a cs_binary_slow (lanza el error de tipos o la división entre cero)."""
+        return [f"movl ${OP_CODES[op]}, %edi"] + self.load_pair(arg1, "%rsi", "%rdx") + \
+            self.load_pair(arg2, "%rcx", "%r8") + ["call cs_binary_slow@PLT"]
+
+    def add_cold(self, slow, code, resume=None):
+        self.cold += [f"{slow}:"] + code + ([f"jmp {resume}"] if resume else [])
+
+    # ---------------- Instrucciones ----------------
+
+    def emit_binary(self, op, arg1, arg2, res):
+        if op == "sconcat":
+            # Uno de los operandos es una cadena: directo a cs_concat, sin el camino de enteros
+            done = self.new_label()
+            return self.add_slow(arg1, arg2, res, done) + [f"{done}:"]
+        # Un '+' puede ser una concatenación, también un iadd si un operando no resulta entero
+        concat = op in ("+", "iadd")
+        op = generic_op(op)
+        if op in ("==", "!="):
+            return self.emit_equality(op, arg1, arg2, res)
+        slow = self.new_label()
+        resume = self.new_label()
+        expected = BOOL if op in ("&&", "||") else INT
+        if any(is_constant(x) and self.constant(x)[0] != expected for x in (arg1, arg2)):
+            # Un operando constante del tipo equivocado: siempre es el camino lento
+            if concat:
+                done = self.new_label()
+                return self.add_slow(arg1, arg2, res, done) + [f"{done}:"]
+            return self.slow_binary(op, arg1, arg2)
+        lines = self.tag_checks([(arg1, expected), (arg2, expected)], slow)
+        lines += self.load_data(arg1, "%rax")
+        right = self.data_operand(arg2)
+        if right is None:
+            lines += self.load_data(arg2, "%rcx")
+            right = "%rcx"
+        if op in ("/", "%"):
+            if right != "%rcx":
+                lines.append(f"movq {right}, %rcx")
+            lines += ["testq %rcx, %rcx", f"je {slow}", "cqto", "idivq %rcx"]
+            if op == "%":
+                lines.append("movq %rdx, %rax")
+        elif op in ("+", "-", "*", "&&", "||"):
+            mnemonic = {"+": "addq", "-": "subq", "*": "imulq", "&&": "andq", "||": "orq"}[op]
+            lines.append(f"{mnemonic} {right}, %rax")
+        else:
+            lines += [f"cmpq {right}, %rax", f"set{CONDITIONS[op]} %al", "movzbl %al, %eax"]
+        result = BOOL if op in CONDITIONS or op in ("&&", "||") else INT
+        lines += self.store_tagged(result, "%rax", res)
+        if concat:
+            lines.append(f"{resume}:")
+            self.add_cold(slow, self.add_slow(arg1, arg2, res, resume))
+        else:
+            self.add_cold(slow, self.slow_binary(op, arg1, arg2))
+        return lines
+
+    def add_slow(self, arg1, arg2, res, done):
+        """Suma que no es de enteros: con una cadena concatena, si no es un error de tipos."""
+        concat = self.new_label()
+        if any(is_constant(x) and self.constant(x)[0] == STR for x in (arg1, arg2)):
+            lines = []
+        else:
+            lines = []
+            for x in (arg1, arg2):
+                if not is_constant(x):
+                    lines += [f"cmpl ${STR}, {self.tag_operand(x)}", f"je {concat}"]
+            lines += self.slow_binary("+", arg1, arg2)
+        lines += [f"{concat}:"] + self.load_pair(arg1, "%rdi", "%rsi") + self.load_pair(arg2, "%rdx", "%rcx")
+        return lines + ["call cs_concat@PLT"] + self.store_pair("%rax", "%rdx", res) + [f"jmp {done}"]
+
+    def emit_compare_branch(self, quad, target):
+        op, arg1, arg2, res = quad
+        op = generic_op(op)
+        slow = self.new_label()
+        lines = self.tag_checks([(arg1, INT), (arg2, INT)], slow)
+        lines += self.load_data(arg1, "%rax")
+        right = self.data_operand(arg2)
+        if right is None:
+            lines += self.load_data(arg2, "%rcx")
+            right = "%rcx"
+        lines += [f"cmpq {right}, %rax", f"j{CONDITIONS[op]} {target}"]
+        self.add_cold(slow, self.slow_binary(op, arg1, arg2))
+        return lines
+
+    def emit_equality(self, op, arg1, arg2, res):
+        slow = self.new_label()
+        resume = self.new_label()
+        constants = [x for x in (arg1, arg2) if x is None or is_constant(x)]
+        if any(x is not None and self.constant(x)[0] == STR for x in constants) or \
+                any(not self.is_int_constant(x) for x in constants):
+            # Cadenas, null o booleanos constantes: directo a cs_values_equal
+            lines = self.load_pair(arg1, "%rdi", "%rsi") + self.load_pair(arg2, "%rdx", "%rcx")
+            lines += ["call cs_values_equal@PLT", "testl %eax, %eax", f"set{'ne' if op == '==' else 'e'} %al", "movzbl %al, %eax"]
+            return lines + self.store_tagged(BOOL, "%rax", res)
+        lines = self.tag_checks([(arg1, INT), (arg2, INT)], slow)
+        lines += self.load_data(arg1, "%rax")
+        right = self.data_operand(arg2)
+        if right is None:
+            lines += self.load_data(arg2, "%rcx")
+            right = "%rcx"
+        lines += [f"cmpq {right}, %rax", f"set{CONDITIONS[op]} %al", "movzbl %al, %eax", f"{resume}:"]
+        lines += self.store_tagged(BOOL, "%rax", res)
+        code = self.load_pair(arg1, "%rdi", "%rsi") + self.load_pair(arg2, "%rdx", "%rcx")
+        code += ["call cs_values_equal@PLT", "testl %eax, %eax", f"set{'ne' if op == '==' else 'e'} %al", "movzbl %al, %eax"]
+        self.add_cold(slow, code, resume=resume)
+        return lines
+
+    def emit_unary(self, op, arg1, res):
+        op = generic_op(op)
+        slow = self.new_label()
+        expected = INT if op == "-" else BOOL
+        code = [f"movl ${OP_NEG if op == '-' else OP_NOT}, %edi"] + self.load_pair(arg1, "%rsi", "%rdx") + \
+            ["call cs_unary_slow@PLT"]
+        if is_constant(arg1) and self.constant(arg1)[0] != expected:
+            return code
+        lines = self.tag_checks([(arg1, expected)], slow) + self.load_data(arg1, "%rax")
+        lines.append("negq %rax" if op == "-" else "xorq $1, %rax")
+        self.add_cold(slow, code)
+        return lines + self.store_tagged(expected, "%rax", res)
+
+    def element_address(self, array, index, slow):
+        """
+        Deja en %rcx los elementos y en %rax el desplazamiento de array[index]
+        (verifica límites salvo si slow es None); None si el acceso siempre falla.
+        """
+        if array is None or is_constant(array) or (is_constant(index) and self.constant(index)[0] != INT):
+            return None
+        lines = self.tag_checks([(array, ARR), (index, INT)], slow) if slow else []
+        lines += [f"movq {self.home(array)[1]}, %rcx"] + self.load_data(index, "%rax")
+        if slow:
+            lines += ["cmpq (%rcx), %rax", f"jae {slow}"]
+        return lines + ["movq 8(%rcx), %rcx", "shlq $4, %rax"]
+
+    def index_fail(self, array, index):
+        return self.load_pair(array, "%rdi", "%rsi") + self.load_pair(index, "%rdx", "%rcx") + \
+            ["call cs_index_fail@PLT"]
+
+    def emit_field(self, op, obj, ref, value):
+        """LOAD_FIELD/STORE_FIELD: acceso directo si la clase del objeto tiene el campo en esa posición."""
+        offset, name = ref
+        if op == "LOAD_FIELD":
+            fallback = self.emit_quad(("GET_FIELD", obj, name, value), [])
+        else:
+            fallback = self.emit_quad(("SET_FIELD", obj, name, value), [])
+        if obj is None or is_constant(obj):
+            return fallback
+        slow = self.new_label()
+        resume = self.new_label()
+        self.add_cold(slow, fallback, resume)
+        tag, data = self.home(obj)
+        lines = [f"cmpl ${OBJ}, {tag}", f"jne {slow}", f"movq {data}, %rax", "movq (%rax), %rcx",
+                 f"movq {CLASS_FIELD_AT}(%rcx), %rcx", f"cmpl ${self.field_ids[name]}, {4 * offset}(%rcx)",
+                 f"jne {slow}"]
+        if op == "LOAD_FIELD":
+            lines += [f"movq {8 + 16 * offset}(%rax), %rdx", f"movq {16 + 16 * offset}(%rax), %rax"]
+            lines += self.store_pair("%rdx", "%rax", value)
+        else:
+            lines += self.load_pair(value, "%rdx", "%rcx")
+            lines += [f"movq %rdx, {8 + 16 * offset}(%rax)", f"movq %rcx, {16 + 16 * offset}(%rax)"]
+        return lines + [f"{resume}:"]
+
+    def call_runtime(self, function, args):
+        """Llama a una función del runtime con argumentos cs_value."""
+        lines = []
+        for k, x in enumerate(args):
+            lines += self.load_pair(x, *ARG_PAIRS[k])
+        return lines + [f"call {function}@PLT"]
+
+    def pop_arguments(self, params, count):
+        if count > len(params):
+            raise native_build_error(f"Llamada con argumentos fuera de orden en {self.unit.qualified_name}")
+        args = params[len(params) - count:] if count else []
+        del params[len(params) - count:]
+        return args
+
+    def pass_arguments(self, args):
+        """Los tres primeros cs_value en registros y el resto en la pila, como en C."""
+        lines = self.spill_values(args[len(ARG_PAIRS):])
+        for k, x in enumerate(args[:len(ARG_PAIRS)]):
+            lines += self.load_pair(x, *ARG_PAIRS[k])
+        return lines
+
+    def spill_values(self, values):
+        """Copia los cs_value seguidos al área de salida de la pila, desde (%rsp)."""
+        lines = []
+        for k, x in enumerate(values):
+            offset = 16 * k
+            if x is None or is_constant(x):
+                lines.append(f"movq {self.tag_operand(x)}, {offset}(%rsp)")
+                lines += self.load_data(x, "%rax") + [f"movq %rax, {offset + 8}(%rsp)"]
+            else:
+                tag, data = self.home(x)
+                lines += [f"movq {tag}, %rax", f"movq %rax, {offset}(%rsp)",
+                          f"movq {data}, %rax", f"movq %rax, {offset + 8}(%rsp)"]
+        return lines
+
+    def call_unit(self, callee, args, receiver=None):
+        """Llamada directa con verificación de aridad en tiempo de compilación."""
+        if len(args) != len(callee.params):
+            return [f"leaq {self.cstring(callee.name)}(%rip), %rdi", f"movl ${len(callee.params)}, %esi",
+                    f"movl ${len(args)}, %edx", "call cs_arity_error@PLT"]
+        if receiver is not None:
+            args = [receiver] + args
+        return self.pass_arguments(args) + [f"call {self.function_name(callee)}"]
+
+    def emit_quad(self, quad, params):
+        op, arg1, arg2, res = quad
+        if op == "label":
+            return [f"{label(res)}:"]
+        if op in BINARY_OPS and arg2 is not None:
+            return self.emit_binary(op, arg1, arg2, res)
+        if op in UNARY_OPS:
+            return self.emit_unary(op, arg1, res)
+        if op == "=":
+            return self.copy(arg1, res)
+        if op == "goto":
+            return [f"jmp {label(arg1 or res)}"]
+        if op == "if":
+            if is_constant(arg1):
+                return [f"jmp {label(res)}"] if constant_value(arg1) is True else []
+            skip = self.new_label()
+            tag, data = self.home(arg1)
+            return [f"cmpl ${BOOL}, {tag}", f"jne {skip}", f"cmpq $0, {data}", f"jne {label(res)}", f"{skip}:"]
+        if op == "JUMP_TABLE":
+            low, labels = arg2
+            table = f".Ltable{len(self.tables)}"
+            self.tables.append((table, [label(l) for l in labels]))
+            default = label(res)
+            lines = self.tag_checks([(arg1, INT)], default) + self.load_data(arg1, "%rax")
+            if low:
+                lines.append(f"subq ${low}, %rax")
+            return lines + [
+                f"cmpq ${len(labels)}, %rax", f"jae {default}",
+                f"leaq {table}(%rip), %rcx", "movslq (%rcx,%rax,4), %rax", "addq %rcx, %rax", "jmp *%rax",
+            ]
+        if op == "HASH_SWITCH":
+            lines = self.call_runtime("cs_hash", [arg1]) + [f"movq %rax, {self.hash_slot}"]
+            for v, l in arg2:
+                text = constant_value(v)
+                miss = self.new_label()
+                lines += [f"cmpl ${fnv1a(text)}, {self.hash_slot}", f"jne {miss}"]
+                lines += self.load_pair(arg1, "%rdi", "%rsi")
+                lines += [f"leaq {self.string(text)}(%rip), %rdx", "call cs_str_equals@PLT",
+                          "testl %eax, %eax", f"jne {label(l)}", f"{miss}:"]
+            return lines + [f"jmp {label(res)}"]
+        if op == "RETURN":
+            if self.unit.header is None:
+                return [f"jmp {self.return_label}"]
+            lines = self.load_pair(arg1, "%rax", "%rdx") if arg1 is not None else [f"movq ${NULL}, %rax"]
+            return lines + [f"jmp {self.return_label}"]
+        if op in INDEX_LOADS:
+            slow = self.new_label() if op == "[]" else None
+            lines = self.element_address(arg1, arg2, slow)
+            if lines is None:
+                return self.index_fail(arg1, arg2)
+            if slow:
+                self.add_cold(slow, self.index_fail(arg1, arg2))
+            lines += ["movq (%rcx,%rax), %rdx", "movq 8(%rcx,%rax), %rax"]
+            return lines + self.store_pair("%rdx", "%rax", res)
+        if op in INDEX_STORES:
+            slow = self.new_label() if op == "[]=" else None
+            lines = self.element_address(res, arg2, slow)
+            if lines is None:
+                return self.index_fail(res, arg2)
+            if slow:
+                self.add_cold(slow, self.index_fail(res, arg2))
+            if arg1 is None or is_constant(arg1):
+                lines.append(f"movq {self.tag_operand(arg1)}, (%rcx,%rax)")
+                operand = self.data_operand(arg1)
+                if operand is None:
+                    lines += self.load_data(arg1, "%rdx")
+                    operand = "%rdx"
+                return lines + [f"movq {operand}, 8(%rcx,%rax)"]
+            tag, data = self.home(arg1)
+            return lines + [f"movq {tag}, %rdx", "movq %rdx, (%rcx,%rax)", f"movq {data}, %rdx", "movq %rdx, 8(%rcx,%rax)"]
+        if op == "bounds":
+            fail = self.call_runtime("cs_bounds_fail", [arg1, arg2])
+            if is_constant(arg1) and self.constant(arg1)[0] != INT:
+                return fail
+            slow = self.new_label()
+            self.add_cold(slow, fail)
+            lines = self.tag_checks([(arg1, INT), (arg2, INT)], slow)
+            lines += self.load_data(arg1, "%rax") + self.load_data(arg2, "%rdx")
+            return lines + ["cmpq %rdx, %rax", f"jae {slow}"]
+        if op == "alloc" and arg2 is not None:
+            data = self.array_data(arg2)
+            return [f"leaq {data}(%rip), %rdi", f"leaq {data}_lengths(%rip), %rsi", f"movl ${len(arg2[0])}, %edx",
+                    "call cs_alloc_data@PLT"] + self.store_pair("%rax", "%rdx", res)
+        if op == "CONCAT":
+            lines = self.spill_values(arg1) + ["movq %rsp, %rdi", f"movl ${len(arg1)}, %esi", "call cs_concat_n@PLT"]
+            return lines + self.store_pair("%rax", "%rdx", res)
+        if op == "alloc":
+            return self.call_runtime("cs_alloc", [arg1]) + self.store_pair("%rax", "%rdx", res)
+        if op == "length":
+            return self.call_runtime("cs_length", [arg1]) + self.store_pair("%rax", "%rdx", res)
+        if op == "PRINT":
+            return self.call_runtime("cs_print", [res])
+        if op == "param":
+            params.append(arg1)
+            return []
+        if op in ("CALL_FUNC", "call"):
+            args = self.pop_arguments(params, arg2)
+            callee = self.functions.get(arg1)
+            if callee is None:
+                return [f"leaq {self.cstring(arg1)}(%rip), %rdi", "call cs_undefined_function@PLT"]
+            return self.call_unit(callee, args) + self.store_pair("%rax", "%rdx", res)
+        if op == "CALL_METHOD":
+            receiver, method = arg1.rsplit(".", 1)
+            args = self.pop_arguments(params, arg2)
+            lines = self.load_pair(receiver, "%rdi", "%rsi")
+            lines += [f"movl ${self.selector_ids[method]}, %edx", f"leaq {self.cstring(method)}(%rip), %rcx",
+                      f"movl ${len(args)}, %r8d", "call cs_lookup@PLT", "movq (%rax), %r11"]
+            return lines + self.pass_arguments([receiver] + args) + ["call *%r11"] + \
+                self.store_pair("%rax", "%rdx", res)
+        if op == "CALL_VIRTUAL":
+            slot, method, nargs = arg2
+            args = self.pop_arguments(params, nargs)
+            lookup = self.load_pair(arg1, "%rdi", "%rsi") + [
+                f"movl ${self.selector_ids[method]}, %edx", f"leaq {self.cstring(method)}(%rip), %rcx",
+                f"movl ${len(args)}, %r8d", "call cs_lookup@PLT"]
+            call = ["movq (%rax), %r11"] + self.pass_arguments([arg1] + args) + ["call *%r11"] + \
+                self.store_pair("%rax", "%rdx", res)
+            if arg1 is None or is_constant(arg1):
+                return lookup + call
+            # Entrada de la ranura en cs_class.methods: se usa si es el mismo método con la misma aridad
+            slow = self.new_label()
+            resume = self.new_label()
+            tag, data = self.home(arg1)
+            self.add_cold(slow, lookup, resume)
+            return [f"cmpl ${OBJ}, {tag}", f"jne {slow}", f"movq {data}, %rax", "movq (%rax), %rax",
+                    f"movq {CLASS_METHODS}(%rax), %rax", f"addq ${16 * slot}, %rax",
+                    f"cmpl ${self.selector_ids[method]}, 12(%rax)", f"jne {slow}",
+                    f"cmpl ${len(args)}, 8(%rax)", f"jne {slow}", f"{resume}:"] + call
+        if op == "CALL_DIRECT":
+            owner, method, nargs, guard = arg2
+            callee = self.methods[(owner, method)]
+            if guard is None:
+                args = self.pop_arguments(params, nargs)
+                return self.call_unit(callee, args, receiver=arg1) + self.store_pair("%rax", "%rdx", res)
+            args = params[len(params) - nargs:] if nargs else []
+            fallback = self.emit_quad(("CALL_METHOD", f"{arg1}.{method}", nargs, res), params)
+            if arg1 is None or is_constant(arg1):
+                return fallback
+            # Llamada directa si la clase del objeto tiene el método en la ranura; si no, por nombre
+            slow = self.new_label()
+            resume = self.new_label()
+            self.add_cold(slow, fallback, resume)
+            tag, data = self.home(arg1)
+            return [f"cmpl ${OBJ}, {tag}", f"jne {slow}", f"movq {data}, %rax", "movq (%rax), %rax",
+                    f"movq {CLASS_METHODS}(%rax), %rax",
+                    f"cmpl ${self.selector_ids[method]}, {16 * guard + 12}(%rax)", f"jne {slow}"] + \
+                self.call_unit(callee, args, receiver=arg1) + self.store_pair("%rax", "%rdx", res) + [f"{resume}:"]
+        if op == "ALLOC_OBJ":
+            if arg1 not in self.classes:
+                raise native_build_error(f"Clase no definida: {arg1}")
+            return [f"leaq class_{arg1}(%rip), %rdi", "call cs_new_object@PLT"] + self.store_pair("%rax", "%rdx", res)
+        if op == "CALL_CONSTRUCTOR":
+            args = self.pop_arguments(params, arg2)
+            for cls in class_chain(self.classes, arg1):
+                constructor = self.methods.get((cls.name, "constructor"))
+                if constructor is not None:
+                    return self.call_unit(constructor, args, receiver=res)
+            return []
+        if op == "GET_FIELD":
+            is_size = int(arg2 in ("size", "length"))
+            return self.load_pair(arg1, "%rdi", "%rsi") + [
+                f"movl ${self.field_ids[arg2]}, %edx", f"leaq {self.cstring(arg2)}(%rip), %rcx",
+                f"movl ${is_size}, %r8d", "call cs_get_field@PLT",
+            ] + self.store_pair("%rax", "%rdx", res)
+        if op == "SET_FIELD":
+            return self.load_pair(arg1, "%rdi", "%rsi") + self.load_pair(res, "%r8", "%r9") + [
+                f"movl ${self.field_ids[arg2]}, %edx", f"leaq {self.cstring(arg2)}(%rip), %rcx",
+                "call cs_set_field@PLT",
+            ]
+        if op in ("LOAD_FIELD", "STORE_FIELD"):
+            return self.emit_field(op, arg1, arg2, res)
+        if op == "ON_EXCEPTION":
+            return ["call cs_try_buffer@PLT", "movq %rax, %rdi", "call _setjmp@PLT",
+                    "testl %eax, %eax", f"jne {label(res)}"]
+        if op == "END_TRY":
+            skip = self.new_label()
+            return [f"movq {self.depth_slot}, %rax", "cmpl %eax, cs_handler_depth(%rip)", f"jle {skip}",
+                    "decl cs_handler_depth(%rip)", f"{skip}:"]
+        if op == "EXC_ASSIGN":
+            if not res:
+                return []
+            tag, data = self.home(res)
+            return ["movq cs_error(%rip), %rax", f"movq %rax, {tag}", "movq cs_error+8(%rip), %rax", f"movq %rax, {data}"]
+        raise native_build_error(f"Instrucción TAC no soportada por el backend de x86-64: {op}")
+
+
+def x86_source(quads):
+    return x86_emitter(quads).emit()
+
+
+def runtime_object(cc):
+    """
+    Objeto del runtime de C compilado una vez y guardado en caché según el
+    contenido de cs_runtime.{c,h}; construir un programa solo ensambla y enlaza.
+    """
+    digest = hashlib.sha1()
+    for path in (RUNTIME_SOURCE, RUNTIME_HEADER):
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    digest.update(cc.encode())
+    cache_dir = os.path.join(tempfile.gettempdir(), "compiscript-runtime")
+    os.makedirs(cache_dir, exist_ok=True)
+    obj = os.path.join(cache_dir, f"cs_runtime-{digest.hexdigest()[:16]}.o")
+    if not os.path.exists(obj):
+        partial = f"{obj}.{os.getpid()}"
+        command = [cc] + RUNTIME_C_FLAGS + ["-I", RUNTIME_DIR, RUNTIME_SOURCE, "-o", partial]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise native_build_error(f"{' '.join(command)}\n{result.stderr}")
+        os.replace(partial, obj)
+    return obj
+
+
+def run_tool(command):
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise native_build_error(f"{' '.join(command)}\n{result.stderr}")
+
+
+def build_x86(quads, executable, cc=None, assembler=None):
+    """Escribe <executable>.s, lo ensambla con as y lo enlaza con el runtime; devuelve la ruta del ejecutable."""
+    if platform.machine().lower() not in ("x86_64", "amd64"):
+        raise native_build_error(f"El backend de x86-64 no está disponible en {platform.machine()}")
+    cc = cc or os.environ.get("CC", "cc")
+    assembler = assembler or os.environ.get("AS", "as")
+    for tool in (cc, assembler):
+        if shutil.which(tool) is None:
+            raise native_build_error(f"No se encontró '{tool}'")
+    source = executable + ".s"
+    with open(source, "w", encoding="utf-8") as f:
+        f.write(x86_source(quads))
+    obj = executable + ".o"
+    run_tool([assembler, "--64", source, "-o", obj])
+    run_tool([cc, obj, runtime_object(cc), "-o", executable])
+    os.remove(obj)
+    return executable